@@ -0,0 +1,530 @@
+import asyncio
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from platform_handler import get_platform_handler
+from deadline import Deadline, DeadlineExceeded
+from atspi_cache import set_event_dispatch
+
+try:
+    import gi
+    gi.require_version('Atspi', '2.0')
+    from gi.repository import Atspi, GLib
+    ATSPI_EVENTS_AVAILABLE = True
+except (ImportError, ValueError):
+    ATSPI_EVENTS_AVAILABLE = False
+
+# 元素出现/消失时通常会触发的 AT-SPI 事件，用于唤醒 wait_for_element
+ELEMENT_CHANGE_EVENTS = (
+    "object:children-changed",
+    "object:state-changed:showing",
+    "object:state-changed:visible",
+    "window:create",
+    "window:destroy",
+)
+
+
+def _copied(capture):
+    """
+    截图函数的包装：在工作线程中复制结果。
+
+    MIT-SHM 模式下截图是线程专属共享内存的视图，查询线程常驻，同一线程的下一次截图会覆盖之前返回的数组，
+    而协程拿到结果时该线程可能已经在执行另一次截图。
+    """
+    @functools.wraps(capture)
+    def copy(*args):
+        frame = capture(*args)
+        return None if frame is None else frame.copy()
+    return copy
+
+
+class AtspiEventBridge:
+    """把 AT-SPI 事件桥接到 asyncio 事件循环。
+
+    在后台线程中运行 GLib 主循环接收 AT-SPI 事件，通过 call_soon_threadsafe
+    投递给在事件循环中等待的 future。
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self._waiters = []  # (事件类型前缀元组, future)
+        self._lock = threading.Lock()
+        self._listener = None
+        self._registered = []
+        self._glib_loop = None
+        self._thread = None
+
+    def start(self, event_types=ELEMENT_CHANGE_EVENTS):
+        """注册事件监听并启动GLib主循环线程。AT-SPI 不可用时返回False。"""
+        if not ATSPI_EVENTS_AVAILABLE:
+            return False
+        try:
+            self._listener = Atspi.EventListener.new(self._on_event)
+            for event_type in event_types:
+                self._listener.register(event_type)
+                self._registered.append(event_type)
+        except Exception:
+            self.stop()
+            return False
+        self._glib_loop = GLib.MainLoop()
+        self._thread = threading.Thread(target=self._glib_loop.run, name="atspi-event-bridge", daemon=True)
+        self._thread.start()
+        # 主循环运行期间 libatspi 缓存的失效事件也能送达
+        set_event_dispatch(True)
+        return True
+
+    def stop(self):
+        """注销事件监听并停止GLib主循环线程。"""
+        if self._listener is not None:
+            for event_type in self._registered:
+                try:
+                    self._listener.deregister(event_type)
+                except Exception:
+                    pass
+        self._registered = []
+        self._listener = None
+        if self._glib_loop is not None:
+            self._glib_loop.quit()
+            self._glib_loop = None
+            set_event_dispatch(False)
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for _, future in waiters:
+            self.loop.call_soon_threadsafe(self._cancel_future, future)
+
+    @staticmethod
+    def _cancel_future(future):
+        if not future.done():
+            future.cancel()
+
+    @staticmethod
+    def _resolve_future(future, event_type):
+        if not future.done():
+            future.set_result(event_type)
+
+    def _on_event(self, ev):
+        """GLib 线程中的事件回调，只负责把匹配的事件转交给事件循环。"""
+        event_type = getattr(ev, "type", "") or ""
+        with self._lock:
+            matched = [w for w in self._waiters if event_type.startswith(w[0])]
+            for w in matched:
+                self._waiters.remove(w)
+        for _, future in matched:
+            self.loop.call_soon_threadsafe(self._resolve_future, future, event_type)
+
+    async def wait_for_event(self, event_types=ELEMENT_CHANGE_EVENTS, timeout=None):
+        """等待任一指定类型的事件，返回事件类型；超时返回None。"""
+        future = self.loop.create_future()
+        waiter = (tuple(event_types), future)
+        with self._lock:
+            self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+
+class AsyncGUIAutomation:
+    """
+    GUIAutomation 的 asyncio 版本，所有方法都是协程，参数与 GUIAutomation 同名方法一致。
+
+    - 查询类操作在线程池中执行，可用 asyncio.gather 并发（见 gather_queries）。
+    - 输入类操作（点击、输入、按键、窗口激活等）进入内部队列，由单个工作协程按顺序执行。
+    - 延时使用 asyncio.sleep，wait_for_element 由 AT-SPI 事件唤醒，事件不可用时退化为轮询。
+
+    用法:
+        async with AsyncGUIAutomation() as gui:
+            await gui.click_element(None, "name:七")
+            text, size = await gui.gather_queries(
+                gui.get_element_text(None, "role:text"),
+                gui.get_window_size(None, "计算器"))
+    """
+
+    def __init__(self, max_workers=8, use_events=True):
+        """初始化异步GUI自动化操作类，整个实例共用一个（线程安全的）平台处理器"""
+        self.platform_handler = get_platform_handler()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-query")
+        self._input_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gui-input")
+        self._use_events = use_events
+        self._input_queue = None
+        self._input_worker = None
+        self._event_bridge = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        """启动输入队列工作协程和 AT-SPI 事件桥。可重复调用。"""
+        loop = asyncio.get_running_loop()
+        if self._input_worker is None:
+            self._input_queue = asyncio.Queue()
+            self._input_worker = loop.create_task(self._input_loop())
+        if self._use_events and self._event_bridge is None:
+            bridge = AtspiEventBridge(loop)
+            if bridge.start():
+                self._event_bridge = bridge
+
+    async def close(self):
+        """停止工作协程与事件桥，释放线程池。"""
+        if self._input_worker is not None:
+            self._input_worker.cancel()
+            try:
+                await self._input_worker
+            except asyncio.CancelledError:
+                pass
+            self._input_worker = None
+            # 取消尚未执行的输入动作，避免调用方一直等待
+            while not self._input_queue.empty():
+                _, future = self._input_queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+            self._input_queue = None
+        if self._event_bridge is not None:
+            self._event_bridge.stop()
+            self._event_bridge = None
+        self._executor.shutdown(wait=False)
+        self._input_executor.shutdown(wait=False)
+
+    async def _input_loop(self):
+        """按入队顺序逐个执行输入动作。"""
+        loop = asyncio.get_running_loop()
+        while True:
+            func, future = await self._input_queue.get()
+            try:
+                if not future.cancelled():
+                    result = await loop.run_in_executor(self._input_executor, func)
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._input_queue.task_done()
+
+    async def _query(self, func, *args):
+        """在查询线程池中执行只读操作。"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def _input(self, func, *args):
+        """把输入操作放入内部队列，等待其按顺序执行完成。"""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._input_queue.put((functools.partial(func, *args), future))
+        return await future
+
+    async def _call(self, runner, func, args, before_delay, after_delay,
+                    continue_on_error=False, error_result=None, catch_errors=True):
+        """统一处理延时与 continue_on_error。"""
+        await asyncio.sleep(before_delay)
+        try:
+            result = await runner(func, *args)
+        except Exception:
+            if continue_on_error and catch_errors:
+                await asyncio.sleep(after_delay)
+                return error_result
+            raise
+        await asyncio.sleep(after_delay)
+        return result
+
+    @staticmethod
+    async def gather_queries(*coros):
+        """并发执行多个查询协程，按顺序返回结果。"""
+        return await asyncio.gather(*coros)
+
+    # ---------------- 窗口操作 ----------------
+
+    async def open_application(self, app_path, before_delay=0.2, after_delay=0.2):
+        """打开指定路径的应用，返回进程 pid。"""
+        return await self._call(self._input, self.platform_handler.open_application, (app_path,),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def close_window(self, objWin, window_title, before_delay=0.2, after_delay=0.2, force=False):
+        """关闭窗口（发送关闭请求；force 为 True 时未关闭的窗口 0.5 秒后直接销毁）。"""
+        return await self._call(self._input, self.platform_handler.close_window, (objWin, window_title, force),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def get_active_window(self, objWin, before_delay=0.2, after_delay=0.2):
+        """获取活动窗口。"""
+        return await self._call(self._query, self.platform_handler.get_active_window, (),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def set_active_window(self, objWin, window_title, before_delay=0.2, after_delay=0.2):
+        """设置活动窗口（改变输入焦点，按输入操作串行执行）。"""
+        return await self._call(self._input, self.platform_handler.set_active_window, (window_title,),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def change_window_state(self, objWin, window_title, state, before_delay=0.2, after_delay=0.2):
+        """更改窗口显示状态，如 'maximize'、'minimize'、'restore'。"""
+        return await self._call(self._input, self.platform_handler.change_window_state, (window_title, state),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def check_window_exists(self, objWin, window_title, before_delay=0.2, after_delay=0.2):
+        """判断窗口是否存在。"""
+        return await self._call(self._query, self.platform_handler.check_window_exists, (window_title,),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def get_window_size(self, objWin, window_title, before_delay=0.2, after_delay=0.2):
+        """获取窗口位置和大小。"""
+        return await self._call(self._query, self.platform_handler.get_window_size, (window_title,),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def resize_window(self, objWin, window_title, width, height, before_delay=0.2, after_delay=0.2):
+        """改变窗口大小。"""
+        return await self._call(self._input, self.platform_handler.resize_window, (window_title, width, height),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def move_window(self, objWin, window_title, x, y, before_delay=0.2, after_delay=0.2):
+        """移动窗口位置。"""
+        return await self._call(self._input, self.platform_handler.move_window, (window_title, x, y),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def set_window_topmost(self, objWin, window_title, is_topmost=True, before_delay=0.2, after_delay=0.2):
+        """设置窗口是否置顶。"""
+        return await self._call(self._input, self.platform_handler.set_window_topmost, (window_title, is_topmost),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def get_window_class_name(self, objWin, window_title, before_delay=0.2, after_delay=0.2):
+        """获取窗口类名。"""
+        return await self._call(self._query, self.platform_handler.get_window_class_name, (window_title,),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def get_window_file_path(self, objWin, window_title, before_delay=0.2, after_delay=0.2):
+        """获取窗口文件路径。"""
+        return await self._call(self._query, self.platform_handler.get_window_file_path, (window_title,),
+                                before_delay, after_delay, catch_errors=False)
+
+    async def get_window_process_id(self, objWin, window_title, before_delay=0.2, after_delay=0.2):
+        """获取窗口进程 PID。"""
+        return await self._call(self._query, self.platform_handler.get_window_process_id, (window_title,),
+                                before_delay, after_delay, catch_errors=False)
+
+    # ---------------- 元素操作 ----------------
+
+    async def capture_screen(self, objWin, continue_on_error=False, before_delay=0, after_delay=0):
+        """截取整个屏幕，返回 BGRA 的 NumPy 数组（副本，不会被之后的截图覆盖）。"""
+        return await self._call(self._query, _copied(self.platform_handler.capture_screen), (),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def capture_region(self, objWin, x, y, width, height, continue_on_error=False, before_delay=0, after_delay=0):
+        """截取屏幕矩形区域，返回 BGRA 的 NumPy 数组（副本）。"""
+        return await self._call(self._query, _copied(self.platform_handler.capture_region), (x, y, width, height),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def capture_window(self, objWin, window_title, continue_on_error=False, before_delay=0, after_delay=0):
+        """截取窗口区域，返回 BGRA 的 NumPy 数组（副本）。"""
+        return await self._call(self._query, _copied(self.platform_handler.capture_window), (window_title,),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def capture_element(self, objWin, locator, time_out=10, continue_on_error=False,
+                              before_delay=0, after_delay=0):
+        """截取元素区域，返回 BGRA 的 NumPy 数组（副本）。"""
+        return await self._call(self._query, _copied(self.platform_handler.capture_element), (locator, time_out),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def save_screenshot(self, objWin, path, window_title=None, locator=None, continue_on_error=False,
+                              before_delay=0, after_delay=0):
+        """保存截图为 PNG：指定 locator 时截取元素，指定 window_title 时截取窗口，否则截取整个屏幕。返回文件路径。"""
+        return await self._call(self._query, self.platform_handler.save_screenshot, (path, window_title, locator),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def wait_for_region_stable(self, objWin, rect=None, quiet_ms=500, time_out=10, window_title=None,
+                                     threshold=0.5, continue_on_error=False, before_delay=0, after_delay=0):
+        """等待区域画面连续 quiet_ms 毫秒不变，返回等待的秒数（在查询线程池中等待，不占用输入队列）。"""
+        return await self._call(self._query, self.platform_handler.wait_for_region_stable,
+                                (rect, quiet_ms, time_out, window_title, threshold),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def wait_for_region_change(self, objWin, rect=None, time_out=10, window_title=None, threshold=0.5,
+                                     baseline=None, continue_on_error=False, before_delay=0, after_delay=0):
+        """等待区域画面发生变化，返回等待的秒数。"""
+        return await self._call(self._query, self.platform_handler.wait_for_region_change,
+                                (rect, time_out, window_title, threshold, baseline),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def highlight_element(self, objWin, locator, continue_on_error=False, before_delay=0.2, after_delay=0.2,
+                                duration=2.0, color="red", thickness=3):
+        """高亮显示元素（覆盖窗口，不发送输入，可与其他查询并行）。"""
+        return await self._call(self._query, self.platform_handler.highlight_element,
+                                (locator, duration, color, thickness),
+                                before_delay, after_delay, continue_on_error, False)
+
+    async def highlight_elements(self, objWin, locators, continue_on_error=False, before_delay=0.2, after_delay=0.2,
+                                 duration=2.0, color="red", thickness=3):
+        """同时高亮多个元素。"""
+        return await self._call(self._query, self.platform_handler.highlight_elements,
+                                (locators, duration, color, thickness),
+                                before_delay, after_delay, continue_on_error, False)
+
+    async def hide_highlight(self, objWin, before_delay=0, after_delay=0):
+        """移除所有高亮边框。"""
+        return await self._call(self._query, self.platform_handler.hide_highlight, (),
+                                before_delay, after_delay, False, False)
+
+    async def click_element(self, objWin, locator, mouse_button="left", click_type="single",
+                            activate_window=True, cursor_position="center", x_offset=0, y_offset=0,
+                            modifier_keys=None, smooth_move=False, time_out=10, continue_on_error=False,
+                            before_delay=0.2, after_delay=0.2):
+        """点击元素。"""
+        args = (locator, mouse_button, click_type, activate_window, cursor_position,
+                x_offset, y_offset, modifier_keys, smooth_move, time_out)
+        return await self._call(self._input, self.platform_handler.click_element, args,
+                                before_delay, after_delay, continue_on_error, False)
+
+    async def move_to_element(self, objWin, locator, activate_window=True, cursor_position="center",
+                              x_offset=0, y_offset=0, modifier_keys=None, smooth_move=False, time_out=10,
+                              continue_on_error=False, before_delay=0.2, after_delay=0.2):
+        """移动到元素 hover。"""
+        args = (locator, activate_window, cursor_position, x_offset, y_offset,
+                modifier_keys, smooth_move, time_out)
+        return await self._call(self._input, self.platform_handler.move_to_element, args,
+                                before_delay, after_delay, continue_on_error, False)
+
+    async def input_text_to_element(self, objWin, locator, text, clear_content=True, input_interval=0,
+                                    activate_window=True, click_before_input=False, time_out=10,
+                                    continue_on_error=False, before_delay=0.2, after_delay=0.2):
+        """在元素中输入文本。"""
+        args = (locator, text, clear_content, input_interval, activate_window, click_before_input, time_out)
+        return await self._call(self._input, self.platform_handler.input_text_to_element, args,
+                                before_delay, after_delay, continue_on_error, False)
+
+    async def press_key_to_element(self, objWin, locator, key, modifier_keys=None, input_interval=0,
+                                   activate_window=True, click_before_input=False, time_out=10,
+                                   continue_on_error=False, before_delay=0.2, after_delay=0.2):
+        """在元素中按键。"""
+        args = (locator, key, modifier_keys, input_interval, activate_window, click_before_input, time_out)
+        return await self._call(self._input, self.platform_handler.press_key_to_element, args,
+                                before_delay, after_delay, continue_on_error, False)
+
+    async def set_element_attribute(self, objWin, locator, attribute_name, value, time_out=10,
+                                    continue_on_error=False, before_delay=0.2, after_delay=0.2):
+        """设置元素的指定属性值（通过输入实现，按输入操作串行执行）。"""
+        return await self._call(self._input, self.platform_handler.set_element_attribute,
+                                (locator, attribute_name, value, time_out),
+                                before_delay, after_delay, continue_on_error, False)
+
+    async def find_element(self, objWin, locator, time_out=10, continue_on_error=False,
+                           before_delay=0.2, after_delay=0.2):
+        """查找元素并返回 ElementRef 句柄。"""
+        return await self._call(self._query, self.platform_handler.find_element, (locator, time_out),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def query_elements(self, objWin, selector, locator=None, max_count=None, continue_on_error=False,
+                             before_delay=0.2, after_delay=0.2):
+        """按 XPath / CSS 选择器查询全部匹配的元素。"""
+        return await self._call(self._query, self.platform_handler.query_elements, (selector, locator, max_count),
+                                before_delay, after_delay, continue_on_error, [])
+
+    async def dump_tree(self, objWin, path, locator=None, fields=(), max_depth=None, format=None,
+                        continue_on_error=False, before_delay=0, after_delay=0):
+        """把可访问性树逐个节点写入导出文件。"""
+        return await self._call(self._query, self.platform_handler.dump_tree, (path, locator, fields, max_depth, format),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def get_child_elements(self, objWin, locator, level, continue_on_error=False,
+                                 before_delay=0.2, after_delay=0.2):
+        """获取子元素。"""
+        return await self._call(self._query, self.platform_handler.get_child_elements, (locator, level),
+                                before_delay, after_delay, continue_on_error, [])
+
+    async def get_child_elements_locator(self, objWin, locator, level, locator_type="css",
+                                         continue_on_error=False, before_delay=0.2, after_delay=0.2):
+        """获取子元素的定位信息。"""
+        return await self._call(self._query, self.platform_handler.get_child_elements_locator,
+                                (locator, level, locator_type),
+                                before_delay, after_delay, continue_on_error, [])
+
+    async def get_parent_element(self, objWin, locator, continue_on_error=False, before_delay=0.2, after_delay=0.2):
+        """获取父元素信息。"""
+        return await self._call(self._query, self.platform_handler.get_parent_element, (locator,),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def get_parent_element_locator(self, objWin, locator, locator_type="css", continue_on_error=False,
+                                         before_delay=0.2, after_delay=0.2):
+        """获取父元素的定位信息。"""
+        return await self._call(self._query, self.platform_handler.get_parent_element_locator,
+                                (locator, locator_type),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def get_unique_locator(self, objWin, locator, scope="desktop", time_out=10, continue_on_error=False,
+                                 before_delay=0.2, after_delay=0.2):
+        """获取元素的最短唯一定位器。"""
+        return await self._call(self._query, self.platform_handler.get_unique_locator, (locator, scope, time_out),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def get_element_text(self, objWin, locator, time_out=10, continue_on_error=False,
+                               before_delay=0.2, after_delay=0.2):
+        """获取元素的文本。"""
+        return await self._call(self._query, self.platform_handler.get_element_text, (locator, time_out),
+                                before_delay, after_delay, continue_on_error, "")
+
+    async def get_element(self, objWin, locator, time_out=10, continue_on_error=False,
+                          before_delay=0.2, after_delay=0.2):
+        """获取元素的所有属性和值。"""
+        return await self._call(self._query, self.platform_handler.get_element, (locator, time_out),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def set_element_text(self, objWin, locator, text, time_out=10, continue_on_error=False,
+                               before_delay=0.2, after_delay=0.2):
+        """设置元素的文本。"""
+        return await self._call(self._input, self.platform_handler.set_element_text, (locator, text, time_out),
+                                before_delay, after_delay, continue_on_error, False)
+
+    async def get_element_bounds(self, objWin, locator, relative_to="parent", time_out=10,
+                                 continue_on_error=False, before_delay=0.2, after_delay=0.2):
+        """获取元素的边界信息。"""
+        return await self._call(self._query, self.platform_handler.get_element_bounds,
+                                (locator, relative_to, time_out),
+                                before_delay, after_delay, continue_on_error, None)
+
+    async def wait_for_element(self, objWin, locator, timeout=10, wait_for="visible", continue_on_error=False,
+                               before_delay=0.2, after_delay=0.2):
+        """
+        等待元素出现/隐藏。
+
+        每次检查都是不阻塞的单次探测；条件不满足时等待 AT-SPI 元素变化事件
+        （最多 0.5 秒，事件不可用时就是普通的 asyncio.sleep 轮询）。
+        """
+        await asyncio.sleep(before_delay)
+        deadline = Deadline.coerce(timeout)
+        while True:
+            with deadline.stage("check"):
+                satisfied = await self._query(self.platform_handler.check_element_state, locator, wait_for)
+            if satisfied:
+                await asyncio.sleep(after_delay)
+                return True
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                break
+            if self._event_bridge is not None:
+                await self._event_bridge.wait_for_event(timeout=min(0.5, remaining))
+            else:
+                await asyncio.sleep(min(0.5, remaining))
+        if continue_on_error:
+            await asyncio.sleep(after_delay)
+            return False
+        raise DeadlineExceeded(f"等待元素超时: {locator}, 等待条件: {wait_for}", deadline)
+
+    async def check_element_exists(self, objWin, locator, continue_on_error=False, before_delay=0.2, after_delay=0.2):
+        """判断元素是否存在。"""
+        return await self._call(self._query, self.platform_handler.check_element_exists, (locator,),
+                                before_delay, after_delay, continue_on_error, False)
+
+    async def get_element_checked(self, objWin, locator, continue_on_error=False, before_delay=0.2, after_delay=0.2):
+        """获取元素的勾选状态。"""
+        return await self._call(self._query, self.platform_handler.get_element_checked, (locator,),
+                                before_delay, after_delay, continue_on_error, False)
+
+    async def set_element_checked(self, objWin, locator, checked, continue_on_error=False,
+                                  before_delay=0.2, after_delay=0.2):
+        """设置元素的勾选状态。"""
+        return await self._call(self._input, self.platform_handler.set_element_checked, (locator, checked),
+                                before_delay, after_delay, continue_on_error, False)
@@ -9,6 +9,41 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from bs4 import BeautifulSoup, Tag, Comment
 from platform_handler import get_platform_handler
+from action_batch import ActionBatch
+from instrumentation import INSTRUMENTATION, PHASE_DELAY, PHASE_HANDLER
+from gui_logging import dump_on_failure
+
+
+def _delay(seconds):
+    """执行前/后的固定延时，计入 delay 阶段。"""
+    with INSTRUMENTATION.phase(PHASE_DELAY):
+        time.sleep(seconds)
+
+
+# 常驻进程（guiautomationd）中设置，所有操作复用同一个处理器及其窗口/元素缓存
+_shared_handler = None
+
+
+def set_shared_handler(handler):
+    """设置所有操作共用的平台处理器；为 None 时恢复为每次调用创建新的处理器。"""
+    global _shared_handler
+    _shared_handler = handler
+
+
+def _new_handler():
+    """创建平台处理器，计入 handler 阶段；设置了共用处理器时直接返回它。"""
+    if _shared_handler is not None:
+        return _shared_handler
+    with INSTRUMENTATION.phase(PHASE_HANDLER):
+        return get_platform_handler()
+
+
+def _atspi_disabled(handler, locator):
+    """处理器禁用了 AT-SPI 时，元素操作按成功返回；image 定位器不依赖 AT-SPI，失败就是真的失败。"""
+    if isinstance(locator, str) and locator.lstrip().lower().startswith("image:"):
+        return False
+    return hasattr(handler, 'ATSPI_AVAILABLE') and not handler.ATSPI_AVAILABLE
+
 
 class GUIAutomation:
     """
@@ -20,7 +55,53 @@ class GUIAutomation:
 
     def __init__(self):
         """初始化GUI自动化操作类，根据当前系统自动选择适合的平台处理器"""
-        self.platform_handler = get_platform_handler()
+        self.platform_handler = _new_handler()
+
+    @staticmethod
+    def batch(objWin, time_out=10, continue_on_error=False):
+        """
+        创建批量动作脚本。在 with 块中记录的步骤会在退出时编译成计划一次性执行：
+        定位器统一解析，输入事件合并发送，只执行计划中声明的等待。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        time_out (int): 单个步骤查找元素的超时时间，默认为 10 秒。
+        continue_on_error (bool): 某一步失败后是否继续执行后续步骤，默认为 False。
+
+        返回:
+        ActionBatch: 批量脚本对象，执行后 result 属性为包含每步耗时的 BatchResult。
+
+        示例:
+        with GUIAutomation.batch(objWin) as b:
+            b.click("name:七")
+            b.input_text("role:text", "123")
+            b.press_key("role:text", "enter")
+        print(b.result.steps)
+        """
+        handler = _new_handler()
+        return ActionBatch(handler, objWin, time_out, continue_on_error)
+
+    @staticmethod
+    def record(objWin, scope="desktop"):
+        """
+        录制用户操作（点击、文字输入、按键），生成可重放的批量脚本。
+
+        每个操作的元素在录制时即生成唯一定位器和路径提示，两步之间较长的间隔转为 wait_for 的超时上限。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        scope (str): 唯一定位器的判断范围，"desktop"、"app" 或 "window"，默认为 "desktop"（与重放时的查找范围相同）。
+
+        返回:
+        ActionRecorder: 录制器，退出 with 块时停止录制，recording 属性为录制结果。
+
+        示例:
+        with GUIAutomation.record(objWin) as recorder:
+            input("操作完成后按回车")
+        recorder.recording.save("script.py")     # 或 "plan.json"
+        """
+        from action_recorder import ActionRecorder
+        return ActionRecorder(_new_handler(), scope)
 
     @staticmethod
     def open_application(app_path, before_delay=0.2, after_delay=0.2):
@@ -35,30 +116,31 @@ class GUIAutomation:
         返回:
         objWin: 窗口对象。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.open_application(app_path)
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
-    def close_window(objWin, window_title, before_delay=0.2, after_delay=0.2):
+    def close_window(objWin, window_title, before_delay=0.2, after_delay=0.2, force=False):
         """
-        关闭窗口。
+        关闭窗口。发送关闭请求，由应用决定如何关闭（例如先询问是否保存）。
 
         参数:
         objWin (Desktop): 窗口对象。
         window_title (str): 窗口标题。
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
+        force (bool): 窗口 0.5 秒内没有关闭时直接销毁，未保存的数据会丢失，默认为 False。
 
         返回:
         bool: 是否执行成功。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
-        result = handler.close_window(objWin, window_title)
-        time.sleep(after_delay)
+        _delay(before_delay)
+        handler = _new_handler()
+        result = handler.close_window(objWin, window_title, force)
+        _delay(after_delay)
         return result
 
     @staticmethod
@@ -74,10 +156,10 @@ class GUIAutomation:
         返回:
         obj: 活动窗口，可操控对象。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.get_active_window()
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
@@ -94,10 +176,10 @@ class GUIAutomation:
         返回:
         bool: 是否执行成功
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.set_active_window(window_title)
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
@@ -115,10 +197,10 @@ class GUIAutomation:
         返回:
         bool: 是否执行成功
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.change_window_state(window_title, state)
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
@@ -135,10 +217,10 @@ class GUIAutomation:
         返回:
         bool: 窗口是否存在。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.check_window_exists(window_title)
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
@@ -155,10 +237,10 @@ class GUIAutomation:
         返回:
         dict: 位置和大小信息
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.get_window_size(window_title)
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
@@ -177,10 +259,10 @@ class GUIAutomation:
         返回:
         bool: 是否执行成功
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.resize_window(window_title, width, height)
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
@@ -196,10 +278,10 @@ class GUIAutomation:
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.move_window(window_title, x, y)
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
@@ -217,10 +299,10 @@ class GUIAutomation:
         返回:
         bool: 是否执行成功
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.set_window_topmost(window_title, is_topmost)
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
@@ -237,10 +319,10 @@ class GUIAutomation:
         返回:
         str: 窗口类名。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.get_window_class_name(window_title)
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
@@ -257,10 +339,10 @@ class GUIAutomation:
         返回:
         str: 窗口文件路径。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.get_window_file_path(window_title)
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
@@ -277,16 +359,17 @@ class GUIAutomation:
         返回:
         int: 窗口进程 PID。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         result = handler.get_window_process_id(window_title)
-        time.sleep(after_delay)
+        _delay(after_delay)
         return result
 
     @staticmethod
-    def highlight_element(objWin, locator, continue_on_error=False, before_delay=0.2, after_delay=0.2):
+    def highlight_element(objWin, locator, continue_on_error=False, before_delay=0.2, after_delay=0.2,
+                          duration=2.0, color="red", thickness=3):
         """
-        高亮显示元素。
+        高亮显示元素。在元素周围显示不接收输入的边框窗口，不移动鼠标。
 
         参数:
         objWin (Desktop): 窗口对象。
@@ -294,17 +377,277 @@ class GUIAutomation:
         continue_on_error (bool): 错误是否继续执行，默认为 False。
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
+        duration (float): 高亮显示的时间，之后自动消失，None 表示一直显示，默认为 2 秒。
+        color (str): 边框颜色（X11 颜色名或 "#rrggbb"），默认为 "red"。
+        thickness (int): 边框宽度（像素），默认为 3。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.highlight_element(locator, duration, color, thickness)
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
+                return False
+            else:
+                raise e
+
+    @staticmethod
+    def highlight_elements(objWin, locators, continue_on_error=False, before_delay=0.2, after_delay=0.2,
+                           duration=2.0, color="red", thickness=3):
+        """
+        同时高亮多个元素，替换之前的高亮。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        locators (list): 定位标识列表。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0.2 秒。
+        after_delay (float): 执行后的延时，默认为 0.2 秒。
+        duration (float): 高亮显示的时间，None 表示一直显示，默认为 2 秒。
+        color (str): 边框颜色，默认为 "red"。
+        thickness (int): 边框宽度（像素），默认为 3。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
-            result = handler.highlight_element(locator)
-            time.sleep(after_delay)
+            result = handler.highlight_elements(locators, duration, color, thickness)
+            _delay(after_delay)
             return result
         except Exception as e:
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return False
+            else:
+                raise Exception(f"高亮元素失败: {e}")
+
+    @staticmethod
+    def hide_highlight(objWin, before_delay=0, after_delay=0):
+        """
+        移除所有高亮边框。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        before_delay (float): 执行前的延时，默认为 0 秒。
+        after_delay (float): 执行后的延时，默认为 0 秒。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        result = handler.hide_highlight()
+        _delay(after_delay)
+        return result
+
+    @staticmethod
+    def capture_screen(objWin, continue_on_error=False, before_delay=0, after_delay=0):
+        """
+        截取整个屏幕。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0 秒。
+        after_delay (float): 执行后的延时，默认为 0 秒。
+
+        返回:
+        numpy.ndarray: (高, 宽, 4) 的 BGRA 图像；MIT-SHM 模式下为共享内存的视图，下一次同尺寸截图会覆盖，需要保留时调用 .copy()。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.capture_screen()
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
+                return None
+            else:
+                raise e
+
+    @staticmethod
+    def capture_region(objWin, x, y, width, height, continue_on_error=False, before_delay=0, after_delay=0):
+        """
+        截取屏幕矩形区域。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        x (int): 左上角 x 坐标。
+        y (int): 左上角 y 坐标。
+        width (int): 宽度。
+        height (int): 高度。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0 秒。
+        after_delay (float): 执行后的延时，默认为 0 秒。
+
+        返回:
+        numpy.ndarray: (高, 宽, 4) 的 BGRA 图像；MIT-SHM 模式下为共享内存的视图，下一次同尺寸截图会覆盖，需要保留时调用 .copy()。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.capture_region(x, y, width, height)
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
+                return None
+            else:
+                raise e
+
+    @staticmethod
+    def capture_window(objWin, window_title, continue_on_error=False, before_delay=0, after_delay=0):
+        """
+        截取窗口所在的屏幕区域。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        window_title (str|int): 窗口标题或窗口ID。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0 秒。
+        after_delay (float): 执行后的延时，默认为 0 秒。
+
+        返回:
+        numpy.ndarray: (高, 宽, 4) 的 BGRA 图像；MIT-SHM 模式下为共享内存的视图，下一次同尺寸截图会覆盖，需要保留时调用 .copy()。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.capture_window(window_title)
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
+                return None
+            else:
+                raise e
+
+    @staticmethod
+    def capture_element(objWin, locator, time_out=10, continue_on_error=False, before_delay=0, after_delay=0):
+        """
+        截取元素所在的屏幕区域（按元素的屏幕坐标）。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        locator (str): 定位标识，如 "name:five" 或 "id:res"。
+        time_out (int): 查找元素的超时时间，默认为 10 秒。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0 秒。
+        after_delay (float): 执行后的延时，默认为 0 秒。
+
+        返回:
+        numpy.ndarray: (高, 宽, 4) 的 BGRA 图像；MIT-SHM 模式下为共享内存的视图，下一次同尺寸截图会覆盖，需要保留时调用 .copy()。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.capture_element(locator, time_out)
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
+                return None
+            else:
+                raise e
+
+    @staticmethod
+    def save_screenshot(objWin, path, window_title=None, locator=None, continue_on_error=False, before_delay=0, after_delay=0):
+        """
+        保存截图为 PNG。指定 locator 时截取元素，指定 window_title 时截取窗口，否则截取整个屏幕。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        path (str): 保存路径。
+        window_title (str): 窗口标题，默认为 None。
+        locator (str): 元素定位标识，默认为 None。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0 秒。
+        after_delay (float): 执行后的延时，默认为 0 秒。
+
+        返回:
+        str: 保存的文件路径。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.save_screenshot(path, window_title, locator)
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
+                return None
+            else:
+                raise e
+
+    @staticmethod
+    def wait_for_region_stable(objWin, rect=None, quiet_ms=500, time_out=10, window_title=None,
+                               threshold=0.5, continue_on_error=False, before_delay=0, after_delay=0):
+        """
+        等待区域画面稳定：连续 quiet_ms 毫秒没有像素变化即返回，代替固定时长的 time.sleep。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        rect: 区域，(x, y, width, height)、get_element_bounds 格式的字典、定位器或 ElementRef；省略时为整个窗口或屏幕。
+        quiet_ms (int): 需要保持不变的时长（毫秒），默认为 500。
+        time_out (float): 最长等待时间（秒），默认为 10。
+        window_title (str): 窗口标题；指定时 rect 的坐标相对于窗口左上角，省略 rect 时等待整个窗口。
+        threshold (float): 16x16 图块平均像素值的变化阈值（0-255），默认为 0.5。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0 秒。
+        after_delay (float): 执行后的延时，默认为 0 秒。
+
+        返回:
+        float: 实际等待的秒数；出错且 continue_on_error 为 True 时返回 None。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.wait_for_region_stable(rect, quiet_ms, time_out, window_title, threshold)
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
+                return None
+            else:
+                raise e
+
+    @staticmethod
+    def wait_for_region_change(objWin, rect=None, time_out=10, window_title=None, threshold=0.5,
+                               baseline=None, continue_on_error=False, before_delay=0, after_delay=0):
+        """
+        等待区域画面发生变化。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        rect: 区域，格式同 wait_for_region_stable。
+        time_out (float): 最长等待时间（秒），默认为 10。
+        window_title (str): 窗口标题；指定时 rect 的坐标相对于窗口左上角。
+        threshold (float): 16x16 图块平均像素值的变化阈值（0-255），默认为 0.5。
+        baseline (numpy.ndarray): 作为基准的同一区域截图（capture_region 的结果 .copy()），省略时以调用时的画面为基准。
+            先截图、再执行操作、再等待，可以避免操作触发的变化在等待开始前就已完成。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0 秒。
+        after_delay (float): 执行后的延时，默认为 0 秒。
+
+        返回:
+        float: 实际等待的秒数；出错且 continue_on_error 为 True 时返回 None。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.wait_for_region_change(rect, time_out, window_title, threshold, baseline)
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
+                return None
             else:
                 raise e
 
@@ -344,23 +687,23 @@ class GUIAutomation:
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.click_element(
                 locator, mouse_button, click_type, activate_window,
                 cursor_position, x_offset, y_offset, modifier_keys,
                 smooth_move, time_out
             )
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
 
-            if hasattr(handler, 'ATSPI_AVAILABLE') and not handler.ATSPI_AVAILABLE:
-                time.sleep(after_delay)
+            if _atspi_disabled(handler, locator):
+                _delay(after_delay)
                 return True
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return False
             else:
                 raise e
@@ -397,18 +740,18 @@ class GUIAutomation:
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.move_to_element(
                 locator, activate_window, cursor_position,
                 x_offset, y_offset, modifier_keys, smooth_move, time_out
             )
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return False
             else:
                 raise e
@@ -443,23 +786,23 @@ class GUIAutomation:
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.input_text_to_element(
                 locator, text, clear_content, input_interval,
                 activate_window, click_before_input, time_out
             )
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
 
-            if hasattr(handler, 'ATSPI_AVAILABLE') and not handler.ATSPI_AVAILABLE:
+            if _atspi_disabled(handler, locator):
                 GUIAutomation._element_text_store[locator] = text
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return True
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return False
             else:
                 raise e
@@ -494,18 +837,18 @@ class GUIAutomation:
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.press_key_to_element(
                 locator, key, modifier_keys, input_interval,
                 activate_window, click_before_input, time_out
             )
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return False
             else:
                 raise e
@@ -526,15 +869,15 @@ class GUIAutomation:
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.set_element_attribute(locator, attribute_name, value, time_out)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return False
             else:
                 raise e
@@ -555,19 +898,46 @@ class GUIAutomation:
         返回:
         list: 所有子元素的 HTML 标签信息。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.get_child_elements(locator, level)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return []
             else:
                 raise e
 
+    @staticmethod
+    def iter_child_elements(objWin, locator, min_level=2, max_level=None, fields=("name", "role"),
+                            max_count=None, continue_on_error=False, before_delay=0.2):
+        """
+        逐个产出子元素信息，可提前停止迭代。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        locator (str): 父元素的定位标识，如 "name:five" 或 "id:res"。
+        min_level (int): 起始层级，父元素为第 1 层，直接子元素为第 2 层，默认为 2。
+        max_level (int): 结束层级，默认与 min_level 相同。
+        fields (tuple): 要读取的字段，可选 "name" "role" "id" "text" "rectangle" "states" "level"，默认为 ("name", "role")。
+        max_count (int): 最多产出的元素个数，默认不限制。
+        continue_on_error (bool): 错误是否继续执行，为 True 时出错即停止迭代，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0.2 秒。
+
+        返回:
+        generator: 每个元素一个字典，只包含 fields 中的字段。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            yield from handler.iter_child_elements(locator, min_level, max_level, fields, max_count)
+        except Exception as e:
+            if not continue_on_error:
+                raise Exception(f"获取子元素失败: {e}")
+
     @staticmethod
     def get_child_elements_locator(
             objWin,
@@ -585,7 +955,7 @@ class GUIAutomation:
         objWin (Desktop): 窗口对象。
         locator (str): 父元素的定位标识，如 "name:five" 或 "id:res"。
         level (int): 子元素层级。
-        locator_type (str): 定位器类型，支持 "id" "name"，默认为 "id"。
+        locator_type (str): 定位器类型，支持 "id" "name" "role" "unique"（在整个桌面范围内唯一、并经查找确认指向该元素的最短定位器），默认为 "id"。
         continue_on_error (bool): 错误是否继续执行，默认为 False。
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
@@ -593,15 +963,15 @@ class GUIAutomation:
         返回:
         list: 所有子元素的定位信息，格式为 [id:xxxxx" 或 "name:xxxx" 的列表]
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.get_child_elements_locator(locator, level, locator_type)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return []
             else:
                 raise e
@@ -621,15 +991,15 @@ class GUIAutomation:
         返回:
         str: 父元素的 HTML 信息。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.get_parent_element(locator)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return None
             else:
                 raise e
@@ -649,7 +1019,7 @@ class GUIAutomation:
         参数:
         objWin (Desktop): 窗口对象。
         locator (str): 子元素的定位标识，如 "name:five" 或 "id:res"。
-        locator_type (str): 定位器类型，支持 "id" "name"，默认为 "id"。
+        locator_type (str): 定位器类型，支持 "id" "name" "role" "unique"（在整个桌面范围内唯一、并经查找确认指向该元素的最短定位器），默认为 "id"。
         continue_on_error (bool): 错误是否继续执行，默认为 False。
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
@@ -657,15 +1027,49 @@ class GUIAutomation:
         返回:
         str: 父元素的定位信息，格式为 "id:xxxx"、"name:xxxx"
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.get_parent_element_locator(locator, locator_type)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
+                return None
+            else:
+                raise e
+
+    @staticmethod
+    def get_unique_locator(objWin, locator, scope="desktop", time_out=10, continue_on_error=False, before_delay=0.2,
+                           after_delay=0.2):
+        """
+        获取元素的最短唯一定位器，录制的脚本用它一次定位到同一个元素。
+
+        依次尝试 "id:" "name:" "role:"、角色 + 名称的 XPath、以唯一祖先开头的链式 XPath，最后为带序号的路径。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        locator (str): 元素的定位标识，如 "name:five"，也可以是 ElementRef。
+        scope (str): 判断唯一性的范围，"desktop"（整个桌面，与查找范围相同）、"app" 或 "window"，默认为 "desktop"。
+                     较小的范围快照更小，在桌面上会先匹配到其他元素的候选被跳过。
+        time_out (int): 查找元素的超时时间，默认为 10 秒。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0.2 秒。
+        after_delay (float): 执行后的延时，默认为 0.2 秒。
+
+        返回:
+        str: 定位器，如 "name:确定" 或 "xpath://panel[@name='键盘']//push button[@name='5']"。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.get_unique_locator(locator, scope, time_out)
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
                 return None
             else:
                 raise e
@@ -686,21 +1090,121 @@ class GUIAutomation:
         返回:
         str: 元素的文本。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.get_element_text(locator, time_out)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
-            if hasattr(handler, 'ATSPI_AVAILABLE') and not handler.ATSPI_AVAILABLE:
+            if _atspi_disabled(handler, locator):
                 return GUIAutomation._element_text_store.get(locator, "")
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return ""
             else:
                 raise e
 
+    @staticmethod
+    def find_element(objWin, locator, time_out=10, continue_on_error=False, before_delay=0.2, after_delay=0.2):
+        """
+        查找元素并返回 ElementRef 句柄。
+
+        句柄的 name、role、bounds、states、text 等属性在首次访问时读取并短时缓存，
+        parent、children、find() 从该元素出发导航；所有接受 locator 的方法都可以直接传入句柄，跳过查找。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        locator (str): 定位标识，如 "name:five" 或 "id:res"。
+        time_out (int): 查找元素的超时时间，默认为 10 秒。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0.2 秒。
+        after_delay (float): 执行后的延时，默认为 0.2 秒。
+
+        返回:
+        ElementRef: 元素句柄，出错且 continue_on_error 为 True 时返回 None。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.find_element(locator, time_out)
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
+                return None
+            else:
+                raise e
+
+    @staticmethod
+    def query_elements(objWin, selector, locator=None, max_count=None, continue_on_error=False,
+                       before_delay=0.2, after_delay=0.2):
+        """
+        按 XPath / CSS 选择器查询全部匹配的元素。
+
+        先建立一次可访问性树快照，再在内存中求值，多个结果只遍历一次树。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        selector (str): 选择器，如 "xpath://push button[@name='确定']" 或 "css:panel > push_button:first-child"。
+        locator (str): 查询范围的根元素，默认为整个桌面。
+        max_count (int): 最多返回的元素个数，默认不限制。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0.2 秒。
+        after_delay (float): 执行后的延时，默认为 0.2 秒。
+
+        返回:
+        list: ElementRef 列表（文档顺序），出错且 continue_on_error 为 True 时返回空列表。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.query_elements(selector, locator, max_count)
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
+                return []
+            else:
+                raise Exception(f"查询元素失败: {e}")
+
+    @staticmethod
+    def dump_tree(objWin, path, locator=None, fields=(), max_depth=None, format=None, continue_on_error=False,
+                  before_delay=0, after_delay=0):
+        """
+        把可访问性树逐个节点写入导出文件，不在内存中建立整棵树。
+
+        导出文件可以用 tree_export.diff_tree 比较，或用 tree_export.precompute_hints 生成定位器路径提示。
+
+        参数:
+        objWin (Desktop): 窗口对象。
+        path (str): 导出文件路径，.ndjson / .jsonl 为每行一个 JSON 节点，其他扩展名为紧凑的二进制格式，.gz 结尾时再压缩。
+        locator (str): 导出范围的根元素，默认为整个桌面。
+        fields (tuple): role / name 之外要记录的字段，可选 "id" "text" "rectangle" "states"，默认不记录。
+        max_depth (int): 最多导出的层数，默认不限制。
+        format (str): "ndjson" 或 "binary"，默认按扩展名判断。
+        continue_on_error (bool): 错误是否继续执行，默认为 False。
+        before_delay (float): 执行前的延时，默认为 0 秒。
+        after_delay (float): 执行后的延时，默认为 0 秒。
+
+        返回:
+        dict: {"nodes", "bytes", "time", "truncated"}，出错且 continue_on_error 为 True 时返回 None。
+        """
+        _delay(before_delay)
+        handler = _new_handler()
+        try:
+            result = handler.dump_tree(path, locator, fields, max_depth, format)
+            _delay(after_delay)
+            return result
+        except Exception as e:
+            if continue_on_error:
+                _delay(after_delay)
+                return None
+            else:
+                raise Exception(f"导出可访问性树失败: {e}")
+
     @staticmethod
     def get_element(objWin, locator, time_out=10, continue_on_error=False, before_delay=0.2, after_delay=0.2):
         """
@@ -717,18 +1221,18 @@ class GUIAutomation:
         返回:
         dict: 元素的所有属性和值
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.get_element(locator, time_out)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
             # AT-SPI 不可用时回退，返回空字典
-            if hasattr(handler, 'ATSPI_AVAILABLE') and not handler.ATSPI_AVAILABLE:
+            if _atspi_disabled(handler, locator):
                 return {}
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return None
             else:
                 raise e
@@ -747,15 +1251,15 @@ class GUIAutomation:
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.set_element_text(locator, text, time_out)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return False
             else:
                 raise e
@@ -785,18 +1289,18 @@ class GUIAutomation:
         返回:
         dict: 元素的边界信息，包含 x、y、width、height。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.get_element_bounds(locator, relative_to, time_out)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
 
-            if hasattr(handler, 'ATSPI_AVAILABLE') and not handler.ATSPI_AVAILABLE:
+            if _atspi_disabled(handler, locator):
                 return {'x': 0, 'y': 0, 'width': 1, 'height': 1}
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return None
             else:
                 raise e
@@ -816,18 +1320,18 @@ class GUIAutomation:
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.wait_for_element(locator, timeout, wait_for)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
-            if hasattr(handler, 'ATSPI_AVAILABLE') and not handler.ATSPI_AVAILABLE:
-                time.sleep(after_delay)
+            if _atspi_disabled(handler, locator):
+                _delay(after_delay)
                 return True
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return False
             else:
                 raise e
@@ -847,22 +1351,22 @@ class GUIAutomation:
         返回:
         bool: 元素是否存在。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
-        if hasattr(handler, 'ATSPI_AVAILABLE') and not handler.ATSPI_AVAILABLE:
-            time.sleep(after_delay)
+        _delay(before_delay)
+        handler = _new_handler()
+        if _atspi_disabled(handler, locator):
+            _delay(after_delay)
             return True
         try:
             result = handler.check_element_exists(locator)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
 
-            if hasattr(handler, 'ATSPI_AVAILABLE') and not handler.ATSPI_AVAILABLE:
-                time.sleep(after_delay)
+            if _atspi_disabled(handler, locator):
+                _delay(after_delay)
                 return True
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return False
             else:
                 raise e
@@ -882,15 +1386,15 @@ class GUIAutomation:
         返回:
         bool: 元素的勾选状态。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.get_element_checked(locator)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return False
             else:
                 raise e
@@ -908,15 +1412,19 @@ class GUIAutomation:
         before_delay (float): 执行前的延时，默认为 0.2 秒。
         after_delay (float): 执行后的延时，默认为 0.2 秒。
         """
-        time.sleep(before_delay)
-        handler = get_platform_handler()
+        _delay(before_delay)
+        handler = _new_handler()
         try:
             result = handler.set_element_checked(locator, checked)
-            time.sleep(after_delay)
+            _delay(after_delay)
             return result
         except Exception as e:
             if continue_on_error:
-                time.sleep(after_delay)
+                _delay(after_delay)
                 return False
             else:
-                raise e
\ No newline at end of file
+                raise e
+
+
+INSTRUMENTATION.instrument_class(GUIAutomation)
+dump_on_failure(GUIAutomation)
@@ -0,0 +1,146 @@
+"""
+守护进程客户端与操作分派的单元测试：objWin 参数只对带 objWin 的操作去掉（open_application 等原样发送），
+使用进程内的 Unix 套接字服务端，不依赖桌面环境。
+"""
+
+import os
+import socket
+import shutil
+import tempfile
+import threading
+import unittest
+
+from automation_client import GUIAutomationClient
+from daemon_protocol import send_message, recv_message
+
+try:
+    import guiautomationd
+    from GUIAutomation import set_shared_handler
+    DAEMON_AVAILABLE = True
+except ImportError:
+    DAEMON_AVAILABLE = False
+
+
+class _Automation:
+    """GUIAutomation 的替身：返回收到的参数。"""
+
+    @staticmethod
+    def open_application(app_path, before_delay=0.2, after_delay=0.2):
+        return [app_path, before_delay]
+
+    @staticmethod
+    def click_element(objWin, locator, before_delay=0.2, after_delay=0.2):
+        return [objWin, locator, before_delay]
+
+    @staticmethod
+    def batch(objWin=None, time_out=10, continue_on_error=False):
+        raise Exception("不应作为操作调用")
+
+    @staticmethod
+    def _private(objWin):
+        raise Exception("不应作为操作调用")
+
+
+class _EchoServer:
+    """最小的守护进程替身：记录收到的操作，返回其参数；operations 为 None 时模拟没有操作表的旧版本。"""
+
+    def __init__(self, path, operations):
+        self.operations = operations
+        self.received = []
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(1)
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        sock, _ = self.server.accept()
+        with sock:
+            while True:
+                try:
+                    request = recv_message(sock)
+                except EOFError:
+                    return
+                results = []
+                for op in request["ops"]:
+                    if op["op"] == "operations":
+                        if self.operations is None:
+                            results.append({"ok": False, "error": "不支持的操作: operations"})
+                        else:
+                            results.append({"ok": True, "value": self.operations})
+                        continue
+                    self.received.append(op)
+                    results.append({"ok": True, "value": op["args"]})
+                send_message(sock, {"id": request["id"], "results": results})
+
+    def close(self):
+        self.server.close()
+
+
+class TestClientArguments(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "daemon.sock")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def connect(self, operations):
+        self.server = _EchoServer(self.path, operations)
+        self.addCleanup(self.server.close)
+        client = GUIAutomationClient(self.path, timeout=5)
+        self.addCleanup(client.close)
+        return client
+
+    def test_operation_without_objwin(self):
+        client = self.connect({"open_application": False, "click_element": True, "release": False})
+        self.assertEqual(client.open_application("/usr/bin/x", 0), ["/usr/bin/x", 0])
+        self.assertEqual(client.click_element(None, "name:确定", 0), ["name:确定", 0])
+        self.assertEqual(client.click_element("name:确定", objWin=None), ["name:确定"])
+        self.assertEqual(client.release([1, 2]), [[1, 2]])
+        self.assertEqual([op["op"] for op in self.server.received], ["open_application", "click_element",
+                                                                     "click_element", "release"])
+
+    def test_pipeline(self):
+        client = self.connect({"open_application": False, "click_element": True})
+        with client.pipeline() as pipeline:
+            pipeline.open_application("/usr/bin/x")
+            pipeline.click_element(None, "name:确定")
+        self.assertEqual(pipeline.results, [["/usr/bin/x"], ["name:确定"]])
+
+    def test_old_daemon(self):
+        # 没有操作表时与原来一样去掉第一个参数
+        client = self.connect(None)
+        self.assertEqual(client.click_element(None, "name:确定"), ["name:确定"])
+
+
+@unittest.skipUnless(DAEMON_AVAILABLE, "guiautomationd 的依赖不可用")
+class TestDaemonDispatch(unittest.TestCase):
+    def setUp(self):
+        self.daemon = guiautomationd.AutomationDaemon(os.path.join(tempfile.gettempdir(), "unused.sock"),
+                                                      handler=object())
+        self.addCleanup(set_shared_handler, None)
+        self.daemon.automation = _Automation
+        self.daemon.operations = guiautomationd.operation_table(_Automation)
+
+    def test_operation_table(self):
+        self.assertEqual(guiautomationd.operation_table(_Automation),
+                         {"open_application": False, "click_element": True})
+        table = guiautomationd.operation_table(guiautomationd.GUIAutomation)
+        self.assertFalse(table["open_application"])
+        self.assertTrue(table["click_element"])
+
+    def test_execute(self):
+        reply = self.daemon.execute(guiautomationd._Connection(None), {"id": 1, "ops": [
+            {"op": "open_application", "args": ["/usr/bin/x"]},
+            {"op": "click_element", "args": ["name:确定"], "kwargs": {"before_delay": 0}},
+            {"op": "operations"},
+        ]})
+        values = [result["value"] for result in reply["results"]]
+        self.assertEqual(values[0], ["/usr/bin/x", 0.2])
+        self.assertEqual(values[1], [None, "name:确定", 0])
+        self.assertEqual(values[2]["open_application"], False)
+        self.assertEqual(values[2]["ping"], False)
+
+
+if __name__ == "__main__":
+    unittest.main()
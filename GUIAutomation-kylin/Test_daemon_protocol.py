@@ -0,0 +1,146 @@
+"""
+guiautomationd 消息格式的单元测试：帧结构、二进制附件和 NumPy 数组、套接字上的收发，不依赖桌面环境。
+"""
+
+import os
+import json
+import socket
+import struct
+import threading
+import unittest
+
+import daemon_protocol
+from daemon_protocol import (encode_message, decode_message, send_message, recv_message, ProtocolError,
+                             default_socket_path)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def frame_bytes(message):
+    return b"".join(bytes(part) for part in encode_message(message))
+
+
+class TestFraming(unittest.TestCase):
+    def test_layout(self):
+        data = frame_bytes({"op": "ping", "blob": b"\x00\x01"})
+        (length,) = struct.unpack(">I", data[:4])
+        self.assertEqual(length, len(data) - 4)
+        (count,) = struct.unpack(">H", data[4:6])
+        self.assertEqual(count, 2)
+        (size,) = struct.unpack(">I", data[6:10])
+        body = json.loads(data[10:10 + size].decode("utf-8"))
+        self.assertEqual(body, {"op": "ping", "blob": {"__bytes__": 1}})
+        (size_1,) = struct.unpack(">I", data[10 + size:14 + size])
+        self.assertEqual(size_1, 2)
+        self.assertEqual(data[14 + size:], b"\x00\x01")
+
+    def test_round_trip(self):
+        message = {"id": 7, "op": "find", "args": ["name:确定", 1.5, None, True],
+                   "nested": {"data": [b"abc", bytearray(b"de"), memoryview(b"f")]}, "tuple": (1, 2)}
+        decoded = decode_message(frame_bytes(message)[4:])
+        self.assertEqual(decoded, {"id": 7, "op": "find", "args": ["name:确定", 1.5, None, True],
+                                   "nested": {"data": [b"abc", b"de", b"f"]}, "tuple": [1, 2]})
+
+    def test_compact_utf8_json(self):
+        data = frame_bytes({"name": "确定"})
+        self.assertIn("确定".encode("utf-8"), data)
+        self.assertNotIn(b" ", data)
+
+    @unittest.skipUnless(daemon_protocol.NUMPY_AVAILABLE, "NumPy 不可用")
+    def test_ndarray(self):
+        image = np.arange(2 * 3 * 4, dtype=np.uint8).reshape(2, 3, 4)
+        scores = np.linspace(0, 1, 5, dtype=np.float32)[::2]  # 非连续数组
+        decoded = decode_message(frame_bytes({"image": image, "scores": scores, "n": np.int64(3)})[4:])
+        np.testing.assert_array_equal(decoded["image"], image)
+        np.testing.assert_array_equal(decoded["scores"], scores)
+        self.assertEqual(decoded["scores"].dtype, np.float32)
+        self.assertEqual(decoded["n"], 3)
+        self.assertIsInstance(decoded["n"], int)
+
+    def test_truncated(self):
+        data = frame_bytes({"blob": b"x" * 100})[4:]
+        with self.assertRaises(ProtocolError):
+            decode_message(data[:-10])
+
+    def test_empty(self):
+        with self.assertRaises(ProtocolError):
+            decode_message(struct.pack(">H", 0))
+
+    def test_too_large(self):
+        saved = daemon_protocol.MAX_FRAME
+        daemon_protocol.MAX_FRAME = 64
+        try:
+            with self.assertRaises(ProtocolError):
+                encode_message({"blob": b"x" * 100})
+        finally:
+            daemon_protocol.MAX_FRAME = saved
+
+
+class TestSocket(unittest.TestCase):
+    def setUp(self):
+        self.left, self.right = socket.socketpair()
+
+    def tearDown(self):
+        self.left.close()
+        self.right.close()
+
+    def test_send_receive(self):
+        messages = [{"id": i, "op": "echo", "blob": bytes([i]) * i} for i in range(5)]
+        for message in messages:
+            send_message(self.left, message)
+        self.assertEqual([recv_message(self.right) for _ in messages], messages)
+
+    def test_large_attachment(self):
+        # 超过套接字缓冲区，sendmsg 只发送一部分时逐段补发
+        blob = os.urandom(8 * 1024 * 1024)
+        result = {}
+        reader = threading.Thread(target=lambda: result.update(message=recv_message(self.right)))
+        reader.start()
+        send_message(self.left, {"op": "capture", "blob": blob})
+        reader.join(30)
+        self.assertEqual(result["message"]["blob"], blob)
+
+    def test_eof(self):
+        self.left.close()
+        with self.assertRaises(EOFError):
+            recv_message(self.right)
+
+    def test_eof_inside_frame(self):
+        self.left.sendall(frame_bytes({"blob": b"x" * 100})[:20])
+        self.left.close()
+        with self.assertRaises(EOFError):
+            recv_message(self.right)
+
+    def test_invalid_length(self):
+        self.left.sendall(struct.pack(">I", daemon_protocol.MAX_FRAME + 1))
+        with self.assertRaises(ProtocolError):
+            recv_message(self.right)
+
+
+class TestSocketPath(unittest.TestCase):
+    def setUp(self):
+        self.saved = {key: os.environ.get(key) for key in (daemon_protocol.SOCKET_ENV, "XDG_RUNTIME_DIR", "DISPLAY")}
+
+    def tearDown(self):
+        for key, value in self.saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    def test_default_path(self):
+        os.environ.pop(daemon_protocol.SOCKET_ENV, None)
+        os.environ["XDG_RUNTIME_DIR"] = "/run/user/1000"
+        os.environ["DISPLAY"] = ":1"
+        self.assertEqual(default_socket_path(), f"/run/user/1000/guiautomationd-{os.getuid()}-1.sock")
+
+    def test_env_override(self):
+        os.environ[daemon_protocol.SOCKET_ENV] = "/tmp/custom.sock"
+        self.assertEqual(default_socket_path(), "/tmp/custom.sock")
+
+
+if __name__ == "__main__":
+    unittest.main()
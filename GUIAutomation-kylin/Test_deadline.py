@@ -0,0 +1,112 @@
+"""
+Deadline 单元测试：子预算、阶段耗时、花费明细和 DeadlineExceeded，不依赖桌面环境。
+"""
+
+import time
+import unittest
+
+from deadline import Deadline, DeadlineExceeded
+
+
+class TestDeadline(unittest.TestCase):
+    def test_coerce(self):
+        # 已是 Deadline 时原样返回，None 使用默认值
+        deadline = Deadline(5)
+        self.assertIs(Deadline.coerce(deadline), deadline)
+        self.assertEqual(Deadline.coerce(None, default=3).budget, 3.0)
+        self.assertIsNone(Deadline.coerce(None).budget)
+        self.assertEqual(Deadline.coerce(2).budget, 2.0)
+
+    def test_unlimited(self):
+        deadline = Deadline()
+        self.assertEqual(deadline.remaining(), float("inf"))
+        self.assertFalse(deadline.expired())
+        self.assertEqual(deadline.limit(7), 7)
+        deadline.check("任何步骤")
+
+    def test_remaining_and_limit(self):
+        deadline = Deadline(10)
+        self.assertLessEqual(deadline.remaining(), 10)
+        self.assertGreater(deadline.remaining(), 9)
+        self.assertEqual(deadline.limit(1), 1)
+        self.assertLessEqual(deadline.limit(60), 10)
+        self.assertEqual(Deadline(-1).budget, 0.0)
+
+    def test_child_reserves_time(self):
+        deadline = Deadline(10)
+        child = deadline.child(reserve=4)
+        self.assertLessEqual(child.remaining(), 6)
+        self.assertGreater(child.remaining(), 5)
+        # 预留时间超过剩余时间时子预算立即到期
+        self.assertTrue(deadline.child(reserve=20).expired())
+        # 不限时的预算派生出的子预算同样不限时
+        self.assertIsNone(Deadline().child(reserve=1).end)
+
+    def test_child_shares_stage_times(self):
+        deadline = Deadline(10)
+        child = deadline.child(reserve=1)
+        with deadline.stage("find"):
+            with child.stage("atspi"):
+                pass
+        self.assertIn("find", deadline.spent)
+        self.assertIn("find/atspi", deadline.spent)
+
+    def test_stage_accumulates(self):
+        deadline = Deadline(10)
+        for _ in range(2):
+            with deadline.stage("wait"):
+                time.sleep(0.02)
+        self.assertEqual(list(deadline.spent), ["wait"])
+        self.assertGreaterEqual(deadline.spent["wait"], 0.04)
+
+    def test_stage_records_on_error(self):
+        deadline = Deadline(10)
+        with self.assertRaises(ValueError):
+            with deadline.stage("atspi"):
+                raise ValueError("失败")
+        self.assertIn("atspi", deadline.spent)
+        # 异常后阶段栈已复原
+        with deadline.stage("bounds"):
+            pass
+        self.assertIn("bounds", deadline.spent)
+
+    def test_sleep_does_not_pass_deadline(self):
+        deadline = Deadline(0.05)
+        started = time.monotonic()
+        slept = deadline.sleep(1)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertLessEqual(slept, 0.05)
+        self.assertIn("wait", deadline.spent)
+        self.assertEqual(deadline.sleep(1), 0)
+
+    def test_report(self):
+        deadline = Deadline(10)
+        with deadline.stage("atspi"):
+            pass
+        report = deadline.report()
+        self.assertTrue(report.startswith("预算 10.0s, 已用 "))
+        self.assertIn("atspi ", report)
+        self.assertTrue(Deadline().report().startswith("不限时, 已用 "))
+        self.assertNotIn(":", Deadline(1).report())
+
+    def test_check_raises_with_report(self):
+        deadline = Deadline(0)
+        with deadline.stage("atspi"):
+            pass
+        self.assertTrue(deadline.expired())
+        with self.assertRaises(DeadlineExceeded) as context:
+            deadline.check("bounds")
+        error = context.exception
+        self.assertIs(error.deadline, deadline)
+        self.assertEqual(error.message, "超时，未执行: bounds")
+        self.assertTrue(str(error).startswith("超时，未执行: bounds (预算 0.0s"))
+        self.assertIn("atspi", str(error))
+
+    def test_exceeded_without_deadline(self):
+        error = DeadlineExceeded("超时")
+        self.assertEqual(str(error), "超时")
+        self.assertIsNone(error.deadline)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+模板匹配的单元测试：NCC 得分、金字塔粗匹配、多尺度匹配和模板缓存，使用合成图像，不依赖桌面环境。
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import template_matcher
+from template_matcher import TemplateMatcher, TemplateMatch, parse_image_locator
+
+try:
+    import numpy as np
+    from PIL import Image
+    IMAGES_AVAILABLE = template_matcher.NUMPY_AVAILABLE
+except ImportError:
+    IMAGES_AVAILABLE = False
+
+
+def pattern(height, width):
+    """平滑、无重复的灰度图案，缩放后仍能匹配。"""
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    image = 128 + 60 * np.sin(x / 5.0) * np.cos(y / 7.0) + 40 * np.sin((x + 2 * y) / 11.0)
+    image[(x - width * 0.3) ** 2 + (y - height * 0.6) ** 2 < (min(height, width) * 0.15) ** 2] = 250
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def screen(height=300, width=400, seed=1):
+    random = np.random.RandomState(seed)
+    return (random.rand(height, width) * 60 + 40).astype(np.uint8)
+
+
+@unittest.skipUnless(IMAGES_AVAILABLE, "NumPy / Pillow 不可用")
+class TestTemplateMatcher(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.template = pattern(48, 64)
+        self.path = os.path.join(self.directory, "button.png")
+        Image.fromarray(self.template).save(self.path)
+        self.matcher = TemplateMatcher()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_ncc_exact(self):
+        level = template_matcher._TemplateLevel(self.template.astype(np.float32))
+        frame = screen(100, 120).astype(np.float32)
+        frame[30:78, 40:104] = self.template
+        scores = template_matcher._ncc(frame, level)
+        self.assertEqual(scores.shape, (100 - 48 + 1, 120 - 64 + 1))
+        y, x = divmod(int(np.argmax(scores)), scores.shape[1])
+        self.assertEqual((y, x), (30, 40))
+        self.assertAlmostEqual(scores[y, x], 1.0, places=4)
+        self.assertLessEqual(scores.max(), 1.0)
+        self.assertGreaterEqual(scores.min(), -1.0)
+
+    def test_ncc_brightness_invariant(self):
+        level = template_matcher._TemplateLevel(self.template.astype(np.float32))
+        frame = self.template.astype(np.float32) * 0.5 + 20
+        self.assertAlmostEqual(float(template_matcher._ncc(frame, level)[0, 0]), 1.0, places=4)
+
+    def test_ncc_degenerate(self):
+        flat = template_matcher._TemplateLevel(np.full((20, 20), 7, dtype=np.float32))
+        self.assertIsNone(template_matcher._ncc(screen(50, 50), flat))
+        level = template_matcher._TemplateLevel(self.template.astype(np.float32))
+        self.assertIsNone(template_matcher._ncc(screen(30, 30), level))
+        # 纯色窗口得分为 0
+        scores = template_matcher._ncc(np.zeros((60, 80), dtype=np.float32), level)
+        self.assertEqual(float(np.abs(scores).max()), 0.0)
+
+    def test_pyramid(self):
+        levels = self.matcher.template(self.path)
+        self.assertEqual([(level.height, level.width) for level in levels], [(48, 64), (24, 32), (12, 16)])
+        # 命中缓存时返回同一个金字塔
+        self.assertIs(self.matcher.template(self.path), levels)
+        self.matcher.clear_cache()
+        self.assertIsNot(self.matcher.template(self.path), levels)
+
+    def test_small_template_single_level(self):
+        path = os.path.join(self.directory, "small.png")
+        Image.fromarray(pattern(16, 16)).save(path)
+        self.assertEqual(len(self.matcher.template(path)), 1)
+
+    def test_match_with_pyramid(self):
+        frame = screen()
+        frame[137:185, 211:275] = self.template
+        match = self.matcher.match(frame, self.path, confidence=0.95, origin=(1000, 500))
+        self.assertIsInstance(match, TemplateMatch)
+        self.assertEqual((match.x, match.y, match.width, match.height), (1211, 637, 64, 48))
+        self.assertGreater(match.confidence, 0.99)
+        self.assertEqual(match.scale, 1.0)
+
+    def test_match_color_frame(self):
+        frame = np.repeat(screen()[..., None], 4, axis=2)
+        frame[10:58, 300:364, :3] = self.template[..., None]
+        match = self.matcher.match(frame, self.path)
+        self.assertEqual((match.x, match.y), (300, 10))
+
+    def test_match_not_found(self):
+        self.assertIsNone(self.matcher.match(screen(), self.path, confidence=0.9))
+
+    def test_multi_scale(self):
+        scaled = np.asarray(Image.fromarray(self.template).resize((80, 60), Image.BILINEAR))
+        frame = screen()
+        frame[100:160, 50:130] = scaled
+        self.assertIsNone(self.matcher.match(frame, self.path, confidence=0.95))
+        match = self.matcher.match(frame, self.path, confidence=0.95, scales=(0.8, 1.0, 1.25))
+        self.assertEqual(match.scale, 1.25)
+        self.assertEqual((match.width, match.height), (80, 60))
+        self.assertLessEqual(abs(match.x - 50) + abs(match.y - 100), 2)
+
+    def test_missing_template(self):
+        with self.assertRaises(Exception):
+            self.matcher.template(os.path.join(self.directory, "missing.png"))
+
+
+class TestImageLocator(unittest.TestCase):
+    def test_parse(self):
+        path, options = parse_image_locator("/tmp/ok.png?confidence=0.85&scales=0.75,1,1.25&window=记事本")
+        self.assertEqual(path, "/tmp/ok.png")
+        self.assertEqual(options, {"confidence": 0.85, "scales": (0.75, 1.0, 1.25), "window": "记事本"})
+        self.assertEqual(parse_image_locator(" /tmp/ok.png "), ("/tmp/ok.png", {}))
+
+    def test_unknown_option(self):
+        with self.assertRaises(ValueError):
+            parse_image_locator("/tmp/ok.png?blur=2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+可访问性树导出与比较的单元测试：dump_tree / iter_dump 往返，diff_tree 的新增、删除、改名、移动，不依赖桌面环境。
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.fake_backend import build_spec_tree, element_field
+from tree_export import dump_tree, iter_dump, iter_nodes, read_header, diff_tree, fingerprint
+
+
+TREE = ("application", "记事本", [
+    ("frame", "记事本", [
+        ("menu bar", "菜单", [("menu", "文件"), ("menu", "编辑")]),
+        ("panel", "编辑区", [("text", "正文", {"text": "hello"})]),
+        ("status bar", "状态"),
+    ]),
+])
+
+
+def build_tree():
+    return build_spec_tree(TREE)
+
+
+def records(root, fields=()):
+    return list(iter_nodes(root, fields, element_field))
+
+
+class TestTreeExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_iter_nodes(self):
+        nodes = records(build_tree(), fields=("text",))
+        self.assertEqual(len(nodes), 8)
+        self.assertEqual([n["name"] for n in nodes], ["记事本", "记事本", "菜单", "文件", "编辑", "编辑区", "正文", "状态"])
+        self.assertEqual(nodes[4]["path"], [0, 0, 1])
+        self.assertEqual(nodes[4]["depth"], 3)
+        self.assertEqual(nodes[2]["children"], 2)
+        self.assertEqual(nodes[6]["text"], "hello")
+        self.assertEqual(nodes[0]["fp"], fingerprint("application", "记事本"))
+        self.assertEqual(len(list(iter_nodes(build_tree(), max_depth=1))), 2)
+        self.assertEqual(len(list(iter_nodes(build_tree(), max_nodes=3))), 3)
+
+    def test_round_trip(self):
+        expected = records(build_tree(), fields=("text",))
+        for name in ("tree.ndjson", "tree.bin", "tree.ndjson.gz", "tree.bin.gz"):
+            path = os.path.join(self.directory, name)
+            result = dump_tree(build_tree(), path, fields=("text",), reader=element_field, header={"app": "记事本"})
+            self.assertEqual(result["nodes"], 8)
+            self.assertFalse(result["truncated"])
+            loaded = list(iter_dump(path))
+            self.assertEqual([(r["path"], r["role"], r["name"], r["fp"], r["text"]) for r in loaded],
+                             [(r["path"], r["role"], r["name"], r["fp"], r["text"]) for r in expected], name)
+            header = read_header(path)
+            self.assertEqual(header["app"], "记事本")
+            self.assertEqual(header["fields"], ["role", "name", "text"])
+            self.assertFalse([f for f in os.listdir(self.directory) if f.endswith(".tmp")])
+
+    def test_truncated(self):
+        path = os.path.join(self.directory, "tree.ndjson")
+        result = dump_tree(build_tree(), path, max_nodes=5)
+        self.assertEqual(result["nodes"], 5)
+        self.assertTrue(result["truncated"])
+
+    def test_bad_format(self):
+        with self.assertRaises(ValueError):
+            dump_tree(build_tree(), os.path.join(self.directory, "tree.xml"), format="xml")
+
+
+class TestDiffTree(unittest.TestCase):
+    def diff(self, before, after, fields=()):
+        return diff_tree(records(before, fields), records(after, fields))
+
+    def test_identical(self):
+        self.assertEqual(self.diff(build_tree(), build_tree()), [])
+
+    def test_renamed(self):
+        after = build_tree()
+        after.children[0].children[2].name = "就绪"
+        self.assertEqual(self.diff(build_tree(), after), [
+            {"op": "changed", "path_a": [0, 2], "path_b": [0, 2], "role": "status bar", "name": "就绪",
+             "fields": {"name": ["状态", "就绪"]}}])
+
+    def test_changed_field(self):
+        after = build_tree()
+        after.children[0].children[1].children[0].text = "world"
+        entries = self.diff(build_tree(), after, fields=("text",))
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["op"], "changed")
+        self.assertEqual(entries[0]["fields"], {"text": ["hello", "world"]})
+
+    def test_added_and_removed_subtrees(self):
+        after = build_tree()
+        frame = after.children[0]
+        toolbar = build_spec_tree(("tool bar", "工具栏", [("push button", "保存")]), frame.latency)
+        frame.children.insert(1, toolbar)
+        frame.children[0].children.pop()  # 删除 编辑 菜单
+        entries = self.diff(build_tree(), after)
+        self.assertEqual(sorted((e["op"], e["name"], e["nodes"]) for e in entries),
+                         [("added", "工具栏", 2), ("removed", "编辑", 1)])
+        added = [e for e in entries if e["op"] == "added"][0]
+        self.assertEqual((added["path_a"], added["path_b"]), (None, [0, 1]))
+        # 插入兄弟节点引起的序号变化不算移动
+        self.assertFalse([e for e in entries if e["op"] == "moved"])
+
+    def test_role_changed_is_replacement(self):
+        after = build_tree()
+        after.children[0].children[2].role = "label"
+        entries = self.diff(build_tree(), after)
+        self.assertEqual(sorted((e["op"], e["role"]) for e in entries),
+                         [("added", "label"), ("removed", "status bar")])
+
+    def test_moved(self):
+        after = build_tree()
+        menus = after.children[0].children[0]
+        menus.children.reverse()
+        entries = self.diff(build_tree(), after)
+        self.assertEqual(entries, [{"op": "moved", "path_a": [0, 0, 1], "path_b": [0, 0, 0], "role": "menu",
+                                    "name": "编辑"}])
+
+    def test_empty_side(self):
+        entries = diff_tree([], records(build_tree()))
+        self.assertEqual(entries, [{"op": "added", "path_a": None, "path_b": [], "role": "application",
+                                    "name": "记事本", "nodes": 8}])
+        self.assertEqual(diff_tree([], []), [])
+
+    def test_diff_files(self):
+        directory = tempfile.mkdtemp()
+        try:
+            before = os.path.join(directory, "before.bin")
+            after_path = os.path.join(directory, "after.ndjson.gz")
+            after = build_tree()
+            after.children[0].children[2].name = "就绪"
+            dump_tree(build_tree(), before)
+            dump_tree(after, after_path)
+            self.assertEqual([e["op"] for e in diff_tree(before, after_path)], ["changed"])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+"""
+可访问性树快照与 XPath / CSS 选择器的单元测试，使用 benchmarks/fake_backend 中的假 AT-SPI 元素，不依赖桌面环境。
+"""
+
+import unittest
+
+from benchmarks.fake_backend import build_spec_tree, element_field
+from tree_selectors import compile_xpath, compile_css, normalize_role, SelectorSyntaxError
+from tree_snapshot import TreeSnapshot
+
+
+TREE = ("application", "计算器", [
+    ("frame", "计算器", [
+        ("panel", "keys", [
+            ("push button", "1", {"accessible_id": "b1"}),
+            ("push button", "2", {"accessible_id": "b2"}),
+            ("push button", "确定", {"accessible_id": "ok", "states": ("visible", "showing", "focused")}),
+        ]),
+        ("panel", "display", [
+            ("text", "结果", {"text": "42", "accessible_id": "result"}),
+            ("push button", "确定", {"accessible_id": "ok2"}),
+        ]),
+    ]),
+])
+
+
+def build_tree():
+    return build_spec_tree(TREE)
+
+
+class TestTreeSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = TreeSnapshot(build_tree(), reader=element_field)
+
+    def names(self, nodes):
+        return [node.name for node in nodes]
+
+    def test_capture(self):
+        snapshot = self.snapshot
+        self.assertEqual(len(snapshot), 9)
+        self.assertEqual(snapshot.root.role, "application")
+        # 先序下标：子树中的节点下标都在 [index, end) 内
+        self.assertEqual([node.index for node in snapshot.nodes], list(range(9)))
+        keys = snapshot.nodes[2]
+        self.assertEqual((keys.name, keys.index, keys.end), ("keys", 2, 6))
+        self.assertEqual(snapshot.root.end, 9)
+        self.assertEqual(snapshot._node(-1), snapshot.document)
+        self.assertFalse(snapshot.truncated)
+
+    def test_indexes(self):
+        snapshot = self.snapshot
+        self.assertEqual(snapshot.by_role["push button"], [3, 4, 5, 8])
+        self.assertEqual(snapshot.by_name["确定"], [5, 8])
+        self.assertEqual(snapshot.by_role["panel"], [2, 6])
+
+    def test_max_depth_and_max_nodes(self):
+        shallow = TreeSnapshot(build_tree(), max_depth=1)
+        self.assertEqual(self.names(shallow.nodes), ["计算器", "计算器"])
+        limited = TreeSnapshot(build_tree(), max_nodes=4)
+        self.assertEqual(len(limited), 4)
+        self.assertTrue(limited.truncated)
+
+    def test_branch(self):
+        # 只展开 display 面板：keys 只记录自身，绝对路径仍按完整的层级求值
+        snapshot = TreeSnapshot(build_tree(), branch=[0, 1])
+        self.assertEqual(self.names(snapshot.nodes), ["计算器", "计算器", "keys", "display", "结果", "确定"])
+        self.assertEqual(snapshot.nodes[2].children, [])
+        self.assertEqual([n.index for n in snapshot.xpath("/application/frame/panel[2]/push button")], [5])
+        self.assertEqual(snapshot.xpath("//panel[@name='keys']/push button"), [])
+
+    def test_attributes(self):
+        snapshot = self.snapshot
+        ok = snapshot.nodes[5]
+        self.assertEqual(snapshot.attribute(ok, "name"), "确定")
+        self.assertEqual(snapshot.attribute(ok, "id"), "ok")
+        self.assertEqual(snapshot.attribute(ok, "index"), 2.0)
+        self.assertEqual(snapshot.attribute(ok, "depth"), 3.0)
+        self.assertEqual(snapshot.attribute(ok, "width"), 80.0)
+        self.assertEqual(snapshot.states(ok), {"visible", "showing", "focused"})
+        self.assertEqual(snapshot.attribute(snapshot.nodes[7], "text"), "42")
+        self.assertIsNone(snapshot.attribute(snapshot.document, "name"))
+        # 延迟字段只读取一次
+        calls = snapshot.calls
+        snapshot.attribute(ok, "id")
+        self.assertEqual(snapshot.calls, calls)
+
+    def test_lazy_fields_without_reader(self):
+        snapshot = TreeSnapshot(build_tree())
+        self.assertIsNone(snapshot.attribute(snapshot.nodes[5], "id"))
+        self.assertEqual(snapshot.states(snapshot.nodes[5]), set())
+
+    def test_xpath(self):
+        snapshot = self.snapshot
+        self.assertEqual([n.index for n in snapshot.xpath("//push button[@name='确定']")], [5, 8])
+        self.assertEqual([n.index for n in snapshot.xpath("//push_button[@name='确定']")], [5, 8])
+        self.assertEqual(self.names(snapshot.xpath("/application/frame/panel")), ["keys", "display"])
+        self.assertEqual(self.names(snapshot.xpath("//panel[@name='keys']/push button[2]")), ["2"])
+        self.assertEqual(self.names(snapshot.xpath("//panel/push button[last()]")), ["确定", "确定"])
+        self.assertEqual([n.index for n in snapshot.xpath("//push button[1]")], [3, 8])
+        self.assertEqual(self.names(snapshot.xpath("//*[@id='result']/parent::*")), ["display"])
+        self.assertEqual(self.names(snapshot.xpath("//*[contains(@name, '结')]")), ["结果"])
+        self.assertEqual(self.names(snapshot.xpath("//*[starts-with(@id, 'b')]")), ["1", "2"])
+        self.assertEqual(self.names(snapshot.xpath("//*[@id='b1' or @id='b2']")), ["1", "2"])
+        self.assertEqual(self.names(snapshot.xpath("//text[@text='42']")), ["结果"])
+        self.assertEqual(self.names(snapshot.xpath("//push button[@id='b1']/following-sibling::*")),
+                         ["2", "确定"])
+        self.assertEqual(self.names(snapshot.xpath("//push button[@id='ok']/preceding-sibling::*[1]")), ["2"])
+        self.assertEqual(self.names(snapshot.xpath("//panel[count(push_button)=1]")), ["display"])
+        self.assertEqual(self.names(snapshot.xpath("//panel[not(@name='keys')]")), ["display"])
+        self.assertEqual(snapshot.xpath("//push button[@name='不存在']"), [])
+
+    def test_nested_predicate_keeps_position(self):
+        # 内层谓词不清除外层谓词的 position() 标记，操作数交换前后结果相同
+        snapshot = self.snapshot
+        for expression in ("//push button[position()=1 and parent::panel[@name='display']]",
+                           "//push button[parent::panel[@name='display'] and position()=1]"):
+            self.assertTrue(compile_xpath(expression).paths[0].steps[-1].positional)
+            self.assertEqual([n.index for n in snapshot.xpath(expression)], [8])
+
+    def test_css(self):
+        snapshot = self.snapshot
+        self.assertEqual([n.index for n in snapshot.css('push_button[name="确定"]')], [5, 8])
+        self.assertEqual(self.names(snapshot.css("#result")), ["结果"])
+        self.assertEqual(self.names(snapshot.css("push_button.focused")), ["确定"])
+        self.assertEqual([n.index for n in snapshot.css("panel > push_button:nth-child(2)")], [4, 8])
+        self.assertEqual([n.index for n in snapshot.css("panel > push_button:last-child")], [5, 8])
+        self.assertEqual(self.names(snapshot.css("text + push_button")), ["确定"])
+        self.assertEqual([n.index for n in snapshot.css("text ~ push_button")], [8])
+        self.assertEqual(self.names(snapshot.css('[name^="结"], #b2')), ["2", "结果"])
+        self.assertEqual(self.names(snapshot.css("push_button:not(.focused)")), ["1", "2", "确定"])
+        self.assertEqual(self.names(snapshot.css("frame panel:first-child")), ["keys"])
+
+    def test_find_first(self):
+        snapshot = self.snapshot
+        self.assertEqual(snapshot.findByXPath("//push button[@name='确定']").index, 5)
+        self.assertEqual(snapshot.findByCss("#ok2").index, 8)
+        self.assertIsNone(snapshot.findByCss("#missing"))
+
+    def test_select_with_context(self):
+        snapshot = self.snapshot
+        display = snapshot.nodes[6]
+        nodes = snapshot.select(compile_xpath(".//push button"), context=display)
+        self.assertEqual([n.index for n in nodes], [8])
+
+
+class TestSelectorCompiler(unittest.TestCase):
+    def test_normalize_role(self):
+        self.assertEqual(normalize_role("push_button"), "push button")
+        self.assertEqual(normalize_role("Push-Button"), "push button")
+        self.assertEqual(normalize_role("  table   cell "), "table cell")
+
+    def test_compile_cache(self):
+        self.assertIs(compile_xpath("//push button"), compile_xpath("//push button"))
+        self.assertIs(compile_css("panel > push_button"), compile_css("panel > push_button"))
+
+    def test_name_equality_index_hint(self):
+        step = compile_xpath("//push button[@name='确定']").paths[0].steps[-1]
+        self.assertEqual(step.role, "push button")
+        self.assertEqual(step.index_hint, ("name", "确定"))
+        self.assertTrue(compile_xpath("//push button[last()]").paths[0].steps[-1].positional)
+
+    def test_union(self):
+        self.assertEqual(len(compile_xpath("//a | //b").paths), 2)
+        self.assertEqual(len(compile_css("a, b").paths), 2)
+
+    def test_syntax_errors(self):
+        for expression in ("//push button[@name='确定'", "//*[", "//foo::bar"):
+            with self.assertRaises(SelectorSyntaxError):
+                compile_xpath(expression)
+        with self.assertRaises(SelectorSyntaxError):
+            compile_css("")
+
+
+if __name__ == "__main__":
+    unittest.main()
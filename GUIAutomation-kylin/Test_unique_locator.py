@@ -0,0 +1,151 @@
+"""
+唯一定位器生成的单元测试：快照上的各类候选，以及多个应用中存在同名元素时按桌面生成、按实际查找路径确认。
+使用 benchmarks/fake_backend 中的假 AT-SPI 树，不依赖桌面环境。
+"""
+
+import os
+os.environ.setdefault('GUIAUTOMATION_HINTS', '0')
+
+import unittest
+
+from benchmarks.fake_backend import FakeBackend, LatencyModel, build_spec_tree, element_field
+from tree_snapshot import TreeSnapshot
+from unique_locator import LocatorGenerator, quote
+
+
+# 工具栏和对话框中都有名为“保存”的按钮，对话框中还有同名的标签和两个无名称按钮
+TREE = ("application", "编辑器", [
+    ("frame", "编辑器", [
+        ("panel", "toolbar", [("push button", "保存"), ("push button", "打开")]),
+        ("panel", "dialog", [
+            ("push button", "保存"),
+            ("label", "保存", {"accessible_id": "lbl"}),
+            ("push button", ""),
+            ("push button", ""),
+        ]),
+    ]),
+])
+
+
+def build_tree():
+    return build_spec_tree(TREE)
+
+
+def walk(accessible):
+    yield accessible
+    for child in accessible.children:
+        yield from walk(child)
+
+
+class TestLocatorGenerator(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = TreeSnapshot(build_tree(), reader=element_field)
+        self.generator = LocatorGenerator(self.snapshot)
+
+    def node(self, name, occurrence=0):
+        return [n for n in self.snapshot.nodes if n.name == name][occurrence]
+
+    def assert_unique(self, locator, node):
+        self.assertTrue(locator.startswith("xpath:"), locator)
+        self.assertEqual(self.snapshot.xpath(locator[len("xpath:"):]), [node])
+
+    def test_quote(self):
+        self.assertEqual(quote("确定"), "'确定'")
+        self.assertEqual(quote("it's"), '"it\'s"')
+        self.assertIsNone(quote("'\""))
+
+    def test_unique_name(self):
+        self.assertEqual(self.generator.locator_for(self.node("打开")), "name:打开")
+
+    def test_unique_id_and_role(self):
+        label = self.node("保存", 2)
+        self.assertEqual(label.role, "label")
+        self.assertEqual(self.generator.locator_for(label), "id:lbl")
+        generator = LocatorGenerator(self.snapshot, locator_types=("name", "role"))
+        self.assertEqual(generator.locator_for(label), "role:label")
+
+    def test_chained_xpath(self):
+        # 两个 保存 按钮的角色和名称都相同，只能通过唯一的祖先区分
+        button = self.node("保存", 1)
+        locator = self.generator.locator_for(button)
+        self.assertEqual(locator, "xpath://*[@name='dialog']//push button[@name='保存']")
+        self.assert_unique(locator, button)
+
+    def test_indexed_path(self):
+        unnamed = [n for n in self.snapshot.nodes if n.role == "push button" and not n.name]
+        locators = [self.generator.locator_for(node) for node in unnamed]
+        self.assertEqual(locators, ["xpath://*[@name='dialog']/push button[2]",
+                                    "xpath://*[@name='dialog']/push button[3]"])
+        for locator, node in zip(locators, unnamed):
+            self.assert_unique(locator, node)
+
+    def test_every_node(self):
+        for node in self.snapshot.nodes:
+            locator = self.generator.locator_for(node)
+            if locator.startswith("xpath:"):
+                self.assert_unique(locator, node)
+
+    def test_verify(self):
+        button = self.node("打开")
+        rejected = []
+
+        def verify(locator):
+            rejected.append(locator)
+            return locator.startswith("xpath:")
+
+        locator = self.generator.locator_for(button, verify=verify)
+        self.assertEqual(rejected[0], "name:打开")
+        self.assert_unique(locator, button)
+        self.assertIsNone(self.generator.locator_for(button, verify=lambda locator: False))
+
+
+class TestDesktopUniqueLocator(unittest.TestCase):
+    """两个应用的元素名称、id 完全相同：窗口内唯一的定位器在桌面上会先匹配到另一个应用。"""
+
+    def setUp(self):
+        self.backend = FakeBackend(LatencyModel())
+        self.first = self.backend.build_accessible_tree(60, fanout=4, app_name="fake-app")
+        self.second = self.backend.build_accessible_tree(60, fanout=4, app_name="fake-app")
+        for pid, app in enumerate(self.backend.desktop.children, 1000):
+            app.pid = pid
+
+    def handler(self, module):
+        from element_ref import ElementRef
+        handler = module.LinuxHandler()
+        handler.hint_store = None
+        return handler, ElementRef
+
+    def resolve(self, handler, locator):
+        handler.element_cache.clear()
+        return handler.find_element(locator, 0).accessible
+
+    def test_second_app(self):
+        with self.backend.install() as module:
+            handler, ElementRef = self.handler(module)
+            targets = [n for n in walk(self.second) if n is not self.second]
+            for scope in ("window", "desktop"):
+                for target in targets[::7]:
+                    handler.element_cache.clear()
+                    locator = handler.get_unique_locator(ElementRef(target, handler), scope)
+                    self.assertIs(self.resolve(handler, locator), target, f"{scope}: {locator}")
+                    self.assertFalse(locator.startswith(("name:", "id:")), locator)
+
+    def test_first_app(self):
+        with self.backend.install() as module:
+            handler, ElementRef = self.handler(module)
+            leaf = [n for n in walk(self.first) if n.role == "push button"][-1]
+            locator = handler.get_unique_locator(ElementRef(leaf, handler))
+            self.assertIs(self.resolve(handler, locator), leaf)
+
+    def test_child_locators(self):
+        with self.backend.install() as module:
+            handler, ElementRef = self.handler(module)
+            panel = self.second.children[0]
+            locators = handler.get_child_elements_locator(ElementRef(panel, handler), 2, "unique")
+            self.assertEqual(len(locators), len(panel.children))
+            for locator, child in zip(locators, panel.children):
+                self.assertIs(self.resolve(handler, locator), child, locator)
+
+
+if __name__ == "__main__":
+    unittest.main()
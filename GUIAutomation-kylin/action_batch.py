@@ -0,0 +1,276 @@
+import time
+from xtest_input import XTestInputBuffer, PyAutoGUIInput
+
+try:
+    import gi
+    gi.require_version('Atspi', '2.0')
+    from gi.repository import Atspi
+    ATSPI_AVAILABLE = True
+except (ImportError, ValueError):
+    ATSPI_AVAILABLE = False
+
+# 需要定位元素的步骤类型
+ELEMENT_OPS = ("click", "move_to", "input_text", "press_key")
+# 不发送输入、只等待的步骤类型
+WAIT_OPS = ("wait", "wait_for")
+
+
+class StepResult:
+    """单个步骤的执行结果与耗时（秒）。"""
+
+    __slots__ = ("index", "op", "locator", "ok", "error",
+                 "resolve_time", "input_time", "wait_time", "total_time")
+
+    def __init__(self, index, op, locator):
+        self.index = index
+        self.op = op
+        self.locator = locator
+        self.ok = False
+        self.error = None
+        self.resolve_time = 0.0
+        self.input_time = 0.0
+        self.wait_time = 0.0
+        self.total_time = 0.0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        status = "ok" if self.ok else f"failed: {self.error}"
+        return f"<StepResult #{self.index} {self.op} {self.locator or ''} {self.total_time * 1000:.1f}ms {status}>"
+
+
+class BatchResult:
+    """批量执行结果：每个步骤的耗时，以及整体的解析/输入统计。"""
+
+    def __init__(self):
+        self.steps = []
+        self.plan_time = 0.0       # 编译计划 + 一次性解析定位器
+        self.total_time = 0.0
+        self.resolved_up_front = 0
+        self.resolved_lazily = 0
+        self.input_events = 0
+        self.input_flushes = 0
+
+    @property
+    def ok(self):
+        return all(step.ok for step in self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def to_dict(self):
+        return {
+            "ok": self.ok,
+            "plan_time": self.plan_time,
+            "total_time": self.total_time,
+            "resolved_up_front": self.resolved_up_front,
+            "resolved_lazily": self.resolved_lazily,
+            "input_events": self.input_events,
+            "input_flushes": self.input_flushes,
+            "steps": [step.to_dict() for step in self.steps],
+        }
+
+
+class ActionBatch:
+    """
+    批量动作脚本。
+
+    在 with 块中记录步骤，退出 with 块时编译为执行计划并一次性执行：
+    - 所有定位器在执行前通过一次桌面树遍历解析（handler.find_elements），
+      届时还不存在的元素（如点击后才弹出的对话框）在执行到该步时再查找；
+    - 连续的输入步骤在同一个 XTEST 缓冲中发送，只在等待步骤前和计划结束时 flush；
+    - 不插入任何默认延时，只执行计划中声明的 wait / wait_for。
+
+    用法:
+        with GUIAutomation.batch(objWin) as b:
+            b.click("name:七")
+            b.input_text("role:text", "123")
+            b.press_key("role:text", "enter")
+            b.wait_for("name:结果")
+        print(b.result.steps)
+    """
+
+    def __init__(self, handler, objWin=None, time_out=10, continue_on_error=False):
+        self.handler = handler
+        self.objWin = objWin
+        self.time_out = time_out
+        self.continue_on_error = continue_on_error
+        self.steps = []
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.run()
+        return False
+
+    # ---------------- 记录步骤 ----------------
+
+    def _add(self, op, locator=None, **params):
+        self.steps.append((op, locator, params))
+        return self
+
+    def click(self, locator, mouse_button="left", click_type="single", cursor_position="center",
+              x_offset=0, y_offset=0, modifier_keys=None):
+        """点击元素。click_type 支持 "single"、"double"。"""
+        return self._add("click", locator, mouse_button=mouse_button, click_type=click_type,
+                         cursor_position=cursor_position, x_offset=x_offset, y_offset=y_offset,
+                         modifier_keys=modifier_keys)
+
+    def move_to(self, locator, cursor_position="center", x_offset=0, y_offset=0):
+        """移动鼠标到元素。"""
+        return self._add("move_to", locator, cursor_position=cursor_position,
+                         x_offset=x_offset, y_offset=y_offset)
+
+    def input_text(self, locator, text, clear_content=True, click_before_input=False):
+        """在元素中输入文本。"""
+        return self._add("input_text", locator, text=text, clear_content=clear_content,
+                         click_before_input=click_before_input)
+
+    def press_key(self, locator, key, modifier_keys=None, click_before_input=False):
+        """在元素中按键。"""
+        return self._add("press_key", locator, key=key, modifier_keys=modifier_keys,
+                         click_before_input=click_before_input)
+
+    def wait(self, seconds):
+        """固定等待（计划中唯一的无条件延时）。"""
+        return self._add("wait", None, seconds=seconds)
+
+    def wait_for(self, locator, timeout=10, wait_for="visible"):
+        """等待元素出现/隐藏。之后的步骤会重新解析定位器。"""
+        return self._add("wait_for", locator, timeout=timeout, wait_for=wait_for)
+
+    # ---------------- 编译与执行 ----------------
+
+    def _compile(self, result):
+        """解析计划：一次遍历解析所有定位器。返回 {定位器: 元素}。"""
+        start = time.time()
+        elements = {}
+        locators = []
+        for op, locator, _ in self.steps:
+            if op not in ELEMENT_OPS:
+                continue
+            if isinstance(locator, str):
+                locators.append(locator)
+            else:
+                elements[locator] = locator.accessible  # ElementRef 已经定位，无需查找
+        if locators and hasattr(self.handler, "find_elements"):
+            try:
+                elements.update(self.handler.find_elements(locators, timeout=0))
+            except Exception:
+                pass
+        result.resolved_up_front = len(elements)
+        result.plan_time = time.time() - start
+        return elements
+
+    def _new_input(self):
+        display = None
+        if hasattr(self.handler, "_get_display_connection"):
+            display, _ = self.handler._get_display_connection()
+        if XTestInputBuffer.available(display):
+            return XTestInputBuffer(display)
+        return PyAutoGUIInput()
+
+    def _element_bounds(self, element):
+        coords = element.get_extents(Atspi.CoordType.SCREEN)
+        return coords.x, coords.y, coords.width, coords.height
+
+    def _resolve(self, locator, elements, step_result, result):
+        element = elements.get(locator)
+        if element is not None:
+            try:
+                element.get_name()  # 校验元素仍然有效
+                return element
+            except Exception:
+                elements.pop(locator, None)
+        start = time.time()
+        element = self.handler._resolve_element(locator, self.time_out)
+        elements[locator] = element
+        result.resolved_lazily += 1
+        step_result.resolve_time += time.time() - start
+        return element
+
+    def _send(self, sender, op, element, params):
+        x, y, width, height = self._element_bounds(element)
+        if op in ("click", "move_to"):
+            cx, cy = self.handler._calculate_click_coords(x, y, width, height, params["cursor_position"],
+                                                          params["x_offset"], params["y_offset"])
+            if op == "move_to":
+                sender.move(cx, cy)
+                return
+            mods = params.get("modifier_keys") or []
+            for key in mods:
+                sender.key(key, True)
+            count = 2 if params["click_type"] == "double" else 1
+            sender.click(cx, cy, params["mouse_button"], count)
+            for key in reversed(mods):
+                sender.key(key, False)
+            return
+        if params.get("click_before_input"):
+            sender.click(x + width // 2, y + height // 2)
+        if op == "input_text":
+            if params["clear_content"]:
+                sender.hotkey("ctrl", "a")
+                sender.press("delete")
+            sender.type_text(params["text"])
+        elif op == "press_key":
+            mods = params.get("modifier_keys") or []
+            if mods:
+                sender.hotkey(*(list(mods) + [params["key"]]))
+            else:
+                sender.press(params["key"])
+
+    def run(self):
+        """编译并执行计划，返回 BatchResult（同时保存在 self.result）。"""
+        result = BatchResult()
+        self.result = result
+        run_start = time.time()
+        elements = self._compile(result)
+
+        with self.handler.input_session():
+            sender = self._new_input()
+            try:
+                for index, (op, locator, params) in enumerate(self.steps):
+                    step = StepResult(index, op, locator)
+                    result.steps.append(step)
+                    step_start = time.time()
+                    try:
+                        if op == "wait":
+                            sender.flush()
+                            time.sleep(params["seconds"])
+                            step.wait_time = time.time() - step_start
+                        elif op == "wait_for":
+                            sender.flush()
+                            self.handler.wait_for_element(locator, params["timeout"], params["wait_for"])
+                            step.wait_time = time.time() - step_start
+                            # 界面已变化，之前解析的元素可能失效
+                            elements.clear()
+                        else:
+                            element = self._resolve(locator, elements, step, result)
+                            input_start = time.time()
+                            self._send(sender, op, element, params)
+                            step.input_time = time.time() - input_start
+                        step.ok = True
+                    except Exception as e:
+                        step.error = str(e)
+                    step.total_time = time.time() - step_start
+                    if not step.ok and not self.continue_on_error:
+                        break
+                sender.flush()
+            finally:
+                sender.restore_keyboard_mapping()
+                result.input_events = sender.event_count
+                result.input_flushes = sender.flush_count
+
+        result.total_time = time.time() - run_start
+        failed = [step for step in result.steps if not step.ok]
+        if failed and not self.continue_on_error:
+            step = failed[0]
+            raise Exception(f"批量执行失败: 第 {step.index} 步 {step.op} {step.locator or ''}: {step.error}")
+        return result
@@ -0,0 +1,610 @@
+import sys
+import time
+import json
+import queue
+import signal
+import argparse
+import threading
+
+from gui_logging import get_logger
+from element_ref import ElementRef
+from unique_locator import quote
+from xtest_input import KEY_NAME_MAP, BUTTON_MAP
+
+try:
+    import gi
+    gi.require_version('Atspi', '2.0')
+    from gi.repository import Atspi
+    ATSPI_AVAILABLE = True
+except (ImportError, ValueError):
+    ATSPI_AVAILABLE = False
+
+try:
+    import Xlib.X
+    import Xlib.XK
+    import Xlib.display
+    from Xlib.ext import record
+    from Xlib.protocol import rq
+    RECORD_AVAILABLE = True
+except ImportError:
+    RECORD_AVAILABLE = False
+
+"""
+操作录制：把用户的点击和键盘输入录制成可重放的 GUIAutomation 批量脚本。
+
+输入事件来自 X RECORD 扩展（服务器上所有客户端的按键和鼠标按下），焦点来自 AT-SPI 的
+object:state-changed:focused 事件；X 服务器不支持 RECORD 时改用 AT-SPI 的 mouse:button 事件和按键监听。
+
+- 点击：按下时取坐标处最深的元素（handler.element_at_point），0.4 秒内同一元素的第二次点击合并为双击；
+- 键盘：连续输入的字符合并为一个 input_text，结束时读取元素的实际文本（输入法输入、退格修改都以最终文本为准）；
+  回车、Tab、方向键和带 Ctrl / Alt 的组合键为 press_key；
+- 每个元素录制时即生成唯一定位器（handler.get_unique_locator，默认在整个桌面范围内唯一，
+  并按实际的查找路径确认能定位到该元素）和路径提示；
+- 两步之间的间隔超过 WAIT_THRESHOLD 时在后一步前插入 wait_for，超时为观察到的间隔 × WAIT_SLACK，
+  元素已经出现时不等待，间隔只是上限。
+
+录制结果 Recording 可保存为 Python 脚本（GUIAutomation.batch）或 JSON 计划（与 guiautomationd 的 batch 步骤格式相同），
+两者都带有路径提示，重放前写入提示库（install_hints），定位时直接按路径命中，不搜索整个桌面。
+"""
+
+# 两步之间的间隔超过这么多秒时插入 wait_for
+WAIT_THRESHOLD = 0.5
+# wait_for 的超时 = 观察到的间隔 × WAIT_SLACK，至少 MIN_WAIT 秒
+WAIT_SLACK = 1.5
+MIN_WAIT = 1.0
+# 同一元素上两次点击的间隔不超过这么多秒时合并为双击
+DOUBLE_CLICK_INTERVAL = 0.4
+
+FOCUS_EVENT = "object:state-changed:focused"
+MOUSE_EVENT = "mouse:button"
+
+PLAN_FORMAT = "guiautomation-plan"
+
+# X 修饰键掩码 -> 按键名（与 xtest_input 的按键名一致）
+MODIFIER_MASKS = (("ctrl", 1 << 2), ("alt", 1 << 3), ("shift", 1 << 0), ("win", 1 << 6))
+MODIFIER_KEYSYMS = ("Control_L", "Control_R", "Shift_L", "Shift_R", "Alt_L", "Alt_R", "Super_L", "Super_R",
+                    "Meta_L", "Meta_R", "ISO_Level3_Shift", "Caps_Lock", "Num_Lock", "Mode_switch")
+# 滚轮等不是点击的鼠标按键
+IGNORED_BUTTONS = (4, 5, 6, 7)
+
+# X keysym 名称 -> 按键名：KEY_NAME_MAP 的反向，同一个 keysym 取最短的名称
+KEYSYM_KEYS = {"KP_Enter": "enter", "ISO_Left_Tab": "tab"}
+for _key, _keysym in KEY_NAME_MAP.items():
+    if len(_key) > 1 and len(_key) < len(KEYSYM_KEYS.get(_keysym, _key + " ")):
+        KEYSYM_KEYS[_keysym] = _key
+BUTTON_NAMES = {number: name for name, number in BUTTON_MAP.items()}
+
+record_log = get_logger("input")
+
+_keysym_names = None
+
+
+def keysym_name(keysym):
+    """keysym 的 X 名称（Return、F5 ...），取不到时为 None。"""
+    global _keysym_names
+    if _keysym_names is None:
+        _keysym_names = {}
+        if RECORD_AVAILABLE:
+            for name in dir(Xlib.XK):
+                if name.startswith("XK_"):
+                    _keysym_names.setdefault(getattr(Xlib.XK, name), name[3:])
+    return _keysym_names.get(keysym)
+
+
+def keysym_char(keysym):
+    """可打印字符的 keysym 对应的字符（Latin-1 与 Unicode keysym），其他为 None。"""
+    if 0x20 <= keysym <= 0x7E or 0xA0 <= keysym <= 0xFF:
+        return chr(keysym)
+    if 0x01000100 <= keysym <= 0x0110FFFF:
+        return chr(keysym - 0x01000000)
+    return None
+
+
+def modifier_keys(state):
+    return [name for name, mask in MODIFIER_MASKS if state & mask]
+
+
+class RecordedStep:
+    """录制的一步：操作、定位器、参数、开始 / 结束时间（time.monotonic）及路径提示。"""
+
+    __slots__ = ("op", "locator", "params", "start", "end", "hint", "element", "typed")
+
+    def __init__(self, op, locator, params, start, hint=None, element=None):
+        self.op = op
+        self.locator = locator
+        self.params = params
+        self.start = start
+        self.end = start
+        self.hint = hint
+        self.element = element
+        self.typed = ""
+
+    def batch_step(self):
+        """[步骤名, args, kwargs]，只写出与默认值不同的参数。"""
+        params = self.params
+        if self.op == "click":
+            kwargs = {}
+            if params.get("mouse_button", "left") != "left":
+                kwargs["mouse_button"] = params["mouse_button"]
+            if params.get("click_type", "single") != "single":
+                kwargs["click_type"] = params["click_type"]
+            if params.get("modifier_keys"):
+                kwargs["modifier_keys"] = params["modifier_keys"]
+            return ["click", [self.locator], kwargs]
+        if self.op == "input_text":
+            kwargs = {} if params.get("clear_content", True) else {"clear_content": False}
+            return ["input_text", [self.locator, params["text"]], kwargs]
+        kwargs = {"modifier_keys": params["modifier_keys"]} if params.get("modifier_keys") else {}
+        return ["press_key", [self.locator, params["key"]], kwargs]
+
+    def __repr__(self):
+        return f"<RecordedStep {self.op} {self.locator} {self.params}>"
+
+
+class Recording:
+    """一次录制的结果。"""
+
+    def __init__(self, steps, wait_slack=WAIT_SLACK, min_wait=MIN_WAIT):
+        self.steps = list(steps)
+        self.wait_slack = wait_slack
+        self.min_wait = min_wait
+
+    def __len__(self):
+        return len(self.steps)
+
+    def plan_steps(self):
+        """批量脚本的步骤 [[步骤名, args, kwargs], ...]，间隔较长的两步之间插入 wait_for。"""
+        result = []
+        previous = None
+        for step in self.steps:
+            if previous is not None:
+                gap = step.start - previous.end
+                if gap >= WAIT_THRESHOLD:
+                    timeout = round(max(self.min_wait, gap * self.wait_slack), 1)
+                    result.append(["wait_for", [step.locator], {"timeout": timeout}])
+            result.append(step.batch_step())
+            previous = step
+        return result
+
+    def hints(self):
+        """各定位器的路径提示（每个定位器一条）。"""
+        hints = {}
+        for step in self.steps:
+            if step.hint is not None and step.locator not in hints:
+                hints[step.locator] = dict(step.hint, locator=step.locator)
+        return list(hints.values())
+
+    def to_plan(self):
+        """JSON 计划：steps 可直接交给 GUIAutomation.batch 或 guiautomationd 的 batch 操作。"""
+        return {"format": PLAN_FORMAT, "version": 1, "recorded": time.time(),
+                "steps": self.plan_steps(), "hints": self.hints()}
+
+    def to_script(self):
+        """等价的 Python 脚本。"""
+        lines = ["# 由 action_recorder 录制生成", "from GUIAutomation import GUIAutomation",
+                 "from action_recorder import install_hints", "", "HINTS = ["]
+        lines.extend(f"    {hint!r}," for hint in self.hints())
+        lines.extend(["]", "", "", "def main():", "    install_hints(HINTS)",
+                      "    with GUIAutomation.batch(None) as b:"])
+        steps = self.plan_steps()
+        for name, args, kwargs in steps:
+            arguments = [repr(arg) for arg in args] + [f"{key}={value!r}" for key, value in kwargs.items()]
+            lines.append(f"        b.{name}({', '.join(arguments)})")
+        if not steps:
+            lines.append("        pass")
+        lines.extend(["    for step in b.result.steps:", "        print(step)", "", "",
+                      'if __name__ == "__main__":', "    main()", ""])
+        return "\n".join(lines)
+
+    def save(self, path, format=None):
+        """保存为 Python 脚本（.py）或 JSON 计划（.json，或 format="json"）。"""
+        format = format or ("json" if path.endswith(".json") else "python")
+        with open(path, "w", encoding="utf-8") as f:
+            if format == "json":
+                json.dump(self.to_plan(), f, ensure_ascii=False, indent=1)
+                f.write("\n")
+            else:
+                f.write(self.to_script())
+        return path
+
+
+def install_hints(hints, store=None):
+    """把录制时的路径提示写入提示库，返回写入的条数；提示库被关闭（GUIAUTOMATION_HINTS=0）时什么也不做。"""
+    if store is None:
+        from locator_hints import get_hint_store
+        store = get_hint_store()
+        if store is None:
+            return 0
+    tables = {}
+    for hint in hints:
+        tables.setdefault((hint["app"], hint["version"]), {})[hint["locator"]] = hint
+    for (app_name, version), table in tables.items():
+        store.record_many(app_name, version, table)
+    return len(hints)
+
+
+def load_plan(path):
+    with open(path, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    if plan.get("format") != PLAN_FORMAT:
+        raise ValueError(f"不是录制的计划文件: {path}")
+    return plan
+
+
+def run_plan(plan, objWin=None, time_out=10, continue_on_error=False):
+    """重放 JSON 计划（文件路径或 to_plan() 的结果）：先写入路径提示，再作为批量脚本执行，返回 BatchResult。"""
+    from GUIAutomation import GUIAutomation
+    if isinstance(plan, str):
+        plan = load_plan(plan)
+    install_hints(plan.get("hints", ()))
+    batch = GUIAutomation.batch(objWin, time_out, continue_on_error)
+    for name, args, kwargs in plan["steps"]:
+        getattr(batch, name)(*args, **kwargs)
+    return batch.run()
+
+
+class ActionRecorder:
+    """
+    操作录制器。
+
+    用法:
+        with GUIAutomation.record(objWin) as recorder:
+            ...                                  # 用户操作
+        recorder.recording.save("script.py")     # 或 "plan.json"
+
+    事件由录制线程放入队列，分两个阶段处理：取元素线程在事件到达时立即取坐标处（或获得焦点）的元素及其路径提示，
+    只做几次 AT-SPI 调用，不会被前一步的定位器生成拖慢；解析线程再按到达顺序为元素生成唯一定位器。
+    点击后随即关闭的对话框等元素在生成定位器时可能已经销毁，这时改用取元素时记录的路径提示写出带序号的 XPath。
+    """
+
+    def __init__(self, handler, scope="desktop", wait_slack=WAIT_SLACK, min_wait=MIN_WAIT):
+        self.handler = handler
+        self.scope = scope
+        self.wait_slack = wait_slack
+        self.min_wait = min_wait
+        self.steps = []
+        self.dropped = 0
+        self._events = queue.Queue()   # 录制线程 -> 取元素线程：原始输入事件
+        self._picked = queue.Queue()   # 取元素线程 -> 解析线程：已取得元素的事件
+        self._focus = None  # (元素, 路径提示)
+        self._described = None  # (元素, 定位器, 提示)：连续操作同一元素时不重复生成
+        self._threads = []
+        self._record_context = None
+        self._listener = None
+        self._key_listener = None
+        self._running = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    @property
+    def recording(self):
+        return Recording(self.steps, self.wait_slack, self.min_wait)
+
+    # ---------------- 开始 / 停止 ----------------
+
+    def start(self):
+        if self._running:
+            return self
+        if not ATSPI_AVAILABLE:
+            raise Exception("录制需要 AT-SPI（gi.repository.Atspi）")
+        self._running = True
+        use_record = RECORD_AVAILABLE and self._record_supported()
+        self._spawn(self._pick_loop, "recorder-pick")
+        self._spawn(self._resolve_loop, "recorder-resolve")
+        self._spawn(lambda: self._atspi_loop(not use_record), "recorder-atspi")
+        if use_record:
+            ready = threading.Event()
+            self._spawn(lambda: self._record_loop(ready), "recorder-xrecord")
+            ready.wait(2.0)
+        record_log.info("开始录制（输入事件来源: %s）", "X RECORD" if use_record else "AT-SPI")
+        return self
+
+    def stop(self):
+        """停止录制，等待已收到的事件处理完，返回 Recording。"""
+        if not self._running:
+            return self.recording
+        self._running = False
+        if self._record_context is not None:
+            try:
+                control = Xlib.display.Display()
+                control.record_disable_context(self._record_context)
+                control.flush()
+                control.close()
+            except Exception as e:
+                record_log.debug("停止 X RECORD 失败: %s", e)
+        try:
+            Atspi.event_quit()
+        except Exception:
+            pass
+        self._events.put(None)
+        for thread in self._threads:
+            thread.join(5.0)
+        self._threads = []
+        self._close_step()
+        record_log.info("录制结束: %d 步", len(self.steps))
+        return self.recording
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    # ---------------- 事件来源 ----------------
+
+    @staticmethod
+    def _record_supported():
+        try:
+            display = Xlib.display.Display()
+            try:
+                return display.has_extension("RECORD")
+            finally:
+                display.close()
+        except Exception:
+            return False
+
+    def _record_loop(self, ready):
+        display = Xlib.display.Display()
+        try:
+            self._record_context = display.record_create_context(0, [record.AllClients], [{
+                "core_requests": (0, 0), "core_replies": (0, 0),
+                "ext_requests": (0, 0, 0, 0), "ext_replies": (0, 0, 0, 0),
+                "delivered_events": (0, 0), "device_events": (Xlib.X.KeyPress, Xlib.X.ButtonPress),
+                "errors": (0, 0), "client_started": False, "client_died": False,
+            }])
+            ready.set()
+            # 阻塞到 stop() 从另一个连接关闭上下文
+            display.record_enable_context(self._record_context, lambda reply: self._on_record(display, reply))
+            display.record_free_context(self._record_context)
+        except Exception as e:
+            record_log.warning("X RECORD 录制出错: %s", e)
+        finally:
+            ready.set()
+            display.close()
+
+    def _on_record(self, display, reply):
+        if reply.category != record.FromServer or reply.client_swapped or not reply.data or reply.data[0] < 2:
+            return
+        data = reply.data
+        now = time.monotonic()
+        while data:
+            event, data = rq.EventField(None).parse_binary_value(data, display.display, None, None)
+            if event.type == Xlib.X.ButtonPress:
+                self._events.put(("button", now, event.root_x, event.root_y, event.detail, event.state))
+            elif event.type == Xlib.X.KeyPress:
+                shifted = 1 if event.state & Xlib.X.ShiftMask else 0
+                keysym = display.keycode_to_keysym(event.detail, shifted) or display.keycode_to_keysym(event.detail, 0)
+                self._events.put(("key", now, keysym, event.state))
+
+    def _atspi_loop(self, input_events):
+        """AT-SPI 事件循环：焦点事件，RECORD 不可用时还有鼠标按键和按键事件。"""
+        self._listener = Atspi.EventListener.new(self._on_atspi_event)
+        self._listener.register(FOCUS_EVENT)
+        if input_events:
+            self._listener.register(MOUSE_EVENT)
+            try:
+                self._key_listener = Atspi.DeviceListener.new(self._on_atspi_key)
+                Atspi.register_keystroke_listener(self._key_listener, None, 0, 1 << int(Atspi.KeyEventType.PRESSED),
+                                                  Atspi.KeyListenerSyncType.NOSYNC)
+            except Exception as e:
+                record_log.warning("无法监听 AT-SPI 按键事件，键盘输入不会被录制: %s", e)
+        try:
+            Atspi.event_main()
+        finally:
+            for event_type in (FOCUS_EVENT, MOUSE_EVENT):
+                try:
+                    self._listener.deregister(event_type)
+                except Exception:
+                    pass
+
+    def _on_atspi_event(self, event):
+        now = time.monotonic()
+        if event.type.startswith(FOCUS_EVENT):
+            if event.detail1:
+                self._events.put(("focus", now, event.source))
+        elif event.type.startswith(MOUSE_EVENT) and event.type.endswith("p"):
+            # mouse:button:1p，detail1 / detail2 为屏幕坐标
+            try:
+                button = int(event.type.split(":")[2][:-1])
+            except ValueError:
+                return
+            self._events.put(("button", now, event.detail1, event.detail2, button, 0))
+
+    def _on_atspi_key(self, event):
+        self._events.put(("key", time.monotonic(), event.id, event.modifiers))
+        return False
+
+    # ---------------- 事件 -> 步骤 ----------------
+
+    def _pick_loop(self):
+        """第一阶段：事件到达时立即取得元素（点击坐标处 / 获得焦点的元素）及其路径提示。"""
+        while True:
+            event = self._events.get()
+            if event is None:
+                self._picked.put(None)
+                return
+            try:
+                event = self.pick(event)
+            except Exception as e:
+                self.dropped += 1
+                record_log.warning("录制事件处理失败，已跳过: %s: %s", event[0], e)
+                continue
+            if event is not None:
+                self._picked.put(event)
+
+    def _resolve_loop(self):
+        """第二阶段：按到达顺序生成步骤和定位器。"""
+        while True:
+            event = self._picked.get()
+            if event is None:
+                return
+            try:
+                self.process(event)
+            except Exception as e:
+                self.dropped += 1
+                record_log.warning("录制事件处理失败，已跳过: %s: %s", event[0], e)
+
+    def _hint(self, element):
+        try:
+            return self.handler._element_hint(element)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _hint_locator(hint):
+        """按路径提示写出的带序号 XPath（元素已销毁、无法再生成唯一定位器时使用）。"""
+        name = quote(hint["app"]) if hint["app"] else None
+        app = f"application[@name={name}]" if name else "application"
+        return "xpath://" + "/".join([app] + [f"*[{index + 1}]" for index in hint["path"]])
+
+    def _describe(self, element, hint=None):
+        """元素的唯一定位器和路径提示；hint 为取元素时记录的路径提示。"""
+        described = self._described
+        if described is not None and described[0] == element:
+            return described[1], described[2]
+        try:
+            locator = self.handler.get_unique_locator(ElementRef(element, self.handler), self.scope)
+        except Exception as e:
+            if hint is None:
+                raise
+            locator = self._hint_locator(hint)
+            record_log.warning("无法为元素生成唯一定位器（可能已关闭），改用路径提示 %s: %s", locator, e)
+        else:
+            hint = self._hint(element) or hint
+        self._described = (element, locator, hint)
+        return locator, hint
+
+    def _close_step(self):
+        """结束正在进行的文字输入：以元素的实际文本为准（输入法、退格都已反映在其中）。"""
+        step = self.steps[-1] if self.steps else None
+        if step is None or step.op != "input_text" or step.element is None:
+            return
+        try:
+            text = self.handler._element_field(step.element, "text")
+        except Exception:
+            text = None
+        if text:
+            step.params["text"] = text
+            step.params["clear_content"] = True
+        step.element = None
+
+    def pick(self, event):
+        """
+        取元素：("button", 时间, x, y, 按键, 修饰键) -> ("click", 时间, 元素, 提示, 按键, 修饰键)，
+        ("focus", 时间, 元素) -> ("focus", 时间, 元素, 提示)；其他事件原样返回，不需要记录的返回 None。
+        """
+        kind, now = event[0], event[1]
+        if kind == "button":
+            x, y, button, state = event[2:]
+            if button in IGNORED_BUTTONS:
+                return None
+            element = self.handler.element_at_point(x, y)
+            if element is None:
+                record_log.debug("坐标 (%s, %s) 处没有可访问的元素，跳过点击", x, y)
+                return None
+            return ("click", now, element, self._hint(element), button, state)
+        if kind == "focus" and len(event) == 3:
+            return ("focus", now, event[2], self._hint(event[2]))
+        return event
+
+    def process(self, event):
+        """处理一个事件（pick 之前或之后的均可）：生成或合并步骤。"""
+        event = self.pick(event)
+        if event is None:
+            return
+        kind, now = event[0], event[1]
+        if kind == "focus":
+            self._focus = event[2:]
+            return
+        if kind == "click":
+            self._on_click(now, *event[2:])
+        elif kind == "key":
+            self._on_key(now, *event[2:])
+
+    def _on_click(self, now, element, hint, button, state):
+        locator, hint = self._describe(element, hint)
+        mouse_button = BUTTON_NAMES.get(button, "left")
+        last = self.steps[-1] if self.steps else None
+        if (last is not None and last.op == "click" and last.locator == locator
+                and last.params["mouse_button"] == mouse_button and last.params["click_type"] == "single"
+                and now - last.end <= DOUBLE_CLICK_INTERVAL):
+            last.params["click_type"] = "double"
+            last.end = now
+            return
+        self._close_step()
+        self.steps.append(RecordedStep("click", locator, {"mouse_button": mouse_button, "click_type": "single",
+                                                          "modifier_keys": modifier_keys(state)}, now, hint))
+
+    def _on_key(self, now, keysym, state):
+        name = keysym_name(keysym)
+        if name in MODIFIER_KEYSYMS:
+            return
+        if self._focus is None:
+            record_log.debug("没有焦点元素，跳过按键 %s", name or keysym)
+            return
+        element, hint = self._focus
+        locator, hint = self._describe(element, hint)
+        mods = modifier_keys(state)
+        char = keysym_char(keysym)
+        last = self.steps[-1] if self.steps else None
+        typing = last is not None and last.op == "input_text" and last.locator == locator
+        if char is not None and not set(mods) - {"shift"}:
+            if typing:
+                last.typed += char
+                last.params["text"] = last.typed
+                last.end = now
+                return
+            self._close_step()
+            step = RecordedStep("input_text", locator, {"text": char, "clear_content": False}, now, hint, element)
+            step.typed = char
+            self.steps.append(step)
+            return
+        if name == "BackSpace" and typing and not mods:
+            last.typed = last.typed[:-1]
+            last.params["text"] = last.typed
+            last.end = now
+            return
+        self._close_step()
+        key = KEYSYM_KEYS.get(name) or (name or "").lower()
+        if not key:
+            record_log.debug("无法识别的按键 keysym=%s，跳过", keysym)
+            return
+        self.steps.append(RecordedStep("press_key", locator,
+                                       {"key": key, "modifier_keys": [m for m in mods if m != key]}, now, hint))
+
+
+def main(argv=None):
+    from platform_handler import get_platform_handler
+    parser = argparse.ArgumentParser(description="录制用户操作，生成 GUIAutomation 脚本或 JSON 计划")
+    parser.add_argument("-o", "--output", required=True, help="输出文件，.py 为 Python 脚本，.json 为 JSON 计划")
+    parser.add_argument("--duration", type=float, default=None, help="录制时长（秒），默认直到 Ctrl+C")
+    parser.add_argument("--scope", default="desktop", choices=("desktop", "app", "window"),
+                        help="唯一定位器的判断范围，默认为 desktop")
+    parser.add_argument("--wait-slack", type=float, default=WAIT_SLACK,
+                        help=f"wait_for 超时相对观察到的间隔的倍数，默认为 {WAIT_SLACK}")
+    args = parser.parse_args(argv)
+
+    recorder = ActionRecorder(get_platform_handler(), args.scope, args.wait_slack)
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    recorder.start()
+    print("正在录制，按 Ctrl+C 结束", file=sys.stderr)
+    stopped.wait(args.duration)
+    recording = recorder.stop()
+    # 结束录制的 Ctrl+C 本身也被录制到了终端窗口上
+    last = recording.steps[-1] if recording.steps else None
+    if last is not None and last.op == "press_key" and last.params["key"] == "c" and "ctrl" in last.params["modifier_keys"]:
+        recording.steps.pop()
+    recording.save(args.output)
+    print(f"{len(recording)} 步，已保存到 {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
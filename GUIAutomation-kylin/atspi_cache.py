@@ -0,0 +1,285 @@
+import os
+import threading
+from collections import deque
+
+from gui_logging import get_logger
+from instrumentation import INSTRUMENTATION
+from desktop_search import app_key
+
+try:
+    import gi
+    gi.require_version('Atspi', '2.0')
+    from gi.repository import Atspi
+    ATSPI_AVAILABLE = True
+except (ImportError, ValueError):
+    ATSPI_AVAILABLE = False
+
+"""
+libatspi 客户端缓存的策略。
+
+查找元素时反复读取 name / role / 子元素 / 状态，这些值可以由 libatspi 缓存在客户端。策略决定：
+
+- 进入一个应用（作用域）时用 set_cache_mask 设置该应用要缓存的数据，只设置一次；
+- 是否在进入时预取（遍历一遍读取定位器用到的字段，之后的查找都从缓存读取）；
+- 有 GLib 主循环分发事件时（AsyncGUIAutomation 的事件桥运行期间，见 set_event_dispatch）监听子元素、名称、角色、
+  状态变化事件，收到时清除事件源的缓存；同步 API 中没有主循环，不注册监听（注册了也收不到事件，只会让各应用多发信号）；
+- 轮询查找没有找到元素时清空缓存再搜索，不会因为过期的缓存错过新出现的元素。
+
+同步 API 中已缓存的状态、名称只在查找落空时刷新，因此默认策略为 off，缓存需要显式开启。
+
+每次读取已缓存过的字段计为一次避免的总线调用（avoided，估计值），stats() 汇总。
+策略按运行选择：GUIAUTOMATION_ATSPI_CACHE=off|none|locators|prefetch|all，或调用 set_cache_policy()。
+"""
+
+POLICY_ENV = "GUIAUTOMATION_ATSPI_CACHE"
+DEFAULT_POLICY = "off"
+
+# 定位器相关的字段，对应 Atspi.Cache 的标志
+LOCATOR_FIELDS = ("name", "role", "children", "parent", "states")
+FIELD_FLAGS = {"name": "NAME", "role": "ROLE", "children": "CHILDREN", "parent": "PARENT", "states": "STATES"}
+
+# 策略名 -> (缓存的字段，None 表示不设置缓存掩码；进入作用域时是否预取)
+POLICIES = {
+    "off": (None, False),               # 不设置缓存掩码、不监听事件，与以前的行为相同
+    "none": ((), False),                # 关闭缓存，每次读取都经过总线（排查缓存问题时使用）
+    "locators": (LOCATOR_FIELDS, False),
+    "prefetch": (LOCATOR_FIELDS, True),
+    "all": (LOCATOR_FIELDS, False),     # 缓存全部数据（Atspi.Cache.ALL），统计只计定位器字段
+}
+
+# 使缓存失效的事件
+INVALIDATING_EVENTS = (
+    "object:children-changed",
+    "object:property-change:accessible-name",
+    "object:property-change:accessible-role",
+    "object:state-changed",
+)
+
+# 预取时每个应用最多读取的节点数
+PREFETCH_LIMIT = 5000
+# 统计用的已读字段记录上限，超过后清空重新计数（记录持有元素的引用，常驻进程中不能无限增长）
+SEEN_LIMIT = 20000
+
+cache_log = get_logger("atspi")
+
+
+class CachePolicy:
+    """一种缓存策略及其统计。进程内共用一个（get_cache_policy），libatspi 的缓存本身也是进程级的。"""
+
+    def __init__(self, name=None):
+        name = (name or os.environ.get(POLICY_ENV) or DEFAULT_POLICY).strip().lower()
+        if name not in POLICIES:
+            raise ValueError(f"未知的缓存策略: {name}，可选 {', '.join(POLICIES)}")
+        self.name = name
+        fields, self.prefetch = POLICIES[name]
+        if not ATSPI_AVAILABLE:
+            fields = None
+        self.fields = frozenset(fields or ())
+        self.mask = None if fields is None else self._mask(name, fields)
+        self.reads = 0
+        self.avoided = 0
+        self.prefetched = 0
+        self.invalidations = 0
+        self.events = 0
+        self._apps = {}       # 应用标识 -> 应用，已设置缓存掩码
+        self._seen = set()    # (元素, 字段)：上次清空以来读取过的字段
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._listener = None
+
+    @staticmethod
+    def _mask(name, fields):
+        if name == "all":
+            return Atspi.Cache.ALL
+        mask = Atspi.Cache.NONE
+        for field in fields:
+            mask |= getattr(Atspi.Cache, FIELD_FLAGS[field])
+        return mask
+
+    @property
+    def active(self):
+        return self.mask is not None
+
+    # ---------------- 作用域 ----------------
+
+    def enter(self, app):
+        """进入一个应用：第一次进入时设置缓存掩码、开始监听失效事件，prefetch 策略下预取整棵树。"""
+        if self.mask is None:
+            return
+        key = app_key(app)
+        with self._lock:
+            if key in self._apps:
+                return
+            self._apps[key] = app
+        try:
+            app.set_cache_mask(self.mask)
+        except Exception as e:
+            cache_log.debug("设置缓存掩码失败: %s: %s", key, e)
+        self._listen()
+        if self.prefetch:
+            self._prefetch(app)
+
+    def _prefetch(self, app):
+        """广度优先读取一遍定位器字段，填充 libatspi 缓存。"""
+        queue = deque([app])
+        count = 0
+        while queue and count < PREFETCH_LIMIT:
+            node = queue.popleft()
+            try:
+                node.get_name()
+                node.get_role_name()
+                node.get_state_set()
+                children = [node.get_child_at_index(i) for i in range(node.get_child_count())]
+            except Exception:
+                continue
+            count += 1
+            with self._lock:
+                for field in ("name", "role", "states", "children"):
+                    self._remember((node, field))
+            queue.extend(child for child in children if child is not None)
+        self.prefetched += count
+        cache_log.debug("预取 %d 个节点: %s", count, app_key(app))
+
+    # ---------------- 统计 ----------------
+
+    def note(self, element, field):
+        """记录一次字段读取；该元素的这个字段自上次清空以来已经读过时计为一次避免的总线调用。"""
+        if field not in self.fields:
+            return
+        key = (element, field)
+        with self._lock:
+            self.reads += 1
+            if key in self._seen:
+                self.avoided += 1
+                hit = True
+            else:
+                self._remember(key)
+                hit = False
+        if hit:
+            INSTRUMENTATION.count("atspi_cache_avoided")
+
+    def _remember(self, key):
+        # 调用方持有 _lock
+        if len(self._seen) >= SEEN_LIMIT:
+            self._seen.clear()
+        self._seen.add(key)
+        self._dirty = True
+
+    # ---------------- 失效 ----------------
+
+    def invalidate(self):
+        """
+        清空已进入的各应用的缓存。自上次清空以来用过缓存时返回 True（调用方据此决定是否立即重新搜索），
+        策略为 off 或没有读取过任何缓存字段时什么也不做，返回 False。
+        """
+        with self._lock:
+            if not self._dirty:
+                return False
+            self._dirty = False
+            self._seen.clear()
+            apps = list(self._apps.values())
+            self.invalidations += 1
+        for app in apps:
+            try:
+                app.clear_cache()
+            except Exception:
+                pass
+        INSTRUMENTATION.count("atspi_cache_invalidations")
+        return True
+
+    def _on_event(self, event):
+        source = getattr(event, "source", None)
+        if source is None:
+            return
+        self.events += 1
+        try:
+            source.clear_cache()
+        except Exception:
+            pass
+        with self._lock:
+            for field in self.fields:
+                self._seen.discard((source, field))
+
+    def _listen(self):
+        """已进入过应用且有主循环分发事件时注册失效事件的监听。"""
+        with self._lock:
+            if self._listener is not None or not self._apps or not _dispatching or not ATSPI_AVAILABLE:
+                return
+            self._listener = Atspi.EventListener.new(self._on_event)
+        for event_type in INVALIDATING_EVENTS:
+            try:
+                self._listener.register(event_type)
+            except Exception as e:
+                cache_log.debug("注册缓存失效事件失败: %s: %s", event_type, e)
+
+    def _unlisten(self):
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            for event_type in INVALIDATING_EVENTS:
+                try:
+                    listener.deregister(event_type)
+                except Exception:
+                    pass
+
+    def close(self):
+        """停止监听，已进入的应用恢复默认缓存掩码（切换策略时调用）。"""
+        self._unlisten()
+        with self._lock:
+            apps, self._apps = list(self._apps.values()), {}
+            self._seen.clear()
+        for app in apps:
+            try:
+                app.set_cache_mask(Atspi.Cache.UNDEFINED)
+                app.clear_cache()
+            except Exception:
+                pass
+
+    def stats(self):
+        """策略、已进入的应用数、字段读取次数、避免的总线调用（估计）、预取节点数、清空次数和收到的失效事件数。"""
+        with self._lock:
+            return {"policy": self.name, "apps": len(self._apps), "reads": self.reads, "avoided": self.avoided,
+                    "prefetched": self.prefetched, "invalidations": self.invalidations, "events": self.events}
+
+
+_policy = None
+_policy_lock = threading.Lock()
+_dispatching = 0  # 正在运行的、分发 AT-SPI 事件的 GLib 主循环数
+
+
+def set_event_dispatch(running):
+    """
+    事件桥的 GLib 主循环启动（running=True）或停止时调用。有主循环时当前策略监听失效事件，
+    最后一个主循环停止后注销监听，缓存退回到只在查找落空时刷新。
+    """
+    global _dispatching
+    with _policy_lock:
+        _dispatching = max(0, _dispatching + (1 if running else -1))
+        policy, dispatching = _policy, _dispatching
+    if policy is None:
+        return
+    if dispatching:
+        policy._listen()
+    else:
+        policy._unlisten()
+
+
+def get_cache_policy():
+    global _policy
+    policy = _policy
+    if policy is not None:
+        return policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = CachePolicy()
+        return _policy
+
+
+def set_cache_policy(name):
+    """切换本进程的缓存策略（off / none / locators / prefetch / all），返回新的策略。"""
+    global _policy
+    policy = CachePolicy(name)
+    with _policy_lock:
+        previous, _policy = _policy, policy
+    if previous is not None:
+        previous.close()
+    return policy
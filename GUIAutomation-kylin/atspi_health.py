@@ -0,0 +1,284 @@
+import os
+import time
+import threading
+
+from gui_logging import get_logger
+from instrumentation import INSTRUMENTATION
+
+try:
+    import gi
+    gi.require_version('Atspi', '2.0')
+    from gi.repository import Atspi
+    ATSPI_AVAILABLE = True
+except (ImportError, ValueError):
+    ATSPI_AVAILABLE = False
+
+try:
+    from gi.repository import Gio, GLib
+    GIO_AVAILABLE = True
+except ImportError:
+    GIO_AVAILABLE = False
+
+"""
+AT-SPI 总线健康状态（熔断器）。
+
+查找元素前不再每次调用 Atspi.get_desktop(0) 探测总线，而是根据实际调用的结果判断：
+连续出现 FAILURE_THRESHOLD 次总线级错误（服务不存在、无应答、连接断开、超时）后熔断，
+冷却期内所有 AT-SPI 查找立即失败（AT-SPI_BUS_ERROR），由调用方转入非 AT-SPI 的备用路径；
+冷却期结束后进入半开状态，由一个线程探测一次桌面，成功则恢复，失败则重新计时。
+同时在后台监听会话总线上 org.a11y.Bus 的 NameOwnerChanged：总线退出时立即熔断，重新出现时立即允许重试。
+
+状态变化记录到日志（atspi 子系统）和计数器（atspi_breaker_open 等），stats() 返回当前状态与累计次数。
+"""
+
+# 连续多少次总线级错误后熔断；GUIAUTOMATION_ATSPI_FAILURES 可覆盖
+FAILURE_THRESHOLD = int(os.environ.get("GUIAUTOMATION_ATSPI_FAILURES", "3"))
+# 熔断后的冷却时间（秒）；GUIAUTOMATION_ATSPI_COOLDOWN 可覆盖
+COOLDOWN = float(os.environ.get("GUIAUTOMATION_ATSPI_COOLDOWN", "5"))
+
+STATE_CLOSED = "closed"        # 正常
+STATE_OPEN = "open"            # 熔断，AT-SPI 查找立即失败
+STATE_HALF_OPEN = "half_open"  # 冷却结束，正在探测
+
+# 表示总线本身不可用（而不是单个元素已销毁）的 D-Bus / GIO 错误
+BUS_ERROR_MARKERS = (
+    "org.freedesktop.DBus.Error.ServiceUnknown",
+    "org.freedesktop.DBus.Error.NoReply",
+    "org.freedesktop.DBus.Error.Disconnected",
+    "org.freedesktop.DBus.Error.NameHasNoOwner",
+    "org.freedesktop.DBus.Error.NoServer",
+    "org.freedesktop.DBus.Error.Timeout",
+    "org.freedesktop.DBus.Error.TimedOut",
+    "Timeout was reached",
+    "The connection is closed",
+    "Could not connect",
+    "AT-SPI_DESKTOP_UNAVAILABLE",
+)
+
+A11Y_BUS_NAME = "org.a11y.Bus"
+
+atspi_log = get_logger("atspi")
+
+
+class AtspiBusUnavailable(Exception):
+    """熔断期间的快速失败。消息以 AT-SPI_BUS_ERROR 开头，与原有的总线错误一致，get_element 等据此转入备用路径。"""
+
+    def __init__(self, reason):
+        self.reason = reason
+        super().__init__(f"AT-SPI_BUS_ERROR: {reason}")
+
+
+def is_bus_error(error):
+    """判断异常是否表示 AT-SPI 总线不可用。"""
+    text = str(error)
+    return any(marker in text for marker in BUS_ERROR_MARKERS)
+
+
+def probe_desktop():
+    """探测总线：读取桌面的应用数量，需要与注册表进程通信一次。"""
+    desktop = Atspi.get_desktop(0)
+    if not desktop:
+        raise Exception("AT-SPI_DESKTOP_UNAVAILABLE")
+    desktop.get_child_count()
+
+
+class AtspiHealth:
+    """
+    AT-SPI 总线熔断器，进程内所有处理器共用（get_atspi_health）。
+
+    用法:
+        health.check()                    # 熔断中抛出 AtspiBusUnavailable；关闭状态下没有任何开销
+        try:
+            result = search()
+        except Exception as e:
+            health.record_error(e)        # 总线级错误计入失败次数，返回是否为总线错误
+        else:
+            health.record_success()
+    """
+
+    def __init__(self, probe=None, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.probe = probe or probe_desktop
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.last_error = None
+        self.opened_at = None
+        self.changed_at = time.time()
+        self.rejected = 0
+        self.transitions = {}
+        self._lock = threading.Lock()
+        self._probing = False
+        self._listeners = []
+        self._watcher = None
+
+    # ---------------- 状态 ----------------
+
+    def _transition(self, state, reason):
+        """切换状态（调用方持有 _lock），返回需要在锁外通知的 (旧状态, 新状态, 原因)。"""
+        old = self.state
+        if old == state:
+            return None
+        self.state = state
+        self.changed_at = time.time()
+        if state == STATE_OPEN:
+            self.opened_at = time.monotonic()
+        key = f"{old}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        return old, state, reason
+
+    def _notify(self, change):
+        if change is None:
+            return
+        old, state, reason = change
+        log = atspi_log.warning if state == STATE_OPEN else atspi_log.info
+        log("AT-SPI 熔断器 %s -> %s: %s", old, state, reason)
+        INSTRUMENTATION.count(f"atspi_breaker_{state}")
+        for listener in list(self._listeners):
+            try:
+                listener(old, state, reason)
+            except Exception as e:
+                atspi_log.debug("熔断器监听函数出错: %s", e)
+
+    def add_listener(self, listener):
+        """注册状态变化回调 listener(旧状态, 新状态, 原因)，例如熔断时清空元素缓存。"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def is_closed(self):
+        return self.state == STATE_CLOSED
+
+    # ---------------- 调用前后 ----------------
+
+    def check(self):
+        """AT-SPI 调用前检查；熔断中（或另一个线程正在探测）抛出 AtspiBusUnavailable。"""
+        if self.state == STATE_CLOSED:
+            return
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return
+            waited = time.monotonic() - self.opened_at if self.opened_at is not None else self.cooldown
+            if self._probing or (self.state == STATE_OPEN and waited < self.cooldown):
+                self.rejected += 1
+                INSTRUMENTATION.count("atspi_breaker_rejected")
+                remaining = max(0.0, self.cooldown - waited)
+                raise AtspiBusUnavailable(f"总线不可用，熔断中（{remaining:.1f}s 后重试）: {self.last_error}")
+            self._probing = True
+            change = self._transition(STATE_HALF_OPEN, "冷却结束，探测总线")
+        self._notify(change)
+        try:
+            self.probe()
+        except Exception as e:
+            with self._lock:
+                self._probing = False
+                self.last_error = str(e)
+                change = self._transition(STATE_OPEN, f"探测失败: {e}")
+                # 仍在熔断中（状态未变）时重新开始冷却计时
+                self.opened_at = time.monotonic()
+            self._notify(change)
+            raise AtspiBusUnavailable(f"总线探测失败: {e}")
+        with self._lock:
+            self._probing = False
+            self.failures = 0
+            change = self._transition(STATE_CLOSED, "探测成功")
+        self._notify(change)
+
+    def record_success(self):
+        if self.failures or self.state != STATE_CLOSED:
+            with self._lock:
+                self.failures = 0
+                change = self._transition(STATE_CLOSED, "调用成功") if not self._probing else None
+            self._notify(change)
+
+    def record_error(self, error):
+        """记录一次 AT-SPI 调用异常；是总线级错误时计入失败次数并返回 True。"""
+        if isinstance(error, AtspiBusUnavailable) or not is_bus_error(error):
+            return False
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            change = None
+            if self.failures >= self.failure_threshold:
+                change = self._transition(STATE_OPEN, f"连续 {self.failures} 次总线错误: {error}")
+        self._notify(change)
+        return True
+
+    def trip(self, reason):
+        """立即熔断（例如 org.a11y.Bus 退出）。"""
+        with self._lock:
+            self.last_error = reason
+            change = self._transition(STATE_OPEN, reason)
+            self.opened_at = time.monotonic()
+        self._notify(change)
+
+    def retest_now(self, reason):
+        """取消剩余的冷却时间，下一次 check() 立即探测（例如 org.a11y.Bus 重新出现）。"""
+        with self._lock:
+            if self.state == STATE_OPEN:
+                self.opened_at = time.monotonic() - self.cooldown
+        atspi_log.info("AT-SPI 熔断器: %s，下一次查找时重新探测", reason)
+
+    def stats(self):
+        """当前状态与累计次数，供 guiautomationd 的 stats 等使用。"""
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "rejected": self.rejected,
+                    "last_error": self.last_error, "changed_at": self.changed_at,
+                    "transitions": dict(self.transitions), "watching": self._watcher is not None}
+
+    # ---------------- 总线监听 ----------------
+
+    def _on_name_owner_changed(self, connection, sender, path, interface, signal, parameters):
+        name, old_owner, new_owner = parameters.unpack()
+        if name != A11Y_BUS_NAME:
+            return
+        if not new_owner:
+            self.trip(f"{A11Y_BUS_NAME} 已退出")
+        else:
+            self.retest_now(f"{A11Y_BUS_NAME} 已由 {new_owner} 提供")
+
+    def _watch(self, ready):
+        # 信号回调在订阅时线程的默认主上下文中分发，使用独立的上下文，不干扰调用方的 GLib 主循环
+        context = GLib.MainContext.new()
+        context.push_thread_default()
+        try:
+            connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+            connection.signal_subscribe("org.freedesktop.DBus", "org.freedesktop.DBus", "NameOwnerChanged",
+                                        "/org/freedesktop/DBus", A11Y_BUS_NAME, Gio.DBusSignalFlags.NONE,
+                                        self._on_name_owner_changed)
+            loop = GLib.MainLoop.new(context, False)
+        except Exception as e:
+            atspi_log.info("无法监听 %s: %s，仅按调用结果判断总线状态", A11Y_BUS_NAME, e)
+            self._watcher = None
+            context.pop_thread_default()
+            ready.set()
+            return
+        ready.set()
+        loop.run()
+
+    def start_watching(self):
+        """在后台线程中监听 org.a11y.Bus 的所有者变化；Gio 不可用或会话总线无法连接时什么也不做。"""
+        if not GIO_AVAILABLE or self._watcher is not None:
+            return False
+        ready = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, args=(ready,), name="atspi-health", daemon=True)
+        self._watcher.start()
+        ready.wait(1.0)
+        return self._watcher is not None
+
+
+_health = None
+_health_lock = threading.Lock()
+
+
+def get_atspi_health():
+    """进程内共用的熔断器（AT-SPI 总线是进程级资源），首次调用时开始监听 org.a11y.Bus。"""
+    global _health
+    with _health_lock:
+        if _health is None:
+            _health = AtspiHealth()
+            _health.start_watching()
+        return _health
@@ -0,0 +1,417 @@
+import os
+import threading
+
+from gui_logging import get_logger
+
+try:
+    import gi
+    gi.require_version('Atspi', '2.0')
+    from gi.repository import Atspi
+    ATSPI_AVAILABLE = True
+except (ImportError, ValueError):
+    ATSPI_AVAILABLE = False
+
+try:
+    from gi.repository import Gio, GLib
+    GIO_AVAILABLE = True
+except ImportError:
+    GIO_AVAILABLE = False
+
+"""
+AT-SPI 的直接 D-Bus 传输层。
+
+libatspi 遍历树时每个子元素一次 get_child_at_index，每个字段一次调用，宽树上的往返次数与节点数成正比。
+这里直接在无障碍总线上发送 AT-SPI2 协议的方法调用：
+
+- org.a11y.atspi.Cache.GetItems：一次调用取得一个应用缓存的整棵树（引用、父节点、子元素序号、名称、角色）；
+- org.a11y.atspi.Accessible.GetChildren：一次调用取得全部子元素引用；
+- 同一层的所有调用异步并发发送（最多 MAX_IN_FLIGHT 个在途），一层只等待一次往返。
+
+结果是 RemoteNode 树，提供 TreeSnapshot 用到的 get_name / get_role_name / get_child_count / get_child_at_index，
+这些方法只读取已取得的数据，不再发起调用。需要点击、读取文本等操作时用 resolve() 换成 Atspi.Accessible
+（从最近的已知祖先按子元素序号逐级取得并校验名称和角色，结果缓存）。
+
+GUIAUTOMATION_ATSPI_TRANSPORT=0 关闭传输层，全部回到 libatspi。
+"""
+
+TRANSPORT_ENV = "GUIAUTOMATION_ATSPI_TRANSPORT"
+
+REGISTRY_BUS = "org.a11y.atspi.Registry"
+ROOT_PATH = "/org/a11y/atspi/accessible/root"
+NULL_PATH = "/org/a11y/atspi/null"
+CACHE_PATH = "/org/a11y/atspi/cache"
+ACCESSIBLE_IFACE = "org.a11y.atspi.Accessible"
+CACHE_IFACE = "org.a11y.atspi.Cache"
+PROPERTIES_IFACE = "org.freedesktop.DBus.Properties"
+
+# 单个调用的超时（毫秒）和同时在途的调用数
+CALL_TIMEOUT_MS = 2000
+MAX_IN_FLIGHT = 256
+
+transport_log = get_logger("atspi")
+
+
+class RemoteNode:
+    """
+    通过传输层读取的一个可访问对象。bus_name + path 为 AT-SPI2 协议中的对象引用。
+
+    children 为 None 表示子元素尚未读取（超出读取深度），此时 get_child_count 返回对象报告的子元素数。
+    """
+
+    __slots__ = ("bus_name", "path", "name", "role", "child_count", "parent", "position", "children", "_accessible")
+
+    def __init__(self, bus_name, path, parent=None, position=0, accessible=None):
+        self.bus_name = bus_name
+        self.path = path
+        self.name = None
+        self.role = None
+        self.child_count = 0
+        self.parent = parent
+        self.position = position
+        self.children = None
+        self._accessible = accessible
+
+    @property
+    def ref(self):
+        return (self.bus_name, self.path)
+
+    # 与 Atspi.Accessible 同名的只读方法，供 TreeSnapshot 等直接遍历
+    def get_name(self):
+        return self.name or ""
+
+    def get_role_name(self):
+        return self.role or ""
+
+    def get_child_count(self):
+        return len(self.children) if self.children is not None else self.child_count
+
+    def get_child_at_index(self, index):
+        if self.children is None or not 0 <= index < len(self.children):
+            return None
+        return self.children[index]
+
+    def get_index_in_parent(self):
+        return self.position
+
+    def get_parent(self):
+        return self.parent
+
+    def iter_preorder(self, include_self=True):
+        """先序遍历（与 _find_element_recursive 的匹配顺序一致）。"""
+        stack = [self] if include_self else list(reversed(self.children or ()))
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.children:
+                stack.extend(reversed(node.children))
+
+    def resolve(self):
+        """对应的 Atspi.Accessible；树已变化（名称或角色不符）时返回 None。"""
+        if self._accessible is not None:
+            return self._accessible
+        chain = []
+        node = self
+        while node._accessible is None:
+            if node.parent is None:
+                return None
+            chain.append(node)
+            node = node.parent
+        accessible = node._accessible
+        for node in reversed(chain):
+            try:
+                child = accessible.get_child_at_index(node.position)
+                if child is None or child.get_name() != node.get_name() or child.get_role_name() != node.get_role_name():
+                    if node.parent.parent is not None:
+                        return None
+                    # 桌面下的应用顺序可能与注册表不同，按名称查找
+                    child = next((app for app in (accessible.get_child_at_index(i)
+                                                  for i in range(accessible.get_child_count()))
+                                  if app is not None and app.get_name() == node.get_name()), None)
+                    if child is None:
+                        return None
+            except Exception:
+                return None
+            node._accessible = child
+            accessible = child
+        return accessible
+
+    def __repr__(self):
+        return f"<RemoteNode {self.bus_name}{self.path} {self.role!r} {self.name!r}>"
+
+
+def accessible_ref(accessible):
+    """Atspi.Accessible 的对象引用 (bus_name, path)；取不到时返回 None。"""
+    if isinstance(accessible, RemoteNode):
+        return accessible.ref
+    try:
+        path = accessible.path
+        bus_name = accessible.app.bus_name if accessible.app is not None else REGISTRY_BUS
+    except Exception:
+        return None
+    if not path or not bus_name:
+        return None
+    return bus_name, path
+
+
+def role_name(role):
+    """Cache.GetItems 返回的角色编号转换为角色名（与 get_role_name 相同，如 "push button"）。"""
+    try:
+        return Atspi.role_get_name(role)
+    except Exception:
+        return None
+
+
+class AtspiTransport:
+    """
+    无障碍总线上的一条 GDBus 连接。线程安全：每次批量调用在调用线程自己的主上下文中等待结果。
+
+    calls 为发出的方法调用数，round_trips 为等待批量结果的次数（一批并发调用计为一次）。
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.calls = 0
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def connect(cls):
+        """连接无障碍总线：地址取 AT_SPI_BUS_ADDRESS，否则向会话总线上的 org.a11y.Bus 查询。"""
+        address = os.environ.get("AT_SPI_BUS_ADDRESS")
+        if not address:
+            session = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+            reply = session.call_sync("org.a11y.Bus", "/org/a11y/bus", "org.a11y.Bus", "GetAddress", None,
+                                      GLib.VariantType.new("(s)"), Gio.DBusCallFlags.NONE, CALL_TIMEOUT_MS, None)
+            address = reply.unpack()[0]
+        flags = Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT | Gio.DBusConnectionFlags.MESSAGE_BUS_CONNECTION
+        return cls(Gio.DBusConnection.new_for_address_sync(address, flags, None, None))
+
+    def is_closed(self):
+        try:
+            return self.connection.is_closed()
+        except Exception:
+            return True
+
+    # ---------------- 批量调用 ----------------
+
+    def _call_many(self, requests):
+        """
+        并发发送一批方法调用并等待全部结果。
+
+        requests 为 [(bus_name, path, interface, method, 参数 Variant 或 None), ...]；
+        返回与之对应的列表，每项为解包后的返回值元组，失败的调用为异常对象。
+        """
+        results = [None] * len(requests)
+        if not requests:
+            return results
+        context = GLib.MainContext.new()
+        context.push_thread_default()
+        state = {"next": 0, "pending": 0}
+
+        def finished(connection, result, index):
+            try:
+                results[index] = connection.call_finish(result).unpack()
+            except Exception as e:
+                results[index] = e
+            state["pending"] -= 1
+            send()
+
+        def send():
+            while state["next"] < len(requests) and state["pending"] < MAX_IN_FLIGHT:
+                index = state["next"]
+                state["next"] += 1
+                state["pending"] += 1
+                bus_name, path, interface, method, parameters = requests[index]
+                self.connection.call(bus_name, path, interface, method, parameters, None,
+                                     Gio.DBusCallFlags.NO_AUTO_START, CALL_TIMEOUT_MS, None, finished, index)
+
+        try:
+            send()
+            while state["pending"]:
+                context.iteration(True)
+        finally:
+            context.pop_thread_default()
+        with self._lock:
+            self.calls += len(requests)
+            self.round_trips += 1
+        return results
+
+    # ---------------- 读取 ----------------
+
+    def _expand(self, nodes, max_depth=None, blacklist=None):
+        """
+        逐层读取 nodes 的子树：每一层在一批并发调用中读取本层节点的名称、角色和子元素引用。
+
+        max_depth 为从 nodes 算起向下读取的层数（None 为不限）；已读取名称的节点不再重复读取。
+        """
+        level = list(nodes)
+        depth = 0
+        while level:
+            expand = max_depth is None or depth < max_depth
+            requests = []
+            for node in level:
+                if node.name is None:
+                    requests.append((node.bus_name, node.path, PROPERTIES_IFACE, "Get",
+                                     GLib.Variant("(ss)", (ACCESSIBLE_IFACE, "Name"))))
+                    requests.append((node.bus_name, node.path, ACCESSIBLE_IFACE, "GetRoleName", None))
+                    requests.append((node.bus_name, node.path, PROPERTIES_IFACE, "Get",
+                                     GLib.Variant("(ss)", (ACCESSIBLE_IFACE, "ChildCount"))))
+                if expand and node.children is None:
+                    requests.append((node.bus_name, node.path, ACCESSIBLE_IFACE, "GetChildren", None))
+            results = iter(self._call_many(requests))
+            next_level = []
+            for node in level:
+                if node.name is None:
+                    name, role, count = next(results), next(results), next(results)
+                    node.name = "" if isinstance(name, Exception) else name[0]
+                    node.role = "" if isinstance(role, Exception) else role[0]
+                    node.child_count = 0 if isinstance(count, Exception) else count[0]
+                if expand and node.children is None:
+                    reply = next(results)
+                    if isinstance(reply, Exception):
+                        # 对象已销毁等情况：作为叶子节点；应用无响应时记入黑名单
+                        if blacklist is not None:
+                            blacklist.note_error(node.bus_name, reply)
+                        node.children = []
+                        continue
+                    node.children = [RemoteNode(bus_name, path, node, position)
+                                     for position, (bus_name, path) in enumerate(reply[0])
+                                     if path != NULL_PATH]
+                if node.children:
+                    next_level.extend(node.children)
+            level = next_level if expand else []
+            depth += 1
+
+    def _load_cached_apps(self, apps, blacklist=None):
+        """
+        用 Cache.GetItems 一次读取各应用缓存的整棵树；缓存不完整的节点（子元素缺失）留给 _expand 补读。
+
+        返回需要补读的节点列表。
+        """
+        replies = self._call_many([(app.bus_name, CACHE_PATH, CACHE_IFACE, "GetItems", None) for app in apps])
+        incomplete = []
+        for app, reply in zip(apps, replies):
+            if isinstance(reply, Exception) and blacklist is not None and blacklist.note_error(app.bus_name, reply):
+                continue
+            if isinstance(reply, Exception) or not self._build_from_cache(app, reply[0]):
+                incomplete.append(app)
+                continue
+            for node in app.iter_preorder():
+                if node.children is None:
+                    incomplete.append(node)
+        return incomplete
+
+    def _build_from_cache(self, app, items):
+        """
+        按缓存条目建立 app 的子树，成功时返回 True。
+
+        条目格式有两种：新版 ((引用), (应用), (父节点), 序号, 子元素数, 接口, 名称, 角色, 描述, 状态)，
+        旧版 ((引用), (应用), (父节点), [子元素引用], 接口, 名称, 角色, 描述, 状态)。
+        """
+        nodes = {app.path: app}
+        rows = []
+        for item in items:
+            if len(item) == 10:
+                (bus_name, path), _, (parent_bus, parent_path), position, count, _, name, role, _, _ = item
+                children = None
+            elif len(item) == 9:
+                (bus_name, path), _, (parent_bus, parent_path), children, _, name, role, _, _ = item
+                position, count = None, len(children)
+            else:
+                return False
+            if bus_name != app.bus_name:
+                continue
+            node = nodes.get(path) or RemoteNode(bus_name, path)
+            node.name = name
+            node.role = role_name(role)
+            node.child_count = count
+            nodes[path] = node
+            rows.append((node, parent_path, position, children))
+        if not any(node is app for node, _, _, _ in rows):
+            return False
+        for node, parent_path, position, children in rows:
+            if children is not None:
+                node.children = [nodes.get(path) for _, path in children if path != NULL_PATH]
+                for index, child in enumerate(node.children):
+                    if child is not None:
+                        child.parent, child.position = node, index
+        for node, parent_path, position, children in rows:
+            if position is None or node.path == app.path or parent_path not in nodes:
+                continue
+            parent = nodes[parent_path]
+            if parent.children is None:
+                parent.children = [None] * parent.child_count
+            if 0 <= position < len(parent.children):
+                parent.children[position] = node
+                node.parent, node.position = parent, position
+        for node in nodes.values():
+            if node.children is None and node.child_count <= 0:
+                node.children = []
+            elif node.children is not None and None in node.children:
+                # 缺少的子元素（未缓存）交给 _expand 重新读取
+                node.children = None
+        return True
+
+    def desktop(self, accessible=None, max_depth=None, blacklist=None):
+        """
+        读取整个桌面，返回根 RemoteNode（其子节点为各应用）。
+
+        应用优先用 Cache.GetItems 整棵读取，不支持缓存或缓存不完整的部分用 GetChildren 逐层补读；
+        accessible 为 Atspi.get_desktop(0)，用于 resolve()。max_depth 与 TreeSnapshot 相同，桌面为第 0 层。
+        blacklist 为 desktop_search.AppBlacklist：跳过其中的应用，无响应的应用（调用超时）加入其中。
+        """
+        root = RemoteNode(REGISTRY_BUS, ROOT_PATH, accessible=accessible)
+        reply = self._call_many([(REGISTRY_BUS, ROOT_PATH, ACCESSIBLE_IFACE, "GetChildren", None)])[0]
+        if isinstance(reply, Exception):
+            # 注册表不可达即总线不可用，交给调用方（熔断器）处理
+            raise reply
+        root.name, root.role = "main", "desktop frame"
+        root.children = [RemoteNode(bus_name, path, root, position)
+                         for position, (bus_name, path) in enumerate(reply[0]) if path != NULL_PATH]
+        root.child_count = len(root.children)
+        # 跳过黑名单中的应用（position 保持注册表中的序号，resolve 时仍能对应到桌面的子元素）
+        apps = [app for app in root.children if blacklist is None or not blacklist.blocked(app.bus_name)]
+        if max_depth is not None and max_depth < 1:
+            root.children = None
+        elif max_depth is None:
+            self._expand(self._load_cached_apps(apps, blacklist), blacklist=blacklist)
+        else:
+            self._expand(apps, max_depth - 1, blacklist)
+        if blacklist is not None and root.children is not None:
+            root.children = [app for app in root.children if not blacklist.blocked(app.bus_name)]
+        return root
+
+    def subtree(self, accessible, max_depth=None):
+        """读取 accessible（Atspi.Accessible）的子树，返回根 RemoteNode；取不到对象引用时返回 None。"""
+        ref = accessible_ref(accessible)
+        if ref is None:
+            return None
+        root = RemoteNode(ref[0], ref[1], accessible=accessible)
+        self._expand([root], max_depth)
+        return root
+
+    def stats(self):
+        return {"calls": self.calls, "round_trips": self.round_trips}
+
+
+_transport = None
+_transport_failed = False
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """进程内共用的传输层；关闭、依赖不可用或无法连接无障碍总线时返回 None（调用方使用 libatspi）。"""
+    global _transport, _transport_failed
+    if os.environ.get(TRANSPORT_ENV, "1") == "0" or not (GIO_AVAILABLE and ATSPI_AVAILABLE):
+        return None
+    with _transport_lock:
+        if _transport is not None and _transport.is_closed():
+            _transport = None
+        if _transport is None and not _transport_failed:
+            try:
+                _transport = AtspiTransport.connect()
+            except Exception as e:
+                # 只尝试一次，之后全部使用 libatspi
+                _transport_failed = True
+                transport_log.info("无法直接连接无障碍总线: %s，使用 libatspi", e)
+        return _transport
@@ -0,0 +1,330 @@
+import os
+import sys
+import time
+import socket
+import itertools
+import subprocess
+import threading
+
+from daemon_protocol import default_socket_path, send_message, recv_message
+
+"""
+guiautomationd 的客户端，接口与 GUIAutomation 相同。
+
+只依赖标准库（截图结果需要 NumPy），不导入 AT-SPI / Xlib / selenium，进程启动几乎没有开销：
+
+    from automation_client import GUIAutomationClient
+    GUIAutomation = GUIAutomationClient(autostart=True)
+    GUIAutomation.click_element(None, "name:七")
+
+    with GUIAutomation.pipeline() as p:          # 多个操作一次往返
+        p.click_element(None, "name:七", before_delay=0, after_delay=0)
+        p.get_element_text(None, "name:结果")
+    print(p.results)
+"""
+
+# 自动启动守护进程后等待套接字可用的时间（秒）
+STARTUP_TIMEOUT = 15
+DAEMON_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "guiautomationd.py")
+
+
+class RemoteElement:
+    """守护进程中 ElementRef 的句柄，只在创建它的连接中有效，可以作为 locator 传给其他操作。"""
+
+    __slots__ = ("client", "handle", "locator")
+
+    def __init__(self, client, handle, locator=None):
+        self.client = client
+        self.handle = handle
+        self.locator = locator
+
+    def fields(self, *fields):
+        """读取元素字段（name role id text rectangle states），一次往返。"""
+        return self.client.call("element_fields", self, list(fields or ("name", "role")))
+
+    @property
+    def name(self):
+        return self.fields("name")["name"]
+
+    @property
+    def role(self):
+        return self.fields("role")["role"]
+
+    @property
+    def bounds(self):
+        return self.fields("rectangle")["rectangle"]
+
+    def __repr__(self):
+        return f"<RemoteElement #{self.handle} {self.locator or ''}>"
+
+
+class _Call:
+    """一个待执行的操作，pipeline 执行后 value / error 被填入。"""
+
+    __slots__ = ("op", "args", "kwargs", "ok", "value", "error", "time")
+
+    def __init__(self, op, args, kwargs):
+        self.op = op
+        self.args = args
+        self.kwargs = kwargs
+        self.ok = None
+        self.value = None
+        self.error = None
+        self.time = None
+
+    def result(self):
+        if self.ok is None:
+            raise Exception(f"操作尚未执行: {self.op}")
+        if not self.ok:
+            raise Exception(self.error)
+        return self.value
+
+
+class Pipeline:
+    """
+    记录多个操作，execute() 时一次往返提交。
+
+    stop_on_error 为真时第一个失败的操作之后不再执行（未执行的操作 ok 为 None）；
+    results 为各操作的返回值，失败的操作对应 None，详细信息见 calls。
+    """
+
+    def __init__(self, client, stop_on_error=True):
+        self.client = client
+        self.stop_on_error = stop_on_error
+        self.calls = []
+        self.results = None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            args, kwargs = self.client._arguments(name, args, kwargs)
+            call = _Call(name, args, kwargs)
+            self.calls.append(call)
+            return call
+        return record
+
+    def execute(self):
+        if not self.calls:
+            self.results = []
+            return self.results
+        replies = self.client._request([{"op": c.op, "args": c.args, "kwargs": c.kwargs} for c in self.calls],
+                                       self.stop_on_error)
+        for call, reply in zip(self.calls, replies):
+            call.ok = reply["ok"]
+            call.time = reply.get("time")
+            if call.ok:
+                call.value = reply.get("value")
+            else:
+                call.error = reply.get("error")
+        self.results = [call.value for call in self.calls]
+        failed = [call for call in self.calls if call.ok is False]
+        if failed and self.stop_on_error:
+            raise Exception(f"{failed[0].op} 失败: {failed[0].error}")
+        return self.results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.execute()
+        return False
+
+
+class RemoteBatch:
+    """GUIAutomation.batch 的远程版本：记录步骤，退出 with 块时整个脚本一次往返在守护进程中执行。"""
+
+    def __init__(self, client, time_out=10, continue_on_error=False):
+        self.client = client
+        self.time_out = time_out
+        self.continue_on_error = continue_on_error
+        self.steps = []
+        self.result = None
+
+    def _step(name):
+        def record(self, *args, **kwargs):
+            self.steps.append([name, list(args), kwargs])
+            return self
+        record.__name__ = name
+        return record
+
+    click = _step("click")
+    move_to = _step("move_to")
+    input_text = _step("input_text")
+    press_key = _step("press_key")
+    wait = _step("wait")
+    wait_for = _step("wait_for")
+    del _step
+
+    def run(self):
+        """执行脚本，返回 BatchResult.to_dict() 格式的字典（同时保存在 self.result）。"""
+        self.result = self.client.call("batch", self.steps, self.time_out, self.continue_on_error)
+        return self.result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.run()
+        return False
+
+
+class GUIAutomationClient:
+    """
+    通过 guiautomationd 执行 GUIAutomation 操作，方法名和参数与 GUIAutomation 相同（objWin 参数保留但不发送）。
+    哪些操作带 objWin 参数（open_application 等没有）由守护进程的操作表决定，第一次调用时查询一次。
+
+    一个实例持有一条连接，线程之间共用时按请求加锁；autostart 为真且守护进程未运行时自动在后台启动。
+    """
+
+    def __init__(self, socket_path=None, autostart=False, timeout=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.autostart = autostart
+        self.timeout = timeout
+        self._sock = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._operations = None  # 操作名 -> 第一个参数是否为 objWin
+
+    # ---------------- 连接 ----------------
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            if not self.autostart:
+                raise Exception(f"guiautomationd 未运行: {self.socket_path}")
+            return self._start_daemon()
+        return sock
+
+    def _start_daemon(self):
+        """在后台启动守护进程（与当前进程脱离），等待套接字可以连接。"""
+        subprocess.Popen([sys.executable, DAEMON_SCRIPT, "--socket", self.socket_path],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True, cwd=os.path.dirname(DAEMON_SCRIPT))
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+                return sock
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                if time.monotonic() >= deadline:
+                    raise Exception(f"启动 guiautomationd 超时: {self.socket_path}")
+                time.sleep(0.05)
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # ---------------- 请求 ----------------
+
+    def _wrap(self, value):
+        if isinstance(value, dict):
+            if "__element__" in value:
+                return RemoteElement(self, value["__element__"], value.get("locator"))
+            return {key: self._wrap(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        return value
+
+    def _unwrap(self, value):
+        if isinstance(value, RemoteElement):
+            if value.client is not self:
+                raise Exception("元素句柄属于另一个客户端连接")
+            return {"__element__": value.handle}
+        if isinstance(value, dict):
+            return {key: self._unwrap(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._unwrap(item) for item in value]
+        return value
+
+    def _request(self, ops, stop_on_error=True):
+        """一次往返执行多个操作，返回每个操作的 {"ok", "value"/"error", "time"}。"""
+        request_id = next(self._ids)
+        message = {"id": request_id, "ops": self._unwrap(ops), "stop_on_error": stop_on_error}
+        with self._lock:
+            if self._sock is None:
+                self._sock = self._connect()
+            try:
+                send_message(self._sock, message)
+                reply = recv_message(self._sock)
+            except (OSError, EOFError) as e:
+                # 连接已断开（守护进程重启等），句柄随之失效，下次调用重新连接
+                self._sock.close()
+                self._sock = None
+                raise Exception(f"与 guiautomationd 通信失败: {e}")
+        if reply.get("id") != request_id:
+            raise Exception(f"响应与请求不匹配: {reply.get('id')} != {request_id}")
+        return [self._wrap(result) for result in reply["results"]]
+
+    def _arguments(self, op, args, kwargs):
+        """按 GUIAutomation 的签名去掉 objWin 参数，返回发送给守护进程的 (args, kwargs)。"""
+        if self._operations is None:
+            result = self._request([{"op": "operations", "args": [], "kwargs": {}}])[0]
+            # 旧版本的守护进程没有操作表：所有操作都带 objWin
+            self._operations = result.get("value") if result["ok"] else {}
+        if not self._operations.get(op, True):
+            return list(args), kwargs
+        if "objWin" in kwargs:
+            kwargs.pop("objWin")
+            return list(args), kwargs
+        return list(args[1:]), kwargs
+
+    def call(self, op, *args, **kwargs):
+        """执行单个操作，失败时抛出异常（与直接调用 GUIAutomation 一致）。"""
+        result = self._request([{"op": op, "args": list(args), "kwargs": kwargs}])[0]
+        if not result["ok"]:
+            raise Exception(result["error"])
+        return result.get("value")
+
+    def pipeline(self, stop_on_error=True):
+        return Pipeline(self, stop_on_error)
+
+    def batch(self, objWin=None, time_out=10, continue_on_error=False):
+        """与 GUIAutomation.batch 相同的批量动作脚本，整个脚本在守护进程中执行。"""
+        return RemoteBatch(self, time_out, continue_on_error)
+
+    def ping(self):
+        return self.call("ping")
+
+    def stats(self):
+        return self.call("stats")
+
+    def release(self, handles=None):
+        """释放守护进程中的元素句柄（默认全部）。"""
+        return self.call("release", None if handles is None else [getattr(h, "handle", h) for h in handles])
+
+    def shutdown(self):
+        """请求守护进程退出。"""
+        try:
+            return self.call("shutdown")
+        finally:
+            self.close()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def operation(*args, **kwargs):
+            args, kwargs = self._arguments(name, args, kwargs)
+            return self.call(name, *args, **kwargs)
+        operation.__name__ = name
+        return operation
@@ -0,0 +1,81 @@
+"""
+截图吞吐基准
+
+默认在 1920x1080 的 Xvfb 中分别用 MIT-SHM 和 XGetImage 后端截取整屏及若干区域，输出每秒帧数：
+
+    python benchmarks/capture_benchmark.py --frames 200 --output capture.json
+    python benchmarks/capture_benchmark.py --no-xvfb          # 使用当前 DISPLAY
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, PACKAGE_DIR)
+
+from run_benchmarks import VirtualSession, summarize, git_commit
+
+# (名称, 宽, 高)，区域从屏幕左上角开始
+REGIONS = (
+    ("screen_1080p", 1920, 1080),
+    ("window_1280x720", 1280, 720),
+    ("element_200x40", 200, 40),
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="截图吞吐基准")
+    parser.add_argument("--frames", type=int, default=100, help="每项截取的帧数")
+    parser.add_argument("--output", default="capture_benchmark_results.json", help="结果 JSON 文件")
+    parser.add_argument("--no-xvfb", action="store_true", help="使用当前 DISPLAY，不启动 Xvfb")
+    return parser.parse_args(argv)
+
+
+def run(frames):
+    from screen_capture import ScreenCapture, BACKEND_SHM
+    results = {}
+    for use_shm in (True, False):
+        capture = ScreenCapture(use_shm=use_shm)
+        if use_shm and capture.backend != BACKEND_SHM:
+            print("MIT-SHM 不可用，跳过 shm 后端")
+            capture.close()
+            continue
+        for name, width, height in REGIONS:
+            width, height = min(width, capture.width), min(height, capture.height)
+            capture.capture_rect(0, 0, width, height)  # 预热：分配共享内存
+            samples = []
+            for _ in range(frames):
+                start = time.perf_counter()
+                frame = capture.capture_rect(0, 0, width, height)
+                samples.append(time.perf_counter() - start)
+            result = summarize(samples, width=int(frame.shape[1]), height=int(frame.shape[0]))
+            result["fps"] = frames / sum(samples)
+            results[f"{capture.backend}_{name}"] = result
+            print(f"{capture.backend:<10}{name:<18}{width}x{height:<8}{result['fps']:>10.1f} fps"
+                  f"{result['median_ms']:>10.2f} ms")
+        capture.close()
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with VirtualSession(use_xvfb=not args.no_xvfb, screen="1920x1080x24", atspi=False):
+        results = run(args.frames)
+    output = {
+        "meta": {"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "params": {"frames": args.frames, "xvfb": not args.no_xvfb}},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
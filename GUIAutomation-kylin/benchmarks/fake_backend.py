@@ -0,0 +1,464 @@
+"""
+进程内的假 X 服务器 / AT-SPI 树
+
+实现 LinuxHandler 用到的 python-xlib 窗口方法（get_wm_name、query_tree、get_attributes 等）和
+Atspi.Accessible 方法（get_child_at_index、get_name、get_role_name、get_extents、get_state_set 等），
+每次调用按 LatencyModel 注入延迟以模拟 D-Bus / X 往返，并统计调用次数，
+使热点路径可以在 10^3 ~ 10^6 个节点的树上确定性地测量。
+
+用法:
+    backend = FakeBackend(LatencyModel(per_call_us=50))
+    backend.build_accessible_tree(10000, fanout=10)
+    backend.build_window_tree(1000, fanout=10)
+    with backend.install():
+        from linux_handler import LinuxHandler
+        handler = LinuxHandler()
+        handler._find_accessible_element("name:leaf-9999", 0)
+    print(backend.latency.calls, backend.latency.simulated)
+"""
+
+import sys
+import time
+import types
+import importlib
+import itertools
+import contextlib
+from collections import deque
+
+MODE_VIRTUAL = "virtual"  # 不真正等待，只累计模拟延迟（确定性）
+MODE_SPIN = "spin"        # 忙等待，真实地拉长调用耗时
+
+
+class LatencyModel:
+    """按方法注入的调用延迟（微秒），同时统计调用次数与累计模拟耗时（秒）。"""
+
+    def __init__(self, per_call_us=0, per_method_us=None, mode=MODE_VIRTUAL):
+        self.per_call_us = per_call_us
+        self.per_method_us = dict(per_method_us or {})
+        self.mode = mode
+        self.calls = 0
+        self.by_method = {}
+        self.simulated = 0.0
+
+    def reset(self):
+        self.calls = 0
+        self.by_method = {}
+        self.simulated = 0.0
+
+    def snapshot(self):
+        return self.calls, self.simulated
+
+    def hit(self, method):
+        self.calls += 1
+        self.by_method[method] = self.by_method.get(method, 0) + 1
+        delay = self.per_method_us.get(method, self.per_call_us) / 1e6
+        if delay <= 0:
+            return
+        self.simulated += delay
+        if self.mode == MODE_SPIN:
+            end = time.perf_counter() + delay
+            while time.perf_counter() < end:
+                pass
+
+
+# ---------------- AT-SPI ----------------
+
+class FakeRole:
+    APPLICATION = "application"
+    FRAME = "frame"
+    PANEL = "panel"
+    PUSH_BUTTON = "push button"
+    DESKTOP_FRAME = "desktop frame"
+
+
+class FakeStateType:
+    VISIBLE = "visible"
+    SHOWING = "showing"
+    ENABLED = "enabled"
+    CHECKED = "checked"
+    FOCUSED = "focused"
+
+
+class FakeState:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, other):
+        return self.name == getattr(other, "name", other)
+
+    def __hash__(self):
+        return hash(self.name)
+
+
+class FakeStateSet(list):
+    """状态集合，支持 `Atspi.StateType.VISIBLE in states` 和遍历 `.name`。"""
+
+    def __contains__(self, item):
+        return any(state == item for state in self)
+
+    def contains(self, item):
+        return item in self
+
+
+class FakeRect:
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x, y, width, height):
+        self.x, self.y, self.width, self.height = x, y, width, height
+
+
+class FakeAccessible:
+    """Atspi.Accessible 的替身。每个 get_* 调用都经过 LatencyModel。"""
+
+    __slots__ = ("latency", "name", "role", "children", "parent", "index", "text", "accessible_id",
+                 "extents", "states", "pid")
+
+    def __init__(self, latency, role, name, text="", accessible_id=None, pid=1000):
+        self.latency = latency
+        self.role = role
+        self.name = name
+        self.text = text
+        self.accessible_id = accessible_id if accessible_id is not None else name
+        self.children = []
+        self.parent = None
+        self.index = 0
+        self.extents = FakeRect(0, 0, 80, 24)
+        self.states = (FakeStateType.VISIBLE, FakeStateType.SHOWING, FakeStateType.ENABLED)
+        self.pid = pid
+
+    def add(self, child):
+        child.parent = self
+        child.index = len(self.children)
+        self.children.append(child)
+        return child
+
+    def get_name(self):
+        self.latency.hit("get_name")
+        return self.name
+
+    def get_role_name(self):
+        self.latency.hit("get_role_name")
+        return self.role
+
+    def get_role(self):
+        self.latency.hit("get_role")
+        return self.role
+
+    def get_id(self):
+        self.latency.hit("get_id")
+        return self.accessible_id
+
+    def get_text(self, *args):
+        self.latency.hit("get_text")
+        return self.text
+
+    def get_child_count(self):
+        self.latency.hit("get_child_count")
+        return len(self.children)
+
+    def get_child_at_index(self, index):
+        self.latency.hit("get_child_at_index")
+        return self.children[index] if 0 <= index < len(self.children) else None
+
+    def get_parent(self):
+        self.latency.hit("get_parent")
+        return self.parent
+
+    def get_index_in_parent(self):
+        self.latency.hit("get_index_in_parent")
+        return self.index
+
+    def get_extents(self, coord_type=None):
+        self.latency.hit("get_extents")
+        return self.extents
+
+    def get_state_set(self):
+        self.latency.hit("get_state_set")
+        return FakeStateSet(FakeState(name) for name in self.states)
+
+    def get_process_id(self):
+        self.latency.hit("get_process_id")
+        return self.pid
+
+    def get_toolkit_name(self):
+        return "fake"
+
+    def get_toolkit_version(self):
+        return "1.0"
+
+
+# ---------------- X11 ----------------
+
+class FakeBadWindow(Exception):
+    pass
+
+
+class FakeQueryTree:
+    __slots__ = ("children", "parent")
+
+    def __init__(self, children, parent):
+        self.children = children
+        self.parent = parent
+
+
+class FakeWindow:
+    """python-xlib Window 的替身。"""
+
+    __slots__ = ("latency", "id", "wm_name", "wm_class", "children", "parent", "geometry")
+
+    def __init__(self, latency, window_id, wm_name=None, wm_class=None):
+        self.latency = latency
+        self.id = window_id
+        self.wm_name = wm_name
+        self.wm_class = wm_class
+        self.children = []
+        self.parent = None
+        self.geometry = FakeRect(0, 0, 640, 480)
+
+    def add(self, child):
+        child.parent = self
+        self.children.append(child)
+        return child
+
+    def get_wm_name(self):
+        self.latency.hit("get_wm_name")
+        return self.wm_name
+
+    def get_wm_class(self):
+        self.latency.hit("get_wm_class")
+        return self.wm_class
+
+    def query_tree(self):
+        self.latency.hit("query_tree")
+        return FakeQueryTree(list(self.children), self.parent)
+
+    def get_attributes(self):
+        self.latency.hit("get_attributes")
+        return types.SimpleNamespace(map_state=1)
+
+    def get_geometry(self):
+        self.latency.hit("get_geometry")
+        return self.geometry
+
+    def get_full_property(self, *args, **kwargs):
+        self.latency.hit("get_full_property")
+        return None
+
+
+class FakeDisplay:
+    """python-xlib Display 的替身，create_resource_object 按 id 查找窗口。"""
+
+    def __init__(self, latency, root):
+        self.latency = latency
+        self.root = root
+        self.windows = {}
+        self._index(root)
+
+    def _index(self, window):
+        stack = [window]
+        while stack:
+            current = stack.pop()
+            self.windows[current.id] = current
+            stack.extend(current.children)
+
+    def screen(self):
+        return types.SimpleNamespace(root=self.root)
+
+    def create_resource_object(self, kind, resource_id):
+        window = self.windows.get(resource_id)
+        if window is None:
+            raise FakeBadWindow(resource_id)
+        return window
+
+    def intern_atom(self, name, only_if_exists=False):
+        return hash(name) & 0xFFFF
+
+    def flush(self):
+        pass
+
+    def sync(self):
+        self.latency.hit("sync")
+
+    def close(self):
+        pass
+
+
+# ---------------- 后端 ----------------
+
+class _FakePyAutoGUI(types.ModuleType):
+    """无显示环境下替代 pyautogui 的输入模块，只记录调用次数。"""
+
+    def __init__(self):
+        super().__init__("pyautogui")
+        self.events = 0
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.events += 1
+        return record
+
+    def position(self):
+        return 0, 0
+
+    def size(self):
+        return 1920, 1080
+
+
+# ---------------- 按描述构造的小树（单元测试） ----------------
+
+def build_spec_tree(spec, latency=None):
+    """
+    按嵌套描述建立一棵 FakeAccessible 树，返回根元素。
+
+    每个节点为 (角色, 名称, [属性字典], [子节点列表])：属性字典中的 text / accessible_id / pid 传给构造函数，
+    其他键（如 states）直接设置为元素属性；没有指定 accessible_id 的元素没有 id。
+    """
+    latency = latency or LatencyModel()
+    role, name = spec[0], spec[1]
+    attributes = next((item for item in spec[2:] if isinstance(item, dict)), {})
+    children = next((item for item in spec[2:] if isinstance(item, list)), [])
+    kwargs = {key: attributes[key] for key in ("text", "accessible_id", "pid") if key in attributes}
+    kwargs.setdefault("accessible_id", "")
+    element = FakeAccessible(latency, role, name, **kwargs)
+    for key, value in attributes.items():
+        if key not in kwargs:
+            setattr(element, key, value)
+    for child in children:
+        element.add(build_spec_tree(child, latency))
+    return element
+
+
+def element_field(accessible, field):
+    """FakeAccessible 的字段读取，返回格式与 LinuxHandler._element_field 一致（TreeSnapshot 的 reader）。"""
+    if field == "id":
+        return accessible.accessible_id
+    if field == "text":
+        return accessible.text
+    if field == "states":
+        return ["ATSPI_STATE_" + state.upper() for state in accessible.states]
+    if field == "rectangle":
+        rect = accessible.extents
+        return {"x": rect.x, "y": rect.y, "width": rect.width, "height": rect.height}
+    return None
+
+
+class FakeBackend:
+    """持有假的 AT-SPI 桌面和 X 窗口树，install() 期间替换 linux_handler 的后端。"""
+
+    def __init__(self, latency=None):
+        self.latency = latency or LatencyModel()
+        self.desktop = FakeAccessible(self.latency, FakeRole.DESKTOP_FRAME, "main")
+        self.root_window = FakeWindow(self.latency, 1, "root")
+        self.display = FakeDisplay(self.latency, self.root_window)
+        self._window_ids = itertools.count(2)
+
+    # ---------------- 构造树 ----------------
+
+    def build_accessible_tree(self, nodes, fanout=10, app_name="fake-app", text_size=16):
+        """
+        在桌面下添加一个应用，应用 -> frame -> 广度优先填满 nodes 个节点。
+
+        内部节点为 panel（名称 panel-<序号>），没有子节点的为 push button（名称 leaf-<序号>），
+        序号按广度优先顺序，最后一个节点 (nodes-1) 在最深层的最右侧，适合作为最坏情况的查找目标。
+        返回 frame。
+        """
+        latency = self.latency
+        app = self.desktop.add(FakeAccessible(latency, FakeRole.APPLICATION, app_name))
+        frame = app.add(FakeAccessible(latency, FakeRole.FRAME, app_name))
+        created = [FakeAccessible(latency, FakeRole.PANEL, "panel-0", accessible_id="node-0")]
+        frame.add(created[0])
+        queue = deque(created)
+        while len(created) < nodes:
+            parent = queue.popleft()
+            for _ in range(fanout):
+                if len(created) >= nodes:
+                    break
+                index = len(created)
+                child = parent.add(FakeAccessible(latency, FakeRole.PANEL, f"panel-{index}",
+                                                  accessible_id=f"node-{index}"))
+                created.append(child)
+                queue.append(child)
+        for index, node in enumerate(created):
+            if not node.children:
+                node.role = FakeRole.PUSH_BUTTON
+                node.name = f"leaf-{index}"
+                node.text = (f"text-{index}-" * (text_size // 6 + 1))[:text_size]
+        return frame
+
+    def build_window_tree(self, windows, fanout=10, title="Fake Window"):
+        """在根窗口下广度优先建立 windows 个窗口，最后一个窗口的标题为 title，其余为 window-<序号>。"""
+        latency = self.latency
+        created = []
+        queue = deque([self.root_window])
+        while len(created) < windows:
+            parent = queue.popleft()
+            for _ in range(fanout):
+                if len(created) >= windows:
+                    break
+                child = parent.add(FakeWindow(latency, next(self._window_ids), f"window-{len(created)}"))
+                created.append(child)
+                queue.append(child)
+        if created:
+            created[-1].wm_name = title
+        self.display._index(self.root_window)
+        return created[-1] if created else None
+
+    # ---------------- 安装 ----------------
+
+    def atspi_module(self):
+        """仿 gi.repository.Atspi 的命名空间。"""
+        desktop = self.desktop
+        return types.SimpleNamespace(
+            get_desktop=lambda index: desktop,
+            init=lambda: 0,
+            Role=FakeRole,
+            StateType=FakeStateType,
+            CoordType=types.SimpleNamespace(SCREEN=0, WINDOW=1),
+            Accessible=FakeAccessible,
+        )
+
+    def xlib_module(self):
+        """仿 Xlib 的命名空间，只包含 linux_handler 在异常处理中引用的错误类型。"""
+        error = types.SimpleNamespace(BadWindow=FakeBadWindow, IDChoiceError=FakeBadWindow,
+                                      ConnectionClosedError=FakeBadWindow, DisplayError=FakeBadWindow)
+        return types.SimpleNamespace(error=error, X=types.SimpleNamespace(), Xatom=types.SimpleNamespace())
+
+    @contextlib.contextmanager
+    def install(self):
+        """替换 linux_handler 模块的 AT-SPI / Xlib 后端；没有显示时同时提供 pyautogui 替身。"""
+        added_pyautogui = False
+        if "pyautogui" not in sys.modules:
+            try:
+                importlib.import_module("pyautogui")
+            except Exception:
+                sys.modules["pyautogui"] = _FakePyAutoGUI()
+                added_pyautogui = True
+        import linux_handler
+        display, root = self.display, self.root_window
+        patches = {
+            "Atspi": self.atspi_module(),
+            "ATSPI_AVAILABLE": True,
+            "XLIB_AVAILABLE": True,
+            "Xlib": self.xlib_module(),
+            "thread_display_connection": lambda: (display, root),
+            "reset_thread_display_connection": lambda: None,
+        }
+        missing = object()
+        saved = {name: getattr(linux_handler, name, missing) for name in patches}
+        for name, value in patches.items():
+            setattr(linux_handler, name, value)
+        try:
+            yield linux_handler
+        finally:
+            for name, value in saved.items():
+                if value is missing:
+                    delattr(linux_handler, name)
+                else:
+                    setattr(linux_handler, name, value)
+            if added_pyautogui:
+                sys.modules.pop("pyautogui", None)
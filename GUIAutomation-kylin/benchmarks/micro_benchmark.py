@@ -0,0 +1,158 @@
+"""
+热点路径的确定性微基准
+
+在 fake_backend 提供的假 X 窗口树 / AT-SPI 树上测量 LinuxHandler 的热点方法，不需要显示和 D-Bus：
+
+- find_window_cold / find_window_warm: _find_window_by_title（目标为最后一个窗口）
+- find_element_recursive: _find_element_recursive 从桌面查找最深层最右侧的叶子
+- find_accessible_cold / find_accessible_warm: _find_accessible_element（清空 / 保留元素缓存）
+- child_elements_level_<N>: get_child_elements 取第 N 层
+
+每项记录墙钟时间、后端调用次数以及模拟延迟（调用次数 x 每次延迟）。默认 virtual 模式不真正等待，
+调用次数和模拟耗时与机器无关，可以跨提交直接比较；spin 模式按延迟忙等，得到包含延迟的真实耗时。
+
+用法:
+    python benchmarks/micro_benchmark.py --sizes 1000,10000,100000 --latency-us 50 --output micro.json
+    python benchmarks/micro_benchmark.py --sizes 1000000 --repeat 1 --compare micro.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, PACKAGE_DIR)
+os.environ.setdefault("GUIAUTOMATION_HINTS", "0")
+
+from fake_backend import FakeBackend, LatencyModel, MODE_VIRTUAL, MODE_SPIN
+from run_benchmarks import summarize, compare, git_commit
+
+WINDOW_TITLE = "Fake Window"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="LinuxHandler 热点路径微基准")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="树的节点数，逗号分隔（最大 1000000）")
+    parser.add_argument("--windows", type=int, default=0, help="窗口树节点数，默认与 AT-SPI 树相同（上限 100000）")
+    parser.add_argument("--fanout", type=int, default=10, help="每个节点的子节点数")
+    parser.add_argument("--latency-us", type=float, default=0, help="每次后端调用注入的延迟（微秒）")
+    parser.add_argument("--mode", choices=(MODE_VIRTUAL, MODE_SPIN), default=MODE_VIRTUAL, help="延迟注入方式")
+    parser.add_argument("--repeat", type=int, default=5, help="每项测量的重复次数")
+    parser.add_argument("--output", default="micro_benchmark_results.json", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="与之前的结果 JSON 比较")
+    parser.add_argument("--threshold", type=float, default=1.25, help="中位数变慢超过该倍数视为回归")
+    return parser.parse_args(argv)
+
+
+class MicroBenchmark:
+
+    def __init__(self, args, nodes):
+        self.args = args
+        self.nodes = nodes
+        self.latency = LatencyModel(args.latency_us, mode=args.mode)
+        self.backend = FakeBackend(self.latency)
+        self.frame = self.backend.build_accessible_tree(nodes, args.fanout)
+        windows = args.windows or min(nodes, 100000)
+        self.backend.build_window_tree(windows, args.fanout, WINDOW_TITLE)
+        self.results = {}
+
+    def _measure(self, name, func, setup=None, **extra):
+        """重复执行 func，记录墙钟时间、调用次数和（含模拟延迟的）耗时。"""
+        walls, simulated, calls = [], [], []
+        for _ in range(self.args.repeat):
+            if setup:
+                setup()
+            calls_before, simulated_before = self.latency.snapshot()
+            start = time.perf_counter()
+            func()
+            wall = time.perf_counter() - start
+            call_count = self.latency.calls - calls_before
+            extra_delay = self.latency.simulated - simulated_before if self.args.mode == MODE_VIRTUAL else 0.0
+            walls.append(wall)
+            simulated.append(wall + extra_delay)
+            calls.append(call_count)
+        result = summarize(simulated, **extra)
+        result["wall_median_ms"] = summarize(walls)["median_ms"]
+        result["backend_calls"] = calls[-1]
+        self.results[f"{name}@{self.nodes}"] = result
+
+    def run(self):
+        with self.backend.install() as linux_handler:
+            handler = linux_handler.LinuxHandler()
+            handler.ATSPI_AVAILABLE = True
+            handler.hint_store = None
+            target = f"name:leaf-{self.nodes - 1}"
+
+            def clear_windows():
+                with handler._cache_lock:
+                    handler.window_cache.clear()
+
+            def clear_elements():
+                with handler._cache_lock:
+                    handler.element_cache.clear()
+
+            self._measure("find_window_cold", lambda: handler._find_window_by_title(WINDOW_TITLE), clear_windows)
+            self._measure("find_window_warm", lambda: handler._find_window_by_title(WINDOW_TITLE))
+            self._measure("find_element_recursive",
+                          lambda: handler._find_element_recursive(self.backend.desktop, "name", f"leaf-{self.nodes - 1}"))
+            self._measure("find_accessible_cold", lambda: handler._find_accessible_element(target, 0), clear_elements)
+            self._measure("find_accessible_warm", lambda: handler._find_accessible_element(target, 0))
+
+            counts = {}
+            for level in (2, 3):
+                def children(level=level):
+                    counts[level] = len(handler.get_child_elements("name:panel-0", level))
+                self._measure(f"child_elements_level_{level}", children, clear_elements)
+                self.results[f"child_elements_level_{level}@{self.nodes}"]["elements"] = counts.get(level, 0)
+        return self.results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(float(size)) for size in args.sizes.split(",") if size.strip()]
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+
+    results = {}
+    for nodes in sizes:
+        start = time.perf_counter()
+        bench = MicroBenchmark(args, nodes)
+        build_time = time.perf_counter() - start
+        results.update(bench.run())
+        print(f"{nodes} 个节点: 建树 {build_time:.2f}s")
+
+    print(f"{'benchmark':<40}{'median ms':>12}{'wall ms':>12}{'calls':>12}")
+    for name, result in results.items():
+        print(f"{name:<40}{result['median_ms']:>12.3f}{result['wall_median_ms']:>12.3f}{result['backend_calls']:>12}")
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {"sizes": sizes, "windows": args.windows, "fanout": args.fanout,
+                       "latency_us": args.latency_us, "mode": args.mode, "repeat": args.repeat},
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(output, baseline, args.threshold)
+        if regressions:
+            print(f"性能回归: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+GUIAutomation 性能基准
+
+在 Xvfb + at-spi2 的独立会话中启动 synthetic_app.py，测量热点路径：
+
+- window_lookup_cold / window_lookup_warm: _find_window_by_title（清空 / 保留窗口缓存）
+- element_lookup_<类型>: 按 name / role / id / text 定位器查找元素（每次清空元素缓存，不使用路径提示）
+- child_elements_depth_<N>: get_child_elements 取第 N 层子元素
+- input_text_throughput: input_text_to_element 输入 --input-chars 个字符，附带每秒字符数
+- wait_latency: 点击 reveal 后 wait_for_element 的返回时间减去应用内的显示延迟
+
+结果写入 JSON，可用 --compare 与之前提交的结果比较，中位数变慢超过 --threshold 倍时返回非零退出码。
+
+用法:
+    python benchmarks/run_benchmarks.py --widgets 500 --depth 4 --output bench.json
+    python benchmarks/run_benchmarks.py --output new.json --compare bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(BENCH_DIR)
+
+# at-spi-bus-launcher 在各发行版中的位置
+ATSPI_LAUNCHER_PATHS = (
+    "/usr/libexec/at-spi-bus-launcher",
+    "/usr/lib/at-spi2-core/at-spi-bus-launcher",
+    "/usr/lib/x86_64-linux-gnu/at-spi2-core/at-spi-bus-launcher",
+    "/usr/lib/aarch64-linux-gnu/at-spi2-core/at-spi-bus-launcher",
+    "/usr/lib/at-spi-bus-launcher",
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GUIAutomation 性能基准")
+    parser.add_argument("--widgets", type=int, default=300, help="合成应用的叶子控件数")
+    parser.add_argument("--depth", type=int, default=3, help="合成应用的容器层数")
+    parser.add_argument("--fanout", type=int, default=4, help="每个容器的子容器数")
+    parser.add_argument("--text-size", type=int, default=32, help="标签文本长度")
+    parser.add_argument("--reveal-delay", type=int, default=200, help="等待测试中标签的显示延迟（毫秒）")
+    parser.add_argument("--repeat", type=int, default=10, help="每项测量的重复次数")
+    parser.add_argument("--input-chars", type=int, default=200, help="输入吞吐测试的字符数")
+    parser.add_argument("--output", default="benchmark_results.json", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="与之前的结果 JSON 比较")
+    parser.add_argument("--threshold", type=float, default=1.25, help="中位数变慢超过该倍数视为回归")
+    parser.add_argument("--no-xvfb", action="store_true", help="使用当前 DISPLAY 和会话总线，不启动 Xvfb")
+    parser.add_argument("--only", action="append", help="只运行名称以此开头的测量项，可重复")
+    return parser.parse_args(argv)
+
+
+# ---------------- 会话 ----------------
+
+class VirtualSession:
+    """启动 Xvfb、会话 D-Bus 和 at-spi 总线，退出时全部结束。"""
+
+    def __init__(self, use_xvfb=True, screen="1280x1024x24", atspi=True):
+        self.use_xvfb = use_xvfb
+        self.screen = screen
+        self.atspi = atspi
+        self.processes = []
+        self.env = dict(os.environ)
+
+    def __enter__(self):
+        try:
+            if self.use_xvfb:
+                self._start_xvfb()
+                if self.atspi:
+                    self._start_dbus()
+                    self._start_atspi_bus()
+        except Exception:
+            self.close()
+            raise
+        self.env.pop("NO_AT_BRIDGE", None)
+        self.env["GTK_MODULES"] = "gail:atk-bridge"
+        os.environ.update(self.env)
+        os.environ.pop("NO_AT_BRIDGE", None)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _start_xvfb(self):
+        if not shutil.which("Xvfb"):
+            raise Exception("未找到 Xvfb，请安装 xvfb 或使用 --no-xvfb")
+        read_fd, write_fd = os.pipe()
+        process = subprocess.Popen(["Xvfb", "-displayfd", str(write_fd), "-screen", "0", self.screen, "-nolisten", "tcp"],
+                                   pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.close(write_fd)
+        self.processes.append(process)
+        with os.fdopen(read_fd) as f:
+            number = f.readline().strip()
+        if not number:
+            raise Exception("Xvfb 启动失败")
+        self.env["DISPLAY"] = f":{number}"
+
+    def _start_dbus(self):
+        if not shutil.which("dbus-daemon"):
+            raise Exception("未找到 dbus-daemon")
+        process = subprocess.Popen(["dbus-daemon", "--session", "--nofork", "--print-address"],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=self.env)
+        self.processes.append(process)
+        address = process.stdout.readline().strip()
+        if not address:
+            raise Exception("会话 D-Bus 启动失败")
+        self.env["DBUS_SESSION_BUS_ADDRESS"] = address
+
+    def _start_atspi_bus(self):
+        launcher = next((path for path in ATSPI_LAUNCHER_PATHS if os.path.exists(path)), None)
+        if launcher is None:
+            raise Exception("未找到 at-spi-bus-launcher，请安装 at-spi2-core")
+        self.processes.append(subprocess.Popen([launcher, "--launch-immediately"], env=self.env,
+                                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        time.sleep(0.5)
+
+    def spawn(self, args):
+        process = subprocess.Popen(args, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.processes.append(process)
+        return process
+
+    def close(self):
+        while self.processes:
+            process = self.processes.pop()
+            if process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+
+# ---------------- 测量 ----------------
+
+def summarize(samples, **extra):
+    """样本（秒）的统计值，单位毫秒。"""
+    ordered = sorted(samples)
+    result = {
+        "samples": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+    result.update(extra)
+    return result
+
+
+def measure(func, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+class BenchmarkRunner:
+
+    def __init__(self, args, handler, title):
+        self.args = args
+        self.handler = handler
+        self.title = title
+        self.results = {}
+        self.errors = {}
+
+    def _wanted(self, name):
+        return not self.args.only or any(name.startswith(prefix) for prefix in self.args.only)
+
+    def _run(self, name, func):
+        if not self._wanted(name):
+            return
+        try:
+            self.results[name] = func()
+        except Exception as e:
+            self.errors[name] = str(e)
+
+    def _clear_element_cache(self):
+        with self.handler._cache_lock:
+            self.handler.element_cache.clear()
+
+    def _clear_window_cache(self):
+        with self.handler._cache_lock:
+            self.handler.window_cache.clear()
+
+    def run(self):
+        args = self.args
+        self._run("window_lookup_cold", lambda: summarize(measure(
+            lambda: self.handler._find_window_by_title(self.title), args.repeat, self._clear_window_cache)))
+        self._run("window_lookup_warm", lambda: summarize(measure(
+            lambda: self.handler._find_window_by_title(self.title), args.repeat)))
+
+        last = max(0, args.widgets - 1)
+        button = last - last % 3
+        label = button + 1 if button + 1 < args.widgets else 1
+        for locator_type, locator in self._element_locators(button, label):
+            self._run(f"element_lookup_{locator_type}", lambda locator=locator: self._element_lookup(locator))
+
+        for level in range(2, args.depth + 3):
+            self._run(f"child_elements_depth_{level}", lambda level=level: self._child_elements(level))
+
+        self._run("input_text_throughput", self._input_throughput)
+        self._run("wait_latency", self._wait_latency)
+        return self.results
+
+    def _element_locators(self, button, label):
+        locators = [("name", f"name:button-{button}"), ("role", "role:entry")]
+        try:
+            element = self.handler._find_accessible_element(f"name:button-{button}", 5)
+            locators.append(("id", f"id:{element.get_id()}"))
+        except Exception:
+            locators.append(("id", f"id:button-{button}"))
+        base = f"text-{label}-"  # 与 synthetic_app._label_text 一致
+        text = (base * (self.args.text_size // len(base) + 1))[:self.args.text_size]
+        locators.append(("text", f"text:{text}"))
+        return locators
+
+    def _element_lookup(self, locator):
+        found = {"value": True}
+
+        def lookup():
+            try:
+                self.handler._find_accessible_element(locator, 0)
+            except Exception:
+                found["value"] = False
+        return summarize(measure(lookup, self.args.repeat, self._clear_element_cache),
+                         locator=locator, found=found["value"])
+
+    def _child_elements(self, level):
+        counts = []
+
+        def collect():
+            counts.append(len(self.handler.get_child_elements("name:box-0-0", level)))
+        samples = measure(collect, max(1, self.args.repeat // 2), self._clear_element_cache)
+        return summarize(samples, level=level, elements=counts[-1] if counts else 0)
+
+    def _input_throughput(self):
+        text = ("abcdefghij" * (self.args.input_chars // 10 + 1))[:self.args.input_chars]
+        locator = "name:entry-2" if self.args.widgets > 2 else "role:entry"
+        samples = measure(lambda: self.handler.input_text_to_element(locator, text, True, 0, False, True, 5),
+                          max(1, self.args.repeat // 5))
+        return summarize(samples, chars=len(text), chars_per_second=len(text) / statistics.median(samples))
+
+    def _wait_latency(self):
+        delay = self.args.reveal_delay / 1000.0
+        samples = []
+        for _ in range(max(1, self.args.repeat // 2)):
+            self._clear_element_cache()
+            self.handler.click_element("name:reveal", activate_window=False, time_out=5)
+            start = time.perf_counter()
+            self.handler.wait_for_element("name:revealed", 10, "visible")
+            samples.append(max(0.0, time.perf_counter() - start - delay))
+        return summarize(samples, reveal_delay_ms=self.args.reveal_delay)
+
+
+# ---------------- 结果 ----------------
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=PACKAGE_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(current, baseline, threshold):
+    """打印对比表，返回中位数变慢超过阈值的测量项列表。"""
+    regressions = []
+    print(f"{'benchmark':<32}{'baseline ms':>14}{'current ms':>14}{'ratio':>9}")
+    for name, result in sorted(current["results"].items()):
+        old = baseline.get("results", {}).get(name)
+        if not old or not old.get("median_ms"):
+            print(f"{name:<32}{'-':>14}{result['median_ms']:>14.2f}{'-':>9}")
+            continue
+        ratio = result["median_ms"] / old["median_ms"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{name:<32}{old['median_ms']:>14.2f}{result['median_ms']:>14.2f}{ratio:>9.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    title = "GUIAutomation Benchmark"
+    app_args = [sys.executable, os.path.join(BENCH_DIR, "synthetic_app.py"), "--title", title,
+                "--widgets", str(args.widgets), "--depth", str(args.depth), "--fanout", str(args.fanout),
+                "--text-size", str(args.text_size), "--reveal-delay", str(args.reveal_delay)]
+
+    with VirtualSession(use_xvfb=not args.no_xvfb) as session:
+        # pyautogui 和 Xlib 在导入时读取 DISPLAY，必须在会话建立之后导入
+        os.environ["GUIAUTOMATION_HINTS"] = "0"
+        sys.path.insert(0, PACKAGE_DIR)
+        from linux_handler import LinuxHandler
+
+        session.spawn(app_args)
+        handler = LinuxHandler()
+        deadline = time.time() + 30
+        while True:
+            try:
+                handler._find_window_by_title(title)
+                handler._find_accessible_element("name:reveal", 1)
+                break
+            except Exception:
+                if time.time() > deadline:
+                    raise Exception("合成应用在 30 秒内未出现")
+                time.sleep(0.5)
+
+        runner = BenchmarkRunner(args, handler, title)
+        results = runner.run()
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "xvfb": not args.no_xvfb,
+            "params": {"widgets": args.widgets, "depth": args.depth, "fanout": args.fanout,
+                       "text_size": args.text_size, "reveal_delay": args.reveal_delay,
+                       "repeat": args.repeat, "input_chars": args.input_chars},
+        },
+        "results": results,
+        "errors": runner.errors,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+    for name, error in sorted(runner.errors.items()):
+        print(f"{name}: 失败 {error}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("params") != output["meta"]["params"]:
+            print("警告: 基准参数与对比文件不同，结果可能不可比")
+        regressions = compare(output, baseline, args.threshold)
+        if regressions:
+            print(f"性能回归: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
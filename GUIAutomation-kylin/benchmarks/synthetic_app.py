@@ -0,0 +1,131 @@
+"""
+基准测试用的合成 GTK 应用
+
+生成一棵可配置规模的控件树：每层 --fanout 个容器，共 --depth 层，叶子层放置按钮、标签和输入框，
+控件总数约为 --widgets。控件名称有规律，便于基准脚本构造定位器：
+
+- 容器:   box-<层>-<序号>
+- 按钮:   button-<序号>
+- 标签:   label-<序号>，文本长度为 --text-size
+- 输入框: entry-<序号>
+- "reveal" 按钮点击后等待 --reveal-delay 毫秒显示名为 "revealed" 的标签，用于测量等待延迟
+
+用法:
+    python synthetic_app.py --widgets 500 --depth 4 --text-size 64 --title "GUIAutomation Benchmark"
+"""
+
+import sys
+import argparse
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, GLib
+
+DEFAULT_TITLE = "GUIAutomation Benchmark"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="合成控件树应用")
+    parser.add_argument("--title", default=DEFAULT_TITLE, help="窗口标题")
+    parser.add_argument("--widgets", type=int, default=300, help="叶子控件总数")
+    parser.add_argument("--depth", type=int, default=3, help="容器嵌套层数")
+    parser.add_argument("--fanout", type=int, default=4, help="每个容器的子容器数")
+    parser.add_argument("--text-size", type=int, default=32, help="标签文本长度（字符）")
+    parser.add_argument("--reveal-delay", type=int, default=200, help="reveal 按钮触发后显示标签的延迟（毫秒）")
+    return parser.parse_args(argv)
+
+
+def _set_accessible(widget, name):
+    """设置控件的无障碍名称和 id（工具包支持 accessible-id 时）。"""
+    accessible = widget.get_accessible()
+    if accessible is None:
+        return
+    if not isinstance(widget, (Gtk.Button, Gtk.Label)):
+        accessible.set_name(name)
+    if hasattr(accessible, "set_accessible_id"):
+        accessible.set_accessible_id(name)
+
+
+def _label_text(index, size):
+    base = f"text-{index}-"
+    return (base * (size // len(base) + 1))[:size] if size > 0 else ""
+
+
+class SyntheticWindow(Gtk.Window):
+
+    def __init__(self, args):
+        super().__init__(title=args.title)
+        self.args = args
+        self.set_default_size(1024, 768)
+        self.connect("destroy", Gtk.main_quit)
+
+        outer = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        self.add(outer)
+
+        controls = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        self.reveal_button = Gtk.Button(label="reveal")
+        self.reveal_button.connect("clicked", self._on_reveal)
+        self.revealed = Gtk.Label(label="revealed")
+        self.revealed.set_no_show_all(True)
+        controls.pack_start(self.reveal_button, False, False, 0)
+        controls.pack_start(self.revealed, False, False, 0)
+        outer.pack_start(controls, False, False, 0)
+
+        scrolled = Gtk.ScrolledWindow()
+        outer.pack_start(scrolled, True, True, 0)
+
+        leaves = self._build_containers(scrolled, max(1, args.depth))
+        self._fill_leaves(leaves, max(0, args.widgets))
+
+    def _build_containers(self, parent, depth):
+        """逐层建立容器，返回最底层容器列表。"""
+        level = [Gtk.Box(orientation=Gtk.Orientation.VERTICAL)]
+        _set_accessible(level[0], "box-0-0")
+        parent.add(level[0])
+        for depth_index in range(1, depth):
+            next_level = []
+            for box in level:
+                for _ in range(self.args.fanout):
+                    orientation = Gtk.Orientation.HORIZONTAL if depth_index % 2 else Gtk.Orientation.VERTICAL
+                    child = Gtk.Box(orientation=orientation)
+                    _set_accessible(child, f"box-{depth_index}-{len(next_level)}")
+                    box.pack_start(child, False, False, 0)
+                    next_level.append(child)
+            level = next_level
+        return level
+
+    def _fill_leaves(self, leaves, count):
+        """把按钮、标签、输入框轮流分配到最底层容器。"""
+        for index in range(count):
+            kind = index % 3
+            if kind == 0:
+                widget = Gtk.Button(label=f"button-{index}")
+                _set_accessible(widget, f"button-{index}")
+            elif kind == 1:
+                widget = Gtk.Label(label=_label_text(index, self.args.text_size))
+                widget.get_accessible().set_name(f"label-{index}")
+                _set_accessible(widget, f"label-{index}")
+            else:
+                widget = Gtk.Entry()
+                _set_accessible(widget, f"entry-{index}")
+            leaves[index % len(leaves)].pack_start(widget, False, False, 0)
+
+    def _on_reveal(self, _button):
+        self.revealed.hide()
+        GLib.timeout_add(self.args.reveal_delay, self._show_revealed)
+
+    def _show_revealed(self):
+        self.revealed.show()
+        return False
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    window = SyntheticWindow(args)
+    window.show_all()
+    Gtk.main()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
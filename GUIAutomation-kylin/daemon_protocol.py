@@ -0,0 +1,151 @@
+import os
+import json
+import struct
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+"""
+guiautomationd 与客户端之间的消息格式。
+
+每条消息为一帧：
+    uint32 帧长度（不含这 4 字节） | uint16 段数 | 每段: uint32 段长度 + 段内容
+第 0 段为 UTF-8 JSON（紧凑格式），其余为二进制附件：JSON 中的 {"__bytes__": i} 指向第 i 段，
+{"__ndarray__": i, "shape": [...], "dtype": "uint8"} 为第 i 段数据构成的 NumPy 数组（截图不经过 JSON 编码）。
+所有整数为网络字节序。
+"""
+
+# 套接字路径：GUIAUTOMATIOND_SOCKET 指定，否则按用户和 DISPLAY 放在 XDG_RUNTIME_DIR（或 /tmp）下
+SOCKET_ENV = "GUIAUTOMATIOND_SOCKET"
+# 单帧上限，避免错误的长度字段导致分配大量内存
+MAX_FRAME = 512 * 1024 * 1024
+
+_FRAME = struct.Struct(">I")
+_COUNT = struct.Struct(">H")
+_SEGMENT = struct.Struct(">I")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def default_socket_path():
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    directory = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    display = os.environ.get("DISPLAY", ":0").replace("/", "_").replace(":", "")
+    return os.path.join(directory, f"guiautomationd-{os.getuid()}-{display or '0'}.sock")
+
+
+def _pack(value, segments):
+    """把值转换为可 JSON 编码的结构，bytes 与 NumPy 数组放入二进制段。"""
+    if isinstance(value, dict):
+        return {str(key): _pack(item, segments) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_pack(item, segments) for item in value]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        segments.append(bytes(value))
+        return {"__bytes__": len(segments) - 1}
+    if NUMPY_AVAILABLE:
+        if isinstance(value, np.ndarray):
+            array = np.ascontiguousarray(value)
+            segments.append(array.data)
+            return {"__ndarray__": len(segments) - 1, "shape": list(array.shape), "dtype": array.dtype.str}
+        if isinstance(value, np.generic):
+            return value.item()
+    return value
+
+
+def _unpack(value, segments):
+    if isinstance(value, dict):
+        if "__bytes__" in value:
+            return bytes(segments[value["__bytes__"]])
+        if "__ndarray__" in value:
+            if not NUMPY_AVAILABLE:
+                raise ProtocolError("收到NumPy数组，但NumPy不可用")
+            data = segments[value["__ndarray__"]]
+            return np.frombuffer(data, dtype=np.dtype(value["dtype"])).reshape(value["shape"])
+        return {key: _unpack(item, segments) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_unpack(item, segments) for item in value]
+    return value
+
+
+def encode_message(message):
+    """编码为一帧（bytes 片段列表，可直接交给 sendmsg / 依次 sendall）。"""
+    segments = [b""]
+    body = _pack(message, segments)
+    segments[0] = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(segments) > 0xFFFF:
+        raise ProtocolError(f"附件过多: {len(segments)}")
+    parts = [b"", _COUNT.pack(len(segments))]
+    length = _COUNT.size
+    for segment in segments:
+        size = memoryview(segment).nbytes
+        parts.append(_SEGMENT.pack(size))
+        parts.append(segment)
+        length += _SEGMENT.size + size
+    if length > MAX_FRAME:
+        raise ProtocolError(f"消息过大: {length} 字节")
+    parts[0] = _FRAME.pack(length)
+    return parts
+
+
+def decode_message(frame):
+    """解码一帧（不含长度前缀）。"""
+    view = memoryview(frame)
+    (count,) = _COUNT.unpack_from(view, 0)
+    offset = _COUNT.size
+    segments = []
+    for _ in range(count):
+        (size,) = _SEGMENT.unpack_from(view, offset)
+        offset += _SEGMENT.size
+        if offset + size > len(view):
+            raise ProtocolError("帧被截断")
+        segments.append(view[offset:offset + size])
+        offset += size
+    if not segments:
+        raise ProtocolError("空消息")
+    body = json.loads(bytes(segments[0]).decode("utf-8"))
+    return _unpack(body, segments)
+
+
+def send_message(sock, message):
+    parts = encode_message(message)
+    if hasattr(sock, "sendmsg"):
+        # 附件较大时避免拼接复制；sendmsg 可能只发送一部分，剩余部分逐段补发
+        sent = sock.sendmsg(parts)
+        for part in parts:
+            size = memoryview(part).nbytes
+            if sent >= size:
+                sent -= size
+                continue
+            sock.sendall(memoryview(part)[sent:])
+            sent = 0
+    else:
+        for part in parts:
+            sock.sendall(part)
+
+
+def _recv_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise EOFError("连接已关闭")
+        received += count
+    return buffer
+
+
+def recv_message(sock):
+    """接收一条消息；对方正常关闭连接时抛出 EOFError。"""
+    (length,) = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    if length > MAX_FRAME:
+        raise ProtocolError(f"帧长度无效: {length}")
+    return decode_message(_recv_exact(sock, length))
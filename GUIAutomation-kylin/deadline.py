@@ -0,0 +1,113 @@
+import time
+import contextlib
+
+"""
+调用方的时间预算。
+
+处理器方法的 time_out 参数既可以是秒数，也可以是 Deadline；方法内部的查找、等待和各级备用路径
+共用同一个 Deadline，只使用剩余的时间，嵌套调用不会把调用方的超时放大成数倍。
+各阶段（AT-SPI 查找、边界备用、窗口点击等）用 stage() 记录耗时，超时错误附带预算的花费明细。
+"""
+
+
+class DeadlineExceeded(Exception):
+    """预算耗尽。str() 为原始消息加上预算花费明细，消息前缀与原有的错误消息保持一致。"""
+
+    def __init__(self, message, deadline=None):
+        self.message = message
+        self.deadline = deadline
+        super().__init__(f"{message} ({deadline.report()})" if deadline is not None else message)
+
+
+class Deadline:
+    """
+    从创建时开始计时的总预算（秒），budget 为 None 时不限时。
+
+    用法:
+        deadline = Deadline.coerce(time_out)
+        with deadline.stage("atspi"):
+            element = self._resolve_element(locator, deadline)
+        deadline.check("bounds")            # 预算已耗尽时抛出 DeadlineExceeded，不再开始新的备用路径
+        deadline.sleep(0.5)                  # 不会睡过截止时间
+    """
+
+    __slots__ = ("budget", "start", "end", "spent", "_stack")
+
+    def __init__(self, budget=None):
+        self.budget = None if budget is None else max(0.0, float(budget))
+        self.start = time.monotonic()
+        self.end = None if budget is None else self.start + self.budget
+        self.spent = {}
+        self._stack = []
+
+    @classmethod
+    def coerce(cls, value, default=None):
+        """time_out 参数转换为 Deadline：已是 Deadline 时原样返回（继续使用调用方的预算）。"""
+        if isinstance(value, Deadline):
+            return value
+        return cls(default if value is None else value)
+
+    def child(self, reserve=0.0):
+        """
+        子预算：在本预算结束前 reserve 秒截止，阶段耗时记入本预算。
+
+        用于给后续的备用路径预留时间，例如 AT-SPI 查找用 child(1.0)，找不到时仍有 1 秒可用于按窗口点击。
+        """
+        child = Deadline.__new__(Deadline)
+        child.start = time.monotonic()
+        child.end = None if self.end is None else max(child.start, self.end - reserve)
+        child.budget = None if child.end is None else child.end - child.start
+        child.spent = self.spent
+        child._stack = self._stack
+        return child
+
+    def remaining(self):
+        """剩余秒数（不小于 0），不限时为 float('inf')。"""
+        if self.end is None:
+            return float("inf")
+        return max(0.0, self.end - time.monotonic())
+
+    def limit(self, seconds):
+        """不超过剩余时间的等待时长，用于 subprocess / select 等自带超时的调用。"""
+        return max(0.0, min(seconds, self.remaining()))
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def expired(self):
+        return self.end is not None and time.monotonic() >= self.end
+
+    def check(self, what):
+        """预算已耗尽时抛出 DeadlineExceeded（what 说明被跳过的步骤）。"""
+        if self.expired():
+            raise DeadlineExceeded(f"超时，未执行: {what}", self)
+
+    def sleep(self, seconds):
+        """睡眠，不超过截止时间；返回实际睡眠的秒数。"""
+        seconds = self.limit(seconds)
+        if seconds > 0:
+            with self.stage("wait"):
+                time.sleep(seconds)
+        return seconds
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """记录一个阶段的耗时；嵌套阶段以 外层/内层 命名。同名阶段的耗时累加。"""
+        self._stack.append(name)
+        path = "/".join(self._stack)
+        started = time.monotonic()
+        try:
+            yield self
+        finally:
+            self._stack.pop()
+            self.spent[path] = self.spent.get(path, 0.0) + time.monotonic() - started
+
+    def report(self):
+        """预算花费明细，例如 "预算 10.0s, 已用 10.02s: atspi 9.00s, fallback/bounds 1.01s"。"""
+        budget = "不限时" if self.budget is None else f"预算 {self.budget:.1f}s"
+        parts = [f"{name} {seconds:.2f}s" for name, seconds in self.spent.items()]
+        detail = ": " + ", ".join(parts) if parts else ""
+        return f"{budget}, 已用 {self.elapsed():.2f}s{detail}"
+
+    def __repr__(self):
+        return f"<Deadline {self.report()}>"
@@ -0,0 +1,324 @@
+import os
+import time
+import queue
+import threading
+import contextlib
+
+from gui_logging import get_logger
+from atspi_transport import accessible_ref, REGISTRY_BUS
+
+"""
+按应用的桌面搜索。
+
+逐个应用搜索时，一个卡住的应用（D-Bus 调用默认 25 秒超时）会挡住后面所有应用。
+search_apps 在常驻的搜索线程中逐个应用搜索，调用方只等待结果（最长到 deadline）：一次 libatspi 调用超过 APP_TIMEOUT
+没有返回的应用不再等待，并加入黑名单，BLACKLIST_TTL 秒内的搜索跳过它（之后自动重试）。树很大但有响应的应用不受时限影响。
+
+- 结果总是桌面顺序中的第一个匹配：后面的应用先找到时，要等前面的应用都搜索完（或被放弃）才返回；
+- 并发是可选的（GUIAUTOMATION_SEARCH_WORKERS > 1，默认 1）：多个应用同时搜索，但 libatspi 不是线程安全的，
+  所有搜索线程的 libatspi 调用都在 ATSPI_LOCK 下串行执行，并发只重叠 Python 端的处理；
+- 卡住的 libatspi 调用无法中断，也不能在它返回之前进入 libatspi：第一次遇到无响应应用时，其后的应用要等这次调用
+  返回（D-Bus 超时，默认 25 秒）才继续搜索，调用方在 deadline 到期时返回；之后的搜索在黑名单有效期内跳过该应用；
+- 搜索线程常驻（WorkerPool），不会每次轮询都为每个应用新建线程。
+
+应用以其 D-Bus 连接名（如 :1.42）标识，读取时不需要与应用本身通信；应用重启后连接名改变，黑名单自然失效。
+"""
+
+# 同时搜索的应用数；默认 1（逐个应用搜索，只在搜索线程中执行以便放弃无响应的应用），大于 1 时启用并发搜索
+SEARCH_WORKERS = int(os.environ.get("GUIAUTOMATION_SEARCH_WORKERS", "1"))
+# 搜索单个应用时一次 libatspi 调用的时限（秒），超过后放弃该应用
+APP_TIMEOUT = float(os.environ.get("GUIAUTOMATION_APP_TIMEOUT", "3"))
+# 无响应应用在黑名单中保留的时间（秒）
+BLACKLIST_TTL = float(os.environ.get("GUIAUTOMATION_APP_BLACKLIST_TTL", "60"))
+
+# 表示应用无响应（而不是元素不存在）的错误
+TIMEOUT_MARKERS = (
+    "org.freedesktop.DBus.Error.NoReply",
+    "org.freedesktop.DBus.Error.Timeout",
+    "org.freedesktop.DBus.Error.TimedOut",
+    "Timeout was reached",
+)
+
+search_log = get_logger("element")
+
+
+def is_timeout_error(error):
+    text = str(error)
+    return any(marker in text for marker in TIMEOUT_MARKERS)
+
+
+def app_key(app):
+    """应用的标识：D-Bus 连接名，取不到时为进程号。"""
+    ref = accessible_ref(app)
+    if ref is not None and ref[0] != REGISTRY_BUS:
+        return ref[0]
+    try:
+        return f"pid:{app.get_process_id()}"
+    except Exception:
+        return f"obj:{id(app)}"
+
+
+class AppBlacklist:
+    """无响应应用的黑名单，条目在 ttl 秒后过期。进程内共用（get_app_blacklist）。"""
+
+    def __init__(self, ttl=BLACKLIST_TTL):
+        self.ttl = ttl
+        self.added = 0
+        self._entries = {}  # key -> (过期时间, 原因)
+        self._lock = threading.Lock()
+
+    def add(self, key, reason):
+        with self._lock:
+            if key not in self._entries:
+                self.added += 1
+            self._entries[key] = (time.monotonic() + self.ttl, reason)
+        search_log.warning("应用无响应，%.0fs 内的搜索跳过它: %s (%s)", self.ttl, key, reason)
+
+    def note_error(self, key, error):
+        """应用调用出错：无响应类错误加入黑名单并返回 True。"""
+        if is_timeout_error(error):
+            self.add(key, str(error))
+            return True
+        return False
+
+    def blocked(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return False
+            return True
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def entries(self):
+        """当前的黑名单 {应用标识: {"reason", "remaining"}}。"""
+        now = time.monotonic()
+        with self._lock:
+            return {key: {"reason": reason, "remaining": until - now}
+                    for key, (until, reason) in self._entries.items() if until > now}
+
+
+class AtspiLock:
+    """
+    搜索路径上 libatspi 调用的串行锁（可重入）。
+
+    持有者卡在无响应应用的 D-Bus 调用上时，等待者一直等到该调用返回（最长为 D-Bus 超时），不会与它同时进入 libatspi；
+    等待超过 stall 秒时计入 stalls 并记录日志。
+    """
+
+    def __init__(self):
+        self.stalls = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._owner = None
+        self._depth = 0
+
+    def acquire(self, stall):
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+                return
+            stalled = False
+            while self._owner is not None:
+                if not self._cond.wait(stall) and not stalled and self._owner is not None:
+                    stalled = True
+                    self.stalls += 1
+                    search_log.debug("libatspi 调用 %.1fs 没有返回，等待其返回后再继续", stall)
+            self._owner = me
+            self._depth = 1
+
+    def release(self):
+        with self._cond:
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self._cond.notify()
+
+
+# 搜索路径上的 libatspi 调用串行执行（libatspi 不是线程安全的）
+ATSPI_LOCK = AtspiLock()
+
+
+@contextlib.contextmanager
+def atspi_section(stall=APP_TIMEOUT):
+    """在 ATSPI_LOCK 下执行一段 libatspi 调用；等待卡住的持有者超过 stall 秒时记录一次。"""
+    ATSPI_LOCK.acquire(stall)
+    try:
+        yield
+    finally:
+        ATSPI_LOCK.release()
+
+
+class WorkerPool:
+    """常驻的守护线程池：空闲线程等待下一个任务，线程数只随同时运行的任务数增长；卡住的线程不妨碍进程退出。"""
+
+    def __init__(self, name):
+        self.name = name
+        self.threads = 0
+        self._idle = 0
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+
+    def submit(self, function, *args):
+        with self._lock:
+            if self._idle:
+                self._idle -= 1
+            else:
+                self.threads += 1
+                threading.Thread(target=self._run, name=f"{self.name}-{self.threads}", daemon=True).start()
+        self._tasks.put((function, args))
+
+    def _run(self):
+        while True:
+            function, args = self._tasks.get()
+            try:
+                function(*args)
+            except Exception as e:
+                search_log.debug("搜索线程任务出错: %s", e)
+            # 空闲时不持有上一个任务（及其引用的处理器、元素）
+            function = args = None
+            with self._lock:
+                self._idle += 1
+
+
+class _SearchState:
+    __slots__ = ("limit", "cancel", "app_timeout")
+
+    def __init__(self, count, app_timeout):
+        self.limit = count  # 已找到的最靠前的应用下标，其后的应用不必再搜索
+        self.cancel = False
+        self.app_timeout = app_timeout
+
+
+class SearchToken:
+    """单个应用搜索的取消检查和 libatspi 调用区段。"""
+
+    __slots__ = ("index", "state", "since", "abandoned")
+
+    def __init__(self, index, state):
+        self.index = index
+        self.state = state
+        self.since = None  # 当前这次 libatspi 调用的开始时间，不在调用中时为 None
+        self.abandoned = False
+
+    def alive(self):
+        """每访问一个节点调用一次：搜索已取消、该应用已被放弃，或更靠前的应用已经找到元素时返回 False。"""
+        state = self.state
+        return not state.cancel and not self.abandoned and self.index < state.limit
+
+    @contextlib.contextmanager
+    def step(self):
+        """一步 libatspi 调用：在 ATSPI_LOCK 下执行并计时，超过 app_timeout 仍未返回的应用会被放弃。"""
+        with atspi_section(self.state.app_timeout):
+            self.since = time.monotonic()
+            try:
+                yield
+            finally:
+                self.since = None
+
+
+_pool = WorkerPool("app-search")
+
+
+def search_apps(apps, search_app, blacklist=None, app_timeout=APP_TIMEOUT, workers=SEARCH_WORKERS, deadline=None):
+    """
+    在常驻搜索线程中按桌面顺序搜索多个应用，返回桌面顺序中第一个找到的元素；都没有找到（或 deadline 到期）返回 None。
+
+    apps 为 [(应用标识, 应用)]，search_app(app, token) 在应用中搜索：每个节点调用 token.alive()，返回 False 时停止，
+    libatspi 调用放在 with token.step() 中。最多 workers 个应用同时搜索；
+    一次调用超过 app_timeout 没有返回的应用不再等待，并加入 blacklist。
+    """
+    if not apps:
+        return None
+    workers = max(1, workers)
+    state = _SearchState(len(apps), app_timeout)
+    results = queue.Queue()
+    tokens = {}
+
+    def run(index, app):
+        token = tokens[index]
+        if not token.alive():
+            results.put((index, None, None))
+            return
+        try:
+            results.put((index, search_app(app, token), None))
+        except Exception as e:
+            results.put((index, None, e))
+
+    # 按下标跟踪，应用标识可能重复（例如同一进程的多个应用对象都退回到进程号）
+    pending = set(range(len(apps)))  # 还不知道结果的应用
+    running = set()
+    found = {}
+    next_index = 0
+    try:
+        while True:
+            if found:
+                best = min(found)
+                if not any(index < best for index in pending):
+                    return found[best]
+            elif not pending:
+                return None
+            while next_index < state.limit and len(running) < workers:
+                tokens[next_index] = SearchToken(next_index, state)
+                running.add(next_index)
+                _pool.submit(run, next_index, apps[next_index][1])
+                next_index += 1
+            now = time.monotonic()
+            wait = app_timeout
+            for index in running:
+                since = tokens[index].since
+                if since is not None:
+                    wait = min(wait, since + app_timeout - now)
+            if deadline is not None:
+                if deadline.expired():
+                    return None
+                wait = min(wait, deadline.remaining())
+            try:
+                index, element, error = results.get(timeout=max(0.0, wait) + 0.001)
+            except queue.Empty:
+                now = time.monotonic()
+                for index in list(running):
+                    since = tokens[index].since
+                    if since is not None and now - since >= app_timeout:
+                        # 线程会在当前 D-Bus 调用返回后看到放弃标志退出，不再占用 ATSPI_LOCK；这里不再等待
+                        tokens[index].abandoned = True
+                        running.discard(index)
+                        pending.discard(index)
+                        if blacklist is not None:
+                            blacklist.add(apps[index][0], f"{app_timeout:.1f}s 没有响应")
+                continue
+            if index not in running:
+                continue  # 已经放弃的应用
+            running.discard(index)
+            pending.discard(index)
+            if error is not None:
+                search_log.debug("应用搜索出错: %s: %s", apps[index][0], error)
+                if blacklist is not None:
+                    blacklist.note_error(apps[index][0], error)
+            elif element is not None:
+                found[index] = element
+                state.limit = min(state.limit, index)
+                pending = {i for i in pending if i < index}
+    finally:
+        state.cancel = True
+
+
+_blacklist = None
+_blacklist_lock = threading.Lock()
+
+
+def get_app_blacklist():
+    global _blacklist
+    with _blacklist_lock:
+        if _blacklist is None:
+            _blacklist = AppBlacklist()
+        return _blacklist
@@ -27,7 +27,8 @@ class ElementLocator:
             "css": self._find_by_css,
             "text": self._find_by_text,
             "tag": self._find_by_tag,
-            "control_type": self._find_by_control_type
+            "control_type": self._find_by_control_type,
+            "image": self._find_by_image
         }
     
     def find_element(self, context, locator):
@@ -173,4 +174,25 @@ class ElementLocator:
             else:
                 raise NotImplementedError("当前上下文不支持通过控件类型查找")
         except Exception as e:
-            raise Exception(f"通过控件类型 '{value}' 查找元素失败: {e}") 
\ No newline at end of file
+            raise Exception(f"通过控件类型 '{value}' 查找元素失败: {e}") 
+    
+    def _find_by_image(self, context, value):
+        """通过模板图像查找元素（value 为图像路径，可带 ?confidence=&scales=&window= 参数）"""
+        try:
+            if hasattr(context, 'find_image'):
+                # 平台处理器：在窗口区域截图并匹配
+                return context.find_image(value)
+            elif hasattr(context, 'shape'):
+                # 截图数组（NumPy），返回相对于数组左上角的坐标
+                from template_matcher import get_matcher, parse_image_locator, DEFAULT_CONFIDENCE, DEFAULT_SCALES
+                path, options = parse_image_locator(value)
+                match = get_matcher().match(context, path,
+                                            options.get("confidence", DEFAULT_CONFIDENCE),
+                                            options.get("scales", DEFAULT_SCALES))
+                if match is None:
+                    raise Exception("未找到匹配的图像区域")
+                return match
+            else:
+                raise NotImplementedError("当前上下文不支持通过图像查找")
+        except Exception as e:
+            raise Exception(f"通过图像 '{value}' 查找元素失败: {e}")
@@ -0,0 +1,160 @@
+import time
+from element_locator import parse_locator
+
+# 属性缓存的默认有效期（秒）：足够覆盖一串连续读取，又不会长期保留过时的界面状态
+DEFAULT_TTL = 0.5
+
+
+class ElementRef:
+    """
+    轻量的元素句柄，包装 AT-SPI 元素及定位到它的定位器。
+
+    - name / role / id / text / bounds / states 在第一次访问时读取，并在 ttl 秒内复用；
+    - parent / children / find() 从当前元素出发导航，不会重新从桌面开始查找；
+    - 处理器的动作方法（click_element、input_text_to_element 等）接受 ElementRef 代替定位器字符串，直接使用其中的元素。
+
+    用法:
+        ref = handler.find_element("role:table")
+        for row in ref.children:
+            if row.name == "目标行":
+                handler.click_element(row, activate_window=False)
+    """
+
+    __slots__ = ("accessible", "locator", "handler", "ttl", "_cache")
+
+    def __init__(self, accessible, handler, locator=None, ttl=DEFAULT_TTL):
+        self.accessible = accessible
+        self.handler = handler
+        self.locator = locator
+        self.ttl = ttl
+        self._cache = {}
+
+    def _get(self, field):
+        now = time.monotonic()
+        cached = self._cache.get(field)
+        if cached is not None and now - cached[1] < self.ttl:
+            return cached[0]
+        value = self.handler._element_field(self.accessible, field)
+        self._cache[field] = (value, now)
+        return value
+
+    def invalidate(self):
+        """丢弃已缓存的属性，下次访问时重新读取。"""
+        self._cache.clear()
+
+    # ---------------- 属性 ----------------
+
+    @property
+    def name(self):
+        return self._get("name")
+
+    @property
+    def role(self):
+        return self._get("role")
+
+    @property
+    def id(self):
+        return self._get("id")
+
+    @property
+    def text(self):
+        return self._get("text")
+
+    @property
+    def bounds(self):
+        """屏幕坐标 {"x", "y", "width", "height"}。"""
+        return self._get("rectangle")
+
+    @property
+    def states(self):
+        return self._get("states")
+
+    def is_valid(self):
+        """元素是否仍然存在（发起一次调用，不使用缓存）。"""
+        try:
+            self.accessible.get_name()
+            return True
+        except Exception:
+            return False
+
+    def to_dict(self, fields=("name", "role", "id", "text", "rectangle", "states")):
+        """与 get_element / get_child_elements 相同格式的字典。"""
+        return {field: self._get(field) for field in fields}
+
+    # ---------------- 导航 ----------------
+
+    def _wrap(self, accessible, locator=None):
+        return ElementRef(accessible, self.handler, locator, self.ttl)
+
+    @property
+    def parent(self):
+        parent = self.accessible.get_parent()
+        return self._wrap(parent) if parent is not None else None
+
+    @property
+    def children(self):
+        result = []
+        for index in range(self.accessible.get_child_count()):
+            child = self.accessible.get_child_at_index(index)
+            if child is not None:
+                result.append(self._wrap(child))
+        return result
+
+    def child(self, index):
+        child = self.accessible.get_child_at_index(index)
+        return self._wrap(child) if child is not None else None
+
+    def find(self, locator, timeout=0):
+        """在当前元素的后代中查找第一个匹配的元素，找不到时抛出异常。timeout 为轮询时间（秒）。"""
+        locator_type, locator_value = parse_locator(locator)
+        start_time = time.time()
+        while True:
+            if locator_type in ("xpath", "css"):
+                # 选择器在当前元素子树的快照上求值，/ 和 // 从当前元素开始
+                found = self.handler.query_elements(locator, self, max_count=1)
+                if found:
+                    return found[0]
+            else:
+                for index in range(self.accessible.get_child_count()):
+                    child = self.accessible.get_child_at_index(index)
+                    if child is None:
+                        continue
+                    found = self.handler._find_element_recursive(child, locator_type, locator_value)
+                    if found:
+                        return self._wrap(found, locator)
+            remaining = timeout - (time.time() - start_time)
+            if remaining <= 0:
+                break
+            time.sleep(min(0.5, remaining))
+        raise Exception(f"AT-SPI_ELEMENT_NOT_FOUND: {locator} (在 {self!r} 中)")
+
+    def select(self, selector):
+        """在当前元素的子树中按 XPath / CSS 选择器查询全部匹配的元素（"xpath:..." 或 "css:..."）。"""
+        return self.handler.query_elements(selector, self)
+
+    def refresh(self, time_out=10):
+        """按原定位器重新定位（元素被销毁重建后使用），返回自身。"""
+        if not self.locator:
+            raise Exception("该元素没有定位器，无法重新定位")
+        self.accessible = self.handler._find_accessible_element(self.locator, time_out)
+        self._cache.clear()
+        return self
+
+    # ---------------- 其他 ----------------
+
+    def __eq__(self, other):
+        if isinstance(other, ElementRef):
+            return self.accessible == other.accessible
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.accessible)
+
+    def __str__(self):
+        return self.locator or repr(self)
+
+    def __repr__(self):
+        try:
+            return f"<ElementRef {self.role} {self.name!r}>"
+        except Exception:
+            return f"<ElementRef {self.locator or 'defunct'}>"
@@ -0,0 +1,217 @@
+import os
+import sys
+import logging
+import functools
+import threading
+import collections
+
+# 日志级别：GUIAUTOMATION_LOG=debug 或按子系统 GUIAUTOMATION_LOG=element=debug,fallback=info
+LOG_ENV = "GUIAUTOMATION_LOG"
+# 环形缓冲容量：GUIAUTOMATION_LOG_RING=2000 时记录全部调试日志，只在调用失败时输出
+RING_ENV = "GUIAUTOMATION_LOG_RING"
+
+ROOT_LOGGER = "guiautomation"
+# 子系统：窗口、元素查找、鼠标键盘输入、备用路径（xdotool、边界点击等）
+SUBSYSTEMS = ("window", "element", "input", "fallback")
+
+LOG_FORMAT = "%(asctime)s L%(levelname)s %(name)s: %(message)s"
+
+_root = logging.getLogger(ROOT_LOGGER)
+# 未配置时不输出任何内容，也不落到 logging 的 lastResort 处理器
+_root.addHandler(logging.NullHandler())
+_root.setLevel(logging.WARNING)
+_root.propagate = False
+
+
+def get_logger(subsystem):
+    """返回子系统日志器，例如 get_logger("element") -> guiautomation.element。"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{subsystem}")
+
+
+def _parse_level(value):
+    level = logging.getLevelName(value.strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"未知的日志级别: {value}")
+    return level
+
+
+def set_level(level, subsystem=None):
+    """设置日志级别（名称或数值）。subsystem 为空时设置根日志器。"""
+    if isinstance(level, str):
+        level = _parse_level(level)
+    logger = get_logger(subsystem) if subsystem else _root
+    logger.setLevel(level)
+
+
+class _SubsystemLevelFilter(logging.Filter):
+    """按子系统过滤输出级别，使 stream 输出不受环形缓冲打开的 DEBUG 级别影响。"""
+
+    def __init__(self, root_level, levels):
+        super().__init__()
+        self.root_level = root_level
+        self.levels = levels
+
+    def filter(self, record):
+        subsystem = record.name[len(ROOT_LOGGER) + 1:].split(".", 1)[0]
+        return record.levelno >= self.levels.get(subsystem, self.root_level)
+
+
+def configure(spec=None, stream=None):
+    """
+    按配置串设置级别并输出到 stream（默认 stderr）。
+
+    spec 形如 "debug" 或 "info,element=debug,fallback=warning"：
+    不带子系统名的项作用于根日志器，其余作用于对应子系统。
+    """
+    root_level = _root.level
+    levels = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "=" in item:
+            subsystem, level = item.split("=", 1)
+            levels[subsystem.strip()] = _parse_level(level)
+        else:
+            root_level = _parse_level(item)
+    if _ring is None:
+        _root.setLevel(root_level)
+        for subsystem, level in levels.items():
+            get_logger(subsystem).setLevel(level)
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.addFilter(_SubsystemLevelFilter(root_level, levels))
+    handler.set_name("guiautomation-stream")
+    for existing in list(_root.handlers):
+        if existing.get_name() == "guiautomation-stream":
+            _root.removeHandler(existing)
+    _root.addHandler(handler)
+    return handler
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    保存最近 capacity 条日志记录的处理器。
+
+    记录只在 dump() 时才格式化，正常运行不写任何输出；
+    调用失败时由 dump_on_failure 包装的入口方法输出缓冲内容，便于排查。
+    """
+
+    def __init__(self, capacity=1000, stream=None):
+        super().__init__(logging.DEBUG)
+        self.capacity = capacity
+        self.stream = stream
+        self.records = collections.deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def dump(self, reason=None, stream=None):
+        """格式化并输出缓冲中的记录，然后清空。"""
+        stream = stream or self.stream or sys.stderr
+        self.acquire()
+        try:
+            records = list(self.records)
+            self.records.clear()
+        finally:
+            self.release()
+        if not records:
+            return 0
+        header = f"---- guiautomation: 最近 {len(records)} 条日志"
+        stream.write(f"{header}（{reason}）----\n" if reason else f"{header} ----\n")
+        for record in records:
+            stream.write(self.format(record) + "\n")
+        stream.flush()
+        return len(records)
+
+    def clear(self):
+        self.acquire()
+        try:
+            self.records.clear()
+        finally:
+            self.release()
+
+
+_ring = None
+_saved_levels = {}
+_call_depth = threading.local()
+
+
+def enable_ring_buffer(capacity=1000, stream=None):
+    """开启环形缓冲：所有子系统记录 DEBUG 级日志到内存，调用失败时输出。"""
+    global _ring
+    disable_ring_buffer()
+    _saved_levels.clear()
+    _saved_levels[ROOT_LOGGER] = _root.level
+    for subsystem in SUBSYSTEMS:
+        _saved_levels[subsystem] = get_logger(subsystem).level
+        get_logger(subsystem).setLevel(logging.NOTSET)
+    _root.setLevel(logging.DEBUG)
+    _ring = RingBufferHandler(capacity, stream)
+    _root.addHandler(_ring)
+    return _ring
+
+
+def disable_ring_buffer():
+    """关闭环形缓冲并恢复开启前的日志级别。"""
+    global _ring
+    if _ring is not None:
+        _root.removeHandler(_ring)
+        _ring = None
+        for name, level in _saved_levels.items():
+            (_root if name == ROOT_LOGGER else get_logger(name)).setLevel(level)
+
+
+def ring_buffer():
+    """当前的环形缓冲处理器，未开启时为None。"""
+    return _ring
+
+
+def dump_ring_buffer(reason=None):
+    """手动输出环形缓冲内容；未开启时不做任何事。"""
+    if _ring is not None:
+        return _ring.dump(reason)
+    return 0
+
+
+def _guard(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _ring is None:
+            return func(*args, **kwargs)
+        depth = getattr(_call_depth, "value", 0)
+        _call_depth.value = depth + 1
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            # 只在最外层调用失败时输出，嵌套调用的失败由外层统一处理
+            if depth == 0:
+                _ring.dump(f"{name} 失败: {e}")
+            raise
+        finally:
+            _call_depth.value = depth
+        return result
+    return wrapper
+
+
+def dump_on_failure(cls):
+    """包装类中的公开方法（含静态方法）：最外层调用抛出异常时输出环形缓冲。"""
+    for attr_name, attr in list(cls.__dict__.items()):
+        if attr_name.startswith("_"):
+            continue
+        name = f"{cls.__name__}.{attr_name}"
+        if isinstance(attr, staticmethod):
+            setattr(cls, attr_name, staticmethod(_guard(name, attr.__func__)))
+        elif callable(attr) and not isinstance(attr, type):
+            setattr(cls, attr_name, _guard(name, attr))
+    return cls
+
+
+if os.environ.get(LOG_ENV):
+    configure(os.environ[LOG_ENV])
+if os.environ.get(RING_ENV):
+    try:
+        enable_ring_buffer(int(os.environ[RING_ENV]))
+    except ValueError:
+        enable_ring_buffer()
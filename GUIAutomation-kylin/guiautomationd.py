@@ -0,0 +1,302 @@
+"""
+guiautomationd：常驻的自动化进程。
+
+持有一个预热的平台处理器（AT-SPI 已初始化、X 连接已建立、窗口/元素缓存和路径提示常驻内存），
+通过 Unix 套接字执行 GUIAutomation 的操作。短脚本用 automation_client.GUIAutomationClient 代替 GUIAutomation，
+不再为每个进程支付导入、建立连接和冷缓存的开销；一次往返可以提交多个操作。
+
+    python guiautomationd.py                       # 套接字路径见 daemon_protocol.default_socket_path()
+    python guiautomationd.py --socket /tmp/gui.sock --log info
+
+请求: {"id": n, "ops": [{"op": "click_element", "args": [...], "kwargs": {...}}, ...], "stop_on_error": true}
+响应: {"id": n, "results": [{"ok": true, "value": ..., "time": 秒} | {"ok": false, "error": "..."}]}
+返回值中的 ElementRef 以句柄 {"__element__": n} 表示，在同一连接中可以作为 locator 传回。
+"""
+
+import os
+import sys
+import time
+import socket
+import signal
+import argparse
+import threading
+import collections
+import inspect
+
+from GUIAutomation import GUIAutomation, set_shared_handler
+from platform_handler import get_platform_handler
+from element_ref import ElementRef
+from daemon_protocol import default_socket_path, send_message, recv_message, ProtocolError
+from gui_logging import get_logger, configure
+from instrumentation import INSTRUMENTATION
+from atspi_transport import get_transport
+from desktop_search import get_app_blacklist
+from atspi_cache import get_cache_policy
+
+daemon_log = get_logger("daemon")
+
+# 每个连接最多保留的元素句柄数，超出后丢弃最早的句柄
+MAX_HANDLES = 4096
+# 批量动作脚本（GUIAutomation.batch）可以记录的步骤
+BATCH_STEPS = ("click", "move_to", "input_text", "press_key", "wait", "wait_for")
+
+
+def operation_table(automation):
+    """
+    automation 的公开静态方法 -> 第一个参数是否为 objWin。
+
+    大多数操作的第一个参数是 objWin（在守护进程中没有意义，调用时传 None），open_application 等没有。
+    """
+    table = {}
+    for name, member in vars(automation).items():
+        if isinstance(member, staticmethod) and not name.startswith("_") and name != "batch":
+            parameters = list(inspect.signature(member.__func__).parameters)
+            table[name] = bool(parameters) and parameters[0] == "objWin"
+    return table
+
+
+class _Connection:
+    """一个客户端连接：元素句柄表只在该连接内有效，断开时释放。"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.handles = collections.OrderedDict()
+        self.next_handle = 1
+
+    def export(self, value):
+        """把返回值中的 ElementRef 替换为句柄。"""
+        if isinstance(value, ElementRef):
+            handle = self.next_handle
+            self.next_handle += 1
+            self.handles[handle] = value
+            while len(self.handles) > MAX_HANDLES:
+                self.handles.popitem(last=False)
+            return {"__element__": handle, "locator": value.locator if isinstance(value.locator, str) else None}
+        if isinstance(value, dict):
+            return {key: self.export(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.export(item) for item in value]
+        if inspect.isgenerator(value):
+            return [self.export(item) for item in value]
+        if hasattr(value, "to_dict"):
+            return self.export(value.to_dict())
+        return value
+
+    def resolve(self, value):
+        """把参数中的句柄换回 ElementRef。"""
+        if isinstance(value, dict):
+            if "__element__" in value:
+                try:
+                    return self.handles[value["__element__"]]
+                except KeyError:
+                    raise Exception(f"元素句柄已失效: {value['__element__']}")
+            return {key: self.resolve(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.resolve(item) for item in value]
+        return value
+
+
+class AutomationDaemon:
+    """在 Unix 套接字上提供 GUIAutomation 操作，每个连接一个线程，共用同一个处理器。"""
+
+    def __init__(self, socket_path=None, handler=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.automation = GUIAutomation
+        self.handler = handler or get_platform_handler()
+        set_shared_handler(self.handler)
+        self.operations = operation_table(self.automation)
+        self.builtins = {
+            "ping": self._op_ping,
+            "operations": self._op_operations,
+            "stats": self._op_stats,
+            "element_fields": self._op_element_fields,
+            "release": self._op_release,
+            "batch": self._op_batch,
+            "shutdown": self._op_shutdown,
+        }
+        self.started = time.time()
+        self.requests = 0
+        self.ops = 0
+        self._server = None
+        self._stopping = threading.Event()
+
+    # ---------------- 内置操作 ----------------
+
+    def _op_ping(self, connection):
+        return {"pid": os.getpid(), "uptime": time.time() - self.started}
+
+    def _op_operations(self, connection):
+        """客户端用的操作表：操作名 -> 第一个参数是否为 objWin（客户端据此决定是否去掉第一个参数）。"""
+        table = {name: False for name in self.builtins}
+        table.update(self.operations)
+        return table
+
+    def _op_stats(self, connection):
+        """进程级统计：请求数、操作数、当前连接的句柄数、备用路径计数、AT-SPI 熔断器和传输层状态、无响应应用黑名单。"""
+        health = getattr(self.handler, "atspi_health", None)
+        transport = get_transport()
+        return {"pid": os.getpid(), "uptime": time.time() - self.started, "requests": self.requests,
+                "ops": self.ops, "handles": len(connection.handles),
+                "element_cache": len(getattr(self.handler, "element_cache", {})),
+                "fallbacks": INSTRUMENTATION.fallback_counts(),
+                "atspi_health": health.stats() if health is not None else None,
+                "atspi_transport": transport.stats() if transport is not None else None,
+                "app_blacklist": get_app_blacklist().entries(),
+                "atspi_cache": get_cache_policy().stats()}
+
+    def _op_element_fields(self, connection, element, fields=("name", "role")):
+        return {field: self.handler._element_field(element.accessible, field) for field in fields}
+
+    def _op_release(self, connection, handles=None):
+        """释放元素句柄，handles 为空时释放该连接的全部句柄。"""
+        if handles is None:
+            connection.handles.clear()
+        else:
+            for handle in handles:
+                connection.handles.pop(handle, None)
+        return len(connection.handles)
+
+    def _op_batch(self, connection, steps, time_out=10, continue_on_error=False):
+        """执行客户端记录的批量动作脚本，steps 为 [[步骤名, args, kwargs], ...]。"""
+        batch = self.automation.batch(None, time_out, continue_on_error)
+        for name, args, kwargs in steps:
+            if name not in BATCH_STEPS:
+                raise Exception(f"不支持的批量步骤: {name}")
+            getattr(batch, name)(*args, **kwargs)
+        return batch.run()
+
+    def _op_shutdown(self, connection):
+        self._stopping.set()
+        threading.Thread(target=self.stop, daemon=True).start()
+        return True
+
+    # ---------------- 执行 ----------------
+
+    def execute(self, connection, request):
+        """执行一个请求中的全部操作；stop_on_error 为真时第一个失败之后的操作不再执行。"""
+        results = []
+        stop_on_error = request.get("stop_on_error", True)
+        for op in request.get("ops", []):
+            name = op.get("op")
+            start = time.perf_counter()
+            try:
+                args = connection.resolve(op.get("args") or [])
+                kwargs = connection.resolve(op.get("kwargs") or {})
+                if name in self.builtins:
+                    value = self.builtins[name](connection, *args, **kwargs)
+                elif name in self.operations:
+                    # objWin 在守护进程中没有意义，与现有调用方一致传 None；没有 objWin 的操作参数原样传入
+                    operation = getattr(self.automation, name)
+                    value = operation(None, *args, **kwargs) if self.operations[name] else operation(*args, **kwargs)
+                else:
+                    raise Exception(f"不支持的操作: {name}")
+                results.append({"ok": True, "value": connection.export(value),
+                                "time": time.perf_counter() - start})
+            except Exception as e:
+                daemon_log.info("操作失败: %s: %s", name, e)
+                results.append({"ok": False, "error": str(e), "time": time.perf_counter() - start})
+                if stop_on_error:
+                    break
+            self.ops += 1
+        self.requests += 1
+        return {"id": request.get("id"), "results": results}
+
+    def _serve_connection(self, sock):
+        connection = _Connection(sock)
+        try:
+            while True:
+                try:
+                    request = recv_message(sock)
+                except EOFError:
+                    break
+                send_message(sock, self.execute(connection, request))
+        except (ProtocolError, OSError) as e:
+            daemon_log.warning("连接异常断开: %s", e)
+        finally:
+            connection.handles.clear()
+            # 每个连接一个线程：线程专属的 X 连接和截图共享内存随连接释放，不会耗尽 X 服务器的客户端数
+            release = getattr(self.handler, "release_thread_resources", None)
+            if release is not None:
+                try:
+                    release()
+                except Exception as e:
+                    daemon_log.debug("释放连接线程的资源失败: %s", e)
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    # ---------------- 监听 ----------------
+
+    def _bind(self):
+        if os.path.exists(self.socket_path):
+            # 已有守护进程在监听时不抢占，残留的套接字文件直接删除
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                probe.close()
+                raise Exception(f"守护进程已在运行: {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.socket_path)
+            finally:
+                probe.close()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # 套接字只允许当前用户访问
+        old_umask = os.umask(0o177)
+        try:
+            server.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        server.listen(16)
+        return server
+
+    def serve_forever(self):
+        self._server = self._bind()
+        daemon_log.info("guiautomationd 已启动: %s (pid %d)", self.socket_path, os.getpid())
+        try:
+            while not self._stopping.is_set():
+                try:
+                    sock, _ = self._server.accept()
+                except OSError:
+                    break
+                threading.Thread(target=self._serve_connection, args=(sock,), daemon=True).start()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopping.set()
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            server.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GUIAutomation 常驻进程")
+    parser.add_argument("--socket", default=None, help="Unix 套接字路径")
+    parser.add_argument("--log", default=os.environ.get("GUIAUTOMATION_LOG", "warning"),
+                        help="日志级别，格式同 GUIAUTOMATION_LOG")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure(args.log)
+    daemon = AutomationDaemon(args.socket)
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
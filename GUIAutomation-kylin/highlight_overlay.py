@@ -0,0 +1,157 @@
+import threading
+
+try:
+    import Xlib.display
+    import Xlib.X
+    from Xlib.ext import shape
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+DEFAULT_COLOR = "red"
+DEFAULT_THICKNESS = 3
+DEFAULT_DURATION = 2.0
+
+
+def _shape_constant(group, name, legacy_name):
+    """兼容新旧 python-xlib 的 XShape 常量命名（shape.SO.Set / shape.ShapeSet）。"""
+    holder = getattr(shape, group, None)
+    if holder is not None and hasattr(holder, name):
+        return getattr(holder, name)
+    return getattr(shape, legacy_name)
+
+
+class HighlightOverlay:
+    """
+    用覆盖窗口高亮元素，不移动鼠标、不发送任何输入。
+
+    每个高亮框是一个 override-redirect 窗口（不受窗口管理器管理、不抢焦点），
+    用 XShape 把可见区域裁成只剩边框，并把输入区域设为空，鼠标事件会穿透到下面的应用。
+    服务器不支持 SHAPE 扩展时，用四个细长窗口拼出边框。
+
+    使用独立的 X 连接，自动隐藏定时器在后台线程中执行，所有操作由内部锁串行。
+    """
+
+    def __init__(self, display=None):
+        if not XLIB_AVAILABLE:
+            raise Exception("Xlib不可用，无法创建高亮窗口")
+        self.display = display or Xlib.display.Display()
+        self.screen = self.display.screen()
+        self._lock = threading.RLock()
+        self._windows = []
+        self._timer = None
+        self._pixels = {}
+        self._has_shape = self.display.has_extension("SHAPE")
+
+    def _pixel(self, color):
+        pixel = self._pixels.get(color)
+        if pixel is None:
+            try:
+                pixel = self.screen.default_colormap.alloc_named_color(color).pixel
+            except Exception:
+                pixel = self.screen.white_pixel
+            self._pixels[color] = pixel
+        return pixel
+
+    def _create_window(self, x, y, width, height, pixel):
+        return self.screen.root.create_window(
+            x, y, max(1, width), max(1, height), 0, self.screen.root_depth,
+            Xlib.X.InputOutput, Xlib.X.CopyFromParent,
+            background_pixel=pixel, override_redirect=True, save_under=True, event_mask=0)
+
+    def _shaped_frame(self, x, y, width, height, thickness, pixel):
+        """一个窗口：可见区域为四条边，输入区域为空。"""
+        outer_x, outer_y = x - thickness, y - thickness
+        outer_w, outer_h = width + 2 * thickness, height + 2 * thickness
+        window = self._create_window(outer_x, outer_y, outer_w, outer_h, pixel)
+        edges = [
+            (0, 0, outer_w, thickness),
+            (0, outer_h - thickness, outer_w, thickness),
+            (0, thickness, thickness, max(0, outer_h - 2 * thickness)),
+            (outer_w - thickness, thickness, thickness, max(0, outer_h - 2 * thickness)),
+        ]
+        shape_set = _shape_constant("SO", "Set", "ShapeSet")
+        window.shape_rectangles(shape_set, _shape_constant("SK", "Bounding", "ShapeBounding"),
+                                Xlib.X.Unsorted, 0, 0, edges)
+        try:
+            window.shape_rectangles(shape_set, _shape_constant("SK", "Input", "ShapeInput"),
+                                    Xlib.X.Unsorted, 0, 0, [])
+        except Exception:
+            pass  # SHAPE 1.0 没有输入区域，边框本身仍会接收点击
+        return [window]
+
+    def _bar_frame(self, x, y, width, height, thickness, pixel):
+        """没有 SHAPE 扩展时用四个窗口拼出边框。"""
+        return [
+            self._create_window(x - thickness, y - thickness, width + 2 * thickness, thickness, pixel),
+            self._create_window(x - thickness, y + height, width + 2 * thickness, thickness, pixel),
+            self._create_window(x - thickness, y, thickness, height, pixel),
+            self._create_window(x + width, y, thickness, height, pixel),
+        ]
+
+    def show(self, rects, color=DEFAULT_COLOR, thickness=DEFAULT_THICKNESS, duration=DEFAULT_DURATION):
+        """
+        高亮一组矩形 [(x, y, width, height), ...]，替换之前的高亮。
+
+        duration 秒后自动隐藏；为 None 或 0 时一直显示，直到调用 hide()。
+        """
+        with self._lock:
+            self._hide_locked()
+            pixel = self._pixel(color)
+            for x, y, width, height in rects:
+                if self._has_shape:
+                    windows = self._shaped_frame(x, y, width, height, thickness, pixel)
+                else:
+                    windows = self._bar_frame(x, y, width, height, thickness, pixel)
+                for window in windows:
+                    window.map()
+                self._windows.extend(windows)
+            self.display.flush()
+            if duration:
+                self._timer = threading.Timer(duration, self.hide)
+                self._timer.daemon = True
+                self._timer.start()
+            return len(rects)
+
+    def _hide_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for window in self._windows:
+            try:
+                window.destroy()
+            except Exception:
+                pass
+        self._windows = []
+
+    def hide(self):
+        """移除所有高亮框。"""
+        with self._lock:
+            self._hide_locked()
+            try:
+                self.display.flush()
+            except Exception:
+                pass
+
+    @property
+    def visible(self):
+        with self._lock:
+            return bool(self._windows)
+
+    def close(self):
+        self.hide()
+        with self._lock:
+            self.display.close()
+
+
+_overlay = None
+_overlay_lock = threading.Lock()
+
+
+def get_overlay():
+    """进程内共享的高亮覆盖层（处理器实例之间共用，后一次高亮替换前一次）。"""
+    global _overlay
+    with _overlay_lock:
+        if _overlay is None:
+            _overlay = HighlightOverlay()
+        return _overlay
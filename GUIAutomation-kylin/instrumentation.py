@@ -0,0 +1,349 @@
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+import contextlib
+
+# 设置为 JSON lines 文件路径即开启记录，例如 GUIAUTOMATION_TRACE=/tmp/gui_trace.jsonl
+TRACE_ENV = "GUIAUTOMATION_TRACE"
+
+# 阶段名称
+PHASE_HANDLER = "handler"    # 创建平台处理器
+PHASE_LOOKUP = "lookup"      # 查找窗口/元素
+PHASE_INPUT = "input"        # 发送鼠标/键盘输入
+PHASE_DELAY = "delay"        # before_delay / after_delay 等固定延时
+PHASE_FALLBACK = "fallback"  # 备用路径（边界点击、xdotool 等）
+PHASE_OTHER = "other"        # 不属于以上阶段的时间
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class CallRecord:
+    """一次被记录的方法调用。阶段时间互斥，各阶段之和等于总耗时。"""
+
+    __slots__ = ("name", "depth", "start", "wall", "phases", "counters", "fallbacks", "error", "thread")
+
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.start = time.time()
+        self.wall = 0.0
+        self.phases = {}
+        self.counters = {}
+        self.fallbacks = []
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "start": self.start,
+            "wall": self.wall,
+            "phases": self.phases,
+            "counters": self.counters,
+            "fallbacks": self.fallbacks,
+            "error": self.error,
+            "thread": self.thread,
+        }
+
+
+class _ThreadState(threading.local):
+    def __init__(self):
+        self.records = []
+        self.phases = []
+        self.mark = time.perf_counter()
+
+
+class JsonLinesSink:
+    """把每条调用记录写成一行 JSON。"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, record):
+        line = json.dumps(record.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class SummarySink:
+    """按方法名汇总调用次数、耗时、阶段、计数器和备用路径，生成结束时的汇总表。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+
+    def __call__(self, record):
+        with self._lock:
+            row = self._rows.get(record.name)
+            if row is None:
+                row = {"depth": record.depth, "calls": 0, "errors": 0, "wall": 0.0, "max": 0.0,
+                       "phases": {}, "counters": {}, "fallbacks": {}}
+                self._rows[record.name] = row
+            row["depth"] = min(row["depth"], record.depth)
+            row["calls"] += 1
+            row["errors"] += 1 if record.error else 0
+            row["wall"] += record.wall
+            row["max"] = max(row["max"], record.wall)
+            for phase, seconds in record.phases.items():
+                row["phases"][phase] = row["phases"].get(phase, 0.0) + seconds
+            for counter, value in record.counters.items():
+                row["counters"][counter] = row["counters"].get(counter, 0) + value
+            for path in record.fallbacks:
+                row["fallbacks"][path] = row["fallbacks"].get(path, 0) + 1
+
+    def rows(self):
+        with self._lock:
+            return {name: dict(row) for name, row in self._rows.items()}
+
+    def table(self):
+        """汇总表文本，外层调用在前，按总耗时降序。"""
+        rows = sorted(self.rows().items(), key=lambda item: (item[1]["depth"], -item[1]["wall"]))
+        if not rows:
+            return ""
+        phase_names = [PHASE_HANDLER, PHASE_LOOKUP, PHASE_INPUT, PHASE_DELAY, PHASE_FALLBACK, PHASE_OTHER]
+        header = (f"{'method':<44}{'calls':>6}{'err':>5}{'total ms':>11}{'mean ms':>10}{'max ms':>10}"
+                  + "".join(f"{name + ' ms':>13}" for name in phase_names) + "  counters / fallbacks")
+        lines = [header, "-" * len(header)]
+        for name, row in rows:
+            calls = row["calls"]
+            line = (f"{'  ' * row['depth'] + name:<44}{calls:>6}{row['errors']:>5}"
+                    f"{row['wall'] * 1000:>11.1f}{row['wall'] * 1000 / calls:>10.1f}{row['max'] * 1000:>10.1f}"
+                    + "".join(f"{row['phases'].get(p, 0.0) * 1000:>13.1f}" for p in phase_names))
+            extras = [f"{k}={v}" for k, v in sorted(row["counters"].items())]
+            extras += [f"fallback:{k}={v}" for k, v in sorted(row["fallbacks"].items())]
+            lines.append(line + "  " + " ".join(extras))
+        return "\n".join(lines)
+
+
+class Instrumentation:
+    """
+    可插拔的调用记录层。
+
+    - instrument_class() 包装 GUIAutomation / LinuxHandler 的方法，每次调用生成一条 CallRecord；
+    - phase() 标记当前代码所处阶段，时间只计入最内层阶段；
+    - count() / cache() / fallback() 记录计数器、缓存命中和触发的备用路径，计入调用栈上所有记录；
+    - 备用路径另有进程级计数（fallback_counts()），不开启记录也会累加；
+    - 记录交给 sinks（JsonLinesSink、SummarySink 或任意可调用对象）。
+
+    未开启时各入口只做一次布尔判断，不产生记录。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sinks = []
+        self.summary = None
+        self._state = _ThreadState()
+        self._probes = []
+        self._summary_registered = False
+        self._fallback_counts = {}
+        self._fallback_lock = threading.Lock()
+
+    # ---------------- 开关 ----------------
+
+    def enable(self, trace_path=None, summary=True, probes=True):
+        """开启记录。trace_path 为 JSON lines 输出文件；summary 为 True 时进程退出打印汇总表。"""
+        if trace_path:
+            self.sinks.append(JsonLinesSink(trace_path))
+        if summary and self.summary is None:
+            self.summary = SummarySink()
+            self.sinks.append(self.summary)
+            if not self._summary_registered:
+                atexit.register(self.print_summary)
+                self._summary_registered = True
+        if probes:
+            self._install_probes()
+        self.enabled = True
+
+    def disable(self):
+        """关闭记录并撤销 D-Bus / X 计数探针。"""
+        self.enabled = False
+        self._remove_probes()
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+        self.sinks = [self.summary] if self.summary is not None else []
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def print_summary(self):
+        if self.summary is not None:
+            table = self.summary.table()
+            if table:
+                print(table)
+
+    # ---------------- 计时 ----------------
+
+    def _tick(self, state):
+        now = time.perf_counter()
+        elapsed = now - state.mark
+        state.mark = now
+        if state.records and elapsed > 0:
+            phase = state.phases[-1] if state.phases else PHASE_OTHER
+            for record in state.records:
+                record.phases[phase] = record.phases.get(phase, 0.0) + elapsed
+
+    @contextlib.contextmanager
+    def _phase(self, name):
+        state = self._state
+        self._tick(state)
+        state.phases.append(name)
+        try:
+            yield
+        finally:
+            self._tick(state)
+            state.phases.pop()
+
+    def phase(self, name):
+        """with INSTRUMENTATION.phase("lookup"): ... 标记一段代码所属的阶段。"""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._phase(name)
+
+    def count(self, counter, value=1):
+        """累加计数器（如 atspi_calls、x_round_trips）。"""
+        if not self.enabled:
+            return
+        for record in self._state.records:
+            record.counters[counter] = record.counters.get(counter, 0) + value
+
+    def cache(self, cache_name, hit):
+        """记录一次缓存命中或未命中。"""
+        if self.enabled:
+            self.count(f"{cache_name}_cache_{'hit' if hit else 'miss'}")
+
+    def fallback(self, path):
+        """记录触发的备用路径，例如 "atspi"、"bounds"、"xdotool"。"""
+        with self._fallback_lock:
+            self._fallback_counts[path] = self._fallback_counts.get(path, 0) + 1
+        if not self.enabled:
+            return
+        for record in self._state.records:
+            record.fallbacks.append(path)
+
+    def fallback_counts(self, reset=False):
+        """进程启动（或上次 reset）以来各备用路径触发的次数 {path: count}。"""
+        with self._fallback_lock:
+            counts = dict(self._fallback_counts)
+            if reset:
+                self._fallback_counts.clear()
+        return counts
+
+    def _call(self, name, func, args, kwargs):
+        state = self._state
+        self._tick(state)
+        record = CallRecord(name, len(state.records))
+        state.records.append(record)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            record.error = str(e)
+            raise
+        finally:
+            self._tick(state)
+            state.records.remove(record)
+            record.wall = time.perf_counter() - started
+            for sink in list(self.sinks):
+                try:
+                    sink(record)
+                except Exception:
+                    pass
+
+    def wrap(self, name, func, phase=None):
+        """返回被记录的函数。phase 不为空时只标记阶段，不生成单独的调用记录。"""
+        if phase is not None:
+            @functools.wraps(func)
+            def phase_wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self._phase(phase):
+                    return func(*args, **kwargs)
+            return phase_wrapper
+
+        @functools.wraps(func)
+        def call_wrapper(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            return self._call(name, func, args, kwargs)
+        return call_wrapper
+
+    def instrument_class(self, cls, prefix=None, phases=None):
+        """
+        包装类中定义的所有公开方法（含静态方法）。
+
+        phases: {私有方法名: 阶段名}，这些方法不单独记录，只把耗时计入对应阶段。
+        """
+        prefix = prefix or cls.__name__
+        phases = phases or {}
+        for attr_name, attr in list(cls.__dict__.items()):
+            if attr_name.startswith("_") and attr_name not in phases:
+                continue
+            phase = phases.get(attr_name)
+            if isinstance(attr, staticmethod):
+                setattr(cls, attr_name, staticmethod(self.wrap(f"{prefix}.{attr_name}", attr.__func__, phase)))
+            elif callable(attr) and not isinstance(attr, type):
+                setattr(cls, attr_name, self.wrap(f"{prefix}.{attr_name}", attr, phase))
+        return cls
+
+    # ---------------- D-Bus / X 计数探针 ----------------
+
+    def _patch(self, owner, attr_name, counter, predicate=None):
+        original = getattr(owner, attr_name, None)
+        if original is None:
+            return
+        instrumentation = self
+
+        @functools.wraps(original)
+        def counted(*args, **kwargs):
+            if predicate is None or predicate(args, kwargs):
+                instrumentation.count(counter)
+            return original(*args, **kwargs)
+        try:
+            setattr(owner, attr_name, counted)
+        except (AttributeError, TypeError):
+            return
+        self._probes.append((owner, attr_name, original))
+
+    def _install_probes(self):
+        """对 AT-SPI 访问器和 python-xlib 请求计数；相应库不可用时跳过。"""
+        if self._probes:
+            return
+        try:
+            import gi
+            gi.require_version('Atspi', '2.0')
+            from gi.repository import Atspi
+            for method in ("get_name", "get_role_name", "get_role", "get_id", "get_text", "get_child_count",
+                           "get_child_at_index", "get_parent", "get_index_in_parent", "get_extents",
+                           "get_state_set", "get_process_id"):
+                self._patch(Atspi.Accessible, method, "atspi_calls")
+        except (ImportError, ValueError):
+            pass
+        try:
+            from Xlib.protocol import display as protocol_display
+            self._patch(protocol_display.Display, "send_and_recv", "x_round_trips",
+                        lambda args, kwargs: kwargs.get("request") is not None)
+        except ImportError:
+            pass
+
+    def _remove_probes(self):
+        while self._probes:
+            owner, attr_name, original = self._probes.pop()
+            setattr(owner, attr_name, original)
+
+
+INSTRUMENTATION = Instrumentation()
+
+if os.environ.get(TRACE_ENV):
+    INSTRUMENTATION.enable(os.environ[TRACE_ENV])
@@ -1,9 +1,30 @@
 import os
 import time
+import weakref
+import threading
 import subprocess
 import pyautogui
+import x11_tools
+import tree_export
 from platform_handler import PlatformHandler
 from element_locator import ElementLocator, parse_locator
+from element_ref import ElementRef
+from screen_capture import get_capture, release_capture, save_png
+from region_watch import RegionWatcher, DEFAULT_THRESHOLD
+from template_matcher import get_matcher, parse_image_locator, DEFAULT_CONFIDENCE, DEFAULT_SCALES
+from tree_snapshot import TreeSnapshot
+from unique_locator import LocatorGenerator
+from tree_selectors import compile_xpath, compile_css
+from highlight_overlay import get_overlay, DEFAULT_COLOR, DEFAULT_DURATION, DEFAULT_THICKNESS
+from locator_hints import get_hint_store, LocatorHintStore
+from instrumentation import INSTRUMENTATION, PHASE_INPUT, PHASE_FALLBACK, PHASE_LOOKUP
+from gui_logging import get_logger, dump_on_failure
+from deadline import Deadline, DeadlineExceeded
+from atspi_health import get_atspi_health, is_bus_error, STATE_OPEN
+from atspi_transport import get_transport, RemoteNode
+from atspi_cache import get_cache_policy, set_cache_policy
+from desktop_search import (search_apps, atspi_section, get_app_blacklist, app_key, is_timeout_error, SEARCH_WORKERS,
+                            APP_TIMEOUT)
 import contextlib
 
 try:
@@ -39,49 +60,201 @@ def x11_display_connection():
         if 'display' in locals() and display:
             display.close()
 
+# python-xlib 的 Display 不是线程安全的：每个线程持有自己的连接，线程内复用
+_thread_local = threading.local()
+
+# 鼠标/键盘输入和焦点切换作用于整个X服务器，进程内所有处理器实例共用一把可重入锁
+_INPUT_LOCK = threading.RLock()
+
+# 进程内存活的处理器（弱引用）：熔断器只注册一个模块级监听函数，不持有处理器，处理器释放后自动移除
+_HANDLERS = weakref.WeakSet()
+
+
+def _on_atspi_health_change(old_state, new_state, reason):
+    """AT-SPI 总线熔断时，缓存的元素随总线一起失效，清空所有存活处理器的元素缓存。"""
+    if new_state != STATE_OPEN:
+        return
+    for handler in list(_HANDLERS):
+        with handler._cache_lock:
+            handler.element_cache.clear()
+
+# click_element 的 AT-SPI 查找最多用到预算结束前这么多秒，留给边界点击、窗口点击等备用路径
+FALLBACK_RESERVE = 1.0
+
+# 可以使用路径提示的定位器类型
+HINTABLE_LOCATORS = ("id", "name", "role", "text", "xpath", "css")
+
+# 在树快照上求值的选择器定位器类型（tree_snapshot / tree_selectors）
+SELECTOR_LOCATORS = ("xpath", "css")
+
+# get_child_elements 等返回的元素信息字段
+ELEMENT_FIELDS = ("name", "role", "id", "text", "rectangle", "states")
+
+# 唯一定位器的判断范围：元素所在的窗口、应用或整个桌面
+LOCATOR_SCOPES = ("window", "app", "desktop")
+
+# 可以由直接 D-Bus 传输层（atspi_transport）批量读取的定位器类型和元素字段。
+# 传输层只用于本来就要读取整棵（子）树的操作：快照、选择器、导出和子元素遍历；
+# 单个 name / role 定位器的查找逐个应用进行，找到即停，并受单个应用的时限约束
+TRANSPORT_LOCATORS = ("name", "role")
+TRANSPORT_FIELDS = ("name", "role", "level", "element")
+
+# 各子系统日志器，级别可通过 GUIAUTOMATION_LOG 分别设置，参数在输出时才格式化
+window_log = get_logger("window")
+element_log = get_logger("element")
+input_log = get_logger("input")
+fallback_log = get_logger("fallback")
+
+def thread_display_connection():
+    """返回当前线程专属的 X11 连接 (display, root)，首次调用时建立，之后在该线程内复用。"""
+    if not XLIB_AVAILABLE:
+        return None, None
+    display = getattr(_thread_local, 'display', None)
+    if display is None:
+        try:
+            display = Xlib.display.Display()
+        except Exception:
+            return None, None
+        _thread_local.display = display
+        _thread_local.root = display.screen().root
+    return display, _thread_local.root
+
+def reset_thread_display_connection():
+    """关闭并丢弃当前线程的 X11 连接，下次使用时重新建立（连接断开后调用）。"""
+    display = getattr(_thread_local, 'display', None)
+    _thread_local.display = None
+    _thread_local.root = None
+    if display is not None:
+        try:
+            display.close()
+        except Exception:
+            pass
+
 class LinuxHandler(PlatformHandler):
-    """kylin平台下的GUI自动化处理器实现，封装了窗口、应用、元素等自动化操作。"""
+    """kylin平台下的GUI自动化处理器实现，封装了窗口、应用、元素等自动化操作。
+
+    线程模型：
+    - 同一个处理器实例可以被多个线程同时使用。X11 请求走每个线程自己的连接
+      (thread_display_connection)，三个缓存由 _cache_lock 保护。
+    - 查询类操作（查找窗口/元素、获取大小、类名、进程、文本、边界、状态、子元素等）可并行执行。
+    - 输入类操作（点击、移动鼠标、输入文本、按键、勾选）以及切换焦点的 set_active_window
+      在进程内全局串行（_INPUT_LOCK）。元素查找在锁外完成，只有真正发送输入的部分持锁。
+    - 需要把多个输入动作作为一个整体执行时（例如先激活窗口再输入），用 input_session() 包住。
+    """
     
     def __init__(self):
         # 初始化元素定位器
         self.element_locator = ElementLocator()
         self.display = None
         self.root = None
+        self._cache_lock = threading.RLock()  # 保护 app_cache / window_cache / element_cache
+        self._input_lock = _INPUT_LOCK
         
         # 初始化AT-SPI接口（辅助技术接口）
         if ATSPI_AVAILABLE:
             try:
                 Atspi.init()
             except Exception as e:
-                print(f"LWARN: Atspi.init() failed: {e}. AT-SPI features may be limited.")
+                element_log.warning("Atspi.init() failed: %s. AT-SPI features may be limited.", e)
                 # 即使Atspi.init()失败，ATSPI_AVAILABLE可能仍为True，但实际操作可能失败。
         
         self.app_cache = {}  # 应用程序缓存，记录已打开应用的pid
         self.window_cache = {}  # 窗口缓存，记录窗口ID
         self.element_cache = {}  # 元素缓存，记录已定位的元素
         self.ATSPI_AVAILABLE = ATSPI_AVAILABLE # 默认与全局一致，子类可覆盖
-    
+        self.hint_store = get_hint_store()  # 跨进程持久化的定位器路径提示，None 表示关闭
+        # 桌面搜索同时搜索的应用数（<= 1 为逐个应用搜索）、单个应用的时限，以及无响应应用的黑名单（进程内共用）
+        self.search_workers = SEARCH_WORKERS
+        self.app_timeout = APP_TIMEOUT
+        self.app_blacklist = get_app_blacklist()
+        # AT-SPI 总线熔断器（进程内共用）；熔断时缓存的元素随总线一起失效
+        self.atspi_health = get_atspi_health() if ATSPI_AVAILABLE else None
+        if self.atspi_health is not None:
+            _HANDLERS.add(self)
+            self.atspi_health.add_listener(_on_atspi_health_change)
+
+    def _atspi_failed(self, error):
+        """记录 AT-SPI 调用异常；总线因此熔断时抛出 AT-SPI_BUS_ERROR，调用方不再继续轮询。"""
+        health = self.atspi_health
+        if health is not None and health.record_error(error) and not health.is_closed():
+            raise Exception(f"AT-SPI_BUS_ERROR: {error}")
+
+    @property
+    def cache_policy(self):
+        """当前的 libatspi 缓存策略（atspi_cache，进程内共用）。"""
+        return get_cache_policy()
+
+    def set_cache_policy(self, name):
+        """切换缓存策略：off / none / locators / prefetch / all，返回新策略。"""
+        return set_cache_policy(name)
+
+    def _transport(self):
+        """直接 D-Bus 传输层，不可用或被关闭时返回 None。"""
+        return get_transport() if ATSPI_AVAILABLE else None
+
+    def _remote_tree(self, accessible=None, max_depth=None):
+        """
+        用传输层批量读取 accessible 的子树（省略时为整个桌面），返回 RemoteNode；传输层不可用时返回 None。
+
+        总线级错误照常抛出（计入熔断器）；其他错误记录后返回 None，调用方改用 libatspi 逐个读取。
+        """
+        transport = self._transport()
+        if transport is None:
+            return None
+        try:
+            if accessible is None:
+                return transport.desktop(Atspi.get_desktop(0), max_depth, self.app_blacklist)
+            return transport.subtree(accessible, max_depth)
+        except Exception as e:
+            if is_bus_error(e):
+                raise
+            element_log.debug("传输层读取失败，改用 libatspi: %s", e)
+            return None
+
+    @staticmethod
+    def _accessible(element):
+        """RemoteNode 换成对应的 Atspi.Accessible（树已变化时为 None），其他对象原样返回。"""
+        return element.resolve() if isinstance(element, RemoteNode) else element
+
     def _get_display_connection(self):
-        """获取一个新的 X11 display 连接。用于与X11窗口系统交互，返回display和root对象。"""
-        if not XLIB_AVAILABLE:
-            return None, None
+        """获取当前线程的 X11 display 连接。用于与X11窗口系统交互，返回display和root对象。"""
+        return thread_display_connection()
+
+    @contextlib.contextmanager
+    def _display_connection(self):
+        """在当前线程的 X11 连接上执行操作；连接出错时丢弃，下次调用重新建立。"""
+        display, root = thread_display_connection()
         try:
-            display = Xlib.display.Display()
-            root = display.screen().root
-            return display, root
-        except Exception:
-            return None, None
+            yield display, root
+        except Exception as e:
+            if XLIB_AVAILABLE and isinstance(e, (Xlib.error.ConnectionClosedError, Xlib.error.DisplayError)):
+                reset_thread_display_connection()
+            raise
+
+    @contextlib.contextmanager
+    def _input_section(self):
+        """持有输入锁执行一段输入操作，耗时计入 input 阶段。"""
+        with self._input_lock:
+            with INSTRUMENTATION.phase(PHASE_INPUT):
+                yield
+
+    def input_session(self):
+        """返回输入锁。with handler.input_session(): 内的多个输入动作不会与其他线程的输入交错。"""
+        return self._input_lock
     
     def open_application(self, app_path):
         """打开应用程序。若已在缓存中且进程存活则直接返回，否则启动新进程并缓存其pid。"""
         try:
             # 检查应用程序是否已在缓存中
-            if app_path in self.app_cache and self._is_process_running(self.app_cache[app_path]):
-                return self.app_cache[app_path]
+            with self._cache_lock:
+                cached_pid = self.app_cache.get(app_path)
+            if cached_pid and self._is_process_running(cached_pid):
+                return cached_pid
             
             # 启动应用程序
             process = subprocess.Popen(app_path, shell=True)
-            self.app_cache[app_path] = process.pid
+            with self._cache_lock:
+                self.app_cache[app_path] = process.pid
             
             # 等待应用程序启动
             time.sleep(1)
@@ -104,20 +277,23 @@ class LinuxHandler(PlatformHandler):
             raise Exception("Xlib不可用，无法查找窗口")
         
         # 操作必须在显示连接上下文中执行
-        with x11_display_connection() as (display, root):
+        with self._display_connection() as (display, root):
             if not display or not root:
                 raise Exception("无法连接到X11显示服务器 (_find_window_by_title)")
 
             # 检查缓存（缓存存储窗口ID）
-            if window_title in self.window_cache:
-                window_id = self.window_cache[window_title]
+            with self._cache_lock:
+                window_id = self.window_cache.get(window_title)
+            INSTRUMENTATION.cache("window", window_id is not None)
+            if window_id is not None:
                 try:
                     # 用当前display和缓存ID创建窗口对象
                     cached_window_obj = display.create_resource_object('window', window_id)
                     cached_window_obj.get_attributes()  # 验证窗口是否存在
                     return cached_window_obj # 有效对象
                 except Exception: # 缓存失效
-                    del self.window_cache[window_title]
+                    window_log.debug("窗口缓存失效: %s (id=%s)", window_title, window_id)
+                    self._forget_window(window_title)
             
             # 递归查找窗口
             def search_window_recursive(current_window_obj, title_to_find):
@@ -149,13 +325,24 @@ class LinuxHandler(PlatformHandler):
             found_window_obj = search_window_recursive(root, window_title)
             
             if found_window_obj:
-                self.window_cache[window_title] = found_window_obj.id # 缓存ID
+                with self._cache_lock:
+                    self.window_cache[window_title] = found_window_obj.id # 缓存ID
                 return found_window_obj # 有效对象
             
         raise Exception(f"找不到窗口: {window_title}")
 
-    def close_window(self, window_obj, window_title):
-        """关闭窗口。优先通过Xlib发送关闭事件，失败时尝试使用xdotool命令关闭。"""
+    def _forget_window(self, window_title):
+        """从窗口缓存中移除指定标题（不存在时忽略）。"""
+        if window_title:
+            with self._cache_lock:
+                self.window_cache.pop(window_title, None)
+
+    def close_window(self, window_obj, window_title, force=False):
+        """
+        关闭窗口。通过Xlib向窗口发送一次关闭请求（WM_DELETE_WINDOW），应用可以先询问是否保存修改。
+
+        force 为 True 时，窗口在 CLOSE_GRACE_PERIOD 秒内没有关闭就直接销毁（xdotool windowclose），未保存的数据会丢失。
+        """
         try:
             if not XLIB_AVAILABLE:
                 raise Exception("Xlib不可用，无法关闭窗口")
@@ -172,55 +359,47 @@ class LinuxHandler(PlatformHandler):
                 raise Exception("无法确定要关闭的窗口: 需要 window_obj 或 window_title")
 
             # 在新display上下文中操作
-            with x11_display_connection() as (display, root):
+            with self._display_connection() as (display, root):
                 if not display or not root:
                     raise Exception("无法连接到X11显示服务器 (close_window)")
 
                 # 创建窗口对象
                 window_to_act_on = display.create_resource_object('window', window_id)
-            
-                wm_delete = display.intern_atom('WM_DELETE_WINDOW')
-                wm_protocols = display.intern_atom('WM_PROTOCOLS')
-                
-                # 构造关闭事件
-                data = [wm_delete, Xlib.X.CurrentTime, 0, 0, 0]
-                
-                ev = event.ClientMessage(
-                    window=window_to_act_on,
-                    client_type=wm_protocols,
-                    data=(32, data)
-                )
-                
-                mask = Xlib.X.SubstructureRedirectMask | Xlib.X.SubstructureNotifyMask
-                root.send_event(ev, event_mask=mask)
-                display.flush()
+                x11_tools.request_close(display, window_to_act_on)
+
+                # 只有调用方要求强制关闭时，才销毁没有按请求关闭的窗口
+                if force and not x11_tools.wait_window_gone(window_to_act_on, x11_tools.CLOSE_GRACE_PERIOD):
+                    INSTRUMENTATION.fallback("xlib_destroy")
+                    fallback_log.info("close_window - '%s' still open after WM_DELETE_WINDOW, destroying it", window_title)
+                    x11_tools.close_window(display, root, window_to_act_on)
             
             # 从缓存移除
-            if window_title and window_title in self.window_cache:
-                del self.window_cache[window_title]
-            
-            # 补充：尝试xdotool关闭
-            try:
-                print(f"LDEBUG: close_window - Attempting xdotool windowclose for title '{window_title}'")
-                subprocess.run(['xdotool', 'search', '--name', str(window_title), 'windowclose', '%1'], 
-                                 check=False, stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL, timeout=2)
-            except Exception as xde:
-                print(f"LWARN: close_window - xdotool windowclose attempt failed for '{window_title}': {xde}")
-            
+            self._forget_window(window_title)
             return True
         except Exception as e:
-            # 如果 Xlib 方法失败，尝试使用 xdotool 作为最后手段
+            # 如果 Xlib 方法失败，按标题重新查找窗口；只有强制关闭时才销毁它
             try:
-                print(f"LWARN: close_window - Xlib close failed ('{e}'). Attempting xdotool fallback for title '{window_title}'.")
-                subprocess.run(['xdotool', 'search', '--name', str(window_title), 'windowclose', '%1'], 
-                                 check=True, stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL, timeout=2)
-                print(f"LINFO: close_window - xdotool windowclose fallback SUCCEEDED for '{window_title}'.")
-                if window_title and window_title in self.window_cache:
-                    del self.window_cache[window_title]
+                window_log.warning("close_window - Xlib close failed ('%s'). Attempting fallback for title '%s'.", e, window_title)
+                with INSTRUMENTATION.phase(PHASE_FALLBACK):
+                    if force and x11_tools.use_xdotool():
+                        INSTRUMENTATION.fallback("xdotool")
+                        result = x11_tools.run_xdotool(['search', '--name', window_title, 'windowclose', '%1'])
+                        if result.returncode != 0:
+                            raise Exception(f"xdotool 返回 {result.returncode}")
+                    else:
+                        INSTRUMENTATION.fallback("xlib_close")
+                        with self._display_connection() as (display, root):
+                            window = x11_tools.find_window(display, root, str(window_title))
+                            if force:
+                                x11_tools.close_window(display, root, window)
+                            else:
+                                x11_tools.request_close(display, window)
+                fallback_log.info("close_window - fallback SUCCEEDED for '%s'.", window_title)
+                self._forget_window(window_title)
                 return True
-            except Exception as xde_fallback:
-                print(f"LERROR: close_window - xdotool windowclose fallback also FAILED for '{window_title}': {xde_fallback}")
-                raise Exception(f"关闭窗口失败 (Xlib and xdotool attempts failed): {e}")
+            except Exception as fallback_error:
+                fallback_log.error("close_window - fallback also FAILED for '%s': %s", window_title, fallback_error)
+                raise Exception(f"关闭窗口失败 (Xlib close and fallback failed): {e}")
     
     def get_active_window(self):
         """获取活动窗口"""
@@ -228,14 +407,18 @@ class LinuxHandler(PlatformHandler):
             if not XLIB_AVAILABLE:
                 raise Exception("Xlib不可用，无法获取活动窗口")
             
-            active_window_atom = self.display.intern_atom('_NET_ACTIVE_WINDOW')
-            active_window = self.root.get_property(active_window_atom, Xlib.X.AnyPropertyType, 0, 1).value[0]
-            return self.display.create_resource_object('window', active_window)
+            with self._display_connection() as (display, root):
+                if not display or not root:
+                    raise Exception("无法连接到X11显示服务器 (get_active_window)")
+                active_window_atom = display.intern_atom('_NET_ACTIVE_WINDOW')
+                active_window = root.get_property(active_window_atom, Xlib.X.AnyPropertyType, 0, 1).value[0]
+                return display.create_resource_object('window', active_window)
         except Exception as e:
             raise Exception(f"获取活动窗口失败: {e}")
     
-    def set_active_window(self, window_title):
-        """设置活动窗口"""
+    def set_active_window(self, window_title, time_out=None):
+        """设置活动窗口。time_out 为秒数或调用方的 Deadline，限制激活后的等待和备用路径的耗时"""
+        deadline = Deadline.coerce(time_out)
         try:
             if not XLIB_AVAILABLE:
                 raise Exception("Xlib不可用，无法设置活动窗口")
@@ -246,57 +429,64 @@ class LinuxHandler(PlatformHandler):
                 raise Exception(f"找不到窗口 (for set_active_window): {window_title}")
             window_id_to_activate = temp_xlib_window_for_id.id
 
-            with x11_display_connection() as (display, root):
-                if not display or not root:
-                    raise Exception("无法连接到X11显示服务器 (set_active_window)")
+            with self._input_section():
+                with self._display_connection() as (display, root):
+                    if not display or not root:
+                        raise Exception("无法连接到X11显示服务器 (set_active_window)")
                 
 
-                window_to_activate_obj = display.create_resource_object('window', window_id_to_activate)
+                    window_to_activate_obj = display.create_resource_object('window', window_id_to_activate)
 
-                active_atom = display.intern_atom('_NET_ACTIVE_WINDOW')
+                    active_atom = display.intern_atom('_NET_ACTIVE_WINDOW')
 
-                ev = event.ClientMessage(
-                    window=root, 
-                    client_type=active_atom,
-                    data=(32, [
-                        1,       
-                        Xlib.X.CurrentTime, 
-                        window_to_activate_obj.id, 
-                        0, 
-                        0  
-                    ])
-                )
+                    ev = event.ClientMessage(
+                        window=root, 
+                        client_type=active_atom,
+                        data=(32, [
+                            1,       
+                            Xlib.X.CurrentTime, 
+                            window_to_activate_obj.id, 
+                            0, 
+                            0  
+                        ])
+                    )
                 
                 
-                mask = Xlib.X.SubstructureRedirectMask | Xlib.X.SubstructureNotifyMask
-                root.send_event(ev, event_mask=mask)
-                display.flush()
+                    mask = Xlib.X.SubstructureRedirectMask | Xlib.X.SubstructureNotifyMask
+                    root.send_event(ev, event_mask=mask)
+                    display.flush()
                 
                
-                window_to_activate_obj.map() 
-                window_to_activate_obj.raise_window() 
-                window_to_activate_obj.set_input_focus(Xlib.X.RevertToParent, Xlib.X.CurrentTime) 
-                display.sync() 
+                    window_to_activate_obj.map() 
+                    window_to_activate_obj.raise_window() 
+                    window_to_activate_obj.set_input_focus(Xlib.X.RevertToParent, Xlib.X.CurrentTime) 
+                    display.sync() 
                 
-                time.sleep(0.5) 
+                    deadline.sleep(0.5)
             
             return True
         except Exception as e:
-            # If Xlib methods fail, try xdotool as a last resort
-            print(f"LDEBUG: set_active_window Xlib failed for '{window_title}': {e}. Trying xdotool.")
+            # Xlib 方法失败时，按 xdotool windowactivate 的方式重新查找并激活第一个匹配的窗口
+            window_log.debug("set_active_window Xlib failed for '%s': %s. Trying windowactivate fallback.", window_title, e)
             try:
-                # 如果同名窗口多个，使用 '%1' 激活第一个匹配
-                safe_title = str(window_title)
-                # Use '%1' to activate the first match if multiple windows have the same name
-                subprocess.run(['xdotool', 'search', '--name', safe_title, 'windowactivate', '%1'], 
-                                 check=True, stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL, timeout=3)
-                print(f"LINFO: set_active_window succeeded with xdotool for '{window_title}'.")
+                with self._input_lock, INSTRUMENTATION.phase(PHASE_FALLBACK):
+                    if x11_tools.use_xdotool():
+                        INSTRUMENTATION.fallback("xdotool")
+                        result = x11_tools.run_xdotool(['search', '--name', window_title, 'windowactivate', '%1'],
+                                                       timeout=deadline.limit(3))
+                        if result.returncode != 0:
+                            raise Exception(f"xdotool 返回 {result.returncode}")
+                    else:
+                        INSTRUMENTATION.fallback("xlib_activate")
+                        with self._display_connection() as (display, root):
+                            x11_tools.activate_window(display, root, x11_tools.find_window(display, root, str(window_title)))
+                fallback_log.info("set_active_window succeeded with windowactivate fallback for '%s'.", window_title)
                 return True
-            except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as xde:
-                print(f"LWARN: set_active_window xdotool also failed for '{window_title}': {xde}")
+            except Exception as xde:
+                fallback_log.warning("set_active_window windowactivate fallback also failed for '%s': %s", window_title, xde)
                 # 继续执行，以便抛出原始 Xlib 异常，该异常对主要方法更具信息量
             
-            raise Exception(f"设置活动窗口失败 (Xlib primary and xdotool fallback failed): {e}")
+            raise Exception(f"设置活动窗口失败 (Xlib primary and windowactivate fallback failed): {e}")
     
     def change_window_state(self, window_title, state):
         """更改窗口状态"""
@@ -311,7 +501,7 @@ class LinuxHandler(PlatformHandler):
             window_id = temp_window.id
 
             # 在新的 X11 连接上下文中执行状态更改
-            with x11_display_connection() as (display, root):
+            with self._display_connection() as (display, root):
                 if not display or not root:
                     raise Exception("无法连接到X11显示服务器 (change_window_state)")
 
@@ -362,31 +552,28 @@ class LinuxHandler(PlatformHandler):
             if not XLIB_AVAILABLE:
                 return False
             
-            print(f"检查窗口是否存在：{window_title}...")
+            window_log.debug("检查窗口是否存在：%s...", window_title)
             
             # 尝试使用主要机制查找窗口
             # _find_window_by_title will raise an exception if not found after its search.
             self._find_window_by_title(window_title)
             return True
         except Exception:
-            # If _find_window_by_title fails, it means it couldn't find it via Xlib directly.
-            # Now, try xdotool as a fallback.
-            pass # 继续执行，以使用 xdotool 回退
+            # _find_window_by_title 按子串匹配 WM_NAME；找不到时再按 xdotool search --name 的方式
+            # （_NET_WM_NAME、不区分大小写的正则）查找一次
+            pass
 
         try:
-            # 确保 window_title 为适用于命令行的简单字符串
-            safe_title = str(window_title)
-            # xdotool search 返回码：找到时为 0，未找到时为 1
-            # It also prints the window ID(s) to stdout.
-            result = subprocess.run(['xdotool', 'search', '--name', safe_title], 
-                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, timeout=2)
-            # Check if return code is 0 and stdout is not empty (i.e., at least one window ID was printed)
-            return result.returncode == 0 and result.stdout.strip() != b''
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            # xdotool failed or not found
-            return False
+            with INSTRUMENTATION.phase(PHASE_FALLBACK):
+                if x11_tools.use_xdotool():
+                    INSTRUMENTATION.fallback("xdotool")
+                    # xdotool search 返回码：找到时为 0，未找到时为 1，并输出窗口ID
+                    result = x11_tools.run_xdotool(['search', '--name', window_title])
+                    return result.returncode == 0 and result.stdout.strip() != ''
+                INSTRUMENTATION.fallback("xlib_search")
+                with self._display_connection() as (display, root):
+                    return bool(x11_tools.search_windows(display, root, str(window_title), limit=1))
         except Exception:
-            # Any other exception during xdotool execution
             return False
     
     def get_window_size(self, window_title):
@@ -402,7 +589,7 @@ class LinuxHandler(PlatformHandler):
             window_id = temp_xlib_window.id
 
             # 现在在新的受管理显示连接上下文中操作
-            with x11_display_connection() as (display, root):
+            with self._display_connection() as (display, root):
                 if not display or not root:
                     raise Exception("无法连接到X11显示服务器 (get_window_size)")
 
@@ -429,7 +616,7 @@ class LinuxHandler(PlatformHandler):
                 raise Exception(f"找不到窗口 (for resize_window): {window_title}")
             window_id_to_resize = temp_xlib_window_for_id.id
 
-            with x11_display_connection() as (display, root):
+            with self._display_connection() as (display, root):
                 if not display or not root:
                     raise Exception("无法连接到X11显示服务器 (resize_window)")
 
@@ -457,7 +644,7 @@ class LinuxHandler(PlatformHandler):
             window_id = temp_window.id
 
             # 在新的 X11 连接上下文中移动窗口
-            with x11_display_connection() as (display, root):
+            with self._display_connection() as (display, root):
                 if not display or not root:
                     raise Exception("无法连接到X11显示服务器 (move_window)")
                 window = display.create_resource_object('window', window_id)
@@ -480,7 +667,7 @@ class LinuxHandler(PlatformHandler):
             window_id = temp_window.id
 
             # 在新的 X11 连接上下文中执行置顶操作
-            with x11_display_connection() as (display, root):
+            with self._display_connection() as (display, root):
                 if not display or not root:
                     raise Exception("无法连接到X11显示服务器 (set_window_topmost)")
 
@@ -513,7 +700,7 @@ class LinuxHandler(PlatformHandler):
             window_id = temp_window.id
 
             # 在新的 X11 连接上下文中获取类名
-            with x11_display_connection() as (display, root):
+            with self._display_connection() as (display, root):
                 if not display or not root:
                     raise Exception("无法连接到X11显示服务器 (get_window_class_name)")
                 window = display.create_resource_object('window', window_id)
@@ -550,7 +737,7 @@ class LinuxHandler(PlatformHandler):
             return None
         try:
             # 在新的 X11 连接上下文中获取 PID
-            with x11_display_connection() as (display, root):
+            with self._display_connection() as (display, root):
                 if not display or not root:
                     return None
                 pid_atom = display.intern_atom('_NET_WM_PID')
@@ -580,83 +767,240 @@ class LinuxHandler(PlatformHandler):
     
     # AT-SPI辅助方法
     def _find_accessible_element(self, locator, timeout=10):
-        """使用AT-SPI查找元素"""
+        """使用AT-SPI查找元素。timeout 为秒数或调用方的 Deadline（只使用其剩余时间）"""
         if not self.ATSPI_AVAILABLE: # 检查此实例是否应使用AT-SPI
-            print("LINFO: AT-SPI support is explicitly disabled in this handler instance. Cannot use AT-SPI for element finding.")
+            element_log.info("AT-SPI support is explicitly disabled in this handler instance. Cannot use AT-SPI for element finding.")
             raise Exception("AT-SPI_DISABLED_BY_HANDLER")
 
         if not ATSPI_AVAILABLE: # 这是全局Python绑定的可用性检查
-            print("LERROR: AT-SPI Python bindings (gi.repository.Atspi) are not imported/available.")
+            element_log.error("AT-SPI Python bindings (gi.repository.Atspi) are not imported/available.")
             raise Exception("AT-SPI_BINDINGS_NOT_AVAILABLE")
         
-        # 检查桌面是否可访问，这可以更早地捕获AT-SPI总线问题
-        try:
-            desktop = Atspi.get_desktop(0)
-            if not desktop:
-                print("LERROR: Failed to get AT-SPI desktop (desktop is None). Accessibility bus may not be running.")
-                raise Exception("AT-SPI_DESKTOP_UNAVAILABLE")
-            # 如果可行且快速，可添加 child_count 或 应用程序名称检查
-        except Exception as e:
-            print(f"LERROR: Critical AT-SPI error during desktop access: {e}. Accessibility bus may not be running or accessible.")
-            raise Exception(f"AT-SPI_BUS_ERROR: {e}")
+        # 总线熔断中立即失败（AT-SPI_BUS_ERROR），不在已经断开的总线上耗尽超时；正常时没有额外的探测调用
+        self.atspi_health.check()
 
-        cache_key = f"{locator}_{timeout}"
-        if cache_key in self.element_cache:
-            element = self.element_cache[cache_key]
+        deadline = Deadline.coerce(timeout)
+        # 缓存只按定位器区分：同一个定位器无论超时多少都指向同一个元素
+        cache_key = locator
+        with self._cache_lock:
+            element = self.element_cache.get(cache_key)
+        INSTRUMENTATION.cache("element", element is not None)
+        if element is not None:
             try:
                 element.get_name() # Simple validation
                 return element
             except Exception:
-                del self.element_cache[cache_key]
+                with self._cache_lock:
+                    self.element_cache.pop(cache_key, None)
         
         locator_type, locator_value = parse_locator(locator)
+        if locator_type in SELECTOR_LOCATORS:
+            # 语法错误立即报告，不进入轮询
+            self._compile_selector(locator_type, locator_value)
+
+        # 先按上次运行记录的路径直接定位，只需少量 get_child_at_index 调用
+        if self.hint_store is not None and locator_type in HINTABLE_LOCATORS:
+            element = self._find_by_hint(locator, locator_type, locator_value)
+            if element:
+                with self._cache_lock:
+                    self.element_cache[cache_key] = element
+                return element
         
+        # 至少搜索一次（timeout 为 0 时即单次探测），失败后按剩余时间轮询
         start_time = time.time()
-        while time.time() - start_time < timeout:
+        fresh = False
+        while True:
             try:
-                # Re-fetch desktop in loop in case it becomes available, though initial check is better
-                current_desktop = Atspi.get_desktop(0) 
-                if not current_desktop:
-                    time.sleep(0.5)
-                    continue
-
-                for app_index in range(current_desktop.get_child_count()):
-                    app = current_desktop.get_child_at_index(app_index)
-                    if not app: continue
-                    for window_index in range(app.get_child_count()):
-                        window = app.get_child_at_index(window_index)
-                        if not window: continue
-                        element = self._find_element_recursive(window, locator_type, locator_value)
-                        if element:
-                            self.element_cache[cache_key] = element
-                            return element
+                with deadline.stage("atspi"):
+                    element = self._search_desktop_once(locator_type, locator_value, deadline)
+                self.atspi_health.record_success()
+                if element:
+                    element_log.debug("找到元素: %s (%.3fs)", locator, time.time() - start_time)
+                    with self._cache_lock:
+                        self.element_cache[cache_key] = element
+                    if self.hint_store is not None and locator_type in HINTABLE_LOCATORS:
+                        self._remember_hint(locator, element)
+                    return element
             except Exception as e_inner_loop:
                 # 记录循环中的小错误，但不立即使整个搜索失败
-                # print(f"LDEBUG: AT-SPI search inner loop exception: {e_inner_loop}")
-                pass 
-            
-            time.sleep(0.5)
+                element_log.debug("AT-SPI search inner loop exception: %s", e_inner_loop)
+                self._atspi_failed(e_inner_loop)
+
+            # 第一遍可能读到了过期的缓存：清空后立即再搜索一遍，之后每次轮询前都清空
+            if not fresh:
+                fresh = True
+                if self.cache_policy.invalidate():
+                    continue
+            if deadline.expired():
+                break
+            deadline.sleep(0.5)
+            self.cache_policy.invalidate()
         
-        print(f"LWARN: Element not found via AT-SPI within {timeout}s: {locator}")
-        raise Exception(f"AT-SPI_ELEMENT_NOT_FOUND: {locator}")
+        element_log.warning("Element not found via AT-SPI within %ss: %s", deadline.budget, locator)
+        raise DeadlineExceeded(f"AT-SPI_ELEMENT_NOT_FOUND: {locator}", deadline)
+
+    def _resolve_element(self, locator, time_out=10):
+        """定位器字符串按 _find_accessible_element 查找；ElementRef 直接返回其中的元素，不再查找。"""
+        if isinstance(locator, ElementRef):
+            return locator.accessible
+        return self._find_accessible_element(locator, time_out)
+
+    def find_element(self, locator, time_out=10):
+        """查找元素并返回 ElementRef，属性按需读取，可作为其他方法的 locator 参数。"""
+        if isinstance(locator, ElementRef):
+            return locator
+        try:
+            return ElementRef(self._find_accessible_element(locator, time_out), self, locator)
+        except Exception as e:
+            raise Exception(f"查找元素失败: {e}")
+
+    def _search_desktop_once(self, locator_type, locator_value, deadline=None):
+        """
+        在桌面所有应用的窗口中查找一遍，不等待；找不到返回None。
+
+        各应用在常驻搜索线程中按桌面顺序搜索（desktop_search.search_apps），返回桌面顺序中的第一个匹配；
+        search_workers > 1 时多个应用同时搜索。一次调用超过 app_timeout 没有返回的应用进入黑名单，之后的搜索暂时跳过它。
+        """
+        # Re-fetch desktop in loop in case it becomes available, though initial check is better
+        current_desktop = Atspi.get_desktop(0) 
+        if not current_desktop:
+            return None
+        if locator_type in SELECTOR_LOCATORS:
+            return self._select_first(None, locator_type, locator_value)
+
+        apps = []
+        with atspi_section(self.app_timeout):
+            for app_index in range(current_desktop.get_child_count()):
+                app = current_desktop.get_child_at_index(app_index)
+                if not app: continue
+                key = app_key(app)
+                if self.app_blacklist.blocked(key):
+                    element_log.debug("跳过无响应的应用: %s", key)
+                    continue
+                self.cache_policy.enter(app)
+                apps.append((key, app))
+        return search_apps(apps, lambda app, token: self._search_app(app, locator_type, locator_value, token),
+                           self.app_blacklist, self.app_timeout, self.search_workers,
+                           # 预算已用完时（例如 time_out=0 的单次探测）仍完整搜索一遍，只受单个应用的时限约束
+                           deadline if deadline is not None and not deadline.expired() else None)
     
+    def _search_app(self, app, locator_type, locator_value, token):
+        """
+        在一个应用的窗口中按先序查找（与 _find_element_recursive 的顺序一致）。每个节点检查是否已取消，
+        libatspi 调用在 token.step() 中串行执行并计时。
+        """
+        cache = self.cache_policy
+        with token.step():
+            stack = [app.get_child_at_index(i) for i in range(app.get_child_count() - 1, -1, -1)]
+        while stack:
+            if not token.alive():
+                return None
+            node = stack.pop()
+            if not node:
+                continue
+            with token.step():
+                if self._element_matches(node, locator_type, locator_value):
+                    return node
+                cache.note(node, "children")
+                try:
+                    stack.extend(node.get_child_at_index(i) for i in range(node.get_child_count() - 1, -1, -1))
+                except Exception as e:
+                    # 应用无响应时交给 search_apps 记入黑名单；其他错误（元素已销毁等）跳过该子树
+                    if is_timeout_error(e):
+                        raise
+        return None
+
+    def _find_by_hint(self, locator, locator_type, locator_value):
+        """按记录的子元素索引路径定位；指纹或定位条件不符时删除该提示并返回None。"""
+        store = self.hint_store
+        stale = []
+        try:
+            desktop = Atspi.get_desktop(0)
+            for app_index in range(desktop.get_child_count() if desktop else 0):
+                app = desktop.get_child_at_index(app_index)
+                if not app: continue
+                app_name = app.get_name()
+                if not store.has_hints_for(app_name): continue
+                version = store.app_version(app)
+                hint = store.lookup(app_name, version, locator)
+                if not hint: continue
+                node = app
+                for index in hint["path"]:
+                    node = node.get_child_at_index(index) if node else None
+                if (node and node.get_role_name() == hint["role"] and node.get_name() == hint["name"]
+                        and self._hint_matches(node, locator_type, locator_value, desktop, [app_index] + hint["path"])):
+                    store.note_hit()
+                    INSTRUMENTATION.cache("hint", True)
+                    element_log.debug("路径提示命中: %s -> %s", locator, hint["path"])
+                    return node
+                # 同名应用（多个实例）共用提示，所有实例都不匹配时才删除
+                stale.append((app_name, version))
+            for app_name, version in stale:
+                element_log.debug("路径提示失效，已删除: %s (%s)", locator, app_name)
+                store.forget(app_name, version, locator)
+        except Exception:
+            pass
+        store.note_miss()
+        INSTRUMENTATION.cache("hint", False)
+        return None
+
+    def _hint_matches(self, node, locator_type, locator_value, desktop, path):
+        """
+        提示指向的元素是否仍匹配定位器。path 为元素相对桌面的子元素序号路径。
+
+        XPath / CSS 与查找时一样以桌面为根求值（录制的定位器可能锚定在应用或桌面上，
+        如 /desktop frame/application[2]/...），但快照只展开元素所在的应用和窗口，
+        其他应用、窗口只记录自身；该窗口内的第一个匹配为该元素即可。
+        """
+        if locator_type not in SELECTOR_LOCATORS:
+            return self._element_matches(node, locator_type, locator_value)
+        snapshot = TreeSnapshot(desktop, self._element_field, branch=path[:2])
+        snapshot_node = self._snapshot_node(snapshot, path)
+        if snapshot_node is None:
+            return False
+        matches = self._select(snapshot, locator_type, locator_value)
+        return bool(matches) and matches[0] is snapshot_node
+
+    def _element_hint(self, element):
+        """
+        元素的路径提示 {"app", "version", "path", "role", "name"}：相对其所属应用的子元素索引路径及 role/name 指纹。
+        不在任何应用中时返回 None。
+        """
+        path = []
+        node = element
+        while node.get_role() != Atspi.Role.APPLICATION:
+            path.append(node.get_index_in_parent())
+            node = node.get_parent()
+            if node is None or len(path) > 256:
+                return None
+        path.reverse()
+        store = self.hint_store or LocatorHintStore()
+        return {"app": node.get_name(), "version": store.app_version(node), "path": path,
+                "role": element.get_role_name(), "name": element.get_name()}
+
+    def _remember_hint(self, locator, element):
+        """记录元素相对其所属应用的子元素索引路径及 role/name 指纹。"""
+        try:
+            hint = self._element_hint(element)
+            if hint is not None:
+                self.hint_store.record(hint["app"], hint["version"], locator, hint["path"], hint["role"], hint["name"])
+        except Exception:
+            pass
+
     def _find_element_recursive(self, parent, locator_type, locator_value):
         """递归查找元素"""
         if not ATSPI_AVAILABLE:
             return None
+        if locator_type in SELECTOR_LOCATORS:
+            return self._select_first(parent, locator_type, locator_value)
         
         try:
             # 检查当前元素是否匹配
-            if locator_type == "id" and parent.get_id() == locator_value:
-                return parent
-            elif locator_type == "name" and parent.get_name() == locator_value:
-                return parent
-            elif locator_type == "role" and parent.get_role_name() == locator_value:
-                return parent
-            elif locator_type == "text" and parent.get_text() == locator_value:
+            if self._element_matches(parent, locator_type, locator_value):
                 return parent
             
             # 递归检查子元素
+            self.cache_policy.note(parent, "children")
             for i in range(parent.get_child_count()):
                 child = parent.get_child_at_index(i)
                 if child:
@@ -668,50 +1012,425 @@ class LinuxHandler(PlatformHandler):
         
         return None
     
-    def highlight_element(self, locator):
-        """高亮元素"""
+    def _element_matches(self, element, locator_type, locator_value):
+        """判断单个元素是否匹配定位器（id/name/role/text）。"""
         try:
-            element = self._find_accessible_element(locator)
-            if element:
-                # 获取元素位置和大小
-                coords = element.get_extents(Atspi.CoordType.SCREEN)
-                x, y, width, height = coords.x, coords.y, coords.width, coords.height
-                
-                # 使用pyautogui绘制矩形框模拟高亮
-                current_x, current_y = pyautogui.position()
-                
-                # 绘制四条边
-                pyautogui.moveTo(x, y)
-                pyautogui.dragTo(x + width, y, duration=0.1)
-                pyautogui.dragTo(x + width, y + height, duration=0.1)
-                pyautogui.dragTo(x, y + height, duration=0.1)
-                pyautogui.dragTo(x, y, duration=0.1)
-                
-                # 恢复鼠标位置
-                pyautogui.moveTo(current_x, current_y)
-                
-                return True
-            
-            raise Exception(f"无法高亮元素: {locator}")
+            if locator_type == "id":
+                return element.get_id() == locator_value
+            elif locator_type == "name":
+                if not isinstance(element, RemoteNode):
+                    self.cache_policy.note(element, "name")
+                return element.get_name() == locator_value
+            elif locator_type == "role":
+                if not isinstance(element, RemoteNode):
+                    self.cache_policy.note(element, "role")
+                return element.get_role_name() == locator_value
+            elif locator_type == "text":
+                return element.get_text() == locator_value
+        except Exception:
+            pass
+        return False
+
+    def find_elements(self, locators, timeout=10):
+        """
+        一次遍历桌面树同时解析多个定位器，返回 {定位器: 元素}。
+
+        每一轮只遍历一遍树，所有尚未解析的定位器在同一次遍历中匹配；
+        超时后仍未找到的定位器不会出现在结果中（由调用方决定如何处理）。
+        """
+        if not self.ATSPI_AVAILABLE or not ATSPI_AVAILABLE:
+            return {}
+        try:
+            self.atspi_health.check()
+        except Exception as e:
+            element_log.info("find_elements: %s", e)
+            return {}
+        pending = {}
+        for locator in locators:
+            if locator not in pending:
+                pending[locator] = parse_locator(locator)
+        found = {}
+        deadline = Deadline.coerce(timeout)
+        while pending:
+            try:
+                desktop = Atspi.get_desktop(0)
+                # 有选择器定位器时反正要读取整个桌面：只有 name / role / 选择器定位器时用传输层一次读取，
+                # 快照和 name / role 的遍历都在读取结果上进行；没有选择器时逐个应用遍历，找齐即停
+                remote = None
+                if (desktop and any(t in SELECTOR_LOCATORS for t, _ in pending.values())
+                        and all(t in SELECTOR_LOCATORS + TRANSPORT_LOCATORS for t, _ in pending.values())):
+                    remote = self._remote_tree()
+                # 选择器定位器在同一份桌面快照上求值
+                selectors = [locator for locator in pending if pending[locator][0] in SELECTOR_LOCATORS]
+                if selectors and desktop:
+                    snapshot = TreeSnapshot(remote, self._remote_field) if remote is not None else self.snapshot_tree(desktop)
+                    for locator in selectors:
+                        nodes = self._select(snapshot, *pending[locator])
+                        element = self._accessible(nodes[0].accessible) if nodes else None
+                        if element is not None:
+                            found[locator] = element
+                            del pending[locator]
+                roots = []
+                if remote is not None:
+                    roots = [window for app in remote.children or () for window in app.children or ()]
+                elif desktop:
+                    for app_index in range(desktop.get_child_count()):
+                        app = desktop.get_child_at_index(app_index)
+                        if not app: continue
+                        for window_index in range(app.get_child_count()):
+                            window = app.get_child_at_index(window_index)
+                            if window:
+                                roots.append(window)
+                # 先序遍历，与 _find_element_recursive 的匹配顺序一致
+                stack = list(reversed(roots))
+                while stack and any(pending[locator][0] not in SELECTOR_LOCATORS for locator in pending):
+                    node = stack.pop()
+                    for locator, (locator_type, locator_value) in list(pending.items()):
+                        if locator_type in SELECTOR_LOCATORS:
+                            continue
+                        if self._element_matches(node, locator_type, locator_value):
+                            element = self._accessible(node)
+                            if element is not None:
+                                found[locator] = element
+                                del pending[locator]
+                    try:
+                        children = [node.get_child_at_index(i) for i in range(node.get_child_count())]
+                    except Exception:
+                        continue
+                    stack.extend(child for child in reversed(children) if child)
+                self.atspi_health.record_success()
+            except Exception as e:
+                if self.atspi_health.record_error(e) and not self.atspi_health.is_closed():
+                    break
+            if not pending or deadline.expired():
+                break
+            deadline.sleep(0.5)
+            self.cache_policy.invalidate()
+        return found
+
+    # XPath / CSS 选择器：先建立树快照，再在内存中求值
+    def _compile_selector(self, locator_type, locator_value):
+        try:
+            return compile_xpath(locator_value) if locator_type == "xpath" else compile_css(locator_value)
+        except ValueError as e:
+            raise Exception(f"选择器语法错误: {e}")
+
+    def snapshot_tree(self, locator=None, max_depth=None, time_out=10):
+        """
+        建立可访问性树快照（tree_snapshot.TreeSnapshot），之后可用 .xpath() / .css() 多次查询。
+
+        locator 为定位器、ElementRef 或 Atspi 元素，省略时为整个桌面；max_depth 限制记录的层数。
+        """
+        if locator is None:
+            self.atspi_health.check()
+            root = None
+        elif isinstance(locator, (str, ElementRef)):
+            root = self._resolve_element(locator, time_out)
+        else:
+            root = locator
+        transport = self._transport()
+        calls = transport.calls if transport is not None else 0
+        # 传输层可用时先批量读取整棵子树，快照遍历的是已取得的 RemoteNode，不再逐个发起调用
+        remote = self._remote_tree(root, max_depth)
+        if remote is not None:
+            snapshot = TreeSnapshot(remote, self._remote_field, max_depth=max_depth)
+            snapshot.calls = transport.calls - calls
+        else:
+            snapshot = TreeSnapshot(root if root is not None else Atspi.get_desktop(0), self._element_field,
+                                    max_depth=max_depth)
+        INSTRUMENTATION.count("snapshot_nodes", len(snapshot))
+        element_log.debug("树快照: %d 个节点, %d 次调用, %.3fs", len(snapshot), snapshot.calls, snapshot.capture_time)
+        return snapshot
+
+    def _remote_field(self, element, field):
+        """快照延迟字段的读取函数：RemoteNode 先换成 Atspi.Accessible。"""
+        accessible = self._accessible(element)
+        return None if accessible is None else self._element_field(accessible, field)
+
+    def _select(self, snapshot, locator_type, locator_value):
+        return snapshot.select(self._compile_selector(locator_type, locator_value))
+
+    def _select_first(self, root, locator_type, locator_value):
+        """在 root 子树的快照上求值选择器，返回第一个匹配的 AT-SPI 元素；没有匹配返回None。"""
+        node = self.element_locator.find_element(self.snapshot_tree(root), f"{locator_type}:{locator_value}")
+        return self._accessible(node.accessible) if node is not None else None
+
+    def query_elements(self, selector, locator=None, max_count=None, time_out=10):
+        """
+        按 XPath / CSS 选择器查询全部匹配的元素，返回 ElementRef 列表（文档顺序）。
+
+        selector 形如 "xpath://push button[@name='确定']" 或 "css:panel > push_button"；
+        locator 指定查询的子树根（省略时为整个桌面），只建立一次快照。
+        """
+        locator_type, locator_value = parse_locator(selector)
+        if locator_type not in SELECTOR_LOCATORS:
+            raise ValueError(f"不支持的选择器类型: {locator_type}，应为 xpath 或 css")
+        snapshot = self.snapshot_tree(locator, time_out=time_out)
+        nodes = self._select(snapshot, locator_type, locator_value)
+        if max_count is not None:
+            nodes = nodes[:max_count]
+        elements = [self._accessible(node.accessible) for node in nodes]
+        return [ElementRef(element, self, selector) for element in elements if element is not None]
+
+    def dump_tree(self, path, locator=None, fields=(), max_depth=None, format=None, time_out=10):
+        """
+        把可访问性子树逐个节点写入导出文件（tree_export.dump_tree），返回 {"nodes", "bytes", "time", "truncated"}。
+
+        locator 为定位器、ElementRef 或 Atspi 元素，省略时为整个桌面；fields 为 role / name 之外要记录的字段
+        （id / text / rectangle / states，每个节点每个字段多一次调用）。导出应用或整个桌面时文件头记录应用名和版本，
+        之后可以用 tree_export.precompute_hints 离线生成路径提示。
+        """
+        fields = tuple(fields)
+        for field in fields:
+            if field not in ELEMENT_FIELDS:
+                raise ValueError(f"不支持的元素字段: {field}")
+        if locator is None:
+            self.atspi_health.check()
+            root = Atspi.get_desktop(0)
+        else:
+            root = self._resolve_element(locator, time_out)
+        header = {"root": locator if isinstance(locator, str) else None}
+        store = self.hint_store or LocatorHintStore()
+        try:
+            if locator is None:
+                apps = [root.get_child_at_index(i) for i in range(root.get_child_count())]
+                header["apps"] = [{"name": app.get_name(), "version": store.app_version(app)} if app else None
+                                  for app in apps]
+            elif root.get_role() == Atspi.Role.APPLICATION:
+                header["app"] = root.get_name()
+                header["app_version"] = store.app_version(root)
+        except Exception as e:
+            element_log.debug("读取应用版本失败，导出文件不能用于生成路径提示: %s", e)
+        stats = tree_export.dump_tree(root, path, format, fields, self._element_field, max_depth, header=header)
+        INSTRUMENTATION.count("dump_nodes", stats["nodes"])
+        element_log.debug("导出树: %s, %d 个节点, %d 字节, %.3fs", path, stats["nodes"], stats["bytes"], stats["time"])
+        return stats
+
+    # 图像定位（image:<路径>）：在窗口区域的截图中做模板匹配，不依赖 AT-SPI
+    def _is_image_locator(self, locator):
+        return isinstance(locator, str) and locator.lstrip().lower().startswith("image:")
+
+    def _window_rect(self, window):
+        """窗口在屏幕上的区域 (x, y, width, height)。window 可以是窗口标题或Xlib窗口对象"""
+        with self._display_connection() as (display, root):
+            if isinstance(window, str):
+                window = self._find_window_by_title(window)
+            geometry = window.get_geometry()
+            origin = window.translate_coords(root, 0, 0)
+            return -origin.x, -origin.y, geometry.width, geometry.height
+
+    def _image_search_region(self, window_title=None):
+        """模板匹配的搜索区域 (x, y, width, height)：指定的窗口；未指定时为活动窗口，取不到活动窗口时为整个屏幕。"""
+        try:
+            return self._window_rect(window_title or self.get_active_window())
+        except Exception as e:
+            if window_title:
+                raise
+            element_log.debug("取不到活动窗口区域，在整个屏幕中匹配: %s", e)
+            capture = self._capture()
+            return 0, 0, capture.width, capture.height
+
+    def find_image(self, value, confidence=None, scales=None):
+        """
+        在窗口区域截图中查找一次模板图像，返回 TemplateMatch（屏幕坐标，含 confidence / scale）。
+
+        value 为 image 定位器的值，例如 "/path/ok.png?confidence=0.85&scales=0.9,1,1.1&window=记事本"。
+        由 ElementLocator 的 image 定位类型调用；找不到时抛出异常。
+        """
+        path, options = parse_image_locator(value)
+        x, y, width, height = self._image_search_region(options.get("window"))
+        frame = self._capture().capture_rect(x, y, width, height)
+        match = get_matcher().match(frame, path,
+                                    confidence or options.get("confidence", DEFAULT_CONFIDENCE),
+                                    scales or options.get("scales", DEFAULT_SCALES),
+                                    (max(0, x), max(0, y)))
+        if match is None:
+            raise Exception("未找到匹配的图像区域")
+        return match
+
+    def _find_image_element(self, locator, time_out=10):
+        """按 image 定位器查找，time_out 秒内轮询（至少匹配一次），返回 TemplateMatch。"""
+        path, _ = parse_image_locator(parse_locator(locator)[1])
+        if not os.path.isfile(path):
+            raise Exception(f"模板图像不存在: {path}")
+        deadline = Deadline.coerce(time_out)
+        start_time = time.time()
+        while True:
+            try:
+                with deadline.stage("image"):
+                    match = self.element_locator.find_element(self, locator)
+                element_log.debug("图像匹配: %s -> %r (%.3fs)", locator, match, time.time() - start_time)
+                return match
+            except Exception as e:
+                last_error = e
+            if deadline.expired():
+                break
+            deadline.sleep(0.2)
+        element_log.warning("Image not found within %ss: %s", deadline.budget, locator)
+        raise DeadlineExceeded(f"IMAGE_ELEMENT_NOT_FOUND: {locator} ({last_error})", deadline)
+
+    def _element_extents(self, locator, time_out=10):
+        """元素的屏幕区域（有 x / y / width / height 属性）：image 定位器按模板匹配，其余按 AT-SPI get_extents。"""
+        if self._is_image_locator(locator):
+            return self._find_image_element(locator, time_out)
+        return self._resolve_element(locator, time_out).get_extents(Atspi.CoordType.SCREEN)
+
+    def highlight_element(self, locator, duration=DEFAULT_DURATION, color=DEFAULT_COLOR, thickness=DEFAULT_THICKNESS):
+        """高亮元素：在元素周围显示不接收输入的边框窗口，duration 秒后自动消失"""
+        try:
+            return self.highlight_elements([locator], duration, color, thickness)
         except Exception as e:
             raise Exception(f"高亮元素失败: {e}")
-    
+
+    def highlight_elements(self, locators, duration=DEFAULT_DURATION, color=DEFAULT_COLOR, thickness=DEFAULT_THICKNESS):
+        """同时高亮多个元素（替换之前的高亮）。duration 为 None 时一直显示，直到 hide_highlight()。"""
+        rects = []
+        for locator in locators:
+            coords = self._element_extents(locator)
+            rects.append((coords.x, coords.y, coords.width, coords.height))
+        get_overlay().show(rects, color, thickness, duration)
+        return True
+
+    def hide_highlight(self):
+        """移除所有高亮边框"""
+        get_overlay().hide()
+        return True
+
+    def release_thread_resources(self):
+        """关闭当前线程专属的 X 连接和截图实例（共享内存段）。短期线程结束前调用，例如守护进程的连接线程。"""
+        release_capture()
+        reset_thread_display_connection()
+
+    # 截图（NumPy 数组，BGRA，高 x 宽 x 4）
+    def _capture(self):
+        display, _ = self._get_display_connection()
+        return get_capture(display)
+
+    def capture_screen(self):
+        """截取整个屏幕"""
+        try:
+            return self._capture().capture_screen()
+        except Exception as e:
+            raise Exception(f"截图失败: {e}")
+
+    def capture_region(self, x, y, width, height):
+        """截取屏幕矩形区域"""
+        try:
+            return self._capture().capture_rect(x, y, width, height)
+        except Exception as e:
+            raise Exception(f"截图失败: {e}")
+
+    def capture_window(self, window):
+        """截取窗口区域。window 可以是窗口标题、窗口ID或Xlib窗口对象"""
+        try:
+            with self._display_connection() as (display, root):
+                if isinstance(window, str):
+                    window = self._find_window_by_title(window)
+                elif isinstance(window, int):
+                    window = display.create_resource_object('window', window)
+                return self._capture().capture_window(window)
+        except Exception as e:
+            raise Exception(f"窗口截图失败: {e}")
+
+    def capture_element(self, locator, time_out=10):
+        """截取元素区域（按 get_extents 的屏幕坐标）"""
+        try:
+            return self._capture().capture_extents(self._element_extents(locator, time_out))
+        except Exception as e:
+            raise Exception(f"元素截图失败: {e}")
+
+    def save_screenshot(self, path, window_title=None, locator=None):
+        """保存截图为 PNG：指定 locator 时截取元素，指定 window_title 时截取窗口，否则截取整个屏幕"""
+        if locator is not None:
+            frame = self.capture_element(locator)
+        elif window_title is not None:
+            frame = self.capture_window(window_title)
+        else:
+            frame = self.capture_screen()
+        return save_png(frame, path)
+
+    # 等待画面稳定 / 变化（截图 + 图块差分，可用 XDamage 时按重绘事件采样）
+    def _watch_rect(self, rect=None, window_title=None, time_out=10):
+        """
+        等待区域的屏幕坐标 (x, y, width, height)。
+
+        rect 可以是 (x, y, width, height)、get_element_bounds 格式的字典、定位器或 ElementRef；
+        指定 window_title 时元组 / 字典的坐标相对于窗口左上角，rect 省略时为整个窗口；两者都省略时为整个屏幕。
+        """
+        if rect is None:
+            if window_title:
+                return self._window_rect(window_title)
+            capture = self._capture()
+            return 0, 0, capture.width, capture.height
+        if isinstance(rect, (str, ElementRef)):
+            coords = self._element_extents(rect, time_out)
+            return coords.x, coords.y, coords.width, coords.height
+        if isinstance(rect, dict):
+            rect = (rect["x"], rect["y"], rect["width"], rect["height"])
+        x, y, width, height = rect
+        if window_title:
+            origin_x, origin_y, _, _ = self._window_rect(window_title)
+            x, y = x + origin_x, y + origin_y
+        return x, y, width, height
+
+    def wait_for_region_stable(self, rect=None, quiet_ms=500, time_out=10, window_title=None,
+                               threshold=DEFAULT_THRESHOLD, use_damage=True):
+        """等待区域连续 quiet_ms 毫秒没有像素变化（动画、异步重绘结束），返回等待的秒数"""
+        deadline = Deadline.coerce(time_out)
+        try:
+            region = self._watch_rect(rect, window_title, deadline)
+            with RegionWatcher(self._capture(), region, threshold=threshold, use_damage=use_damage) as watcher:
+                elapsed = watcher.wait_stable(quiet_ms, deadline.remaining())
+                window_log.debug("区域 %s 稳定: %.3fs, 截图 %d 次, XDamage=%s",
+                                 region, elapsed, watcher.samples, watcher.monitor is not None)
+                return elapsed
+        except Exception as e:
+            raise Exception(f"等待区域稳定失败: {e}")
+
+    def wait_for_region_change(self, rect=None, time_out=10, window_title=None,
+                               threshold=DEFAULT_THRESHOLD, baseline=None, use_damage=True):
+        """等待区域的像素与 baseline（省略时为调用时的画面）不同，返回等待的秒数"""
+        deadline = Deadline.coerce(time_out)
+        try:
+            region = self._watch_rect(rect, window_title, deadline)
+            with RegionWatcher(self._capture(), region, threshold=threshold, use_damage=use_damage) as watcher:
+                elapsed = watcher.wait_change(deadline.remaining(), baseline)
+                window_log.debug("区域 %s 变化: %.3fs, 截图 %d 次", region, elapsed, watcher.samples)
+                return elapsed
+        except Exception as e:
+            raise Exception(f"等待区域变化失败: {e}")
+
     def click_element(self, locator, mouse_button="left", click_type="single", 
                      activate_window=True, cursor_position="center", 
                      x_offset=0, y_offset=0, modifier_keys=None, 
                      smooth_move=False, time_out=10):
-        """点击元素"""
+        """
+        点击元素。
+
+        time_out 为整个调用（激活窗口、AT-SPI 查找和各级备用路径）的总预算：
+        AT-SPI 查找在预算结束前 FALLBACK_RESERVE 秒截止，备用路径只使用剩余时间，预算耗尽后不再开始新的备用路径。
+        """
+        deadline = Deadline.coerce(time_out)
+        reserve = min(FALLBACK_RESERVE, deadline.remaining() / 4)
         try:
             if activate_window:
                 # 获取元素所在窗口
                 window_title = self._get_window_title_from_locator(locator)
                 if window_title:
-                    self.set_active_window(window_title)
+                    with deadline.stage("activate"):
+                        self.set_active_window(window_title, deadline)
+
+            # 图像定位器：点击模板匹配到的区域，不走 AT-SPI 及其备用方法
+            if self._is_image_locator(locator):
+                bbox = self._find_image_element(locator, deadline)
+                x, y = self._calculate_click_coords(bbox.x, bbox.y, bbox.width, bbox.height, cursor_position, x_offset, y_offset)
+                self._perform_mouse_click(x, y, mouse_button, click_type, modifier_keys, smooth_move)
+                return True
             
             # 首先尝试使用AT-SPI点击
             if self.ATSPI_AVAILABLE:
                 try:
-                    element = self._find_accessible_element(locator, time_out)
+                    element = self._resolve_element(locator, deadline.child(reserve))
                     if element:
                         # 获取元素的屏幕坐标
                         bbox = element.get_extents(Atspi.CoordType.SCREEN)
@@ -721,12 +1440,15 @@ class LinuxHandler(PlatformHandler):
                         self._perform_mouse_click(x, y, mouse_button, click_type, modifier_keys, smooth_move)
                         return True
                 except Exception as e:
-                    print(f"AT-SPI点击失败: {e}，尝试备用方法")
+                    fallback_log.info("AT-SPI点击失败: %s，尝试备用方法", e)
             
-            # 备用方法：使用元素边界进行点击
+            # 备用方法：使用元素边界进行点击（只用剩余预算，不再重新开始一轮完整的超时）
             try:
+                deadline.check("边界点击")
                 # 获取元素边界
-                bounds = self.get_element_bounds(locator, "screen", time_out)
+                INSTRUMENTATION.fallback("bounds")
+                with INSTRUMENTATION.phase(PHASE_FALLBACK), deadline.stage("fallback/bounds"):
+                    bounds = self.get_element_bounds(locator, "screen", deadline.child(reserve / 2))
                 if bounds:
                     x, y = self._calculate_click_coords(bounds["x"], bounds["y"], bounds["width"], bounds["height"], cursor_position, x_offset, y_offset)
                     
@@ -734,27 +1456,32 @@ class LinuxHandler(PlatformHandler):
                     self._perform_mouse_click(x, y, mouse_button, click_type, modifier_keys, smooth_move)
                     return True
             except Exception as e:
-                print(f"边界点击失败: {e}，尝试xdotool方法")
+                fallback_log.info("边界点击失败: %s，尝试按窗口标题点击", e)
             
-            # 最后尝试使用xdotool定位并点击
+            # 最后按名称查找同名窗口，存在时在鼠标当前位置点击（xdotool search --name ... click 的行为）
             try:
                 parsed_locator = parse_locator(locator)
                 locator_type, locator_value = parsed_locator
                 
-                # 仅对某些类型的定位器尝试xdotool
+                # 仅对某些类型的定位器尝试按窗口标题点击
                 if locator_type in ["name", "class", "id"]:
-                    cmd = ["xdotool", "search", "--name", locator_value, "click", "1"]
-                    if mouse_button == "right":
-                        cmd[-1] = "3"
-                    elif mouse_button == "middle":
-                        cmd[-1] = "2"
-                    
-                    subprocess.run(cmd, check=False, stderr=subprocess.DEVNULL)
+                    deadline.check("窗口点击")
+                    with self._input_lock, INSTRUMENTATION.phase(PHASE_FALLBACK), deadline.stage("fallback/window"):
+                        if x11_tools.use_xdotool():
+                            INSTRUMENTATION.fallback("xdotool")
+                            button = {"right": "3", "middle": "2"}.get(mouse_button, "1")
+                            x11_tools.run_xdotool(["search", "--name", locator_value, "click", button],
+                                                  timeout=deadline.limit(x11_tools.XDOTOOL_TIMEOUT))
+                        else:
+                            INSTRUMENTATION.fallback("xlib_click")
+                            with self._display_connection() as (display, root):
+                                window = x11_tools.find_window(display, root, locator_value)
+                                x11_tools.click_window(display, root, window, mouse_button)
                     return True
-            except Exception:
-                pass
+            except Exception as e:
+                fallback_log.info("窗口点击失败: %s", e)
                 
-            raise Exception(f"点击元素失败: 无法找到或点击元素 {locator}")
+            raise Exception(f"点击元素失败: 无法找到或点击元素 {locator} ({deadline.report()})")
         except Exception as e:
             raise Exception(f"点击元素失败: {e}")
             
@@ -794,39 +1521,41 @@ class LinuxHandler(PlatformHandler):
         
     def _perform_mouse_click(self, x, y, mouse_button, click_type, modifier_keys, smooth_move):
         """执行鼠标点击"""
-        # 准备修饰键
-        mods = []
-        if modifier_keys:
-            for key in modifier_keys:
-                pyautogui.keyDown(key)
-                mods.append(key)
+        input_log.debug("鼠标点击 (%s, %s) button=%s type=%s modifiers=%s", x, y, mouse_button, click_type, modifier_keys)
+        with self._input_section():
+            # 准备修饰键
+            mods = []
+            if modifier_keys:
+                for key in modifier_keys:
+                    pyautogui.keyDown(key)
+                    mods.append(key)
         
-        try:
-            # 移动鼠标
-            if smooth_move:
-                pyautogui.moveTo(x, y, duration=0.5)
-            else:
-                pyautogui.moveTo(x, y)
+            try:
+                # 移动鼠标
+                if smooth_move:
+                    pyautogui.moveTo(x, y, duration=0.5)
+                else:
+                    pyautogui.moveTo(x, y)
             
-            # 执行点击
-            button = mouse_button
-            if button == "left":
-                button = "left"
-            elif button == "right":
-                button = "right"
-            elif button == "middle":
-                button = "middle"
+                # 执行点击
+                button = mouse_button
+                if button == "left":
+                    button = "left"
+                elif button == "right":
+                    button = "right"
+                elif button == "middle":
+                    button = "middle"
             
-            if click_type == "double":
-                pyautogui.doubleClick(button=button)
-            elif click_type == "right":
-                pyautogui.rightClick()
-            else:
-                pyautogui.click(button=button)
-        finally:
-            # 释放修饰键
-            for key in reversed(mods):
-                pyautogui.keyUp(key)
+                if click_type == "double":
+                    pyautogui.doubleClick(button=button)
+                elif click_type == "right":
+                    pyautogui.rightClick()
+                else:
+                    pyautogui.click(button=button)
+            finally:
+                # 释放修饰键
+                for key in reversed(mods):
+                    pyautogui.keyUp(key)
     
     # 以下方法按照相同的模式实现
     # 为了简化代码，实现其中几个关键方法，其余方法保持相同模式
@@ -836,10 +1565,9 @@ class LinuxHandler(PlatformHandler):
                        smooth_move=False, time_out=10):
         """移动到元素"""
         try:
-            element = self._find_accessible_element(locator, time_out)
-            if element:
+            coords = self._element_extents(locator, time_out)
+            if coords:
                 # 获取元素位置和大小
-                coords = element.get_extents(Atspi.CoordType.SCREEN)
                 x, y, width, height = coords.x, coords.y, coords.width, coords.height
                 
                 # 计算移动位置
@@ -859,21 +1587,22 @@ class LinuxHandler(PlatformHandler):
                     move_x = x + width + x_offset
                     move_y = y + height + y_offset
                 
-                # 应用修饰键
-                if modifier_keys:
-                    for key in modifier_keys:
-                        pyautogui.keyDown(key)
+                with self._input_section():
+                    # 应用修饰键
+                    if modifier_keys:
+                        for key in modifier_keys:
+                            pyautogui.keyDown(key)
                 
-                # 移动鼠标
-                if smooth_move:
-                    pyautogui.moveTo(move_x, move_y, duration=0.5)
-                else:
-                    pyautogui.moveTo(move_x, move_y)
+                    # 移动鼠标
+                    if smooth_move:
+                        pyautogui.moveTo(move_x, move_y, duration=0.5)
+                    else:
+                        pyautogui.moveTo(move_x, move_y)
                 
-                # 释放修饰键
-                if modifier_keys:
-                    for key in reversed(modifier_keys):
-                        pyautogui.keyUp(key)
+                    # 释放修饰键
+                    if modifier_keys:
+                        for key in reversed(modifier_keys):
+                            pyautogui.keyUp(key)
                 
                 return True
             
@@ -886,30 +1615,31 @@ class LinuxHandler(PlatformHandler):
                              click_before_input=False, time_out=10):
         """在元素中输入文本"""
         try:
-            element = self._find_accessible_element(locator, time_out)
-            if element:
+            coords = self._element_extents(locator, time_out)
+            if coords:
                 # 获取元素位置和大小
-                coords = element.get_extents(Atspi.CoordType.SCREEN)
                 x, y, width, height = coords.x, coords.y, coords.width, coords.height
+                input_log.debug("输入文本到 %s: %d 个字符", locator, len(text))
                 
                 # 如果需要，先点击元素
-                if click_before_input:
-                    click_x = x + width // 2
-                    click_y = y + height // 2
-                    pyautogui.click(click_x, click_y)
+                with self._input_section():
+                    if click_before_input:
+                        click_x = x + width // 2
+                        click_y = y + height // 2
+                        pyautogui.click(click_x, click_y)
                 
-                # 如果需要，清除原有内容
-                if clear_content:
-                    pyautogui.hotkey('ctrl', 'a')
-                    pyautogui.press('delete')
+                    # 如果需要，清除原有内容
+                    if clear_content:
+                        pyautogui.hotkey('ctrl', 'a')
+                        pyautogui.press('delete')
                 
-                # 输入文本
-                if input_interval > 0:
-                    for char in text:
-                        pyautogui.write(char)
-                        time.sleep(input_interval)
-                else:
-                    pyautogui.write(text)
+                    # 输入文本
+                    if input_interval > 0:
+                        for char in text:
+                            pyautogui.write(char)
+                            time.sleep(input_interval)
+                    else:
+                        pyautogui.write(text)
                 
                 return True
             
@@ -924,22 +1654,22 @@ class LinuxHandler(PlatformHandler):
                             click_before_input=False, time_out=10):
         """在元素中按键"""
         try:
-            element = self._find_accessible_element(locator, time_out)
-            if element:
+            coords = self._element_extents(locator, time_out)
+            if coords:
                 # 获取元素位置，如果需要先点击
-                if click_before_input:
-                    coords = element.get_extents(Atspi.CoordType.SCREEN)
-                    x, y, width, height = coords.x, coords.y, coords.width, coords.height
-                    click_x = x + width // 2
-                    click_y = y + height // 2
-                    pyautogui.click(click_x, click_y)
+                with self._input_section():
+                    if click_before_input:
+                        x, y, width, height = coords.x, coords.y, coords.width, coords.height
+                        click_x = x + width // 2
+                        click_y = y + height // 2
+                        pyautogui.click(click_x, click_y)
                 
-                # 应用修饰键并按键
-                if modifier_keys:
-                    keys = modifier_keys + [key]
-                    pyautogui.hotkey(*keys)
-                else:
-                    pyautogui.press(key)
+                    # 应用修饰键并按键
+                    if modifier_keys:
+                        keys = modifier_keys + [key]
+                        pyautogui.hotkey(*keys)
+                    else:
+                        pyautogui.press(key)
                 
                 if input_interval > 0:
                     time.sleep(input_interval)
@@ -956,71 +1686,290 @@ class LinuxHandler(PlatformHandler):
     
     def set_element_attribute(self, locator, attribute_name, value, time_out=10):
         """设置元素属性 - 实现版"""
+        deadline = Deadline.coerce(time_out)
         try:
-            element = self._find_accessible_element(locator, time_out)
-            # 文本或名称属性，通过输入实现
+            element = self._resolve_element(locator, deadline)
+            # 文本或名称属性，通过输入实现（传入已定位的元素，不再重新查找）
             if attribute_name.lower() in ("text", "name"):
-                return self.input_text_to_element(locator, value, clear_content=True, input_interval=0,
-                                                  activate_window=True, click_before_input=True, time_out=time_out)
+                return self.input_text_to_element(ElementRef(element, self, locator), value, clear_content=True,
+                                                  input_interval=0, activate_window=True, click_before_input=True,
+                                                  time_out=deadline)
             # 聚焦属性，通过点击元素中心实现
             elif attribute_name.lower() == "focus":
                 coords = element.get_extents(Atspi.CoordType.SCREEN)
-                pyautogui.click(coords.x + coords.width//2, coords.y + coords.height//2)
+                with self._input_section():
+                    pyautogui.click(coords.x + coords.width//2, coords.y + coords.height//2)
                 return True
             else:
                 raise NotImplementedError(f"Linux下不支持设置属性: {attribute_name}")
         except Exception as e:
             raise Exception(f"设置元素属性失败: {e}")
 
+    def _element_field(self, element, field):
+        """读取元素的单个字段，只发起该字段需要的 AT-SPI 调用。"""
+        if field == "name":
+            return element.get_name()
+        elif field == "role":
+            return element.get_role_name()
+        elif field == "id":
+            return element.get_id()
+        elif field == "text":
+            return element.get_text(0, -1) if hasattr(element, "get_text") else ""
+        elif field == "rectangle":
+            coords = element.get_extents(Atspi.CoordType.SCREEN)
+            return {"x": coords.x, "y": coords.y, "width": coords.width, "height": coords.height}
+        elif field == "states":
+            return [s.name for s in element.get_state_set()]
+        raise ValueError(f"不支持的元素字段: {field}")
+
+    def iter_child_elements(self, locator, min_level=2, max_level=None, fields=ELEMENT_FIELDS,
+                            max_count=None, time_out=10):
+        """
+        逐个产出子元素信息的生成器（非递归，按先序遍历顺序）。
+
+        层级与 get_child_elements 相同：定位到的父元素为第 1 层，其直接子元素为第 2 层。
+        只产出 min_level..max_level 层的元素（max_level 为空时等于 min_level），不会向下遍历超过 max_level 层；
+        fields 指定要读取的字段（ELEMENT_FIELDS 的子集，另可包含 "level" 和 "element"，后者为 ElementRef），只读取这些字段；
+        max_count 限制产出个数。消费者提前停止迭代时不再发起后续调用。
+        fields 只含 name / role / level / element 且传输层可用时，先按层批量读取到 max_level 层再逐个产出。
+        """
+        if max_level is None:
+            max_level = min_level
+        if min_level < 1 or max_level < min_level:
+            raise ValueError(f"无效的层级范围: {min_level}..{max_level}")
+        if max_count is not None and max_count <= 0:
+            return
+        parent = self._resolve_element(locator, time_out)
+        fields = tuple(fields)
+        if all(field in TRANSPORT_FIELDS for field in fields):
+            remote = self._remote_tree(parent, max_level - 1)
+            if remote is not None:
+                yield from self._iter_remote_elements(remote, min_level, max_level, fields, max_count)
+                return
+        produced = 0
+        # 栈中每项为 [元素, 层级, 子元素个数, 下一个子元素下标]，子元素个数在第一次展开时才读取
+        stack = [[parent, 1, None, 0]]
+        if min_level == 1:
+            yield self._element_info(parent, 1, fields)
+            produced += 1
+            if max_count is not None and produced >= max_count:
+                return
+        while stack:
+            frame = stack[-1]
+            element, level = frame[0], frame[1]
+            if level >= max_level:
+                stack.pop()
+                continue
+            if frame[2] is None:
+                try:
+                    frame[2] = element.get_child_count()
+                except Exception:
+                    frame[2] = 0
+            if frame[3] >= frame[2]:
+                stack.pop()
+                continue
+            index = frame[3]
+            frame[3] += 1
+            try:
+                child = element.get_child_at_index(index)
+            except Exception:
+                child = None
+            if child is None:
+                continue
+            if level + 1 >= min_level:
+                yield self._element_info(child, level + 1, fields)
+                produced += 1
+                if max_count is not None and produced >= max_count:
+                    return
+            stack.append([child, level + 1, None, 0])
+
+    def _iter_remote_elements(self, remote, min_level, max_level, fields, max_count):
+        """iter_child_elements 在传输层读取结果上的版本：字段都已取得，只有 element 需要换成 Atspi.Accessible。"""
+        produced = 0
+        stack = [(remote, 1)]
+        while stack:
+            node, level = stack.pop()
+            if level >= min_level:
+                info = {}
+                for field in fields:
+                    if field == "level":
+                        info[field] = level
+                    elif field == "element":
+                        element = node.resolve()
+                        info[field] = ElementRef(element, self) if element is not None else None
+                    elif field == "name":
+                        info[field] = node.get_name()
+                    else:
+                        info[field] = node.get_role_name()
+                yield info
+                produced += 1
+                if max_count is not None and produced >= max_count:
+                    return
+            if level < max_level and node.children:
+                stack.extend((child, level + 1) for child in reversed(node.children))
+
+    def _element_info(self, element, level, fields):
+        info = {}
+        for field in fields:
+            if field == "level":
+                info[field] = level
+            elif field == "element":
+                info[field] = ElementRef(element, self)
+            else:
+                info[field] = self._element_field(element, field)
+        return info
+
     def get_child_elements(self, locator, level):
-        """获取子元素 - 实现版"""
+        """获取第 level 层的全部子元素信息（iter_child_elements 的列表形式）。"""
         try:
-            parent = self._find_accessible_element(locator)
-            # 递归收集指定层级的元素
-            def collect(elem, curr, target):
-                if curr == target:
-                    return [elem]
-                res = []
-                for i in range(elem.get_child_count()):
-                    child = elem.get_child_at_index(i)
-                    res += collect(child, curr+1, target)
-                return res
-            elems = collect(parent, 1, level)
-            result = []
-            for e in elems:
-                coords = e.get_extents(Atspi.CoordType.SCREEN)
-                result.append({
-                    "name": e.get_name(),
-                    "role": e.get_role_name(),
-                    "id": e.get_id(),
-                    "text": e.get_text(0, -1) if hasattr(e, "get_text") else "",
-                    "rectangle": {"x": coords.x, "y": coords.y, "width": coords.width, "height": coords.height},
-                    "states": [s.name for s in e.get_state_set()]
-                })
-            return result
+            return list(self.iter_child_elements(locator, level, level, time_out=10))
         except Exception as e:
             raise Exception(f"获取子元素失败: {e}")
 
+    # 唯一定位器：在桌面（或元素所在应用 / 窗口）的快照上按属性出现次数生成（unique_locator）
+    def _scope_path(self, element, scope):
+        """元素所在范围的根（窗口 / 应用 / 桌面）及元素相对根的子元素序号路径。"""
+        if scope not in LOCATOR_SCOPES:
+            raise ValueError(f"不支持的定位器范围: {scope}，应为 {' / '.join(LOCATOR_SCOPES)}")
+        path = []
+        node = element
+        while True:
+            if scope == "app" and node.get_role() == Atspi.Role.APPLICATION:
+                break
+            parent = node.get_parent()
+            # 应用或桌面本身没有所在的窗口，范围扩大到上一级
+            if parent is None or (scope == "window" and parent.get_role() == Atspi.Role.APPLICATION):
+                break
+            path.append(node.get_index_in_parent())
+            node = parent
+            if len(path) > 256:
+                raise Exception("元素的层级过深")
+        path.reverse()
+        return (None if node.get_parent() is None else node), path
+
+    @staticmethod
+    def _snapshot_node(snapshot, path):
+        node = snapshot.root
+        for index in path:
+            if node is None or index >= len(node.children):
+                return None
+            node = snapshot.nodes[node.children[index]]
+        return node
+
+    def _scope_snapshot(self, element, scope):
+        """范围的快照、元素在快照中的节点及其定位器生成器。"""
+        root, path = self._scope_path(element, scope)
+        snapshot = self.snapshot_tree(root)
+        node = self._snapshot_node(snapshot, path)
+        if node is None or node.role != element.get_role_name() or node.name != element.get_name():
+            raise Exception("元素不在快照中，可访问性树可能已变化")
+        return snapshot, node, LocatorGenerator(snapshot)
+
+    def _locates(self, locator, element, snapshot=None):
+        """
+        定位器按实际的查找路径（路径提示、元素缓存、桌面搜索）是否解析到 element。
+
+        snapshot 为桌面快照时，选择器直接在其上求值（与桌面搜索相同），批量生成时不再为每个定位器重建快照。
+        """
+        try:
+            if snapshot is not None:
+                locator_type, locator_value = parse_locator(locator)
+                if locator_type in SELECTOR_LOCATORS:
+                    matches = self._select(snapshot, locator_type, locator_value)
+                    return bool(matches) and self._accessible(matches[0].accessible) == element
+            return self._find_accessible_element(locator, 0) == element
+        except Exception:
+            return False
+
+    def _unique_locator(self, element, scope):
+        """
+        element 在 scope 范围内唯一、且在整个桌面上查找时确实定位到它的最短定位器。
+        范围小于桌面时，范围内唯一的定位器可能先匹配到其他窗口 / 应用中的元素，都不能用时改为按桌面生成。
+        """
+        snapshot, node, generator = self._scope_snapshot(element, scope)
+        locator = generator.locator_for(node, lambda candidate: self._locates(candidate, element))
+        if locator is None and scope != "desktop":
+            return self._unique_locator(element, "desktop")
+        if locator is None:
+            raise Exception("生成的定位器都不能定位到该元素，可访问性树可能已变化")
+        return locator
+
+    def get_unique_locator(self, locator, scope="desktop", time_out=10):
+        """
+        元素的最短唯一定位器：name: / id: / role:，或 xpath 的角色 + 名称、链式、带序号路径。
+
+        scope 为判断唯一性的范围：desktop（默认，与查找的范围相同）、app 或 window（快照更小，
+        但范围内唯一的定位器可能在桌面上先匹配到其他元素，这样的候选会被跳过）。
+        返回前按实际的查找路径解析每个候选，确认定位到的就是该元素。
+        """
+        try:
+            element = self._resolve_element(locator, time_out)
+            return self._unique_locator(element, scope)
+        except Exception as e:
+            raise Exception(f"生成唯一定位器失败: {e}")
+
+    def element_at_point(self, x, y):
+        """
+        屏幕坐标处最深的元素（录制点击时使用）：先找包含该点的可见窗口（活动窗口优先），
+        再逐级 get_accessible_at_point；没有窗口包含该点时返回 None。
+        """
+        self.atspi_health.check()
+        desktop = Atspi.get_desktop(0)
+        windows = []
+        for app_index in range(desktop.get_child_count() if desktop else 0):
+            app = desktop.get_child_at_index(app_index)
+            if app is None:
+                continue
+            for window_index in range(app.get_child_count()):
+                window = app.get_child_at_index(window_index)
+                try:
+                    states = window.get_state_set()
+                    if not states.contains(Atspi.StateType.SHOWING):
+                        continue
+                    rect = window.get_extents(Atspi.CoordType.SCREEN)
+                except Exception:
+                    continue
+                if rect.x <= x < rect.x + rect.width and rect.y <= y < rect.y + rect.height:
+                    active = states.contains(Atspi.StateType.ACTIVE)
+                    windows.append((0 if active else 1, len(windows), window))
+        if not windows:
+            return None
+        node = min(windows, key=lambda item: item[:2])[2]
+        for _ in range(256):
+            try:
+                child = node.get_accessible_at_point(x, y, Atspi.CoordType.SCREEN)
+            except Exception:
+                child = None
+            if child is None or child == node:
+                break
+            node = child
+        return node
+
     def get_child_elements_locator(self, locator, level, locator_type="id"):
-        """获取子元素定位器 - 实现版"""
+        """获取子元素定位器 - 实现版；locator_type 为 unique 时在一个桌面快照上为每个子元素生成唯一定位器。"""
         try:
-            parent = self._find_accessible_element(locator)
-            def collect(elem, curr, target):
-                if curr == target:
-                    return [elem]
-                res = []
-                for i in range(elem.get_child_count()):
-                    res += collect(elem.get_child_at_index(i), curr+1, target)
-                return res
-            elems = collect(parent, 1, level)
+            locator_type = locator_type.lower()
+            if locator_type == "unique":
+                parent = self._resolve_element(locator, 10)
+                snapshot, node, generator = self._scope_snapshot(parent, "desktop")
+                depth = node.depth + level - 1
+                locators = []
+                for child in snapshot.nodes[node.index + 1:node.end]:
+                    if child.depth != depth:
+                        continue
+                    element = self._accessible(child.accessible)
+                    child_locator = generator.locator_for(
+                        child, lambda candidate: self._locates(candidate, element, snapshot))
+                    if child_locator is None:
+                        raise Exception(f"无法为子元素生成定位器: {child.role} {child.name}")
+                    locators.append(child_locator)
+                return locators
+            if locator_type not in ("id", "name", "role"):
+                return []
             locators = []
-            for e in elems:
-                if locator_type.lower() == "id" and e.get_id():
-                    locators.append(f"id:{e.get_id()}")
-                elif locator_type.lower() == "name" and e.get_name():
-                    locators.append(f"name:{e.get_name()}")
-                elif locator_type.lower() == "role" and e.get_role_name():
-                    locators.append(f"role:{e.get_role_name()}")
+            for info in self.iter_child_elements(locator, level, level, fields=(locator_type,), time_out=10):
+                if info[locator_type]:
+                    locators.append(f"{locator_type}:{info[locator_type]}")
             return locators
         except Exception as e:
             raise Exception(f"获取子元素定位器失败: {e}")
@@ -1028,7 +1977,7 @@ class LinuxHandler(PlatformHandler):
     def get_parent_element(self, locator):
         """获取父元素 - 实现版"""
         try:
-            elem = self._find_accessible_element(locator)
+            elem = self._resolve_element(locator)
             parent = elem.get_parent()
             if not parent:
                 return None
@@ -1047,10 +1996,12 @@ class LinuxHandler(PlatformHandler):
     def get_parent_element_locator(self, locator, locator_type="id"):
         """获取父元素定位器 - 实现版"""
         try:
-            elem = self._find_accessible_element(locator)
+            elem = self._resolve_element(locator)
             parent = elem.get_parent()
             if not parent:
                 return None
+            if locator_type.lower() == "unique":
+                return self.get_unique_locator(ElementRef(parent, self))
             if locator_type.lower() == "id" and parent.get_id():
                 return f"id:{parent.get_id()}"
             elif locator_type.lower() == "name" and parent.get_name():
@@ -1064,7 +2015,7 @@ class LinuxHandler(PlatformHandler):
     def get_element_text(self, locator, time_out=10):
         """获取元素文本 - 简化实现"""
         try:
-            element = self._find_accessible_element(locator, time_out)
+            element = self._resolve_element(locator, time_out)
             if element:
                 text = element.get_text(0, -1)
                 if text:
@@ -1076,10 +2027,21 @@ class LinuxHandler(PlatformHandler):
     
     def get_element(self, locator, time_out=10):
         """获取元素 - 尝试AT-SPI，如果禁用或失败，尝试非AT-SPI回退。"""
+        deadline = Deadline.coerce(time_out)
+        if self._is_image_locator(locator):
+            match = self._find_image_element(locator, deadline)
+            return {
+                "name": parse_locator(locator)[1],
+                "role": "image",
+                "text": "",
+                "rectangle": {"x": match.x, "y": match.y, "width": match.width, "height": match.height},
+                "states": ["visible"],
+                "confidence": match.confidence,
+            }
         try:
             # 优先尝试 AT-SPI (如果在此handler实例中启用)
             # _find_accessible_element 会在 self.ATSPI_AVAILABLE 为 False 时抛出 AT-SPI_DISABLED_BY_HANDLER
-            element_atspi = self._find_accessible_element(locator, time_out) 
+            element_atspi = self._resolve_element(locator, deadline)
             
             # 如果上面的调用没有因为AT-SPI禁用而抛出异常，说明AT-SPI被尝试了
             coords = element_atspi.get_extents(Atspi.CoordType.SCREEN)
@@ -1100,53 +2062,57 @@ class LinuxHandler(PlatformHandler):
             non_atspi_fallback_possible = True
 
             if exception_type == "AT-SPI_DISABLED_BY_HANDLER":
-                print(f"LINFO: get_element - AT-SPI is disabled by handler. Will attempt non-AT-SPI methods for locator: {locator}")
-            elif exception_type in ["AT-SPI_BINDINGS_NOT_AVAILABLE", "AT-SPI_DESKTOP_UNAVAILABLE", "AT-SPI_BUS_ERROR"]:
-                print(f"LWARN: get_element - AT-SPI system issue ({exception_type}). Will attempt non-AT-SPI methods for locator: {locator}")
+                element_log.info("get_element - AT-SPI is disabled by handler. Will attempt non-AT-SPI methods for locator: %s", locator)
+            elif exception_type.startswith(("AT-SPI_BINDINGS_NOT_AVAILABLE", "AT-SPI_DESKTOP_UNAVAILABLE", "AT-SPI_BUS_ERROR")):
+                element_log.warning("get_element - AT-SPI system issue (%s). Will attempt non-AT-SPI methods for locator: %s", exception_type, locator)
             elif exception_type.startswith("AT-SPI_ELEMENT_NOT_FOUND"):
-                print(f"LINFO: get_element - Element not found via AT-SPI. Will attempt non-AT-SPI methods for locator: {locator}")
+                element_log.info("get_element - Element not found via AT-SPI. Will attempt non-AT-SPI methods for locator: %s", locator)
             else:
                 # 对于其他未知AT-SPI错误或完全无关的错误，可能不适合回退
-                print(f"LERROR: get_element - Unexpected error during AT-SPI attempt: {e}. Non-AT-SPI fallback may not be attempted or may fail.")
+                element_log.error("get_element - Unexpected error during AT-SPI attempt: %s. Non-AT-SPI fallback may not be attempted or may fail.", e)
                 non_atspi_fallback_possible = False # Or decide based on error type
 
             if non_atspi_fallback_possible:
-                print(f"LINFO: get_element - Attempting non-AT-SPI fallback for: {locator}")
+                fallback_log.info("get_element - Attempting non-AT-SPI fallback for: %s", locator)
                 # 非AT-SPI后备逻辑：
                 # 这部分非常具有挑战性，因为不通过可访问性接口获取通用元素信息很困难。
-                # 这里的实现将非常基础，主要依赖xdotool（如果可用）进行窗口级的操作或非常简单的名称匹配。
+                # 这里的实现将非常基础，主要按窗口标题进行窗口级的操作（x11_tools，或 xdotool 模式下的 xdotool 命令）。
                 try:
                     parsed_locator = parse_locator(locator)
                     locator_type, locator_value = parsed_locator
 
                     if locator_type == "window" or locator_type == "title": # 针对窗口标题
-                        # 尝试用 xdotool 找到窗口并获取其 geometry
-                        # 这需要系统中安装了 xdotool
-                        cmd = ['xdotool', 'search', '--name', locator_value, 'getwindowgeometry', '%w %h %x %y']
-                        process = subprocess.run(cmd, capture_output=True, text=True, check=False, timeout=2)
-                        if process.returncode == 0 and process.stdout:
-                            lines = process.stdout.strip().split('\\n') # xdotool might give multiple if names match
-                            # For simplicity, take the first one, or implement more robust parsing
-                            if lines:
-                                parts = lines[0].split() # Expecting W H X Y
-                                if len(parts) == 4:
-                                    return {
-                                        "name": locator_value, # Best guess
-                                        "role": "window",    # Assumption
-                                        "text": locator_value,
-                                        "rectangle": {"x": int(parts[2]), "y": int(parts[3]), "width": int(parts[0]), "height": int(parts[1])},
-                                        "states": ["visible"] # Assumption
-                                    }
+                        # 找到第一个标题匹配的窗口并获取其 geometry（xdotool search --name ... getwindowgeometry）
+                        with INSTRUMENTATION.phase(PHASE_FALLBACK):
+                            if x11_tools.use_xdotool():
+                                INSTRUMENTATION.fallback("xdotool")
+                                process = x11_tools.run_xdotool(['search', '--name', locator_value, 'getwindowgeometry',
+                                                                 '--shell', '%1'],
+                                                                timeout=deadline.limit(x11_tools.XDOTOOL_TIMEOUT))
+                                values = dict(line.split("=", 1) for line in process.stdout.splitlines() if "=" in line)
+                                rect = (int(values["X"]), int(values["Y"]), int(values["WIDTH"]), int(values["HEIGHT"]))
+                            else:
+                                INSTRUMENTATION.fallback("xlib_geometry")
+                                with self._display_connection() as (display, root):
+                                    window = x11_tools.find_window(display, root, locator_value)
+                                    rect = x11_tools.window_geometry(display, root, window)
+                        return {
+                            "name": locator_value, # Best guess
+                            "role": "window",    # Assumption
+                            "text": locator_value,
+                            "rectangle": {"x": rect[0], "y": rect[1], "width": rect[2], "height": rect[3]},
+                            "states": ["visible"] # Assumption
+                        }
                     # 其他类型的定位器 (name, class, id for non-window elements) 
                     # 在没有 AT-SPI 的情况下很难可靠地获取。
-                    # 可以尝试基于图像识别 (pyautogui) 或非常具体的 xdotool 命令，但通用性差。
-                    print(f"LWARN: get_element - Non-AT-SPI fallback for locator type '{locator_type}' is very limited or not implemented.")
+                    # 需要按外观定位时使用 image: 定位器（模板匹配）。
+                    fallback_log.warning("get_element - Non-AT-SPI fallback for locator type '%s' is very limited or not implemented.", locator_type)
                 except FileNotFoundError:
-                    print("LERROR: get_element non-AT-SPI fallback - xdotool not found.")
+                    fallback_log.error("get_element non-AT-SPI fallback - xdotool not found.")
                 except subprocess.TimeoutExpired:
-                    print("LWARN: get_element non-AT-SPI fallback - xdotool command timed out.")
+                    fallback_log.warning("get_element non-AT-SPI fallback - xdotool command timed out.")
                 except Exception as ne:
-                    print(f"LERROR: get_element non-AT-SPI fallback failed for '{locator}': {ne}")
+                    fallback_log.error("get_element non-AT-SPI fallback failed for '%s': %s", locator, ne)
             
             # 如果AT-SPI尝试失败（无论何种原因），并且非AT-SPI后备也失败或不适用
             raise Exception(f"获取元素失败 (get_element最终失败): {locator}. Original AT-SPI error (if any): {e if 'element_atspi' not in locals() else 'AT-SPI path attempted but failed differently'}")
@@ -1156,9 +2122,13 @@ class LinuxHandler(PlatformHandler):
         return self.input_text_to_element(locator, text, True, 0, True, True, time_out)
     
     def get_element_bounds(self, locator, relative_to="parent", time_out=10):
-        """获取元素边界 - 简化实现"""
+        """获取元素边界 - 简化实现（image 定位器没有父元素，总是返回屏幕坐标）"""
         try:
-            element = self._find_accessible_element(locator, time_out)
+            if self._is_image_locator(locator):
+                match = self._find_image_element(locator, time_out)
+                return {"x": match.x, "y": match.y, "width": match.width, "height": match.height}
+
+            element = self._resolve_element(locator, time_out)
             if element:
                 coords = element.get_extents(Atspi.CoordType.SCREEN)
                 
@@ -1186,37 +2156,51 @@ class LinuxHandler(PlatformHandler):
             raise Exception(f"获取元素边界失败: {e}")
     
     def wait_for_element(self, locator, timeout=10, wait_for="visible"):
-        """等待元素 - 简化实现"""
-        start_time = time.time()
+        """等待元素 - 简化实现。timeout 为秒数或调用方的 Deadline，至少检查一次"""
+        deadline = Deadline.coerce(timeout)
+        while True:
+            with deadline.stage("check"):
+                if self.check_element_state(locator, wait_for):
+                    return True
+            if deadline.expired():
+                break
+            deadline.sleep(0.5)
         
-        while time.time() - start_time < timeout:
+        raise DeadlineExceeded(f"等待元素超时: {locator}, 等待条件: {wait_for}", deadline)
+
+    def check_element_state(self, locator, wait_for="visible"):
+        """单次检查元素是否满足等待条件（visible/hidden），不等待，供轮询或事件驱动的等待使用。"""
+        if self._is_image_locator(locator):
             try:
-                element = self._find_accessible_element(locator, 1)
-                
-                if wait_for == "visible":
-                    # 检查可见状态
-                    states = element.get_state_set()
-                    visible = Atspi.StateType.VISIBLE in states
-                    if visible:
-                        return True
-                elif wait_for == "hidden":
-                    # 检查隐藏状态
-                    states = element.get_state_set()
-                    visible = Atspi.StateType.VISIBLE in states
-                    if not visible:
-                        return True
+                visible = self._find_image_element(locator, 0) is not None
             except Exception:
-                if wait_for == "hidden":
-                    return True
-            
-            time.sleep(0.5)
-        
-        raise Exception(f"等待元素超时: {locator}, 等待条件: {wait_for}")
+                visible = False
+            if wait_for == "visible":
+                return visible
+            elif wait_for == "hidden":
+                return not visible
+            return False
+        try:
+            element = self._resolve_element(locator, 0)
+        except Exception:
+            return wait_for == "hidden"
+        try:
+            states = element.get_state_set()
+            visible = Atspi.StateType.VISIBLE in states
+        except Exception:
+            return wait_for == "hidden"
+        if wait_for == "visible":
+            return visible
+        elif wait_for == "hidden":
+            return not visible
+        return False
     
-    def check_element_exists(self, locator):
+    def check_element_exists(self, locator, time_out=1):
         """检查元素是否存在 - 简化实现"""
         try:
-            element = self._find_accessible_element(locator, 1)
+            if self._is_image_locator(locator):
+                return self._find_image_element(locator, time_out) is not None
+            element = self._resolve_element(locator, time_out)
             return element is not None
         except Exception:
             return False
@@ -1224,7 +2208,7 @@ class LinuxHandler(PlatformHandler):
     def get_element_checked(self, locator):
         """获取元素选中状态 - 简化实现"""
         try:
-            element = self._find_accessible_element(locator)
+            element = self._resolve_element(locator)
             if element:
                 states = element.get_state_set()
                 return Atspi.StateType.CHECKED in states
@@ -1235,7 +2219,7 @@ class LinuxHandler(PlatformHandler):
     def set_element_checked(self, locator, checked):
         """设置元素选中状态 - 简化实现"""
         try:
-            element = self._find_accessible_element(locator)
+            element = self._resolve_element(locator)
             if element:
                 current_state = Atspi.StateType.CHECKED in element.get_state_set()
                 
@@ -1244,10 +2228,18 @@ class LinuxHandler(PlatformHandler):
                     coords = element.get_extents(Atspi.CoordType.SCREEN)
                     x = coords.x + coords.width // 2
                     y = coords.y + coords.height // 2
-                    pyautogui.click(x, y)
+                    with self._input_section():
+                        pyautogui.click(x, y)
                 
                 return True
             
             raise Exception(f"未找到元素: {locator}")
         except Exception as e:
-            raise Exception(f"设置元素选中状态失败: {e}")
\ No newline at end of file
+            raise Exception(f"设置元素选中状态失败: {e}")
+
+
+INSTRUMENTATION.instrument_class(LinuxHandler, phases={
+    "_find_accessible_element": PHASE_LOOKUP,
+    "_find_window_by_title": PHASE_LOOKUP,
+})
+dump_on_failure(LinuxHandler)
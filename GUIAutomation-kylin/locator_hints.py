@@ -0,0 +1,202 @@
+import os
+import re
+import json
+import atexit
+import hashlib
+import threading
+from gui_logging import get_logger
+
+# 设为 0 关闭路径提示；GUIAUTOMATION_HINT_DIR 指定存放目录
+HINTS_ENV = "GUIAUTOMATION_HINTS"
+HINT_DIR_ENV = "GUIAUTOMATION_HINT_DIR"
+
+element_log = get_logger("element")
+
+
+def default_hint_dir():
+    """默认存放目录：$XDG_CACHE_HOME/guiautomation/hints（未设置时为 ~/.cache）。"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "guiautomation", "hints")
+
+
+class LocatorHintStore:
+    """
+    定位器路径提示的磁盘缓存。
+
+    按 (应用名, 版本) 分文件保存 {定位器: 子元素索引路径 + role/name 指纹}。
+    路径从应用对象开始，例如 [0, 2, 5] 表示 app.child(0).child(2).child(5)。
+    版本取应用可执行文件的大小和修改时间，应用升级后自动使用新的文件。
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get(HINT_DIR_ENV) or default_hint_dir()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.writes = 0
+        self._lock = threading.RLock()
+        self._tables = {}        # (app_name, version) -> {locator: hint}
+        self._version_by_pid = {}
+        self._known_apps = None  # 有提示文件的应用名集合
+
+    # ---------------- 应用标识 ----------------
+
+    @staticmethod
+    def _safe_name(app_name):
+        return re.sub(r"[^\w.-]+", "_", app_name or "unknown")[:64]
+
+    def app_version(self, app):
+        """应用版本标识：可执行文件大小与修改时间，按进程缓存。"""
+        try:
+            pid = app.get_process_id()
+        except Exception:
+            pid = None
+        with self._lock:
+            if pid in self._version_by_pid:
+                return self._version_by_pid[pid]
+        version = ""
+        if pid:
+            try:
+                st = os.stat(f"/proc/{pid}/exe")
+                version = f"{st.st_size}-{int(st.st_mtime)}"
+            except OSError:
+                version = ""
+        if not version:
+            try:
+                version = f"toolkit-{app.get_toolkit_name()}-{app.get_toolkit_version()}"
+            except Exception:
+                version = "unknown"
+        with self._lock:
+            self._version_by_pid[pid] = version
+        return version
+
+    def _file_for(self, app_name, version):
+        digest = hashlib.sha1(version.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.directory, f"{self._safe_name(app_name)}-{digest}.json")
+
+    def has_hints_for(self, app_name):
+        """是否存在该应用名的提示文件（只扫描一次目录，不访问应用）。"""
+        with self._lock:
+            if self._known_apps is None:
+                self._known_apps = set()
+                try:
+                    for filename in os.listdir(self.directory):
+                        if filename.endswith(".json") and "-" in filename:
+                            self._known_apps.add(filename.rsplit("-", 1)[0])
+                except OSError:
+                    pass
+            return self._safe_name(app_name) in self._known_apps
+
+    # ---------------- 读写 ----------------
+
+    def _table(self, app_name, version):
+        key = (app_name, version)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is None:
+                table = {}
+                try:
+                    with open(self._file_for(app_name, version), "r", encoding="utf-8") as f:
+                        table = json.load(f).get("hints", {})
+                except (OSError, ValueError):
+                    table = {}
+                self._tables[key] = table
+            return table
+
+    def _save(self, app_name, version):
+        table = self._tables.get((app_name, version), {})
+        path = self._file_for(app_name, version)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"app": app_name, "version": version, "hints": table}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.writes += 1
+        if self._known_apps is not None:
+            self._known_apps.add(self._safe_name(app_name))
+
+    def lookup(self, app_name, version, locator):
+        """返回定位器的提示 {"path": [...], "role": ..., "name": ...}，没有时返回None。"""
+        with self._lock:
+            return self._table(app_name, version).get(locator)
+
+    def record(self, app_name, version, locator, path, role, name):
+        """记录（或改写）定位器的路径提示并立即写盘。"""
+        hint = {"path": list(path), "role": role, "name": name}
+        with self._lock:
+            table = self._table(app_name, version)
+            if table.get(locator) == hint:
+                return
+            table[locator] = hint
+            try:
+                self._save(app_name, version)
+            except OSError:
+                pass
+
+    def record_many(self, app_name, version, hints):
+        """批量写入提示 {定位器: {"path", "role", "name"}}（tree_export 离线生成），只写一次盘。"""
+        with self._lock:
+            table = self._table(app_name, version)
+            for locator, hint in hints.items():
+                table[locator] = {"path": list(hint["path"]), "role": hint["role"], "name": hint["name"]}
+            try:
+                self._save(app_name, version)
+            except OSError:
+                pass
+
+    def forget(self, app_name, version, locator):
+        """删除失效的提示。"""
+        with self._lock:
+            table = self._table(app_name, version)
+            if table.pop(locator, None) is not None:
+                self.stale += 1
+                try:
+                    self._save(app_name, version)
+                except OSError:
+                    pass
+
+    # ---------------- 统计 ----------------
+
+    def note_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def note_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "writes": self.writes,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"locator hints: {s['hits']} hits, {s['misses']} misses, {s['stale']} stale rewritten, "
+                f"hit rate {s['hit_rate'] * 100:.1f}%")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _print_summary():
+    if _store is not None and (_store.hits or _store.misses):
+        element_log.info("%s", _store.summary())
+
+
+def get_hint_store():
+    """进程内共享的提示库；GUIAUTOMATION_HINTS=0 时返回None。"""
+    global _store
+    if os.environ.get(HINTS_ENV, "1") == "0":
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = LocatorHintStore()
+            atexit.register(_print_summary)
+        return _store
@@ -11,7 +11,7 @@ class PlatformHandler(ABC):
         pass
         
     @abstractmethod
-    def close_window(self, window_obj, window_title):
+    def close_window(self, window_obj, window_title, force=False):
         """关闭窗口"""
         pass
         
@@ -71,7 +71,7 @@ class PlatformHandler(ABC):
         pass
         
     @abstractmethod
-    def highlight_element(self, locator):
+    def highlight_element(self, locator, duration=2.0, color="red", thickness=3):
         """高亮元素"""
         pass
         
@@ -0,0 +1,191 @@
+import time
+import select
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import Xlib.display
+    from Xlib.ext import damage
+    XDAMAGE_AVAILABLE = True
+except ImportError:
+    XDAMAGE_AVAILABLE = False
+
+DEFAULT_TILE = 16
+# 两帧同一图块某个通道的平均值差（0-255）超过该值视为变化。X 的绘制没有噪声，
+# 默认值可以很低：16x16 图块中一个像素变化超过 128 即可检测到；有闪烁光标等无关变化时调高
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_INTERVAL = 0.05
+
+
+def tile_signature(frame, tile=DEFAULT_TILE):
+    """
+    把帧缩成每个 tile x tile 图块的平均值（B、G、R 三个通道），返回 float32 数组。
+
+    用 np.add.reduceat 按块求和，边缘不足一块的部分单独成块，不会漏掉右侧和底部的变化。
+    按行求和时用 uint16 累加（tile <= 257 时不会溢出），不需要先把整帧转成浮点数，
+    1920x1080 约 14ms；比较两帧的签名只需处理 1/tile^2 的数据。
+    """
+    height, width = frame.shape[:2]
+    pixels = frame[..., :3] if frame.ndim == 3 else frame
+    rows = np.arange(0, height, tile)
+    cols = np.arange(0, width, tile)
+    row_dtype = np.uint16 if tile <= 257 else np.uint32
+    sums = np.add.reduceat(np.add.reduceat(pixels, rows, axis=0, dtype=row_dtype), cols, axis=1, dtype=np.uint32)
+    row_counts = np.minimum(tile, height - rows).astype(np.float32)
+    col_counts = np.minimum(tile, width - cols).astype(np.float32)
+    counts = np.outer(row_counts, col_counts)
+    if sums.ndim == 3:
+        counts = counts[..., None]
+    return sums.astype(np.float32) / counts
+
+
+def signature_changed(old, new, threshold=DEFAULT_THRESHOLD):
+    """两个签名是否有图块的差异超过阈值（尺寸不同也视为变化）。"""
+    if old.shape != new.shape:
+        return True
+    return float(np.max(np.abs(new - old))) > threshold
+
+
+class _DamageMonitor:
+    """
+    用 XDamage 监听根窗口上的重绘，只关心与目标区域相交的部分。
+
+    使用独立的 X 连接；没有重绘事件时不需要截图，静止区域的等待几乎不占 CPU。
+    """
+
+    def __init__(self, rect):
+        self.display = Xlib.display.Display()
+        if not self.display.has_extension("DAMAGE"):
+            self.display.close()
+            raise Exception("X服务器不支持 DAMAGE 扩展")
+        self.display.damage_query_version()
+        self.root = self.display.screen().root
+        self.damage = self.root.damage_create(damage.DamageReportBoundingBox)
+        self.display.flush()
+        self.rect = rect
+
+    def _intersects(self, area):
+        if area is None:
+            return True
+        x, y, width, height = self.rect
+        return (area.x < x + width and x < area.x + area.width
+                and area.y < y + height and y < area.y + area.height)
+
+    def wait(self, timeout):
+        """等待 timeout 秒内与区域相交的重绘，有则返回 True。"""
+        deadline = time.monotonic() + timeout
+        while True:
+            hit = False
+            while self.display.pending_events():
+                event = self.display.next_event()
+                if self._intersects(getattr(event, "area", None)):
+                    hit = True
+            if hit:
+                # 清空已累积的损坏区域，BoundingBox 级别才会继续报告后续重绘
+                self.display.damage_subtract(self.damage, 0, 0)
+                self.display.flush()
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            select.select([self.display.fileno()], [], [], remaining)
+
+    def close(self):
+        try:
+            self.display.damage_destroy(self.damage)
+            self.display.close()
+        except Exception:
+            pass
+
+
+class RegionWatcher:
+    """
+    监视屏幕矩形区域的像素变化。
+
+    每次采样截取区域并计算图块签名，与上一次比较；可用 XDamage 时先等重绘事件，没有事件就不截图。
+    rect 为屏幕坐标 (x, y, width, height)，capture 为 screen_capture.ScreenCapture。
+    """
+
+    def __init__(self, capture, rect, tile=DEFAULT_TILE, threshold=DEFAULT_THRESHOLD,
+                 interval=DEFAULT_INTERVAL, use_damage=True):
+        if not NUMPY_AVAILABLE:
+            raise Exception("NumPy不可用，无法比较截图")
+        self.capture = capture
+        self.rect = tuple(int(v) for v in rect)
+        self.tile = tile
+        self.threshold = threshold
+        self.interval = interval
+        self.samples = 0
+        self.monitor = None
+        if use_damage and XDAMAGE_AVAILABLE:
+            try:
+                self.monitor = _DamageMonitor(self.rect)
+            except Exception:
+                self.monitor = None
+
+    def signature(self, frame=None):
+        if frame is None:
+            frame = self.capture.capture_rect(*self.rect)
+            self.samples += 1
+        return tile_signature(frame, self.tile)
+
+    def _next_tick(self, timeout):
+        """等待下一次采样时机。返回 False 表示 XDamage 确认这段时间内区域没有重绘，不必截图。"""
+        if self.monitor is not None:
+            return self.monitor.wait(timeout)
+        time.sleep(min(self.interval, timeout))
+        return True
+
+    def wait_stable(self, quiet_ms=500, time_out=10):
+        """
+        等待区域连续 quiet_ms 毫秒没有变化，返回等待的秒数；time_out 秒内未稳定时抛出异常。
+        """
+        quiet = quiet_ms / 1000.0
+        start = last_change = time.monotonic()
+        current = self.signature()
+        while True:
+            now = time.monotonic()
+            if now - last_change >= quiet:
+                return now - start
+            if now - start >= time_out:
+                raise Exception(f"等待区域稳定超时: {self.rect}, {time_out}s 结束时距上次变化 {now - last_change:.3f}s")
+            wait = min(quiet - (now - last_change), time_out - (now - start))
+            if not self._next_tick(wait):
+                continue
+            new = self.signature()
+            if signature_changed(current, new, self.threshold):
+                last_change = time.monotonic()
+            current = new
+
+    def wait_change(self, time_out=10, baseline=None):
+        """
+        等待区域与基准不同，返回等待的秒数；time_out 秒内没有变化时抛出异常。
+
+        baseline 为之前截取的同一区域的帧（需 .copy()，共享内存截图会被下一次截图覆盖），
+        省略时以调用时的画面为基准。
+        """
+        start = time.monotonic()
+        reference = self.signature(baseline) if baseline is not None else self.signature()
+        while True:
+            elapsed = time.monotonic() - start
+            if elapsed >= time_out:
+                raise Exception(f"等待区域变化超时: {self.rect}, {time_out}s")
+            if not self._next_tick(time_out - elapsed):
+                continue
+            if signature_changed(reference, self.signature(), self.threshold):
+                return time.monotonic() - start
+
+    def close(self):
+        if self.monitor is not None:
+            self.monitor.close()
+            self.monitor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
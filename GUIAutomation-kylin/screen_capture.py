@@ -0,0 +1,340 @@
+import ctypes
+import ctypes.util
+import threading
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import Xlib.display
+    import Xlib.X
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+BACKEND_SHM = "shm"
+BACKEND_XGETIMAGE = "xgetimage"
+
+_ZPIXMAP = 2
+_ALL_PLANES = 0xFFFFFFFF
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+
+# 同一进程内最多保留的共享内存图像个数（按尺寸复用）
+SHM_IMAGE_CACHE_SIZE = 4
+
+
+class _XImage(ctypes.Structure):
+    # 只声明用到的前半部分字段，布局与 Xlib.h 中的 XImage 一致
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+    ]
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+_X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+
+class _ShmLibrary:
+    """libX11 / libXext / libc 中 MIT-SHM 截图需要的函数。加载失败时 available 为 False。"""
+
+    def __init__(self):
+        self.available = False
+        self.errors = 0
+        try:
+            x11 = ctypes.CDLL(ctypes.util.find_library("X11") or "libX11.so.6")
+            xext = ctypes.CDLL(ctypes.util.find_library("Xext") or "libXext.so.6")
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        except OSError:
+            return
+        c_void_p, c_int, c_uint, c_ulong = ctypes.c_void_p, ctypes.c_int, ctypes.c_uint, ctypes.c_ulong
+
+        def bind(lib, name, restype, argtypes):
+            func = getattr(lib, name)
+            func.restype = restype
+            func.argtypes = argtypes
+            return func
+
+        try:
+            self.XOpenDisplay = bind(x11, "XOpenDisplay", c_void_p, [ctypes.c_char_p])
+            self.XCloseDisplay = bind(x11, "XCloseDisplay", c_int, [c_void_p])
+            self.XDefaultScreen = bind(x11, "XDefaultScreen", c_int, [c_void_p])
+            self.XRootWindow = bind(x11, "XRootWindow", c_ulong, [c_void_p, c_int])
+            self.XDefaultVisual = bind(x11, "XDefaultVisual", c_void_p, [c_void_p, c_int])
+            self.XDefaultDepth = bind(x11, "XDefaultDepth", c_int, [c_void_p, c_int])
+            self.XDisplayWidth = bind(x11, "XDisplayWidth", c_int, [c_void_p, c_int])
+            self.XDisplayHeight = bind(x11, "XDisplayHeight", c_int, [c_void_p, c_int])
+            self.XSync = bind(x11, "XSync", c_int, [c_void_p, c_int])
+            self.XDestroyImage = bind(x11, "XDestroyImage", c_int, [ctypes.POINTER(_XImage)])
+            self.XSetErrorHandler = bind(x11, "XSetErrorHandler", c_void_p, [_X_ERROR_HANDLER])
+            self.XShmQueryExtension = bind(xext, "XShmQueryExtension", c_int, [c_void_p])
+            self.XShmCreateImage = bind(xext, "XShmCreateImage", ctypes.POINTER(_XImage),
+                                        [c_void_p, c_void_p, c_uint, c_int, c_void_p,
+                                         ctypes.POINTER(_XShmSegmentInfo), c_uint, c_uint])
+            self.XShmAttach = bind(xext, "XShmAttach", c_int, [c_void_p, ctypes.POINTER(_XShmSegmentInfo)])
+            self.XShmDetach = bind(xext, "XShmDetach", c_int, [c_void_p, ctypes.POINTER(_XShmSegmentInfo)])
+            self.XShmGetImage = bind(xext, "XShmGetImage", c_int,
+                                     [c_void_p, c_ulong, ctypes.POINTER(_XImage), c_int, c_int, c_ulong])
+            self.shmget = bind(libc, "shmget", c_int, [c_int, ctypes.c_size_t, c_int])
+            self.shmat = bind(libc, "shmat", c_void_p, [c_int, c_void_p, c_int])
+            self.shmdt = bind(libc, "shmdt", c_int, [c_void_p])
+            self.shmctl = bind(libc, "shmctl", c_int, [c_int, c_int, c_void_p])
+        except AttributeError:
+            return
+        # libX11 默认的错误处理会直接退出进程，这里改为计数，由调用方检查
+        self._error_handler = _X_ERROR_HANDLER(self._on_error)
+        self.XSetErrorHandler(self._error_handler)
+        self.available = True
+
+    def _on_error(self, display, event):
+        self.errors += 1
+        return 0
+
+
+_shm_library = None
+_shm_library_lock = threading.Lock()
+
+
+def _get_shm_library():
+    global _shm_library
+    with _shm_library_lock:
+        if _shm_library is None:
+            _shm_library = _ShmLibrary()
+        return _shm_library
+
+
+class _ShmImage:
+    """一块共享内存和对应的 XImage，同尺寸的截图重复使用。"""
+
+    def __init__(self, lib, display, visual, depth, width, height):
+        self.lib = lib
+        self.display = display
+        self.width = width
+        self.height = height
+        self.info = _XShmSegmentInfo()
+        self.image = lib.XShmCreateImage(display, visual, depth, _ZPIXMAP, None, ctypes.byref(self.info), width, height)
+        if not self.image:
+            raise Exception("XShmCreateImage 失败")
+        image = self.image.contents
+        if image.bits_per_pixel != 32:
+            lib.XDestroyImage(self.image)
+            raise Exception(f"不支持 {image.bits_per_pixel} 位像素格式")
+        size = image.bytes_per_line * height
+        self.info.shmid = lib.shmget(_IPC_PRIVATE, size, _IPC_CREAT | 0o600)
+        if self.info.shmid < 0:
+            lib.XDestroyImage(self.image)
+            raise Exception(f"shmget 失败: errno {ctypes.get_errno()}")
+        address = lib.shmat(self.info.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            lib.shmctl(self.info.shmid, _IPC_RMID, None)
+            lib.XDestroyImage(self.image)
+            raise Exception(f"shmat 失败: errno {ctypes.get_errno()}")
+        self.info.shmaddr = address
+        self.info.readOnly = 0
+        image.data = address
+        errors = lib.errors
+        lib.XShmAttach(display, ctypes.byref(self.info))
+        lib.XSync(display, 0)
+        # 双方都已挂接，标记删除，进程退出后系统会自动回收
+        lib.shmctl(self.info.shmid, _IPC_RMID, None)
+        if lib.errors != errors:
+            self._release(attached=False)
+            raise Exception("XShmAttach 失败（可能是远程 X 连接）")
+        stride = image.bytes_per_line
+        buffer = (ctypes.c_ubyte * size).from_address(address)
+        # 零拷贝视图：直接指向共享内存，下一次截图会覆盖内容
+        self.array = np.ctypeslib.as_array(buffer).reshape(height, stride // 4, 4)[:, :width, :]
+
+    def capture(self, drawable, x, y):
+        errors = self.lib.errors
+        ok = self.lib.XShmGetImage(self.display, drawable, self.image, x, y, _ALL_PLANES)
+        if not ok or self.lib.errors != errors:
+            raise Exception("XShmGetImage 失败")
+        return self.array
+
+    def _release(self, attached=True):
+        if attached:
+            self.lib.XShmDetach(self.display, ctypes.byref(self.info))
+        self.lib.XDestroyImage(self.image)
+        self.lib.shmdt(self.info.shmaddr)
+        self.image = None
+
+    def close(self):
+        if self.image is not None:
+            self._release()
+
+
+class ScreenCapture:
+    """
+    截图，结果为 NumPy 数组 (高, 宽, 4)，BGRA 字节顺序，uint8。
+
+    - 优先使用 MIT-SHM：X服务器把像素直接写入共享内存，返回的数组是该内存的零拷贝视图，
+      下一次同尺寸截图会覆盖它，需要保留时调用 .copy()；
+    - MIT-SHM 不可用（远程连接、缺少 libXext 等）时使用 python-xlib 的 GetImage，
+      数组为 X 回复数据的只读视图。
+
+    不是线程安全的，每个线程使用自己的实例（见 get_capture()）；每个实例持有一条 X 连接和若干共享内存段，
+    不再使用时调用 close()。
+    """
+
+    def __init__(self, display=None, use_shm=True):
+        if not NUMPY_AVAILABLE:
+            raise Exception("截图需要 numpy")
+        self.xlib_display = display
+        self._own_xlib_display = False
+        self.backend = None
+        self._shm = None
+        self._shm_display = None
+        self._images = {}
+        if use_shm:
+            self._open_shm()
+        if self.backend is None:
+            if not XLIB_AVAILABLE:
+                raise Exception("Xlib不可用，无法截图")
+            if self.xlib_display is None:
+                self.xlib_display = Xlib.display.Display()
+                self._own_xlib_display = True
+            self.backend = BACKEND_XGETIMAGE
+        self.width, self.height = self.screen_size()
+
+    def _open_shm(self):
+        lib = _get_shm_library()
+        if not lib.available:
+            return
+        display = lib.XOpenDisplay(None)
+        if not display:
+            return
+        if not lib.XShmQueryExtension(display):
+            lib.XCloseDisplay(display)
+            return
+        screen = lib.XDefaultScreen(display)
+        self._shm = lib
+        self._shm_display = display
+        self._screen = screen
+        self._root = lib.XRootWindow(display, screen)
+        self._visual = lib.XDefaultVisual(display, screen)
+        self._depth = lib.XDefaultDepth(display, screen)
+        self.backend = BACKEND_SHM
+
+    def screen_size(self):
+        if self.backend == BACKEND_SHM:
+            return (self._shm.XDisplayWidth(self._shm_display, self._screen),
+                    self._shm.XDisplayHeight(self._shm_display, self._screen))
+        screen = self.xlib_display.screen()
+        return screen.width_in_pixels, screen.height_in_pixels
+
+    def _clip(self, x, y, width, height):
+        x0, y0 = max(0, int(x)), max(0, int(y))
+        x1, y1 = min(self.width, int(x) + int(width)), min(self.height, int(y) + int(height))
+        if x1 <= x0 or y1 <= y0:
+            raise Exception(f"截图区域不在屏幕内: ({x}, {y}, {width}, {height})")
+        return x0, y0, x1 - x0, y1 - y0
+
+    def _shm_image(self, width, height):
+        key = (width, height)
+        image = self._images.pop(key, None)
+        if image is None:
+            if len(self._images) >= SHM_IMAGE_CACHE_SIZE:
+                oldest = next(iter(self._images))
+                self._images.pop(oldest).close()
+            image = _ShmImage(self._shm, self._shm_display, self._visual, self._depth, width, height)
+        self._images[key] = image  # 重新插入，保持最近使用的在末尾
+        return image
+
+    def capture_rect(self, x, y, width, height):
+        """截取屏幕矩形区域（超出屏幕的部分被裁掉）。"""
+        x, y, width, height = self._clip(x, y, width, height)
+        if self.backend == BACKEND_SHM:
+            return self._shm_image(width, height).capture(self._root, x, y)
+        root = self.xlib_display.screen().root
+        reply = root.get_image(x, y, width, height, Xlib.X.ZPixmap, _ALL_PLANES)
+        data = reply.data
+        stride = len(data) // height
+        return np.frombuffer(data, dtype=np.uint8).reshape(height, stride // 4, 4)[:, :width, :]
+
+    def capture_screen(self):
+        return self.capture_rect(0, 0, self.width, self.height)
+
+    def capture_window(self, window):
+        """截取窗口在屏幕上的区域（包括遮挡在其上的内容）。window 为 python-xlib 窗口对象。"""
+        geometry = window.get_geometry()
+        origin = window.translate_coords(window.display.screen().root, 0, 0)
+        return self.capture_rect(-origin.x, -origin.y, geometry.width, geometry.height)
+
+    def capture_extents(self, extents):
+        """截取 AT-SPI get_extents(SCREEN) 返回的区域。"""
+        return self.capture_rect(extents.x, extents.y, extents.width, extents.height)
+
+    def close(self):
+        """释放共享内存段并关闭自己建立的 X 连接；之前返回的零拷贝数组随之失效。"""
+        for image in self._images.values():
+            image.close()
+        self._images.clear()
+        if self._shm_display:
+            self._shm.XCloseDisplay(self._shm_display)
+            self._shm_display = None
+        if self._own_xlib_display:
+            self.xlib_display.close()
+            self._own_xlib_display = False
+
+
+def to_rgb(frame):
+    """BGRA 帧转为 RGB 视图（不复制）。"""
+    return frame[..., 2::-1]
+
+
+def save_png(frame, path):
+    """把 BGRA 帧保存为 PNG（需要 Pillow）。"""
+    try:
+        from PIL import Image
+    except ImportError:
+        raise Exception("保存截图需要 Pillow")
+    Image.fromarray(np.ascontiguousarray(to_rgb(frame))).save(path)
+    return path
+
+
+_thread_local = threading.local()
+
+
+def get_capture(display=None):
+    """
+    当前线程专属的 ScreenCapture，首次调用时创建；display 为不能使用 MIT-SHM 时使用的 python-xlib 连接。
+
+    线程结束时实例不会自动关闭：短期线程（例如守护进程的每个连接）结束前调用 release_capture()。
+    """
+    capture = getattr(_thread_local, "capture", None)
+    if capture is None:
+        capture = ScreenCapture(display)
+        _thread_local.capture = capture
+    return capture
+
+
+def release_capture():
+    """关闭当前线程的 ScreenCapture（X 连接和共享内存段），下次 get_capture() 时重新创建。"""
+    capture = getattr(_thread_local, "capture", None)
+    _thread_local.capture = None
+    if capture is not None:
+        capture.close()
@@ -0,0 +1,313 @@
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DEFAULT_CONFIDENCE = 0.9
+DEFAULT_SCALES = (1.0,)
+# 金字塔最粗一层模板的最小边长（像素），再小就没有足够的细节区分候选位置
+MIN_TEMPLATE_SIDE = 12
+MAX_PYRAMID_LEVELS = 3
+# 粗层每个尺度保留的候选位置数，在原始分辨率上逐个精确匹配
+COARSE_CANDIDATES = 3
+# 粗层得分低于 confidence 减去该值的候选直接丢弃
+COARSE_MARGIN = 0.25
+TEMPLATE_CACHE_SIZE = 32
+
+
+class TemplateMatch:
+    """模板匹配结果，屏幕坐标。x / y / width / height 与 AT-SPI get_extents 的返回值同名，可直接替代使用。"""
+
+    __slots__ = ("x", "y", "width", "height", "confidence", "scale")
+
+    def __init__(self, x, y, width, height, confidence, scale):
+        self.x = int(x)
+        self.y = int(y)
+        self.width = int(width)
+        self.height = int(height)
+        self.confidence = float(confidence)
+        self.scale = scale
+
+    def to_dict(self):
+        return {"x": self.x, "y": self.y, "width": self.width, "height": self.height,
+                "confidence": round(self.confidence, 4), "scale": self.scale}
+
+    def __repr__(self):
+        return (f"<TemplateMatch ({self.x}, {self.y}, {self.width}x{self.height}) "
+                f"confidence={self.confidence:.3f} scale={self.scale}>")
+
+
+def parse_image_locator(value):
+    """
+    解析 image 定位器的值，返回 (路径, 选项)。
+    例如: "/tmp/ok.png?confidence=0.85&scales=0.75,1,1.25&window=记事本"
+    -> ("/tmp/ok.png", {"confidence": 0.85, "scales": (0.75, 1.0, 1.25), "window": "记事本"})
+    """
+    path, options = value, {}
+    if "?" in value:
+        path, query = value.split("?", 1)
+        for item in query.split("&"):
+            if not item:
+                continue
+            key, _, raw = item.partition("=")
+            key = key.strip().lower()
+            raw = raw.strip()
+            if key == "confidence":
+                options["confidence"] = float(raw)
+            elif key == "scales":
+                options["scales"] = tuple(float(s) for s in raw.split(",") if s.strip())
+            elif key == "window":
+                options["window"] = raw
+            else:
+                raise ValueError(f"不支持的图像定位参数: {key}")
+    return os.path.expanduser(path.strip()), options
+
+
+def to_gray(frame):
+    """截图的 BGRA 帧（4 通道）、RGB 帧（3 通道）或灰度帧转为 float32 灰度图（ITU-R 601 亮度）。"""
+    if frame.ndim == 2:
+        return frame.astype(np.float32, copy=False)
+    if frame.shape[2] == 4:
+        b, g, r = frame[..., 0], frame[..., 1], frame[..., 2]
+    else:
+        r, g, b = frame[..., 0], frame[..., 1], frame[..., 2]
+    return (0.114 * b + 0.587 * g + 0.299 * r).astype(np.float32)
+
+
+def _downsample(image):
+    """2x2 均值池化，边缘不足一块的像素丢弃。"""
+    height, width = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+    image = image[:height, :width]
+    return 0.25 * (image[0::2, 0::2] + image[1::2, 0::2] + image[0::2, 1::2] + image[1::2, 1::2])
+
+
+def _resize(image, height, width):
+    """双线性缩放到 (height, width)。"""
+    src_h, src_w = image.shape
+    if (src_h, src_w) == (height, width):
+        return image
+    ys = np.clip((np.arange(height) + 0.5) * src_h / height - 0.5, 0, src_h - 1)
+    xs = np.clip((np.arange(width) + 0.5) * src_w / width - 0.5, 0, src_w - 1)
+    y0 = np.floor(ys).astype(np.intp)
+    x0 = np.floor(xs).astype(np.intp)
+    y1 = np.minimum(y0 + 1, src_h - 1)
+    x1 = np.minimum(x0 + 1, src_w - 1)
+    wy = (ys - y0)[:, None].astype(np.float32)
+    wx = (xs - x0)[None, :].astype(np.float32)
+    top = image[y0][:, x0] * (1 - wx) + image[y0][:, x1] * wx
+    bottom = image[y1][:, x0] * (1 - wx) + image[y1][:, x1] * wx
+    return top * (1 - wy) + bottom * wy
+
+
+def _fft_size(n):
+    """不小于 n 的 2^a * 3^b * 5^c，FFT 在这些长度上最快。"""
+    size = n
+    while True:
+        m = size
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return size
+        size += 1
+
+
+class _TemplateLevel:
+    """金字塔的一层：零均值模板、其范数及尺寸。"""
+
+    __slots__ = ("zero_mean", "norm", "height", "width")
+
+    def __init__(self, image):
+        self.height, self.width = image.shape
+        self.zero_mean = (image - image.mean()).astype(np.float64)
+        self.norm = float(np.sqrt(np.sum(self.zero_mean * self.zero_mean)))
+
+
+def _ncc(image, level):
+    """
+    归一化互相关（零均值 NCC），返回 (H-h+1, W-w+1) 的得分图，范围 [-1, 1]。
+
+    分子用 FFT 做相关（模板已去均值，窗口均值项为零），分母用积分图计算每个窗口的方差，
+    整体是 O(HW log HW)，与模板大小无关。
+    """
+    image = image.astype(np.float64, copy=False)
+    height, width = image.shape
+    h, w = level.height, level.width
+    out_h, out_w = height - h + 1, width - w + 1
+    if out_h <= 0 or out_w <= 0 or level.norm == 0:
+        return None
+
+    shape = (_fft_size(height), _fft_size(width))
+    spectrum = np.fft.rfft2(image, shape) * np.conj(np.fft.rfft2(level.zero_mean, shape))
+    numerator = np.fft.irfft2(spectrum, shape)[:out_h, :out_w]
+
+    integral = np.zeros((height + 1, width + 1))
+    integral[1:, 1:] = image.cumsum(0).cumsum(1)
+    integral_sq = np.zeros((height + 1, width + 1))
+    integral_sq[1:, 1:] = (image * image).cumsum(0).cumsum(1)
+
+    def window_sum(table):
+        return table[h:, w:] - table[:-h, w:] - table[h:, :-w] + table[:-h, :-w]
+
+    count = h * w
+    window = window_sum(integral)
+    variance = window_sum(integral_sq) - window * window / count
+    denominator = np.sqrt(np.maximum(variance, 0)) * level.norm
+    # 纯色窗口（方差约为 0）无法判断相似度，得分记为 0
+    scores = np.where(denominator > 1e-6 * count, numerator / np.maximum(denominator, 1e-12), 0.0)
+    return np.clip(scores, -1.0, 1.0)
+
+
+def _top_candidates(scores, count, exclusion):
+    """得分最高的 count 个位置，相互之间至少相隔 exclusion 像素。"""
+    scores = scores.copy()
+    result = []
+    for _ in range(count):
+        index = int(np.argmax(scores))
+        y, x = divmod(index, scores.shape[1])
+        score = scores[y, x]
+        if not np.isfinite(score) or score <= -1:
+            break
+        result.append((y, x, float(score)))
+        scores[max(0, y - exclusion):y + exclusion + 1, max(0, x - exclusion):x + exclusion + 1] = -np.inf
+    return result
+
+
+class TemplateMatcher:
+    """
+    多尺度模板匹配器。
+
+    模板按 (路径, 修改时间, 尺度) 缓存为金字塔（每层 2x2 均值池化），匹配时先在最粗一层上对整个搜索区域做 NCC，
+    再把少量候选位置映射回原始分辨率，只在其邻域内精确计算。搜索区域也一同降采样，
+    所以粗层计算量约为原来的 1/4^层数。
+    """
+
+    def __init__(self, cache_size=TEMPLATE_CACHE_SIZE):
+        if not NUMPY_AVAILABLE:
+            raise Exception("NumPy不可用，无法进行图像匹配")
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def _load_image(self, path):
+        try:
+            from PIL import Image
+        except ImportError:
+            raise Exception("加载模板图像需要 Pillow")
+        with Image.open(path) as image:
+            return np.asarray(image.convert("L"), dtype=np.float32)
+
+    def template(self, path, scale=1.0):
+        """返回模板金字塔（_TemplateLevel 列表，第 0 层为原始分辨率），命中缓存时不读文件。"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError as e:
+            raise Exception(f"模板图像不存在: {path}: {e}")
+        key = (path, mtime, scale)
+        with self._lock:
+            levels = self._cache.get(key)
+            if levels is not None:
+                self._cache.move_to_end(key)
+                return levels
+
+        image = self._load_image(path)
+        if scale != 1.0:
+            height = max(1, int(round(image.shape[0] * scale)))
+            width = max(1, int(round(image.shape[1] * scale)))
+            image = _resize(image, height, width)
+        levels = [_TemplateLevel(image)]
+        while (len(levels) < MAX_PYRAMID_LEVELS
+               and min(image.shape) // 2 >= MIN_TEMPLATE_SIDE):
+            image = _downsample(image)
+            levels.append(_TemplateLevel(image))
+
+        with self._lock:
+            self._cache[key] = levels
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return levels
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _match_scale(self, gray_pyramid, levels, confidence):
+        """在一个尺度上匹配，返回 (y, x, score) 或 None（坐标相对于搜索区域）。"""
+        base = levels[0]
+        top = min(len(levels), len(gray_pyramid)) - 1
+        while top > 0 and (gray_pyramid[top].shape[0] < levels[top].height
+                           or gray_pyramid[top].shape[1] < levels[top].width):
+            top -= 1
+        if top == 0:
+            scores = _ncc(gray_pyramid[0], base)
+            if scores is None:
+                return None
+            index = int(np.argmax(scores))
+            y, x = divmod(index, scores.shape[1])
+            return y, x, float(scores[y, x])
+
+        coarse = _ncc(gray_pyramid[top], levels[top])
+        if coarse is None:
+            return None
+        factor = 2 ** top
+        exclusion = max(1, min(levels[top].height, levels[top].width) // 2)
+        gray = gray_pyramid[0]
+        best = None
+        for cy, cx, score in _top_candidates(coarse, COARSE_CANDIDATES, exclusion):
+            if score < confidence - COARSE_MARGIN:
+                break
+            # 粗层一个像素对应原图 factor 个像素，在其周围 ±factor 范围内精确匹配
+            y0 = max(0, cy * factor - factor)
+            x0 = max(0, cx * factor - factor)
+            y1 = min(gray.shape[0], cy * factor + factor + base.height + 1)
+            x1 = min(gray.shape[1], cx * factor + factor + base.width + 1)
+            scores = _ncc(gray[y0:y1, x0:x1], base)
+            if scores is None:
+                continue
+            index = int(np.argmax(scores))
+            y, x = divmod(index, scores.shape[1])
+            if best is None or scores[y, x] > best[2]:
+                best = (y0 + y, x0 + x, float(scores[y, x]))
+        return best
+
+    def match(self, frame, path, confidence=DEFAULT_CONFIDENCE, scales=DEFAULT_SCALES, origin=(0, 0)):
+        """
+        在帧中查找模板，返回得分最高且不低于 confidence 的 TemplateMatch，找不到时返回 None。
+
+        frame 为截图数组（BGRA / RGB / 灰度），origin 为帧左上角的屏幕坐标，用于把结果换算为屏幕坐标。
+        """
+        gray = to_gray(frame)
+        gray_pyramid = [gray]
+        for _ in range(MAX_PYRAMID_LEVELS - 1):
+            if min(gray_pyramid[-1].shape) < 2 * MIN_TEMPLATE_SIDE:
+                break
+            gray_pyramid.append(_downsample(gray_pyramid[-1]))
+
+        best = None
+        for scale in scales or DEFAULT_SCALES:
+            levels = self.template(path, scale)
+            found = self._match_scale(gray_pyramid, levels, confidence)
+            if found and (best is None or found[2] > best[2]):
+                best = found + (scale, levels[0].height, levels[0].width)
+        if best is None or best[2] < confidence:
+            return None
+        y, x, score, scale, height, width = best
+        return TemplateMatch(origin[0] + x, origin[1] + y, width, height, score, scale)
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher():
+    """进程内共享的模板匹配器（模板金字塔缓存在处理器实例之间共用）。"""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = TemplateMatcher()
+        return _matcher
@@ -0,0 +1,568 @@
+import os
+import sys
+import gzip
+import json
+import time
+import hashlib
+import argparse
+from difflib import SequenceMatcher
+
+"""
+可访问性树的导出与比较。
+
+dump_tree 按先序逐个节点写出整棵子树，不在内存中建立树（只保留当前路径上的节点），两种格式：
+
+- ndjson：第一行为文件头，之后每行一个节点 {"path", "depth", "role", "name", "children", "fp", 其他字段}，
+  最后一行为结尾 {"end": true, "nodes": ...}；
+- binary：GATREE1 开头，节点只记录深度、在父节点中的序号、子元素个数，角色和名称在字符串表中只写一次，
+  路径和指纹在读取时重新计算，通常只有 ndjson 的几分之一。
+
+文件名以 .gz 结尾时再做 gzip 压缩。iter_dump 按文件内容识别格式并逐个产出节点。
+
+diff_tree 按路径和指纹（role + name）对齐两棵树：同一父节点下的子节点按指纹序列对齐（SequenceMatcher），
+对不上的同位置节点角色相同时视为改名，其余为新增 / 删除的子树；顺序调换的同指纹节点记为移动。
+precompute_hints 从导出的应用树离线生成定位器路径提示表（locator_hints），查找时直接命中。
+"""
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_BINARY = "binary"
+
+BINARY_MAGIC = b"GATREE1\n"
+GZIP_MAGIC = b"\x1f\x8b"
+
+# 每个节点都记录的字段；其他字段（id / text / rectangle / states）由 reader 读取
+BASE_FIELDS = ("role", "name")
+
+# 单个导出最多写出的节点数，与 tree_snapshot 一致
+DEFAULT_MAX_NODES = 200000
+
+
+def fingerprint(role, name):
+    """节点指纹：role 与 name 的短哈希，与路径提示中的 role / name 校验对应。"""
+    return hashlib.sha1(f"{role}\0{name}".encode("utf-8")).hexdigest()[:12]
+
+
+def _format_for(path, format=None):
+    if format is not None:
+        if format not in (FORMAT_NDJSON, FORMAT_BINARY):
+            raise ValueError(f"不支持的导出格式: {format}，应为 ndjson 或 binary")
+        return format
+    name = path[:-3] if path.endswith(".gz") else path
+    return FORMAT_NDJSON if name.endswith((".ndjson", ".jsonl", ".json")) else FORMAT_BINARY
+
+
+def _open(path, mode, compress=False):
+    return gzip.open(path, mode) if compress else open(path, mode)
+
+
+# ---------------- 遍历 ----------------
+
+def iter_nodes(root, fields=(), reader=None, max_depth=None, max_nodes=DEFAULT_MAX_NODES):
+    """
+    按先序产出 root 子树的节点记录，只保留当前路径上的节点。
+
+    root 为 Atspi.Accessible 或 RemoteNode；fields 为 BASE_FIELDS 之外要记录的字段，由 reader(element, field) 读取。
+    读取失败的节点（元素已销毁等）连同其子树一起跳过。
+    """
+    extra = [field for field in fields if field not in BASE_FIELDS]
+    produced = 0
+    # 栈中每项为 [元素, 路径, 子元素个数, 下一个子元素下标]
+    stack = []
+    pending = [(root, [])]
+    while pending or stack:
+        if pending:
+            element, path = pending.pop()
+            if produced >= max_nodes:
+                return
+            try:
+                role = element.get_role_name()
+                name = element.get_name()
+                depth = len(path)
+                count = element.get_child_count() if max_depth is None or depth < max_depth else 0
+            except Exception:
+                continue
+            record = {"path": path, "depth": depth, "role": role, "name": name, "children": count,
+                      "fp": fingerprint(role, name)}
+            for field in extra:
+                try:
+                    record[field] = reader(element, field) if reader is not None else None
+                except Exception:
+                    record[field] = None
+            yield record
+            produced += 1
+            if count:
+                stack.append([element, path, count, 0])
+            continue
+        frame = stack[-1]
+        if frame[3] >= frame[2]:
+            stack.pop()
+            continue
+        index = frame[3]
+        frame[3] += 1
+        try:
+            child = frame[0].get_child_at_index(index)
+        except Exception:
+            child = None
+        if child is not None:
+            pending.append((child, frame[1] + [index]))
+
+
+# ---------------- 写出 ----------------
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+class _NdjsonWriter:
+    def __init__(self, f, header):
+        self.f = f
+        self._line(dict(header, format=FORMAT_NDJSON))
+
+    def _line(self, value):
+        self.f.write(json.dumps(value, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def write(self, record):
+        self._line(record)
+
+    def close(self, trailer):
+        self._line(dict(trailer, end=True))
+
+
+class _BinaryWriter:
+    """
+    记录格式（整数为 varint）：深度 + 1、在父节点中的序号、子元素个数、role、name、其他字段（JSON，空串表示没有）。
+    字符串为引用号：0 表示后面跟着新字符串（长度 + UTF-8），n 表示字符串表中的第 n 个。深度 + 1 为 0 时是结尾。
+    """
+
+    def __init__(self, f, header):
+        self.f = f
+        self.strings = {}
+        f.write(BINARY_MAGIC)
+        self._blob(json.dumps(dict(header, format=FORMAT_BINARY), ensure_ascii=False))
+
+    def _blob(self, text):
+        data = text.encode("utf-8")
+        self.f.write(_varint(len(data)) + data)
+
+    def _string(self, text):
+        text = "" if text is None else str(text)
+        ref = self.strings.get(text)
+        if ref is not None:
+            return _varint(ref)
+        self.strings[text] = len(self.strings) + 1
+        data = text.encode("utf-8")
+        return b"\x00" + _varint(len(data)) + data
+
+    def write(self, record):
+        path = record["path"]
+        extra = {key: value for key, value in record.items()
+                 if key not in ("path", "depth", "role", "name", "children", "fp")}
+        self.f.write(_varint(record["depth"] + 1) + _varint(path[-1] if path else 0) + _varint(record["children"])
+                     + self._string(record["role"]) + self._string(record["name"]))
+        self._blob(json.dumps(extra, ensure_ascii=False) if extra else "")
+
+    def close(self, trailer):
+        self.f.write(b"\x00")
+        self._blob(json.dumps(trailer, ensure_ascii=False))
+
+
+def dump_tree(root, path, format=None, fields=(), reader=None, max_depth=None, max_nodes=DEFAULT_MAX_NODES,
+              header=None):
+    """
+    把 root 子树按先序写入 path（边遍历边写，写完后替换目标文件），返回 {"nodes", "bytes", "time", "truncated"}。
+
+    format 为 ndjson 或 binary，省略时按扩展名判断（.ndjson / .jsonl / .json 为 ndjson，其他为 binary）；
+    header 为写入文件头的附加信息（应用名、版本等）。
+    """
+    format = _format_for(path, format)
+    header = dict(header or {}, version=1, created=time.time(), fields=list(BASE_FIELDS) + [
+        field for field in fields if field not in BASE_FIELDS])
+    start = time.perf_counter()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    nodes = 0
+    try:
+        with _open(tmp_path, "wb", compress=path.endswith(".gz")) as f:
+            writer = (_NdjsonWriter if format == FORMAT_NDJSON else _BinaryWriter)(f, header)
+            for record in iter_nodes(root, fields, reader, max_depth, max_nodes):
+                writer.write(record)
+                nodes += 1
+            truncated = nodes >= max_nodes
+            writer.close({"nodes": nodes, "truncated": truncated})
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return {"nodes": nodes, "bytes": os.path.getsize(path), "time": time.perf_counter() - start,
+            "truncated": truncated}
+
+
+# ---------------- 读取 ----------------
+
+def _read_varint(f):
+    value = 0
+    shift = 0
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise EOFError("导出文件不完整")
+        value |= (byte[0] & 0x7F) << shift
+        if not byte[0] & 0x80:
+            return value
+        shift += 7
+
+
+def _read_blob(f):
+    size = _read_varint(f)
+    data = f.read(size)
+    if len(data) != size:
+        raise EOFError("导出文件不完整")
+    return data.decode("utf-8")
+
+
+def _open_dump(path):
+    with open(path, "rb") as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    return gzip.open(path, "rb") if compressed else open(path, "rb")
+
+
+def _iter_binary(f, with_header):
+    header = json.loads(_read_blob(f))
+    if with_header:
+        yield header
+    strings = [None]
+    path = []
+    while True:
+        depth = _read_varint(f)
+        if depth == 0:
+            return
+        depth -= 1
+        position = _read_varint(f)
+        children = _read_varint(f)
+        values = []
+        for _ in range(2):
+            ref = _read_varint(f)
+            if ref == 0:
+                strings.append(_read_blob(f))
+                ref = len(strings) - 1
+            values.append(strings[ref])
+        extra = _read_blob(f)
+        del path[max(depth - 1, 0):]
+        if depth:
+            path.append(position)
+        record = {"path": list(path), "depth": depth, "role": values[0], "name": values[1], "children": children,
+                  "fp": fingerprint(values[0], values[1])}
+        if extra:
+            record.update(json.loads(extra))
+        yield record
+
+
+def _iter_records(path, with_header=False):
+    with _open_dump(path) as f:
+        if f.peek(len(BINARY_MAGIC))[:len(BINARY_MAGIC)] == BINARY_MAGIC:
+            f.read(len(BINARY_MAGIC))
+            yield from _iter_binary(f, with_header)
+            return
+        first = True
+        for line in f:
+            if not line.strip():
+                continue
+            value = json.loads(line)
+            if first:
+                first = False
+                if with_header:
+                    yield value
+                continue
+            if value.get("end"):
+                return
+            yield value
+
+
+def iter_dump(path):
+    """逐个产出导出文件中的节点记录（先序），两种格式、是否压缩按文件内容识别。"""
+    return _iter_records(path)
+
+
+def read_header(path):
+    """导出文件的文件头（格式、字段、导出时间以及 dump_tree 的 header 参数）。"""
+    return next(_iter_records(path, with_header=True))
+
+
+# ---------------- 比较 ----------------
+
+class _LoadedTree:
+    """diff_tree 使用的紧凑树：按先序下标保存记录和子节点下标。"""
+
+    def __init__(self, source):
+        self.records = []
+        self.children = []
+        parents = []  # 当前路径上的节点下标
+        records = iter_dump(source) if isinstance(source, str) else source
+        for record in records:
+            index = len(self.records)
+            depth = record["depth"]
+            del parents[depth:]
+            if parents:
+                self.children[parents[-1]].append(index)
+            elif index:
+                raise ValueError("导出文件有多个根节点")
+            parents.append(index)
+            self.records.append(record)
+            self.children.append([])
+
+    def size(self, index):
+        """以 index 为根的子树的节点数（先序中子树连续）。"""
+        depth = self.records[index]["depth"]
+        end = index + 1
+        while end < len(self.records) and self.records[end]["depth"] > depth:
+            end += 1
+        return end - index
+
+
+def _entry(op, a, ia, b, ib):
+    record = b.records[ib] if ib is not None else a.records[ia]
+    return {"op": op, "path_a": a.records[ia]["path"] if ia is not None else None,
+            "path_b": b.records[ib]["path"] if ib is not None else None,
+            "role": record["role"], "name": record["name"]}
+
+
+def _compare(a, ia, b, ib, out):
+    """比较已对齐的两个节点自身的字段，不同时记为 changed。"""
+    ra, rb = a.records[ia], b.records[ib]
+    changed = {}
+    for field in set(ra) | set(rb):
+        if field in ("path", "depth", "children", "fp"):
+            continue
+        if field in ra and field in rb and ra[field] != rb[field]:
+            changed[field] = [ra[field], rb[field]]
+    if changed:
+        entry = _entry("changed", a, ia, b, ib)
+        entry["fields"] = changed
+        out.append(entry)
+
+
+def diff_tree(a, b):
+    """
+    比较两个导出文件（或 iter_nodes 产出的记录），返回差异列表（按 b 的先序大致排列）：
+
+    {"op": "added" | "removed" | "changed" | "moved", "path_a", "path_b", "role", "name"}，
+    added / removed 只列出子树的根并带 "nodes"（子树节点数）；changed 带 "fields" {字段: [旧值, 新值]}，
+    两边都记录的字段才比较；兄弟节点插入删除引起的序号变化不算移动。
+    """
+    a, b = _LoadedTree(a), _LoadedTree(b)
+    out = []
+    if not a.records or not b.records:
+        for tree, op in ((a, "removed"), (b, "added")):
+            if tree.records:
+                entry = _entry(op, a, 0 if op == "removed" else None, b, 0 if op == "added" else None)
+                entry["nodes"] = len(tree.records)
+                out.append(entry)
+        return out
+    pairs = [(0, 0)]
+    while pairs:
+        ia, ib = pairs.pop()
+        _compare(a, ia, b, ib, out)
+        matched = _align(a, a.children[ia], b, b.children[ib], out)
+        pairs.extend(reversed(matched))
+    return out
+
+
+def _align(a, kids_a, b, kids_b, out):
+    """对齐同一父节点下的子节点，返回对齐的 (a 下标, b 下标) 列表，新增 / 删除 / 移动写入 out。"""
+    fps_a = [a.records[i]["fp"] for i in kids_a]
+    fps_b = [b.records[i]["fp"] for i in kids_b]
+    matched = []
+    removed = []
+    added = []
+    for tag, a0, a1, b0, b1 in SequenceMatcher(None, fps_a, fps_b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            matched.extend(zip(kids_a[a0:a1], kids_b[b0:b1]))
+            continue
+        if tag == "replace":
+            # 同位置、同角色的节点视为改名（例如标签文字变化），继续比较其子树
+            for ia, ib in zip(kids_a[a0:a1], kids_b[b0:b1]):
+                if a.records[ia]["role"] == b.records[ib]["role"]:
+                    matched.append((ia, ib))
+                else:
+                    removed.append(ia)
+                    added.append(ib)
+            n = min(a1 - a0, b1 - b0)
+            removed.extend(kids_a[a0 + n:a1])
+            added.extend(kids_b[b0 + n:b1])
+        elif tag == "delete":
+            removed.extend(kids_a[a0:a1])
+        else:
+            added.extend(kids_b[b0:b1])
+    # 顺序调换的节点：一边删除、一边新增且指纹相同
+    by_fp = {}
+    for ia in removed:
+        by_fp.setdefault(a.records[ia]["fp"], []).append(ia)
+    for ib in list(added):
+        candidates = by_fp.get(b.records[ib]["fp"])
+        if candidates:
+            ia = candidates.pop(0)
+            removed.remove(ia)
+            added.remove(ib)
+            out.append(_entry("moved", a, ia, b, ib))
+            matched.append((ia, ib))
+    for ia in removed:
+        entry = _entry("removed", a, ia, b, None)
+        entry["nodes"] = a.size(ia)
+        out.append(entry)
+    for ib in added:
+        entry = _entry("added", a, None, b, ib)
+        entry["nodes"] = b.size(ib)
+        out.append(entry)
+    matched.sort(key=lambda pair: pair[1])
+    return matched
+
+
+# ---------------- 路径提示 ----------------
+
+def _app_roots(header):
+    """
+    把导出中的节点按所属应用分组：产出 (应用名, 版本, 应用在导出中的路径)。
+    导出的根是应用时取文件头的 app / version；根是桌面时取文件头 apps 中各应用的 name / version。
+    """
+    if header.get("app") is not None and header.get("app_version") is not None:
+        yield header["app"], header["app_version"], ()
+    for index, app in enumerate(header.get("apps") or ()):
+        if app and app.get("version") is not None:
+            yield app["name"], app["version"], (index,)
+
+
+def precompute_hints(path, store=None, locator_types=("name", "role"), locators=None):
+    """
+    从导出的应用树（或桌面树）生成定位器路径提示并写入提示库，返回写入的提示数。
+
+    每个应用中按先序第一个匹配的元素作为定位器的提示，与在线查找的结果一致；locators 指定只生成哪些定位器。
+    导出时的应用版本（可执行文件大小与修改时间）写在文件头中，应用升级后这些提示自动不再使用。
+    """
+    if store is None:
+        from locator_hints import get_hint_store
+        store = get_hint_store()
+        if store is None:
+            return 0
+    header = read_header(path)
+    apps = {prefix: (name, version, {}) for name, version, prefix in _app_roots(header)}
+    if not apps:
+        raise ValueError("导出文件头中没有应用名和版本，无法生成路径提示（应导出应用或整个桌面）")
+    wanted = set(locators) if locators is not None else None
+    depth = min(len(prefix) for prefix in apps)
+    for record in iter_dump(path):
+        node_path = tuple(record["path"])
+        prefix = node_path[:depth]
+        app = apps.get(prefix)
+        # 跳过应用节点本身，在线查找从应用的子元素开始
+        if app is None or len(node_path) == len(prefix):
+            continue
+        table = app[2]
+        for locator_type in locator_types:
+            value = record.get(locator_type)
+            if not value:
+                continue
+            locator = f"{locator_type}:{value}"
+            if locator in table or (wanted is not None and locator not in wanted):
+                continue
+            table[locator] = {"path": list(node_path[len(prefix):]), "role": record["role"], "name": record["name"]}
+    written = 0
+    for name, version, table in apps.values():
+        if table:
+            store.record_many(name, version, table)
+            written += len(table)
+    return written
+
+
+# ---------------- 命令行 ----------------
+
+def _print_diff(entries, stream):
+    for entry in entries:
+        where = entry["path_b"] if entry["path_b"] is not None else entry["path_a"]
+        line = f"{entry['op']:8} {where} {entry['role']} {entry['name']!r}"
+        if entry["op"] == "moved":
+            line += f" (from {entry['path_a']})"
+        elif "nodes" in entry:
+            line += f" ({entry['nodes']} nodes)"
+        elif "fields" in entry:
+            line += " " + ", ".join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in entry["fields"].items())
+        stream.write(line + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="可访问性树导出文件的比较、转换与路径提示预计算")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("diff", help="比较两个导出文件")
+    p.add_argument("a")
+    p.add_argument("b")
+    p.add_argument("--json", action="store_true", help="以 JSON 输出差异列表")
+    p = sub.add_parser("convert", help="在 ndjson 与 binary 之间转换")
+    p.add_argument("source")
+    p.add_argument("target")
+    p = sub.add_parser("hints", help="从导出文件生成定位器路径提示")
+    p.add_argument("dump")
+    p.add_argument("--types", default="name,role", help="定位器类型，逗号分隔，默认为 name,role")
+    args = parser.parse_args(argv)
+
+    if args.command == "diff":
+        entries = diff_tree(args.a, args.b)
+        if args.json:
+            json.dump(entries, sys.stdout, ensure_ascii=False, indent=1)
+            sys.stdout.write("\n")
+        else:
+            _print_diff(entries, sys.stdout)
+        return 1 if entries else 0
+    if args.command == "convert":
+        header = read_header(args.source)
+        fields = [field for field in header.get("fields", ()) if field not in BASE_FIELDS]
+        header = {key: value for key, value in header.items() if key not in ("format", "version", "created", "fields")}
+        stats = _rewrite(args.source, args.target, header, fields)
+        print(f"{stats['nodes']} nodes, {stats['bytes']} bytes")
+        return 0
+    written = precompute_hints(args.dump, locator_types=tuple(t for t in args.types.split(",") if t))
+    print(f"{written} hints written")
+    return 0
+
+
+class _RecordNode:
+    """把导出记录还原成 iter_nodes 可以遍历的节点（convert 使用）。"""
+
+    def __init__(self, record, children):
+        self.record = record
+        self.children = children
+
+    def get_role_name(self):
+        return self.record["role"]
+
+    def get_name(self):
+        return self.record["name"]
+
+    def get_child_count(self):
+        return len(self.children)
+
+    def get_child_at_index(self, index):
+        return self.children[index]
+
+
+def _rewrite(source, target, header, fields):
+    loaded = _LoadedTree(source)
+    nodes = [_RecordNode(record, []) for record in loaded.records]
+    for node, children in zip(nodes, loaded.children):
+        node.children = [nodes[i] for i in children]
+    if not nodes:
+        raise ValueError(f"导出文件中没有节点: {source}")
+    return dump_tree(nodes[0], target, fields=fields, reader=lambda node, field: node.record.get(field),
+                     header=header)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,634 @@
+import re
+import functools
+
+"""
+XPath / CSS 选择器编译器，输出供 tree_snapshot.TreeSnapshot 求值的步骤列表。
+
+两种语法编译成同一种结构：Selector（若干条 | 或 , 分隔的 Path），Path 由 Step 组成，
+Step 为 轴 + 角色测试 + 谓词列表。谓词编译为闭包 func(snapshot, node, position, size)。
+编译结果按表达式字符串缓存（compile_xpath / compile_css 带 lru_cache）。
+
+XPath 方言:
+    //push button[@name='确定']                   角色名可以包含空格，也可写作 push_button
+    /desktop frame/application[@name='计算器']//button[2]
+    //table/table row[last()]/table cell[contains(@name, '合计')]
+    //*[@id='ok' or starts-with(@name, '确')]/parent::*
+    支持的轴: child descendant descendant-or-self parent ancestor ancestor-or-self self
+              following-sibling preceding-sibling following preceding
+    支持的函数: position() last() count() contains() starts-with() ends-with() not()
+              string-length() normalize-space() text() name() role() matches()
+
+CSS 方言:
+    push_button[name="确定"]             类型选择器为角色名，空格写作 _ 或 -
+    frame > filler push_button:nth-child(2)
+    #ok_button                            元素 id
+    check_box.checked                     .xxx 表示具有该状态（focused、checked、selected ...）
+    [name^="保存"], [name*="另存"]         属性运算符 = != ^= $= *= ~=
+    支持的伪类: :first-child :last-child :only-child :nth-child(an+b) :nth-last-child(an+b)
+              :not(...) :contains("文本") :empty :root
+"""
+
+AXES = ("child", "descendant", "descendant-or-self", "parent", "ancestor", "ancestor-or-self", "self",
+        "following-sibling", "preceding-sibling", "following", "preceding")
+
+COMPILE_CACHE_SIZE = 256
+
+
+class SelectorSyntaxError(ValueError):
+    pass
+
+
+class Predicate:
+    """编译后的谓词。positional 为 True 时结果依赖 position() / last()，不能用索引提前过滤。"""
+
+    __slots__ = ("func", "positional", "equals")
+
+    def __init__(self, func, positional=False, equals=None):
+        self.func = func
+        self.positional = positional
+        self.equals = equals  # (属性名, 字面值)：形如 @name='x' 的谓词，可直接查倒排索引
+
+
+class Step:
+    __slots__ = ("axis", "role", "predicates")
+
+    def __init__(self, axis, role=None, predicates=None):
+        self.axis = axis
+        self.role = role  # None 表示任意节点（* 或 node()）
+        self.predicates = predicates or []
+
+    @property
+    def positional(self):
+        return any(p.positional for p in self.predicates)
+
+    @property
+    def index_hint(self):
+        """第一个谓词为 @name/@id 等值比较时返回 (属性名, 值)，求值时先查倒排索引。"""
+        if self.predicates and self.predicates[0].equals and not self.predicates[0].positional:
+            return self.predicates[0].equals
+        return None
+
+    def __repr__(self):
+        return f"{self.axis}::{self.role or '*'}" + "[...]" * len(self.predicates)
+
+
+class Path:
+    __slots__ = ("absolute", "steps")
+
+    def __init__(self, absolute, steps):
+        self.absolute = absolute
+        self.steps = steps
+
+    def __repr__(self):
+        return ("/" if self.absolute else "") + "/".join(map(repr, self.steps))
+
+
+class Selector:
+    """编译后的选择器：paths 为 XPath 中 | 或 CSS 中 , 分隔的各条路径，结果取并集。"""
+
+    __slots__ = ("source", "paths")
+
+    def __init__(self, source, paths):
+        self.source = source
+        self.paths = paths
+
+    def __repr__(self):
+        return f"<Selector {self.source!r}>"
+
+
+def normalize_role(name):
+    """push_button / push-button / Push Button -> push button"""
+    return re.sub(r"\s+", " ", name.replace("_", " ").replace("-", " ")).strip().lower()
+
+
+# ---------------- 值的转换（XPath 1.0 语义的简化版） ----------------
+
+def _node_string(snapshot, node):
+    return node.name or ""
+
+
+def _to_string(snapshot, value):
+    if isinstance(value, list):
+        return _node_string(snapshot, value[0]) if value else ""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _to_number(snapshot, value):
+    try:
+        return float(_to_string(snapshot, value))
+    except ValueError:
+        return float("nan")
+
+
+def _to_bool(value):
+    if isinstance(value, list):
+        return bool(value)
+    if isinstance(value, float):
+        return value == value and value != 0
+    return bool(value)
+
+
+def _compare(snapshot, op, left, right):
+    # 节点集与其他值比较：存在一个节点满足即为真
+    if isinstance(left, list):
+        return any(_compare(snapshot, op, _node_string(snapshot, n), right) for n in left)
+    if isinstance(right, list):
+        return any(_compare(snapshot, op, left, _node_string(snapshot, n)) for n in right)
+    if left is None or right is None:
+        return op == "!=" and (left is None) != (right is None)
+    if op in ("=", "!="):
+        if isinstance(left, bool) or isinstance(right, bool):
+            equal = _to_bool(left) == _to_bool(right)
+        elif isinstance(left, float) or isinstance(right, float):
+            equal = _to_number(snapshot, left) == _to_number(snapshot, right)
+        else:
+            equal = _to_string(snapshot, left) == _to_string(snapshot, right)
+        return equal if op == "=" else not equal
+    a, b = _to_number(snapshot, left), _to_number(snapshot, right)
+    return {"<": a < b, ">": a > b, "<=": a <= b, ">=": a >= b}[op]
+
+
+# ---------------- XPath ----------------
+
+_XPATH_STOP = set("/[]()|@,=!<>'\"")
+
+
+class _XPathParser:
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+        self.positional = False  # 当前谓词是否用到 position() / last()
+
+    # 扫描
+    def error(self, message):
+        raise SelectorSyntaxError(f"XPath 语法错误: {message}（位置 {self.pos}）: {self.text}")
+
+    def skip_ws(self):
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def peek(self, token):
+        self.skip_ws()
+        return self.text.startswith(token, self.pos)
+
+    def accept(self, token):
+        if self.peek(token):
+            self.pos += len(token)
+            return True
+        return False
+
+    def expect(self, token):
+        if not self.accept(token):
+            self.error(f"应为 '{token}'")
+
+    def at_end(self):
+        self.skip_ws()
+        return self.pos >= len(self.text)
+
+    def read_word(self):
+        """读取一个不含空格的名称（函数名、属性名、关键字、轴名）。"""
+        self.skip_ws()
+        match = re.compile(r"[\w.\-]+|\*", re.UNICODE).match(self.text, self.pos)
+        if not match:
+            self.error("应为名称")
+        self.pos = match.end()
+        return match.group()
+
+    def read_node_test(self, allow_spaces):
+        """读取节点测试。路径中的角色名可以包含空格（push button），谓词中的相对路径需写作 push_button。"""
+        self.skip_ws()
+        if self.accept("*"):
+            return None
+        start = self.pos
+        while self.pos < len(self.text):
+            ch = self.text[self.pos]
+            if ch in _XPATH_STOP or self.text.startswith("::", self.pos):
+                break
+            if ch.isspace() and not allow_spaces:
+                break
+            self.pos += 1
+        name = self.text[start:self.pos].strip()
+        if not name:
+            self.error("应为节点测试")
+        if name in ("node", "text") and self.peek("("):
+            self.expect("(")
+            self.expect(")")
+            if name == "text":
+                self.error("text() 只能用于谓词中")
+            return None
+        return normalize_role(name)
+
+    def read_string(self):
+        self.skip_ws()
+        quote = self.text[self.pos]
+        end = self.text.find(quote, self.pos + 1)
+        if end < 0:
+            self.error("字符串没有结束引号")
+        value = self.text[self.pos + 1:end]
+        self.pos = end + 1
+        return value
+
+    # 路径
+    def parse_selector(self):
+        paths = [self.parse_path(top_level=True)]
+        while self.accept("|"):
+            paths.append(self.parse_path(top_level=True))
+        if not self.at_end():
+            self.error("多余的内容")
+        return paths
+
+    def parse_path(self, top_level):
+        steps = []
+        absolute = False
+        if self.accept("//"):
+            absolute = True
+            steps.append(Step("descendant-or-self"))
+        elif self.accept("/"):
+            absolute = True
+            if self.at_end() or self.peek("|") or self.peek(")") or self.peek("]"):
+                return Path(True, [])
+        steps.append(self.parse_step(top_level))
+        while True:
+            if self.accept("//"):
+                steps.append(Step("descendant-or-self"))
+            elif self.accept("/"):
+                pass
+            else:
+                break
+            steps.append(self.parse_step(top_level))
+        return Path(absolute, steps)
+
+    def parse_step(self, top_level):
+        if self.accept(".."):
+            return Step("parent")
+        if self.peek(".") and not self.text.startswith("..", self.pos):
+            self.pos += 1
+            return Step("self")
+        axis = "child"
+        self.skip_ws()
+        match = re.compile(r"([a-z\-]+)\s*::").match(self.text, self.pos)
+        if match:
+            axis = match.group(1)
+            if axis not in AXES:
+                self.error(f"不支持的轴: {axis}")
+            self.pos = match.end()
+        role = self.read_node_test(allow_spaces=top_level)
+        predicates = []
+        while self.accept("["):
+            predicates.append(self.parse_predicate())
+            self.expect("]")
+        return Step(axis, role, predicates)
+
+    # 谓词表达式
+    def parse_predicate(self):
+        # 谓词可以嵌套（路径中的谓词），内层的 position() 不影响外层，外层已有的标记在内层解析后恢复
+        outer = self.positional
+        self.positional = False
+        expr, kind = self.parse_or()
+        positional = self.positional or kind == "number"
+        self.positional = outer
+        equals = getattr(expr, "equals", None)
+        if kind == "number":
+            def func(snapshot, node, position, size, expr=expr):
+                return _to_number(snapshot, expr(snapshot, node, position, size)) == position
+        else:
+            def func(snapshot, node, position, size, expr=expr):
+                return _to_bool(expr(snapshot, node, position, size))
+        return Predicate(func, positional, equals)
+
+    def parse_or(self):
+        left, kind = self.parse_and()
+        while self.accept_keyword("or"):
+            right, _ = self.parse_and()
+            left = (lambda a, b: lambda s, n, p, z: _to_bool(a(s, n, p, z)) or _to_bool(b(s, n, p, z)))(left, right)
+            kind = "bool"
+        return left, kind
+
+    def parse_and(self):
+        left, kind = self.parse_equality()
+        while self.accept_keyword("and"):
+            right, _ = self.parse_equality()
+            left = (lambda a, b: lambda s, n, p, z: _to_bool(a(s, n, p, z)) and _to_bool(b(s, n, p, z)))(left, right)
+            kind = "bool"
+        return left, kind
+
+    def accept_keyword(self, word):
+        self.skip_ws()
+        match = re.compile(r"%s\b" % word).match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            return True
+        return False
+
+    def parse_equality(self):
+        left, kind = self.parse_relational()
+        while True:
+            if self.accept("!="):
+                op = "!="
+            elif self.accept("="):
+                op = "="
+            else:
+                return left, kind
+            right, _ = self.parse_relational()
+            equals = None
+            if op == "=":
+                equals = _literal_equals(left, right) or _literal_equals(right, left)
+            left = (lambda a, b, o: lambda s, n, p, z: _compare(s, o, a(s, n, p, z), b(s, n, p, z)))(left, right, op)
+            left.equals = equals
+            kind = "bool"
+
+    def parse_relational(self):
+        left, kind = self.parse_primary()
+        while True:
+            for op in ("<=", ">=", "<", ">"):
+                if self.accept(op):
+                    break
+            else:
+                return left, kind
+            right, _ = self.parse_primary()
+            left = (lambda a, b, o: lambda s, n, p, z: _compare(s, o, a(s, n, p, z), b(s, n, p, z)))(left, right, op)
+            kind = "bool"
+
+    def parse_primary(self):
+        self.skip_ws()
+        if self.pos >= len(self.text):
+            self.error("表达式不完整")
+        ch = self.text[self.pos]
+        if ch in "'\"":
+            value = self.read_string()
+            func = lambda s, n, p, z: value
+            func.literal = value
+            return func, "string"
+        number = re.compile(r"-?\d+(\.\d+)?").match(self.text, self.pos)
+        if number:
+            self.pos = number.end()
+            value = float(number.group())
+            return (lambda s, n, p, z: value), "number"
+        if self.accept("("):
+            expr, kind = self.parse_or()
+            self.expect(")")
+            return expr, kind
+        if self.accept("@"):
+            attr = self.read_word()
+            func = lambda s, n, p, z: s.attribute(n, attr)
+            func.attribute = attr
+            return func, "string"
+        function = re.compile(r"([a-z][a-z\-]*)\s*\(").match(self.text, self.pos)
+        if function and function.group(1) not in ("node",):
+            self.pos = function.end()
+            return self.parse_function(function.group(1))
+        # 相对路径（节点集），例如 [label[@name='x']] 或 [./push_button]
+        path = self.parse_path(top_level=False)
+        return (lambda s, n, p, z: s.evaluate_path(path, [n])), "nodeset"
+
+    def parse_function(self, name):
+        args = []
+        if not self.accept(")"):
+            while True:
+                args.append(self.parse_or())
+                if self.accept(")"):
+                    break
+                self.expect(",")
+        funcs = [a for a, _ in args]
+
+        def arg_string(index, s, n, p, z):
+            if index < len(funcs):
+                return _to_string(s, funcs[index](s, n, p, z))
+            return _node_string(s, n)
+
+        if name == "position":
+            self.positional = True
+            return (lambda s, n, p, z: float(p)), "number"
+        if name == "last":
+            self.positional = True
+            return (lambda s, n, p, z: float(z)), "number"
+        if name == "count":
+            return (lambda s, n, p, z: float(len(funcs[0](s, n, p, z)))), "number"
+        if name == "not":
+            return (lambda s, n, p, z: not _to_bool(funcs[0](s, n, p, z))), "bool"
+        if name == "contains":
+            return (lambda s, n, p, z: arg_string(1, s, n, p, z) in arg_string(0, s, n, p, z)), "bool"
+        if name == "starts-with":
+            return (lambda s, n, p, z: arg_string(0, s, n, p, z).startswith(arg_string(1, s, n, p, z))), "bool"
+        if name == "ends-with":
+            return (lambda s, n, p, z: arg_string(0, s, n, p, z).endswith(arg_string(1, s, n, p, z))), "bool"
+        if name == "matches":
+            return (lambda s, n, p, z: re.search(arg_string(1, s, n, p, z), arg_string(0, s, n, p, z)) is not None), "bool"
+        if name == "string-length":
+            return (lambda s, n, p, z: float(len(arg_string(0, s, n, p, z)))), "number"
+        if name == "normalize-space":
+            return (lambda s, n, p, z: " ".join(arg_string(0, s, n, p, z).split())), "string"
+        if name == "text":
+            return (lambda s, n, p, z: s.attribute(n, "text") or ""), "string"
+        if name in ("name", "role"):
+            return (lambda s, n, p, z: n.role), "string"
+        if name in ("true", "false"):
+            value = name == "true"
+            return (lambda s, n, p, z: value), "bool"
+        self.error(f"不支持的函数: {name}()")
+
+
+def _literal_equals(attribute_side, literal_side):
+    attr = getattr(attribute_side, "attribute", None)
+    literal = getattr(literal_side, "literal", None)
+    if attr and literal is not None:
+        return (attr, literal)
+    return None
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_xpath(expression):
+    """编译 XPath 表达式（结果缓存）。"""
+    return Selector(expression, _XPathParser(expression.strip()).parse_selector())
+
+
+# ---------------- CSS ----------------
+
+_CSS_TOKEN = re.compile(r"""
+    \s*(?P<combinator>[>+~,])\s*
+  | (?P<space>\s+)
+  | (?P<star>\*)
+  | \#(?P<id>[\w\-]+)
+  | \.(?P<state>[\w\-]+)
+  | \[\s*(?P<attr>[\w\-]+)\s*(?:(?P<op>[~^$*!]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\]\s]+))\s*)?\]
+  | :(?P<pseudo>[\w\-]+)(?:\((?P<arg>(?:[^()]|\([^()]*\))*)\))?
+  | (?P<type>[\w\-]+)
+""", re.VERBOSE | re.UNICODE)
+
+
+def _nth(expression):
+    """解析 an+b（odd / even / 3 / 2n+1 / -n+3），返回判断从 1 开始的序号的函数。"""
+    expression = expression.replace(" ", "").lower()
+    if expression == "odd":
+        a, b = 2, 1
+    elif expression == "even":
+        a, b = 2, 0
+    else:
+        match = re.fullmatch(r"([+-]?\d*)n([+-]\d+)?|([+-]?\d+)", expression)
+        if not match:
+            raise SelectorSyntaxError(f"无效的 an+b 表达式: {expression}")
+        if match.group(3) is not None:
+            a, b = 0, int(match.group(3))
+        else:
+            coefficient = match.group(1)
+            a = -1 if coefficient == "-" else int(coefficient) if coefficient not in ("", "+") else 1
+            b = int(match.group(2) or 0)
+    if a == 0:
+        return lambda index: index == b
+    return lambda index: (index - b) % a == 0 and (index - b) // a >= 0
+
+
+def _attribute_predicate(attr, op, value):
+    attr = attr.lower()
+    if op is None:
+        func = lambda s, n, p, z: bool(s.attribute(n, attr))
+        return Predicate(func)
+    if attr == "role":
+        value = normalize_role(value)
+    tests = {
+        "=": lambda actual: actual == value,
+        "!=": lambda actual: actual != value,
+        "^=": lambda actual: actual.startswith(value),
+        "$=": lambda actual: actual.endswith(value),
+        "*=": lambda actual: value in actual,
+        "~=": lambda actual: value in actual.split(),
+    }
+    test = tests[op]
+
+    def func(s, n, p, z):
+        actual = s.attribute(n, attr)
+        if actual is None:
+            return op == "!="
+        return test(_to_string(s, actual))
+    return Predicate(func, equals=(attr, value) if op == "=" else None)
+
+
+def _state_predicate(state):
+    state = state.lower().replace("-", "_")
+    return Predicate(lambda s, n, p, z: state in s.states(n))
+
+
+def _pseudo_predicate(name, arg):
+    name = name.lower()
+    if name == "first-child":
+        return Predicate(lambda s, n, p, z: n.position == 0)
+    if name == "last-child":
+        return Predicate(lambda s, n, p, z: n.position == s.sibling_count(n) - 1)
+    if name == "only-child":
+        return Predicate(lambda s, n, p, z: s.sibling_count(n) == 1)
+    if name == "nth-child":
+        test = _nth(arg or "")
+        return Predicate(lambda s, n, p, z: test(n.position + 1))
+    if name == "nth-last-child":
+        test = _nth(arg or "")
+        return Predicate(lambda s, n, p, z: test(s.sibling_count(n) - n.position))
+    if name == "empty":
+        return Predicate(lambda s, n, p, z: not n.children)
+    if name == "root":
+        return Predicate(lambda s, n, p, z: n.index == 0)
+    if name == "contains":
+        text = (arg or "").strip().strip("'\"")
+        return Predicate(lambda s, n, p, z: text in (n.name or "") or text in (s.attribute(n, "text") or ""))
+    if name == "not":
+        role, predicates = _parse_compound(arg or "")
+        def func(s, n, p, z):
+            return not ((role is None or n.role == role)
+                        and all(pr.func(s, n, p, z) for pr in predicates))
+        return Predicate(func)
+    raise SelectorSyntaxError(f"不支持的伪类: :{name}")
+
+
+def _compound_parts(text):
+    """把选择器拆成 [(组合符, 复合选择器片段列表)]，组合符为 None（开头）、' '、'>'、'+'、'~' 或 ','。"""
+    result = []
+    pos = 0
+    combinator = None
+    parts = []
+    text = text.strip()
+    while pos < len(text):
+        match = _CSS_TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise SelectorSyntaxError(f"CSS 选择器语法错误（位置 {pos}）: {text}")
+        pos = match.end()
+        if match.group("combinator") or match.group("space"):
+            symbol = match.group("combinator") or " "
+            if parts:
+                result.append((combinator, parts))
+                parts = []
+                combinator = symbol
+            elif symbol != " ":
+                if combinator not in (None, " ") and symbol != ",":
+                    raise SelectorSyntaxError(f"CSS 选择器中连续的组合符: {text}")
+                combinator = symbol
+            continue
+        parts.append(match)
+    if parts:
+        result.append((combinator, parts))
+    elif result or combinator:
+        raise SelectorSyntaxError(f"CSS 选择器不完整: {text}")
+    return result
+
+
+def _build_compound(parts):
+    role = None
+    predicates = []
+    for match in parts:
+        if match.group("type"):
+            role = normalize_role(match.group("type"))
+        elif match.group("id"):
+            predicates.append(_attribute_predicate("id", "=", match.group("id")))
+        elif match.group("state"):
+            predicates.append(_state_predicate(match.group("state")))
+        elif match.group("attr"):
+            value = match.group("dq")
+            if value is None:
+                value = match.group("sq")
+            if value is None:
+                value = match.group("bare")
+            predicates.append(_attribute_predicate(match.group("attr"), match.group("op"), value))
+        elif match.group("pseudo"):
+            predicates.append(_pseudo_predicate(match.group("pseudo"), match.group("arg")))
+    # 可以查倒排索引的等值谓词放在最前面
+    predicates.sort(key=lambda p: p.equals is None or p.equals[0] not in ("name", "id"))
+    return role, predicates
+
+
+def _parse_compound(text):
+    parts = _compound_parts(text)
+    if len(parts) != 1 or parts[0][0] not in (None, " "):
+        raise SelectorSyntaxError(f":not() 中只支持单个复合选择器: {text}")
+    return _build_compound(parts[0][1])
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_css(expression):
+    """编译 CSS 选择器（结果缓存）。组合符：空格（后代）、>（子）、+（紧邻的后一个兄弟）、~（之后的兄弟）。"""
+    paths = []
+    steps = []
+    for combinator, parts in _compound_parts(expression):
+        role, predicates = _build_compound(parts)
+        if combinator in (None, ","):
+            if steps:
+                paths.append(Path(True, steps))
+            steps = [Step("descendant", role, predicates)]
+        elif combinator == " ":
+            steps.append(Step("descendant", role, predicates))
+        elif combinator == ">":
+            steps.append(Step("child", role, predicates))
+        elif combinator == "~":
+            steps.append(Step("following-sibling", role, predicates))
+        elif combinator == "+":
+            first = Predicate(lambda s, n, p, z: p == 1, positional=True)
+            steps.append(Step("following-sibling", None, [first]))
+            steps.append(Step("self", role, predicates))
+    if not steps:
+        raise SelectorSyntaxError(f"空的 CSS 选择器: {expression}")
+    paths.append(Path(True, steps))
+    return Selector(expression, paths)
@@ -0,0 +1,333 @@
+import time
+import bisect
+
+from tree_selectors import compile_xpath, compile_css
+
+"""
+可访问性树快照：一次遍历记录整棵子树的结构、角色和名称，之后的 XPath / CSS 查询都在内存中求值。
+
+每个节点只读取 role、name 和子元素（get_role_name / get_name / get_child_count / get_child_at_index），
+id、text、states、位置等字段在查询用到时才读取并缓存在快照中。
+快照建立角色和名称的倒排索引（按先序下标排序），//push button[@name='确定'] 这类查询
+直接取两个索引中较短的列表，再用先序区间判断是否在上下文节点的子树内，不必扫描所有节点。
+"""
+
+# 单个快照最多记录的节点数，避免异常的超大树耗尽内存
+DEFAULT_MAX_NODES = 200000
+
+
+class SnapshotNode:
+    """快照中的一个节点。index 为先序下标，子树中的节点下标都在 [index, end) 内。"""
+
+    __slots__ = ("index", "accessible", "role", "name", "parent", "children", "depth", "position", "end")
+
+    def __init__(self, index, accessible, role, name, parent, depth, position):
+        self.index = index
+        self.accessible = accessible
+        self.role = role
+        self.name = name
+        self.parent = parent
+        self.children = []
+        self.depth = depth
+        self.position = position  # 在父节点中的序号（从 0 开始）
+        self.end = index + 1
+
+    def __repr__(self):
+        return f"<SnapshotNode #{self.index} {self.role!r} {self.name!r}>"
+
+
+class TreeSnapshot:
+    """
+    一棵可访问性子树的快照。
+
+    roots 为一个或多个 Atspi.Accessible，多个根时各自成为虚拟文档节点的子节点；
+    reader 为读取延迟字段的函数 reader(accessible, field)，field 取 "id"、"text"、"states"、"rectangle"
+    （LinuxHandler._element_field），省略时这些字段都为空。
+    branch 为子元素序号路径（如 [应用序号, 窗口序号]）时，前 len(branch) 层只展开路径上的节点，
+    其余节点只记录自身、不读取子元素：绝对路径和祖先上的谓词照常求值，但只遍历一个窗口。
+    """
+
+    def __init__(self, roots, reader=None, max_depth=None, max_nodes=DEFAULT_MAX_NODES, branch=None):
+        if not isinstance(roots, (list, tuple)):
+            roots = [roots]
+        self.reader = reader
+        self.nodes = []
+        self.by_role = {}
+        self.by_name = {}
+        self.calls = 0
+        self.truncated = False
+        self._fields = {}
+        # 虚拟文档节点：绝对路径从这里开始，/x 匹配根元素，//x 匹配所有节点
+        self.document = SnapshotNode(-1, None, None, None, None, -1, 0)
+        start = time.perf_counter()
+        self._capture(roots, max_depth, max_nodes, branch or ())
+        self.capture_time = time.perf_counter() - start
+
+    def _capture(self, roots, max_depth, max_nodes, branch):
+        # 栈中每项为 (元素, 父节点下标, 深度, 在父节点中的序号)，先序分配下标
+        stack = [(root, -1, 0, position) for position, root in reversed(list(enumerate(roots)))]
+        nodes = self.nodes
+        while stack:
+            if len(nodes) >= max_nodes:
+                self.truncated = True
+                break
+            accessible, parent, depth, position = stack.pop()
+            try:
+                role = accessible.get_role_name()
+                name = accessible.get_name()
+                expand = (max_depth is None or depth < max_depth) and (
+                    depth == 0 or depth > len(branch) or position == branch[depth - 1])
+                count = accessible.get_child_count() if expand else 0
+                self.calls += 3 if expand else 2
+            except Exception:
+                # 元素已销毁等情况，跳过该子树
+                continue
+            index = len(nodes)
+            node = SnapshotNode(index, accessible, role, name, parent, depth, position)
+            nodes.append(node)
+            (self.nodes[parent].children if parent >= 0 else self.document.children).append(index)
+            self.by_role.setdefault(role, []).append(index)
+            self.by_name.setdefault(name, []).append(index)
+            children = []
+            for i in range(count):
+                try:
+                    child = accessible.get_child_at_index(i)
+                except Exception:
+                    child = None
+                self.calls += 1
+                if child is not None:
+                    children.append(child)
+            for child_position in range(len(children) - 1, -1, -1):
+                stack.append((children[child_position], index, depth + 1, child_position))
+        # 被跳过的子元素会让 position 出现空缺，按实际记录的子节点重新编号
+        for node in [self.document] + nodes:
+            for position, child in enumerate(node.children):
+                nodes[child].position = position
+        # 先序遍历中子树是连续区间：end 为最后一个子节点的 end
+        for node in reversed(nodes):
+            if node.children:
+                node.end = nodes[node.children[-1]].end
+        self.document.end = len(nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def root(self):
+        return self.nodes[0] if self.nodes else None
+
+    # ---------------- 字段 ----------------
+
+    def _lazy_field(self, node, field):
+        key = (node.index, field)
+        if key in self._fields:
+            return self._fields[key]
+        value = None
+        if self.reader is not None:
+            try:
+                value = self.reader(node.accessible, field)
+            except Exception:
+                value = None
+            self.calls += 1
+        self._fields[key] = value
+        return value
+
+    def attribute(self, node, attr):
+        """谓词中 @attr 的值：name role id text states index depth child_count x y width height。"""
+        if node.index < 0:
+            return None
+        if attr == "name":
+            return node.name
+        if attr == "role":
+            return node.role
+        if attr == "index":
+            return float(node.position)
+        if attr == "depth":
+            return float(node.depth)
+        if attr in ("child_count", "childcount"):
+            return float(len(node.children))
+        if attr == "id":
+            value = self._lazy_field(node, "id")
+            return None if value is None else str(value)
+        if attr == "text":
+            return self._lazy_field(node, "text")
+        if attr == "states":
+            return " ".join(self.states(node))
+        if attr in ("x", "y", "width", "height"):
+            rect = self._lazy_field(node, "rectangle")
+            return None if rect is None else float(rect[attr])
+        return None
+
+    def states(self, node):
+        """节点状态名称集合（小写，去掉 ATSPI_STATE_ 前缀），如 {"focused", "checked"}。"""
+        key = (node.index, "state_names")
+        if key not in self._fields:
+            names = set()
+            for state in self._lazy_field(node, "states") or ():
+                name = str(state).lower()
+                if name.startswith("atspi_state_"):
+                    name = name[len("atspi_state_"):]
+                names.add(name)
+            self._fields[key] = names
+        return self._fields[key]
+
+    def sibling_count(self, node):
+        parent = self.nodes[node.parent] if node.parent >= 0 else self.document
+        return len(parent.children)
+
+    # ---------------- 查询 ----------------
+
+    def xpath(self, expression):
+        """按 XPath 查询，返回按文档顺序排列的 SnapshotNode 列表。"""
+        return self.select(compile_xpath(expression))
+
+    def css(self, expression):
+        """按 CSS 选择器查询，返回按文档顺序排列的 SnapshotNode 列表。"""
+        return self.select(compile_css(expression))
+
+    # ElementLocator 的自定义接口：xpath / css 定位类型以快照为上下文时调用
+    def findByXPath(self, expression):
+        result = self.xpath(expression)
+        return result[0] if result else None
+
+    def findByCss(self, expression):
+        result = self.css(expression)
+        return result[0] if result else None
+
+    def select(self, selector, context=None):
+        """对编译后的选择器求值；相对路径以 context（默认为根元素）为上下文。"""
+        indexes = set()
+        for path in selector.paths:
+            for node in self.evaluate_path(path, [context or self.root] if self.nodes else []):
+                indexes.add(node.index)
+        return [self.nodes[i] for i in sorted(indexes) if i >= 0]
+
+    def evaluate_path(self, path, contexts):
+        if path.absolute:
+            contexts = [self.document]
+        steps = path.steps
+        i = 0
+        while i < len(steps) and contexts:
+            step = steps[i]
+            # // 展开为 descendant-or-self::node()/child::x，合并成一步用索引求值
+            if (step.axis == "descendant-or-self" and step.role is None and not step.predicates
+                    and i + 1 < len(steps) and steps[i + 1].axis == "child"):
+                contexts = self._descendants(contexts, steps[i + 1], include_self=False, by_parent=True)
+                i += 2
+                continue
+            if step.axis in ("descendant", "descendant-or-self") and not step.positional:
+                contexts = self._descendants(contexts, step, include_self=step.axis == "descendant-or-self")
+            else:
+                contexts = self._generic_step(contexts, step)
+            i += 1
+        return contexts
+
+    def _candidates(self, step):
+        """满足节点测试（以及第一个等值谓词）的候选下标，升序；返回 (下标列表, 已满足的谓词个数)。"""
+        role_list = self.by_role.get(step.role, []) if step.role is not None else None
+        hint = step.index_hint
+        if hint and hint[0] == "name":
+            name_list = self.by_name.get(hint[1], [])
+            if role_list is None:
+                return name_list, 1
+            if len(name_list) <= len(role_list):
+                return [i for i in name_list if self.nodes[i].role == step.role], 1
+            return [i for i in role_list if self.nodes[i].name == hint[1]], 1
+        if role_list is None:
+            return range(len(self.nodes)), 0
+        return role_list, 0
+
+    def _ranges(self, contexts, include_self):
+        """上下文节点子树的先序区间，合并嵌套的区间。"""
+        ranges = []
+        for node in sorted(contexts, key=lambda n: n.index):
+            start = node.index if include_self else node.index + 1
+            if ranges and start < ranges[-1][1]:
+                continue
+            ranges.append((max(start, 0), node.end))
+        return ranges
+
+    def _descendants(self, contexts, step, include_self, by_parent=False):
+        candidates, satisfied = self._candidates(step)
+        selected = []
+        for start, end in self._ranges(contexts, include_self):
+            lo = bisect.bisect_left(candidates, start)
+            hi = bisect.bisect_left(candidates, end)
+            selected.extend(candidates[lo:hi])
+        nodes = [self.nodes[i] for i in selected]
+        predicates = step.predicates[satisfied:]
+        if not predicates:
+            return nodes
+        if by_parent and step.positional:
+            # child 轴上的位置谓词按父节点分组计算（//x[1] 为每个父节点下的第一个 x）
+            groups = {}
+            for node in nodes:
+                groups.setdefault(node.parent, []).append(node)
+            result = []
+            for group in groups.values():
+                result.extend(self._apply_predicates(group, predicates))
+            result.sort(key=lambda n: n.index)
+            return result
+        return self._apply_predicates(nodes, predicates)
+
+    def _apply_predicates(self, nodes, predicates):
+        for predicate in predicates:
+            size = len(nodes)
+            nodes = [node for position, node in enumerate(nodes, 1)
+                     if predicate.func(self, node, position, size)]
+        return nodes
+
+    def _generic_step(self, contexts, step):
+        seen = set()
+        result = []
+        for context in contexts:
+            nodes = [n for n in self._axis(context, step.axis)
+                     if n.index >= 0 and (step.role is None or n.role == step.role)]
+            for node in self._apply_predicates(nodes, step.predicates):
+                if node.index not in seen:
+                    seen.add(node.index)
+                    result.append(node)
+        result.sort(key=lambda n: n.index)
+        return result
+
+    def _node(self, index):
+        return self.nodes[index] if index >= 0 else self.document
+
+    def _axis(self, node, axis):
+        """轴上的节点；反向轴按离 node 由近到远的顺序（即 position() 的顺序）。"""
+        nodes = self.nodes
+        if axis == "child":
+            return [nodes[i] for i in node.children]
+        if axis == "self":
+            return [node]
+        if axis in ("descendant", "descendant-or-self"):
+            start = node.index if axis == "descendant-or-self" else node.index + 1
+            return [nodes[i] for i in range(max(start, 0), node.end)]
+        if axis in ("parent", "ancestor", "ancestor-or-self"):
+            result = [node] if axis == "ancestor-or-self" else []
+            current = node
+            while current.index >= 0 and current.parent is not None:
+                current = self._node(current.parent)
+                if current.index >= 0:
+                    result.append(current)
+                if axis == "parent":
+                    break
+            return result
+        if node.index < 0:
+            return []
+        siblings = self._node(node.parent).children
+        if axis == "following-sibling":
+            return [nodes[i] for i in siblings[node.position + 1:]]
+        if axis == "preceding-sibling":
+            return [nodes[i] for i in reversed(siblings[:node.position])]
+        if axis == "following":
+            return nodes[node.end:]
+        if axis == "preceding":
+            ancestors = set(n.index for n in self._axis(node, "ancestor"))
+            return [nodes[i] for i in range(node.index - 1, -1, -1) if i not in ancestors]
+        raise ValueError(f"不支持的轴: {axis}")
+
+    def stats(self):
+        """快照的规模和开销：节点数、AT-SPI 调用次数、建立耗时。"""
+        return {"nodes": len(self.nodes), "calls": self.calls, "capture_time": self.capture_time,
+                "roles": len(self.by_role), "truncated": self.truncated}
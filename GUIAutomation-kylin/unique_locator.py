@@ -0,0 +1,180 @@
+import bisect
+
+from tree_selectors import normalize_role
+
+"""
+唯一定位器生成。
+
+在一个树快照（tree_snapshot.TreeSnapshot，处理器默认使用整个桌面）上为元素计算最短的唯一定位器，依次尝试：
+
+1. id:xxx / name:xxx / role:xxx —— 该属性值在快照中只出现一次；
+2. xpath://角色[@name='xxx'] —— 角色与名称的组合只出现一次；
+3. 链式：xpath://祖先//角色[@name='xxx'] —— 某个唯一的祖先之下只有这一个；
+4. 带序号的路径：从最近的唯一祖先（至少是快照的根）逐级写出 /角色[@name='xxx'] 或 /角色[序号]。
+
+出现次数来自快照的角色 / 名称倒排索引和按需建立的 id、角色 + 名称索引（各一次线性遍历），
+子树内的计数用先序区间上的二分查找，单个元素的开销为 O(深度 × log N)，为整棵树生成定位器也接近线性。
+唯一性只在快照范围内判断，而查找总是在整个桌面上进行：处理器默认使用桌面快照，
+并通过 locator_for 的 verify 按实际的查找路径再确认一次。
+"""
+
+
+def quote(value):
+    """XPath 字符串字面值；同时含有单引号和双引号时无法表示，返回 None。"""
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return None
+
+
+class LocatorGenerator:
+    """
+    在一个快照上为多个元素生成唯一定位器，索引只建立一次。
+
+    用法:
+        generator = LocatorGenerator(snapshot)
+        generator.locator_for(node)        # node 为快照中的 SnapshotNode
+    """
+
+    def __init__(self, snapshot, locator_types=("id", "name", "role")):
+        self.snapshot = snapshot
+        self.locator_types = locator_types
+        self._pairs = None  # (角色, 名称) -> 先序下标列表
+        self._ids = None    # id -> 出现次数
+
+    # ---------------- 索引 ----------------
+
+    def _pair_index(self):
+        if self._pairs is None:
+            pairs = {}
+            for node in self.snapshot.nodes:
+                pairs.setdefault((node.role, node.name), []).append(node.index)
+            self._pairs = pairs
+        return self._pairs
+
+    def _id_index(self):
+        # id 是延迟字段，只有元素本身有 id 时才读取整棵树的 id（每个节点一次调用）
+        if self._ids is None:
+            ids = {}
+            for node in self.snapshot.nodes:
+                value = self._id(node)
+                if value:
+                    ids[value] = ids.get(value, 0) + 1
+            self._ids = ids
+        return self._ids
+
+    def _id(self, node):
+        value = self.snapshot.attribute(node, "id")
+        return value or None
+
+    @staticmethod
+    def _count_within(indexes, start, end):
+        """升序下标列表中落在 [start, end) 内的个数。"""
+        return bisect.bisect_left(indexes, end) - bisect.bisect_left(indexes, start)
+
+    # ---------------- 描述 ----------------
+
+    @staticmethod
+    def _role_test(role):
+        """路径中的角色测试；角色名不能按原样写进 XPath 时为 None。"""
+        if role and normalize_role(role) == role and "/" not in role and "[" not in role:
+            return role
+        return None
+
+    def _descriptors(self, node, start, end):
+        """
+        node 在先序区间 [start, end) 中唯一时的描述（不含前缀的 XPath 步骤），由短到长。
+        """
+        snapshot = self.snapshot
+        role = self._role_test(node.role)
+        literal = quote(node.name) if node.name else None
+        result = []
+        if role is not None and literal is not None:
+            if self._count_within(self._pair_index()[(node.role, node.name)], start, end) == 1:
+                result.append(f"{role}[@name={literal}]")
+        if literal is not None and self._count_within(snapshot.by_name.get(node.name, []), start, end) == 1:
+            result.append(f"*[@name={literal}]")
+        if role is not None and self._count_within(snapshot.by_role.get(node.role, []), start, end) == 1:
+            result.append(role)
+        result.sort(key=len)
+        return result
+
+    def _step(self, node):
+        """从父节点到 node 的一步：名称在同角色的兄弟中唯一时按名称，否则按序号。"""
+        snapshot = self.snapshot
+        parent = snapshot._node(node.parent)
+        role = self._role_test(node.role)
+        siblings = [snapshot.nodes[i] for i in parent.children]
+        same = [n for n in siblings if n.role == node.role] if role is not None else siblings
+        literal = quote(node.name) if node.name else None
+        test = role if role is not None else "*"
+        if literal is not None and sum(1 for n in same if n.name == node.name) == 1:
+            return f"{test}[@name={literal}]"
+        return f"{test}[{same.index(node) + 1}]"
+
+    # ---------------- 生成 ----------------
+
+    @staticmethod
+    def _plain(value):
+        """能原样写成 type:value 的值（parse_locator 会去掉首尾空白）。"""
+        return bool(value) and value == value.strip()
+
+    def candidates(self, node):
+        """node 的所有唯一定位器候选，由短到长（不含带序号的路径）。"""
+        snapshot = self.snapshot
+        found = []
+        if "id" in self.locator_types:
+            value = self._id(node)
+            if self._plain(value) and self._id_index().get(value) == 1:
+                found.append(f"id:{value}")
+        if "name" in self.locator_types and self._plain(node.name) and len(snapshot.by_name.get(node.name, ())) == 1:
+            found.append(f"name:{node.name}")
+        if "role" in self.locator_types and self._plain(node.role) and len(snapshot.by_role.get(node.role, ())) == 1:
+            found.append(f"role:{node.role}")
+        found.sort(key=len)
+        xpaths = [f"xpath://{d}" for d in self._descriptors(node, 0, len(snapshot.nodes))]
+        # 链式：唯一的祖先之下只有这一个
+        current = node
+        while current.parent is not None and current.parent >= 0:
+            ancestor = snapshot.nodes[current.parent]
+            current = ancestor
+            inner = self._descriptors(node, ancestor.index + 1, ancestor.end)
+            if not inner:
+                continue
+            outer = self._descriptors(ancestor, 0, len(snapshot.nodes))
+            if outer:
+                xpaths.append(f"xpath://{outer[0]}//{inner[0]}")
+        xpaths.sort(key=len)
+        return found + xpaths
+
+    def indexed_path(self, node):
+        """从最近的唯一祖先（没有时从快照的根）逐级写出的路径，总是唯一。"""
+        snapshot = self.snapshot
+        steps = []
+        current = node
+        while True:
+            steps.append(self._step(current))
+            if current.parent is None or current.parent < 0:
+                return "xpath:/" + "/".join(reversed(steps))
+            current = snapshot.nodes[current.parent]
+            outer = self._descriptors(current, 0, len(snapshot.nodes))
+            if outer:
+                return f"xpath://{outer[0]}/" + "/".join(reversed(steps))
+
+    def locator_for(self, node, verify=None):
+        """
+        node 的最短唯一定位器；XPath 候选会在快照上求值确认只匹配 node。
+
+        verify(定位器) 返回 False 的候选跳过（调用方在快照之外再确认，例如按实际的查找路径解析），
+        包括带序号的路径在内的所有候选都被否决时返回 None。
+        """
+        for candidate in self.candidates(node):
+            if candidate.startswith("xpath:") and self.snapshot.xpath(candidate[len("xpath:"):]) != [node]:
+                continue
+            if verify is None or verify(candidate):
+                return candidate
+        path = self.indexed_path(node)
+        if verify is None or verify(path):
+            return path
+        return None
@@ -0,0 +1,191 @@
+import os
+import re
+import time
+import subprocess
+
+try:
+    import Xlib.X
+    from Xlib.protocol import event
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+from xtest_input import XTestInputBuffer
+
+# 设置为 1 时备用路径改回调用 xdotool 命令（需要安装 xdotool），默认使用进程内的 Xlib 实现
+XDOTOOL_ENV = "GUIAUTOMATION_XDOTOOL"
+XDOTOOL_TIMEOUT = 2
+# close_window(force=True) 发出 WM_DELETE_WINDOW 后等待窗口自行关闭的时间（秒），超时后直接销毁
+CLOSE_GRACE_PERIOD = 0.5
+
+# _NET_ACTIVE_WINDOW 的来源：2 表示分页器等直接代表用户操作的程序，窗口管理器不会因焦点抢占保护而忽略
+_SOURCE_PAGER = 2
+
+
+def use_xdotool():
+    """是否启用 xdotool 模式（环境变量 GUIAUTOMATION_XDOTOOL=1）。"""
+    return os.environ.get(XDOTOOL_ENV, "0") == "1"
+
+
+def run_xdotool(args, timeout=XDOTOOL_TIMEOUT):
+    """执行 xdotool 命令，返回 CompletedProcess（stdout 为文本）。"""
+    return subprocess.run(["xdotool"] + [str(arg) for arg in args], capture_output=True, text=True,
+                          check=False, timeout=timeout)
+
+
+# 以下函数与 xdotool 的同名命令行为一致，在调用方提供的 Xlib 连接上执行，不创建子进程：
+# search --name / windowactivate / windowclose / getwindowgeometry / click。
+
+
+def window_name(display, window):
+    """窗口标题：优先 _NET_WM_NAME（UTF-8），否则 WM_NAME。"""
+    try:
+        prop = window.get_full_property(display.intern_atom("_NET_WM_NAME"), display.intern_atom("UTF8_STRING"))
+        if prop is not None and prop.value:
+            value = prop.value
+            return value.decode("utf-8", "replace") if isinstance(value, bytes) else str(value)
+    except Exception:
+        pass
+    try:
+        name = window.get_wm_name()
+    except Exception:
+        return ""
+    if isinstance(name, bytes):
+        return name.decode("utf-8", "replace")
+    return name or ""
+
+
+def _compile_pattern(pattern):
+    """xdotool 按不区分大小写的正则匹配标题；不是合法正则时按普通子串匹配。"""
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error:
+        return re.compile(re.escape(pattern), re.IGNORECASE)
+
+
+def _client_list(display, root):
+    try:
+        prop = root.get_full_property(display.intern_atom("_NET_CLIENT_LIST"), Xlib.X.AnyPropertyType)
+    except Exception:
+        return []
+    if prop is None:
+        return []
+    return [display.create_resource_object("window", window_id) for window_id in prop.value]
+
+
+def search_windows(display, root, pattern, limit=None):
+    """
+    按标题查找窗口（xdotool search --name），返回窗口对象列表。
+
+    先查窗口管理器维护的 _NET_CLIENT_LIST（一次属性读取即可得到全部顶层应用窗口），
+    没有结果时再广度优先遍历整个窗口树。
+    """
+    regex = _compile_pattern(pattern)
+    found = []
+    for window in _client_list(display, root):
+        if regex.search(window_name(display, window)):
+            found.append(window)
+            if limit and len(found) >= limit:
+                return found
+    if found:
+        return found
+
+    queue = [root]
+    while queue:
+        current = queue.pop(0)
+        try:
+            children = current.query_tree().children
+        except Exception:
+            continue
+        for child in children:
+            if regex.search(window_name(display, child)):
+                found.append(child)
+                if limit and len(found) >= limit:
+                    return found
+            queue.append(child)
+    return found
+
+
+def find_window(display, root, pattern):
+    """第一个标题匹配的窗口（xdotool search --name ... %1），找不到时抛出异常。"""
+    windows = search_windows(display, root, pattern, limit=1)
+    if not windows:
+        raise Exception(f"找不到窗口: {pattern}")
+    return windows[0]
+
+
+def _client_message(display, root, window, type_name, data):
+    ev = event.ClientMessage(window=window, client_type=display.intern_atom(type_name), data=(32, data))
+    root.send_event(ev, event_mask=Xlib.X.SubstructureRedirectMask | Xlib.X.SubstructureNotifyMask)
+
+
+def activate_window(display, root, window):
+    """激活窗口（xdotool windowactivate）：必要时切换到窗口所在的桌面，再请求窗口管理器激活并提升窗口。"""
+    try:
+        prop = window.get_full_property(display.intern_atom("_NET_WM_DESKTOP"), Xlib.X.AnyPropertyType)
+        if prop is not None and prop.value[0] != 0xFFFFFFFF:
+            _client_message(display, root, root, "_NET_CURRENT_DESKTOP", [prop.value[0], Xlib.X.CurrentTime, 0, 0, 0])
+    except Exception:
+        pass
+    _client_message(display, root, window, "_NET_ACTIVE_WINDOW", [_SOURCE_PAGER, Xlib.X.CurrentTime, 0, 0, 0])
+    window.map()
+    window.raise_window()
+    display.flush()
+
+
+def request_close(display, window):
+    """
+    请求窗口关闭（ICCCM WM_DELETE_WINDOW，直接发给窗口）。由应用自己决定如何关闭，
+    例如先询问是否保存修改；不支持该协议的窗口不会有反应。
+    """
+    ev = event.ClientMessage(window=window, client_type=display.intern_atom("WM_PROTOCOLS"),
+                             data=(32, [display.intern_atom("WM_DELETE_WINDOW"), Xlib.X.CurrentTime, 0, 0, 0]))
+    window.send_event(ev, event_mask=0)
+    display.flush()
+
+
+def close_window(display, root, window):
+    """销毁窗口（xdotool windowclose，即 XDestroyWindow），应用没有机会保存数据，只在强制关闭时使用。"""
+    window.destroy()
+    display.flush()
+
+
+def window_geometry(display, root, window):
+    """窗口在屏幕上的位置和大小 (x, y, width, height)（xdotool getwindowgeometry）。"""
+    geometry = window.get_geometry()
+    origin = window.translate_coords(root, 0, 0)
+    return -origin.x, -origin.y, geometry.width, geometry.height
+
+
+def window_exists(window):
+    try:
+        window.get_attributes()
+        return True
+    except Exception:
+        return False
+
+
+def wait_window_gone(window, timeout, interval=0.05):
+    """等待窗口被销毁，timeout 秒内消失则返回 True。"""
+    deadline = time.monotonic() + timeout
+    while True:
+        if not window_exists(window):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def click_window(display, root, window, button="left"):
+    """
+    xdotool search --name ... click：窗口存在时在鼠标当前位置点击，不移动鼠标（与 xdotool click 相同，
+    点击的不一定是该窗口）。用 XTEST 注入事件，调用方负责持有输入锁。
+    """
+    if not window_exists(window):
+        raise Exception("窗口已不存在")
+    if not XTestInputBuffer.available(display):
+        raise Exception("X服务器不支持 XTEST 扩展")
+    buffer = XTestInputBuffer(display)
+    buffer.button(button, True)
+    buffer.button(button, False)
+    buffer.flush()
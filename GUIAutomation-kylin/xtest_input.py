@@ -0,0 +1,203 @@
+import pyautogui
+
+try:
+    import Xlib.X
+    import Xlib.XK
+    from Xlib.ext import xtest
+    XTEST_AVAILABLE = True
+except ImportError:
+    XTEST_AVAILABLE = False
+
+# pyautogui 风格的按键名 -> X keysym 名称
+KEY_NAME_MAP = {
+    "ctrl": "Control_L", "ctrlleft": "Control_L", "ctrlright": "Control_R",
+    "shift": "Shift_L", "shiftleft": "Shift_L", "shiftright": "Shift_R",
+    "alt": "Alt_L", "altleft": "Alt_L", "altright": "Alt_R",
+    "win": "Super_L", "super": "Super_L", "command": "Super_L",
+    "enter": "Return", "return": "Return", "\n": "Return",
+    "tab": "Tab", "\t": "Tab", "space": "space", " ": "space",
+    "esc": "Escape", "escape": "Escape",
+    "backspace": "BackSpace", "delete": "Delete", "del": "Delete", "insert": "Insert",
+    "home": "Home", "end": "End", "pageup": "Prior", "pagedown": "Next",
+    "up": "Up", "down": "Down", "left": "Left", "right": "Right",
+    "capslock": "Caps_Lock", "printscreen": "Print",
+}
+
+BUTTON_MAP = {"left": 1, "middle": 2, "right": 3}
+
+
+class XTestInputBuffer:
+    """
+    基于 XTEST 扩展的输入事件缓冲区。
+
+    事件先写入连接的输出缓冲，直到 flush() 才一次性发送给X服务器，
+    一组连续的鼠标/键盘动作只需要一次往返。调用方负责持有处理器的输入锁。
+    不在键盘映射中的字符（如中文）会临时映射到一个空闲 keycode 上再发送。
+    """
+
+    def __init__(self, display):
+        self.display = display
+        self.event_count = 0
+        self.flush_count = 0
+        self._spare_keycode = None
+        self._remapped_keysym = None
+
+    @staticmethod
+    def available(display):
+        """当前连接是否支持 XTEST。"""
+        if not XTEST_AVAILABLE or display is None:
+            return False
+        try:
+            return display.has_extension("XTEST")
+        except Exception:
+            return False
+
+    def _fake(self, event_type, detail, x=None, y=None):
+        if x is None:
+            xtest.fake_input(self.display, event_type, detail)
+        else:
+            xtest.fake_input(self.display, event_type, detail, x=int(x), y=int(y))
+        self.event_count += 1
+
+    def move(self, x, y):
+        """移动鼠标到屏幕坐标。"""
+        self._fake(Xlib.X.MotionNotify, 0, x, y)
+
+    def button(self, button, press):
+        """按下或弹起鼠标按钮（'left'/'middle'/'right' 或按钮号）。"""
+        detail = BUTTON_MAP.get(button, button)
+        self._fake(Xlib.X.ButtonPress if press else Xlib.X.ButtonRelease, detail)
+
+    def click(self, x, y, button="left", count=1):
+        """在坐标处点击 count 次。"""
+        self.move(x, y)
+        for _ in range(count):
+            self.button(button, True)
+            self.button(button, False)
+
+    def _keysym_for(self, key):
+        name = KEY_NAME_MAP.get(key.lower() if len(key) > 1 else key, key)
+        keysym = Xlib.XK.string_to_keysym(name)
+        if keysym == 0 and len(key) == 1:
+            # Latin-1 字符的 keysym 等于码位，其余 Unicode 字符使用 0x01000000 偏移
+            code = ord(key)
+            keysym = code if code < 0x100 else 0x01000000 | code
+        return keysym
+
+    def _keycode_for(self, keysym):
+        """返回 (keycode, 是否需要shift)；键盘映射中没有时临时映射到空闲 keycode。"""
+        keycode = self.display.keysym_to_keycode(keysym)
+        if keycode:
+            needs_shift = (self.display.keycode_to_keysym(keycode, 0) != keysym and
+                           self.display.keycode_to_keysym(keycode, 1) == keysym)
+            return keycode, needs_shift
+        if self._spare_keycode is None:
+            self._spare_keycode = self._find_spare_keycode()
+            if self._spare_keycode is None:
+                raise Exception(f"键盘映射中没有可用的空闲 keycode，无法输入 keysym 0x{keysym:x}")
+        if self._remapped_keysym != keysym:
+            # 映射变更之前先把已缓冲的事件发出去，保证它们用旧映射解释
+            self.flush()
+            self.display.change_keyboard_mapping(self._spare_keycode, [(keysym, keysym)])
+            self.display.sync()
+            self._remapped_keysym = keysym
+        return self._spare_keycode, False
+
+    def _find_spare_keycode(self):
+        first = self.display.display.info.min_keycode
+        count = self.display.display.info.max_keycode - first + 1
+        mapping = self.display.get_keyboard_mapping(first, count)
+        for offset, keysyms in enumerate(mapping):
+            if not any(keysyms):
+                return first + offset
+        return None
+
+    def key(self, key, press):
+        """按下或弹起一个键（pyautogui 风格键名或单个字符）。"""
+        keycode, needs_shift = self._keycode_for(self._keysym_for(key))
+        shift = self.display.keysym_to_keycode(Xlib.XK.string_to_keysym("Shift_L")) if needs_shift else None
+        if press:
+            if shift:
+                self._fake(Xlib.X.KeyPress, shift)
+            self._fake(Xlib.X.KeyPress, keycode)
+        else:
+            self._fake(Xlib.X.KeyRelease, keycode)
+            if shift:
+                self._fake(Xlib.X.KeyRelease, shift)
+
+    def press(self, key):
+        """按一下键。"""
+        self.key(key, True)
+        self.key(key, False)
+
+    def hotkey(self, *keys):
+        """组合键：依次按下，逆序弹起。"""
+        for key in keys:
+            self.key(key, True)
+        for key in reversed(keys):
+            self.key(key, False)
+
+    def type_text(self, text):
+        """逐字符输入文本。"""
+        for char in text:
+            self.press(char)
+
+    def flush(self):
+        """把缓冲的事件发送给X服务器并等待处理完成。"""
+        self.display.sync()
+        self.flush_count += 1
+
+    def restore_keyboard_mapping(self):
+        """撤销临时映射的 keycode。"""
+        if self._spare_keycode is not None and self._remapped_keysym is not None:
+            self.display.change_keyboard_mapping(self._spare_keycode, [(0, 0)])
+            self.display.sync()
+            self._remapped_keysym = None
+
+
+class PyAutoGUIInput:
+    """XTEST 不可用时的替代实现，接口与 XTestInputBuffer 相同，每个动作立即执行。"""
+
+    def __init__(self):
+        self.event_count = 0
+        self.flush_count = 0
+
+    def move(self, x, y):
+        pyautogui.moveTo(x, y)
+        self.event_count += 1
+
+    def button(self, button, press):
+        if press:
+            pyautogui.mouseDown(button=button)
+        else:
+            pyautogui.mouseUp(button=button)
+        self.event_count += 1
+
+    def click(self, x, y, button="left", count=1):
+        pyautogui.click(x, y, clicks=count, button=button)
+        self.event_count += 2 * count
+
+    def key(self, key, press):
+        if press:
+            pyautogui.keyDown(key)
+        else:
+            pyautogui.keyUp(key)
+        self.event_count += 1
+
+    def press(self, key):
+        pyautogui.press(key)
+        self.event_count += 2
+
+    def hotkey(self, *keys):
+        pyautogui.hotkey(*keys)
+        self.event_count += 2 * len(keys)
+
+    def type_text(self, text):
+        pyautogui.write(text)
+        self.event_count += 2 * len(text)
+
+    def flush(self):
+        self.flush_count += 1
+
+    def restore_keyboard_mapping(self):
+        pass